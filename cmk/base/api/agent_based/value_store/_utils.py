@@ -3,6 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import base64
 import json
 from ast import literal_eval
 from collections.abc import (
@@ -14,6 +15,7 @@ from collections.abc import (
     MutableMapping,
 )
 from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Final, TypeVar
 
@@ -28,7 +30,12 @@ from cmk.utils.log import logger
 _PluginName = str
 _Item = str | None
 _UserKey = str
-_ValueStoreKey = tuple[HostName, _PluginName, _Item, _UserKey]
+_ValueStoreKey = tuple[str, _PluginName, _Item]
+# A value encoded to what JSON can represent, see _serialize_value
+_SerializedValue = Any
+
+# The first line of the files, followed by a line per service
+_FORMAT_HEADER: Final = "value store 2"
 
 _TKey = TypeVar("_TKey", bound=Hashable)
 _TValue = TypeVar("_TValue")
@@ -81,8 +88,9 @@ class _StaticDiskSyncedMapping(Mapping[_TKey, _TValue]):
         *,
         path: Path,
         log_debug: Callable[[str], None],
-        serializer: Callable[[Mapping[_TKey, _TValue]], str],
-        deserializer: Callable[[str], Mapping[_TKey, _TValue]],
+        serializer: Callable[[Mapping[_TKey, _TValue]], bytes],
+        deserializer: Callable[[bytes], Mapping[_TKey, _TValue]],
+        merge: Callable[[_TValue | None, _TValue], _TValue] | None = None,
     ) -> None:
         self._path: Final = path
         self._last_sync: float | None = None
@@ -90,6 +98,7 @@ class _StaticDiskSyncedMapping(Mapping[_TKey, _TValue]):
         self._log_debug = log_debug
         self._serializer: Final = serializer
         self._deserializer: Final = deserializer
+        self._merge: Final = merge
         self.disksync()
 
     def __getitem__(self, key: _TKey) -> _TValue:
@@ -111,6 +120,7 @@ class _StaticDiskSyncedMapping(Mapping[_TKey, _TValue]):
 
         This method will reload the values from disk, apply the changes (remove keys
         and update values) as specified by the arguments, and then write the result to disk.
+        Updated values are merged into the reloaded ones, if a merge function is given.
 
         When this method returns, the data provided via the Mapping-interface and
         the data stored on disk must be in sync.
@@ -127,15 +137,19 @@ class _StaticDiskSyncedMapping(Mapping[_TKey, _TValue]):
                     self._log_debug("loading from disk")
                     self._data = (
                         self._deserializer(content)
-                        if (content := store.load_text_from_file(self._path, lock=False).strip())
+                        if (content := store.load_bytes_from_file(self._path, lock=False))
                         else {}
                     )
 
                 if removed or updated:
                     data = {k: v for k, v in self._data.items() if k not in removed}
-                    data.update(updated)
+                    data.update(
+                        updated
+                        if self._merge is None
+                        else ((k, self._merge(data.get(k), v)) for k, v in updated)
+                    )
                     self._log_debug("writing to disk")
-                    store.save_text_to_file(self._path, self._serializer(data))
+                    store.save_bytes_to_file(self._path, self._serializer(data))
                     self._data = data
 
                 self._last_sync = self._path.stat().st_mtime
@@ -152,8 +166,9 @@ class _DiskSyncedMapping(MutableMapping[_TKey, _TValue]):  # pylint: disable=too
         *,
         path: Path,
         log_debug: Callable[[str], None],
-        serializer: Callable[[Mapping[_TKey, _TValue]], str],
-        deserializer: Callable[[str], Mapping[_TKey, _TValue]],
+        serializer: Callable[[Mapping[_TKey, _TValue]], bytes],
+        deserializer: Callable[[bytes], Mapping[_TKey, _TValue]],
+        merge: Callable[[_TValue | None, _TValue], _TValue] | None = None,
     ) -> "_DiskSyncedMapping":
         return cls(
             dynamic=_DynamicDiskSyncedMapping(),
@@ -162,6 +177,7 @@ class _DiskSyncedMapping(MutableMapping[_TKey, _TValue]):  # pylint: disable=too
                 log_debug=log_debug,
                 serializer=serializer,
                 deserializer=deserializer,
+                merge=merge,
             ),
         )
 
@@ -222,28 +238,167 @@ class _DiskSyncedMapping(MutableMapping[_TKey, _TValue]):  # pylint: disable=too
         self._dynamic = _DynamicDiskSyncedMapping()
 
 
+_SCALAR_TYPES: Final = frozenset((type(None), bool, int, float, str))
+
+
+def _serialize_value(value: Any) -> _SerializedValue:
+    """Encode a value to what JSON can represent
+
+    JSON objects are only used to tag the types JSON doesn't know:
+
+    >>> _serialize_value((1, 2.0))
+    {'t': [1, 2.0]}
+    >>> _serialize_value({"a": [None, True], 1: {"b"}})
+    {'i': [['a', [None, True]], [1, {'s': ['b']}]]}
+
+    Subclasses of the builtin types are stored as those, like they used to be:
+
+    >>> _serialize_value(HostName("heute"))
+    'heute'
+    """
+    if type(value) in _SCALAR_TYPES:
+        return value
+    match value:
+        case tuple():
+            # Mostly counters, spare the calls for their items
+            return {"t": [v if type(v) in _SCALAR_TYPES else _serialize_value(v) for v in value]}
+        case list():
+            return [_serialize_value(v) for v in value]
+        case dict() if all(type(k) is str for k in value):
+            return {"d": {k: _serialize_value(v) for k, v in value.items()}}
+        case dict():
+            return {"i": [[_serialize_value(k), _serialize_value(v)] for k, v in value.items()]}
+        case frozenset():
+            return {"f": [_serialize_value(v) for v in value]}
+        case set():
+            return {"s": [_serialize_value(v) for v in value]}
+        case bytes():
+            return {"b": base64.b64encode(value).decode("ascii")}
+        case str():
+            return str(value)
+        case int():
+            return int(value)
+        case float():
+            return float(value)
+    # We can't tell what to make of this when loading it. Fail in the scope of the plug-in then.
+    return {"r": repr(value)}
+
+
+def _deserialize_value(raw: _SerializedValue) -> Any:
+    """
+    >>> _deserialize_value(_serialize_value({"a": (1, 2.0), 1: {b"b"}}))
+    {'a': (1, 2.0), 1: {b'b'}}
+    """
+    if type(raw) is list:
+        return [_deserialize_value(v) for v in raw]
+    if type(raw) is not dict:
+        return raw
+
+    ((tag, encoded),) = raw.items()
+    match tag:
+        case "t":
+            return tuple([_deserialize_value(v) if type(v) in (list, dict) else v for v in encoded])
+        case "d":
+            return {k: _deserialize_value(v) for k, v in encoded.items()}
+        case "i":
+            return {_deserialize_value(k): _deserialize_value(v) for k, v in encoded}
+        case "f":
+            return frozenset(_deserialize_value(v) for v in encoded)
+        case "s":
+            return {_deserialize_value(v) for v in encoded}
+        case "b":
+            return base64.b64decode(encoded)
+    raise ValueError(f"Cannot load value: {encoded!r}")
+
+
+@dataclass
+class _ServiceChanges:
+    """The values of a service changed in this session
+
+    Only the changed keys are merged into the values stored by others in the meantime."""
+
+    values: dict[_UserKey, _SerializedValue]
+    loaded_from: "_ServiceValues | None" = None
+    updated: set[_UserKey] = field(default_factory=set)
+    removed: set[_UserKey] = field(default_factory=set)
+
+
+# The values of a service, either still as the line of the file, loaded or changed
+_ServiceValues = str | dict[_UserKey, _SerializedValue] | _ServiceChanges
+
+
+def _load_service_values(values: _ServiceValues) -> dict[_UserKey, _SerializedValue]:
+    match values:
+        case str():
+            loaded: dict[_UserKey, _SerializedValue] = json.loads(values[values.index("\t") + 1 :])
+            return loaded
+        case _ServiceChanges():
+            return values.values
+    return values
+
+
+def _merge_service_values(stored: _ServiceValues | None, values: _ServiceValues) -> _ServiceValues:
+    """
+    >>> _merge_service_values(
+    ...     '["heute", "plugin", null]\\t{"a": 1, "b": 2, "c": 3}',
+    ...     _ServiceChanges({"a": 4}, updated={"a"}, removed={"b"}),
+    ... )
+    {'a': 4, 'c': 3}
+    """
+    if not isinstance(values, _ServiceChanges):
+        return values
+    if stored is not None and stored is values.loaded_from:
+        # Nobody else has changed them in the meantime
+        return values.values
+    merged = {} if stored is None else dict(_load_service_values(stored))
+    for key in values.removed:
+        merged.pop(key, None)
+    merged.update((key, values.values[key]) for key in values.updated)
+    return merged
+
+
 class _ValueStore(MutableMapping[_UserKey, Any]):  # pylint: disable=too-many-ancestors
     """Implements the mutable mapping that is exposed to the plugins
 
     This class ensures that every service has its own name space in the
-    persisted values, by adding the service ID (check plug-in name and item) to
-    the user supplied keys.
+    persisted values, by storing the values under the service ID (check
+    plug-in name and item).
     """
 
     def __init__(
         self,
         *,
-        data: MutableMapping[_ValueStoreKey, str],
+        data: MutableMapping[_ValueStoreKey, _ServiceValues],
         service_id: _ServiceID,
         host_name: HostName,
     ) -> None:
-        self._prefix = (host_name, str(service_id[0]), service_id[1])
+        self._key: Final = (
+            str(host_name),
+            str(service_id[0]),
+            None if service_id[1] is None else str(service_id[1]),
+        )
         self._data = data
-
-    def _map_key(self, user_key: _UserKey) -> _ValueStoreKey:
+        self._values: dict[_UserKey, _SerializedValue] | None = None
+
+    def _get_values(self) -> dict[_UserKey, _SerializedValue]:
+        """Load the values of this service only when they are needed"""
+        if self._values is None:
+            values = self._data.get(self._key)
+            self._values = {} if values is None else _load_service_values(values)
+        return self._values
+
+    def _changes(self) -> _ServiceChanges:
+        # Mark the values of this service as changed, they are encoded again upon saving.
+        if not isinstance(changes := self._data.get(self._key), _ServiceChanges):
+            self._values = dict(self._get_values())
+            changes = self._data[self._key] = _ServiceChanges(self._values, loaded_from=changes)
+        return changes
+
+    @staticmethod
+    def _check_key(user_key: _UserKey) -> _UserKey:
         if not isinstance(user_key, _UserKey):
             raise TypeError(f"value store key must be {_UserKey}")
-        return (self._prefix[0], self._prefix[1], self._prefix[2], user_key)
+        return user_key
 
     def __getitem__(self, key: _UserKey) -> Any:
         """
@@ -251,7 +406,7 @@ class _ValueStore(MutableMapping[_UserKey, Any]):  # pylint: disable=too-many-an
         This is called in the plugins scope, so deserialization
         should only fail here, not for the whole value store file.
         """
-        return literal_eval(self._data.__getitem__(self._map_key(key)))
+        return _deserialize_value(self._get_values().__getitem__(self._check_key(key)))
 
     def __setitem__(self, key: _UserKey, value: Any) -> Any:
         """
@@ -260,20 +415,92 @@ class _ValueStore(MutableMapping[_UserKey, Any]):  # pylint: disable=too-many-an
         and failure to (de)serialize individual values will only affect the
         offending plugin.
         """
-        return self._data.__setitem__(self._map_key(key), repr(value))
+        changes = self._changes()
+        changes.values[self._check_key(key)] = _serialize_value(value)
+        changes.updated.add(key)
+        changes.removed.discard(key)
 
     def __delitem__(self, key: _UserKey) -> Any:
-        return self._data.__delitem__(self._map_key(key))
+        if self._check_key(key) not in self._get_values():
+            raise KeyError(key)
+        changes = self._changes()
+        del changes.values[key]
+        changes.updated.discard(key)
+        changes.removed.add(key)
 
     def __iter__(self) -> Iterator[_UserKey]:
-        return (
-            user_key
-            for (host_name, check_name, item, user_key) in self._data
-            if (host_name, check_name, item) == self._prefix
-        )
+        return iter(self._get_values())
 
     def __len__(self) -> int:
-        return sum(1 for _ in self)
+        return len(self._get_values())
+
+
+_JSON_ENCODER: Final = json.JSONEncoder(separators=(",", ":"))
+
+
+def _serialize(data: Mapping[_ValueStoreKey, _ServiceValues]) -> bytes:
+    """Write a line per service, the unchanged services as loaded
+
+    JSON escapes tabs and line breaks within strings, so they only separate the service ID from
+    the values and the services from each other.
+    """
+    return "".join(
+        [
+            f"{_FORMAT_HEADER}\n",
+            *(
+                f"{values}\n"
+                if isinstance(values, str)
+                else f"{_JSON_ENCODER.encode(key)}\t{_JSON_ENCODER.encode(loaded)}\n"
+                for key, values in data.items()
+                if isinstance(values, str) or (loaded := _load_service_values(values))
+            ),
+        ]
+    ).encode()
+
+
+def _deserialize(raw: bytes) -> Mapping[_ValueStoreKey, _ServiceValues]:
+    """Load the service IDs, the values of the services are loaded later
+
+    >>> data = _deserialize(_serialize({("heute", "plugin", None): {"key": {"t": [1, 2]}}}))
+    >>> data
+    {('heute', 'plugin', None): '["heute","plugin",null]\\t{"key":{"t":[1,2]}}'}
+    >>> _load_service_values(data[("heute", "plugin", None)])
+    {'key': {'t': [1, 2]}}
+
+    We used to store a JSON list of all keys and repr'ed values:
+
+    >>> _deserialize(b'[[["heute", "plugin", null, "key"], "(1, 2)"]]')
+    {('heute', 'plugin', None): {'key': {'t': [1, 2]}}}
+    """
+    text = raw.decode("utf-8")
+    if text.lstrip().startswith("["):
+        return _deserialize_repr_values(text)
+
+    header, _newline, services = text.partition("\n")
+    if header != _FORMAT_HEADER:
+        return {}
+
+    lines = services.splitlines()
+    # Decoding all service IDs at once is a lot faster than one by one
+    keys = json.loads("[%s]" % ",".join(line[: line.index("\t")] for line in lines))
+    return {
+        (host_name, plugin_name, item): line
+        for (host_name, plugin_name, item), line in zip(keys, lines)
+    }
+
+
+def _deserialize_repr_values(
+    text: str,
+) -> Mapping[_ValueStoreKey, dict[_UserKey, _SerializedValue]]:
+    data: dict[_ValueStoreKey, dict[_UserKey, _SerializedValue]] = {}
+    for (host_name, plugin_name, item, user_key), value in json.loads(text):
+        try:
+            serialized_value = _serialize_value(literal_eval(value))
+        except (ValueError, SyntaxError):
+            # Fail in the scope of the plug-in, as it used to
+            serialized_value = {"r": value}
+        data.setdefault((host_name, plugin_name, item), {})[user_key] = serialized_value
+    return data
 
 
 class ValueStoreManager:
@@ -292,11 +519,14 @@ class ValueStoreManager:
     STORAGE_PATH = Path(cmk.utils.paths.counters_dir)
 
     def __init__(self, host_name: HostName) -> None:
-        self._value_store: _DiskSyncedMapping[_ValueStoreKey, str] = _DiskSyncedMapping.make(
-            path=self.STORAGE_PATH / host_name,
-            log_debug=lambda x: logger.debug("value store: %s", x),
-            serializer=lambda d: json.dumps(list(d.items())),
-            deserializer=lambda raw: {tuple(k): v for k, v in json.loads(raw)},
+        self._value_store: _DiskSyncedMapping[_ValueStoreKey, _ServiceValues] = (
+            _DiskSyncedMapping.make(
+                path=self.STORAGE_PATH / host_name,
+                log_debug=lambda x: logger.debug("value store: %s", x),
+                serializer=_serialize,
+                deserializer=_deserialize,
+                merge=_merge_service_values,
+            )
         )
         self.active_service_interface: MutableMapping[str, Any] | None = None
         self._host_name = host_name
@@ -32,7 +32,7 @@ from cmk.utils.hostaddress import HostAddress, HostName
 from cmk.utils.ip_lookup import IPStackConfig
 from cmk.utils.log import console
 from cmk.utils.misc import pnp_cleanup
-from cmk.utils.prediction import make_updated_predictions, PredictionStore
+from cmk.utils.prediction import make_updated_predictions, PredictionCache, PredictionStore
 from cmk.utils.rulesets import RuleSetName
 from cmk.utils.rulesets.ruleset_matcher import RulesetMatcher, RuleSpec
 from cmk.utils.sectionname import SectionMap, SectionName
@@ -607,7 +607,8 @@ def _compute_final_check_parameters(
     def make_prediction():
         # Whatch out. The CMC has to agree on the path.
         prediction_store = PredictionStore(
-            cmk.utils.paths.predictions_dir / host_name / pnp_cleanup(service.description)
+            cmk.utils.paths.predictions_dir / host_name / pnp_cleanup(service.description),
+            PredictionCache(cmk.utils.paths.predictions_dir / host_name),
         )
         # In the past the creation of predictions (and the livestatus query needed)
         # was performed inside the check plug-ins context.
@@ -617,7 +618,7 @@ def _compute_final_check_parameters(
             predictions=make_updated_predictions(
                 prediction_store,
                 partial(
-                    livestatus.get_rrd_data,
+                    livestatus.get_rrd_data_batch,
                     livestatus.LocalConnection(),
                     host_name,
                     service.description,
@@ -1772,6 +1772,7 @@ class ConfigCache:
             ),
             builtin_host_labels_store=BuiltinHostLabelsStore(),
             debug_matching_stats=ruleset_matching_stats,
+            match_index_path=cmk.utils.paths.rule_match_index_file,
         )
 
         self.ruleset_matcher.ruleset_optimizer.set_all_processed_hosts(
@@ -3033,14 +3034,20 @@ class ConfigCache:
             host_backend = host_backend_config[0]
             if with_inline_snmp and host_backend == "inline":
                 return SNMPBackendEnum.INLINE
-            if host_backend == "classic":
+            # "pysnmp" is the backend dropped during the 2.1 beta, see
+            # transform_snmp_backend_hosts_to_valuespec() of the GUI.
+            if host_backend in ("classic", "pysnmp"):
                 return SNMPBackendEnum.CLASSIC
+            if host_backend == "pysnmp_async":
+                return SNMPBackendEnum.PYSNMP
             raise MKGeneralException(f"Bad Host SNMP Backend configuration: {host_backend}")
 
         if with_inline_snmp and snmp_backend_default == "inline":
             return SNMPBackendEnum.INLINE
         if snmp_backend_default == "classic":
             return SNMPBackendEnum.CLASSIC
+        if snmp_backend_default == "pysnmp_async":
+            return SNMPBackendEnum.PYSNMP
         # Note: in the above case we raise here.
         # I am not sure if this different behavior is intentional.
         return SNMPBackendEnum.CLASSIC
@@ -3170,10 +3177,12 @@ class ConfigCache:
 
         now = time.time()
 
-        def _is_usable(data: piggyback.PiggybackMessage) -> bool:
-            return (now - data.meta.last_update) <= piggy_config.max_cache_age(data.meta.source)
+        def _is_usable(meta: piggyback.PiggybackMetaData) -> bool:
+            return (now - meta.last_update) <= piggy_config.max_cache_age(meta.source)
 
-        return any(map(_is_usable, piggyback.get_messages_for(host_name, cmk.utils.paths.omd_root)))
+        return any(
+            map(_is_usable, piggyback.get_piggyback_meta_data(host_name, cmk.utils.paths.omd_root))
+        )
 
     def _piggybacked_host_files(self, host_name: HostName) -> list[tuple[str | None, str, int]]:
         if rules := self.ruleset_matcher.get_host_values(host_name, piggybacked_host_files):
@@ -3367,6 +3376,27 @@ class ConfigCache:
         out = self.ruleset_matcher.service_extra_conf(hostname, description, check_periods)
         return out[0] if out and out[0] != "24X7" else None
 
+    def _core_service_rulesets(self) -> list[Sequence[RuleSpec[Any]]]:
+        """The service rulesets looked up for every service in the core configuration"""
+        return [
+            service_tag_rules,
+            *extra_service_conf.values(),
+            service_icons_and_actions,
+            service_groups,
+            service_contactgroups,
+            check_periods,
+            custom_service_attributes,
+            service_service_levels,
+        ]
+
+    def prepare_core_service_rulesets(
+        self, hostname: HostName, descriptions: Iterable[ServiceName]
+    ) -> None:
+        """Evaluate the core configuration rulesets for all services of the host at once"""
+        self.ruleset_matcher.prepare_service_rulesets(
+            hostname, descriptions, self._core_service_rulesets()
+        )
+
     @staticmethod
     def get_explicit_service_custom_variables(
         hostname: HostName, description: ServiceName
@@ -4234,6 +4264,19 @@ class CEEConfigCache(ConfigCache):
         self.__rtc_secret.clear()
         self.__agent_config.clear()
 
+    def _core_service_rulesets(self) -> list[Sequence[RuleSpec[Any]]]:
+        return [
+            *super()._core_service_rulesets(),
+            cmc_service_rrd_config,
+            service_recurring_downtimes,  # type: ignore[name-defined,unused-ignore] # pylint: disable=undefined-variable
+            cmc_service_flap_settings,  # type: ignore[name-defined,unused-ignore] # pylint: disable=undefined-variable
+            cmc_service_long_output_in_monitoring_history,  # type: ignore[name-defined,unused-ignore] # pylint: disable=undefined-variable
+            service_state_translation,  # type: ignore[name-defined,unused-ignore] # pylint: disable=undefined-variable
+            cmc_service_check_timeout,  # type: ignore[name-defined,unused-ignore] # pylint: disable=undefined-variable
+            cmc_graphite_service_metrics,  # type: ignore[name-defined,unused-ignore] # pylint: disable=undefined-variable
+            cmc_influxdb_service_metrics,  # type: ignore[name-defined,unused-ignore] # pylint: disable=undefined-variable
+        ]
+
     def cmc_log_rrdcreation(self) -> Literal["terse", "full"] | None:
         return cmc_log_rrdcreation
 
@@ -82,6 +82,7 @@ class MonitoringCore(abc.ABC):
             passwords,
             hosts_to_update,
         )
+        config_cache.ruleset_matcher.persist_match_index()
         if config.ruleset_matching_stats:
             config_cache.ruleset_matcher.persist_matching_stats(
                 "tmp/ruleset_matching_stats", config.get_ruleset_id_mapping()
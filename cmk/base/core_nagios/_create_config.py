@@ -389,6 +389,12 @@ def create_nagios_servicedefs(  # pylint: disable=too-many-branches
     license_counter: Counter,
     ip_address_of: config.IPLookup,
 ) -> dict[ServiceName, Labels]:
+    host_check_table = config_cache.check_table(hostname)
+    config_cache.prepare_core_service_rulesets(
+        hostname,
+        ["Check_MK", *(service.description for service in host_check_table.values())],
+    )
+
     check_mk_attrs = core_config.get_service_attributes(
         hostname, "Check_MK", config_cache, extra_icon=None
     )
@@ -422,7 +428,6 @@ def create_nagios_servicedefs(  # pylint: disable=too-many-branches
 
         return result
 
-    host_check_table = config_cache.check_table(hostname)
     have_at_least_one_service = False
     used_descriptions: dict[ServiceName, AbstractServiceID] = {}
     service_labels: dict[ServiceName, Labels] = {}
@@ -190,6 +190,8 @@ def parse_snmp_backend(backend: object) -> SNMPBackendEnum | None:
             return SNMPBackendEnum.INLINE
         case "classic":
             return SNMPBackendEnum.CLASSIC
+        case "pysnmp":
+            return SNMPBackendEnum.PYSNMP
         case "stored-walk":
             return SNMPBackendEnum.STORED_WALK
         case _:
@@ -326,7 +328,7 @@ _SNMP_BACKEND_OPTION: Final = Option(
     long_option="snmp-backend",
     short_help="Override default SNMP backend",
     argument=True,
-    argument_descr="inline|classic|stored-walk",
+    argument_descr="inline|classic|pysnmp|stored-walk",
 )
 
 # .
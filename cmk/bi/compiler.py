@@ -6,11 +6,16 @@
 from __future__ import annotations
 
 import ast
+import gc
+import hashlib
+import multiprocessing
 import os
 import pickle
 import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import TypedDict
+from typing import Any, TypedDict
 
 from redis import Redis
 
@@ -24,9 +29,9 @@ from cmk.utils.redis import get_redis_client
 
 from cmk.bi.aggregation import BIAggregation
 from cmk.bi.data_fetcher import BIStructureFetcher, get_cache_dir, SiteProgramStart
-from cmk.bi.lib import SitesCallback
+from cmk.bi.lib import BIHostData, SitesCallback
 from cmk.bi.packs import BIAggregationPacks
-from cmk.bi.searcher import BISearcher
+from cmk.bi.searcher import BISearchDependencies, BISearcher
 from cmk.bi.trees import BICompiledAggregation, BICompiledRule, FrozenBIInfo
 from cmk.bi.type_defs import frozen_aggregations_dir
 
@@ -39,16 +44,47 @@ class ConfigStatus(TypedDict):
 
 path_compiled_aggregations = Path(get_cache_dir(), "compiled_aggregations")
 
+# Forking the compilation processes only pays off with enough aggregations for each of them
+MIN_AGGREGATIONS_PER_COMPILATION_PROCESS = 20
+
+
+@dataclass
+class BICompilationReport:
+    compiled: list[str] = field(default_factory=list)
+    reused: list[str] = field(default_factory=list)
+    """The aggregations taken from the last compilation, as their inputs did not change"""
+    changed_hosts: int = 0
+
+
+@dataclass
+class _CompilationDependencies:
+    """What the compiled aggregations have been compiled from"""
+
+    host_digests: dict[str, tuple[int, dict[str, str]]] = field(default_factory=dict)
+    """The digests of the data of the hosts by host name, by site and its program start"""
+    aggregations: dict[str, tuple[str, BISearchDependencies]] = field(default_factory=dict)
+    """The digest of the configuration and the search dependencies by aggregation"""
+
 
 class BICompiler:
-    def __init__(self, bi_configuration_file: str, sites_callback: SitesCallback) -> None:
+    def __init__(
+        self,
+        bi_configuration_file: str,
+        sites_callback: SitesCallback,
+        compilation_processes: int = 1,
+        min_aggregations_per_process: int = MIN_AGGREGATIONS_PER_COMPILATION_PROCESS,
+    ) -> None:
         self._sites_callback = sites_callback
         self._bi_configuration_file = bi_configuration_file
+        self._compilation_processes = compilation_processes
+        self._min_aggregations_per_process = min_aggregations_per_process
 
         self._logger = logger.getChild("bi.compiler")
         self._compiled_aggregations: dict[str, BICompiledAggregation] = {}
         self._path_compilation_lock = Path(get_cache_dir(), "compilation.LOCK")
         self._path_compilation_timestamp = Path(get_cache_dir(), "last_compilation")
+        self._path_compilation_dependencies = Path(get_cache_dir(), "compilation_dependencies")
+        self.compilation_report: BICompilationReport | None = None
         path_compiled_aggregations.mkdir(parents=True, exist_ok=True)
 
         self._redis_client: Redis[str] | None = None
@@ -220,17 +256,70 @@ class BICompiler:
 
             self.prepare_for_compilation(current_configstatus["online_sites"])
 
+            # Only compile the aggregations whose configuration or searched hosts changed
+            previous_dependencies = self._load_compilation_dependencies()
+            # Until the compiled aggregations have been saved, they don't fit to any dependencies
+            self._path_compilation_dependencies.unlink(missing_ok=True)
+            dependencies = _CompilationDependencies(
+                host_digests=self._compute_host_digests(
+                    current_configstatus["online_sites"], previous_dependencies.host_digests
+                )
+            )
+            changed_hosts = _changed_hosts(
+                previous_dependencies.host_digests, dependencies.host_digests
+            )
+            changed_hosts_searcher = BISearcher()
+            changed_hosts_searcher.set_hosts(
+                {
+                    host_name: host
+                    for host_name in changed_hosts
+                    if (host := self._bi_structure_fetcher.hosts.get(host_name)) is not None
+                }
+            )
+            report = BICompilationReport(changed_hosts=len(changed_hosts))
+
             # Compile the raw tree
             all_aggregations_by_id: dict[str, BIAggregation] = {
                 x.id: x for x in self._bi_packs.get_all_aggregations()
             }
+            config_digests: dict[str, str] = {}
+            reused_aggregations: dict[str, BICompiledAggregation] = {}
+            aggregations_to_compile: list[BIAggregation] = []
             for aggregation in all_aggregations_by_id.values():
                 start = time.time()
-                self._compiled_aggregations[aggregation.id] = aggregation.compile(self.bi_searcher)
-                self._logger.debug(f"Compilation of {aggregation.id} took {time.time() - start:f}")
+                config_digest = config_digests[aggregation.id] = self._aggregation_config_digest(
+                    aggregation
+                )
+                if (
+                    compiled_aggregation := self._load_unaffected_compiled_aggregation(
+                        aggregation.id,
+                        config_digest,
+                        previous_dependencies,
+                        changed_hosts,
+                        changed_hosts_searcher,
+                    )
+                ) is not None:
+                    reused_aggregations[aggregation.id] = compiled_aggregation
+                    self._logger.debug(f"Reusing {aggregation.id} took {time.time() - start:f}")
+                    continue
+                aggregations_to_compile.append(aggregation)
+
+            compilation_results = self.compile_aggregations(aggregations_to_compile)
+            # Merge in the order of the configuration, regardless of how they have been compiled
+            for aggr_id in all_aggregations_by_id:
+                if (compiled_aggregation := reused_aggregations.get(aggr_id)) is not None:
+                    self._compiled_aggregations[aggr_id] = compiled_aggregation
+                    dependencies.aggregations[aggr_id] = previous_dependencies.aggregations[aggr_id]
+                    report.reused.append(aggr_id)
+                    continue
+                compiled_aggregation, search_dependencies = compilation_results[aggr_id]
+                self._compiled_aggregations[aggr_id] = compiled_aggregation
+                dependencies.aggregations[aggr_id] = (config_digests[aggr_id], search_dependencies)
+                report.compiled.append(aggr_id)
             self._verify_aggregation_title_uniqueness(self._compiled_aggregations)
 
-            for aggr_id, compiled_aggr in self._compiled_aggregations.items():
+            for aggr_id in report.compiled:
+                compiled_aggr = self._compiled_aggregations[aggr_id]
                 start = time.time()
                 result = compiled_aggr.serialize()
                 self._logger.debug(
@@ -238,6 +327,9 @@ class BICompiler:
                     % (aggr_id, time.time() - start, len(compiled_aggr.branches))
                 )
                 self._save_data(path_compiled_aggregations.joinpath(aggr_id), result)
+            self._save_data(self._path_compilation_dependencies, dependencies)
+            self._log_compilation_report(report)
+            self.compilation_report = report
 
             self._compiled_aggregations = self._manage_frozen_branches(self._compiled_aggregations)
             self._generate_part_of_aggregation_lookup(self._compiled_aggregations)
@@ -249,6 +341,151 @@ class BICompiler:
             str(self._path_compilation_timestamp), str(current_configstatus["configfile_timestamp"])
         )
 
+    def compile_aggregations(
+        self, aggregations: Sequence[BIAggregation]
+    ) -> dict[str, tuple[BICompiledAggregation, BISearchDependencies]]:
+        """Compile the aggregations with the current host data
+
+        If configured and there are enough of them, the aggregations are distributed over a pool of
+        processes. They are forked from this process, so they share the host data of the searcher
+        instead of getting a copy sent."""
+        processes = min(
+            self._compilation_processes,
+            len(aggregations) // max(1, self._min_aggregations_per_process),
+        )
+        if processes < 2:
+            compilation_results = {}
+            for aggregation in aggregations:
+                start = time.time()
+                with self.bi_searcher.record_dependencies() as search_dependencies:
+                    compilation_results[aggregation.id] = (
+                        aggregation.compile(self.bi_searcher),
+                        search_dependencies,
+                    )
+                self._logger.debug(f"Compilation of {aggregation.id} took {time.time() - start:f}")
+            return compilation_results
+
+        start = time.time()
+        # Keep the garbage collection of the processes away from the objects of this process.
+        # Otherwise it touches them all, which makes the processes copy the memory.
+        gc.freeze()
+        try:
+            with multiprocessing.get_context("fork").Pool(
+                processes,
+                initializer=_init_compilation_process,
+                initargs=(self._bi_packs, self.bi_searcher),
+            ) as pool:
+                # The results come in the order of the aggregations, not in the order of completion
+                results = pool.map(
+                    _compile_aggregation,
+                    [aggregation.id for aggregation in aggregations],
+                    chunksize=1,
+                )
+        finally:
+            gc.unfreeze()
+        self._logger.debug(
+            f"Compilation of {len(aggregations)} aggregations in {processes} processes"
+            f" took {time.time() - start:f}"
+        )
+
+        compilation_results = {}
+        for aggregation, (schema, search_dependencies, duration) in zip(aggregations, results):
+            self._logger.debug(f"Compilation of {aggregation.id} took {duration:f}")
+            compilation_results[aggregation.id] = (
+                BIAggregation.create_trees_from_schema(schema),
+                search_dependencies,
+            )
+        return compilation_results
+
+    def _load_compilation_dependencies(self) -> _CompilationDependencies:
+        try:
+            dependencies = pickle.loads(
+                store.load_bytes_from_file(self._path_compilation_dependencies)
+            )
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return _CompilationDependencies()
+        return (
+            dependencies
+            if isinstance(dependencies, _CompilationDependencies)
+            else _CompilationDependencies()
+        )
+
+    def _compute_host_digests(
+        self,
+        online_sites: set[SiteProgramStart],
+        previous_host_digests: Mapping[str, tuple[int, dict[str, str]]],
+    ) -> dict[str, tuple[int, dict[str, str]]]:
+        program_starts: dict[str, int] = dict(online_sites)
+        hosts_by_site: dict[str, dict[str, BIHostData]] = {}
+        for host_name, host in self._bi_structure_fetcher.hosts.items():
+            hosts_by_site.setdefault(host.site_id, {})[host_name] = host
+
+        host_digests = {}
+        for site_id, hosts in hosts_by_site.items():
+            program_start = program_starts.get(site_id, 0)
+            # The data of a site only changes with its program start, so the digests are only
+            # computed for the hosts of restarted sites
+            if (
+                (previous := previous_host_digests.get(site_id)) is not None
+                and previous[0] == program_start
+                and previous[1].keys() == hosts.keys()
+            ):
+                host_digests[site_id] = previous
+                continue
+            host_digests[site_id] = (
+                program_start,
+                {host_name: _host_digest(host) for host_name, host in hosts.items()},
+            )
+        return host_digests
+
+    def _aggregation_config_digest(self, aggregation: BIAggregation) -> str:
+        rules = [
+            self._bi_packs.get_rule_mandatory(rule_id)
+            for rule_id in sorted(self._bi_packs.get_rule_ids_of_aggregation(aggregation.id))
+        ]
+        return hashlib.sha256(
+            repr(
+                (
+                    aggregation.pack_id,
+                    aggregation.serialize(),
+                    [(rule.pack_id, rule.serialize()) for rule in rules],
+                )
+            ).encode()
+        ).hexdigest()
+
+    def _load_unaffected_compiled_aggregation(
+        self,
+        aggr_id: str,
+        config_digest: str,
+        previous_dependencies: _CompilationDependencies,
+        changed_hosts: set[str],
+        changed_hosts_searcher: BISearcher,
+    ) -> BICompiledAggregation | None:
+        if (previous := previous_dependencies.aggregations.get(aggr_id)) is None:
+            return None
+
+        previous_config_digest, search_dependencies = previous
+        if previous_config_digest != config_digest or search_dependencies.affected_by(
+            changed_hosts, changed_hosts_searcher
+        ):
+            return None
+
+        if not (path := path_compiled_aggregations.joinpath(aggr_id)).exists():
+            return None
+        return BIAggregation.create_trees_from_schema(
+            store.load_object_from_pickle_file(path, default={})
+        )
+
+    def _log_compilation_report(self, report: BICompilationReport) -> None:
+        self._logger.info(
+            "Compiled %d aggregations, reused %d (%d hosts changed)",
+            len(report.compiled),
+            len(report.reused),
+            report.changed_hosts,
+        )
+        self._logger.debug("Compiled aggregations: %s", ", ".join(report.compiled))
+        self._logger.debug("Reused aggregations: %s", ", ".join(report.reused))
+
     def _cleanup_vanished_aggregations(self) -> None:
         valid_aggregations = list(self._compiled_aggregations.keys())
         for path_object in path_compiled_aggregations.iterdir():
@@ -352,7 +589,7 @@ class BICompiler:
 
         return latest_timestamp
 
-    def _save_data(self, filepath: Path, data: dict) -> None:
+    def _save_data(self, filepath: Path, data: object) -> None:
         store.save_bytes_to_file(filepath, pickle.dumps(data))
 
     def _get_redis_client(self) -> Redis[str]:
@@ -421,3 +658,62 @@ class BICompiler:
             pipeline.delete(*obsolete_keys)
 
         pipeline.execute()
+
+
+# The configuration and host data the compilation processes work with
+_compilation_snapshot: tuple[BIAggregationPacks, BISearcher] | None = None
+
+
+def _init_compilation_process(bi_packs: BIAggregationPacks, bi_searcher: BISearcher) -> None:
+    global _compilation_snapshot
+    _compilation_snapshot = (bi_packs, bi_searcher)
+
+
+def _compile_aggregation(aggr_id: str) -> tuple[dict[str, Any], BISearchDependencies, float]:
+    """Compile an aggregation in a compilation process
+
+    The compiled aggregation is returned serialized, along with the duration of the compilation."""
+    assert _compilation_snapshot is not None
+    bi_packs, bi_searcher = _compilation_snapshot
+    start = time.time()
+    with bi_searcher.record_dependencies() as search_dependencies:
+        compiled_aggregation = bi_packs.get_aggregation_mandatory(aggr_id).compile(bi_searcher)
+    duration = time.time() - start
+    return compiled_aggregation.serialize(), search_dependencies, duration
+
+
+def _host_digest(host: BIHostData) -> str:
+    return hashlib.sha256(
+        repr(
+            (
+                host.site_id,
+                sorted(host.tags),
+                sorted(host.labels.items()),
+                host.folder,
+                sorted(
+                    (description, sorted(service.tags), sorted(service.labels.items()))
+                    for description, service in host.services.items()
+                ),
+                host.children,
+                host.parents,
+                host.alias,
+                host.name,
+            )
+        ).encode()
+    ).hexdigest()
+
+
+def _changed_hosts(
+    previous_host_digests: Mapping[str, tuple[int, Mapping[str, str]]],
+    host_digests: Mapping[str, tuple[int, Mapping[str, str]]],
+) -> set[str]:
+    """The names of the hosts added, removed or changed"""
+    previous = {
+        k: v for _start, digests in previous_host_digests.values() for k, v in digests.items()
+    }
+    current = {k: v for _start, digests in host_digests.values() for k, v in digests.items()}
+    return {
+        host_name
+        for host_name in previous.keys() | current.keys()
+        if previous.get(host_name) != current.get(host_name)
+    }
@@ -3,8 +3,10 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from collections.abc import Iterable, Mapping
-from typing import Any
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Literal
 
 from cmk.utils.labels import LabelGroups
 from cmk.utils.regex import regex
@@ -24,6 +26,64 @@ from cmk.bi.lib import ABCBISearcher, BIHostData, BIHostSearchMatch, BIServiceSe
 
 # Search data used by bi_searcher
 
+SearchKind = Literal["hosts", "services", "host_name", "host_alias"]
+
+
+@dataclass
+class BISearchDependencies:
+    """The data the searches done while compiling an aggregation depend on
+
+    The result of the compilation may change if the data of one of the hosts looked at changes, or
+    if any host changed so that it is found by one of the searches now."""
+
+    hosts: set[str] = field(default_factory=set)
+    searches: dict[str, tuple[SearchKind, Any]] = field(default_factory=dict)
+    """The searches through all hosts, by their representation"""
+
+    def add_search(self, kind: SearchKind, argument: Any) -> None:
+        self.searches.setdefault(repr((kind, argument)), (kind, argument))
+
+    def affected_by(self, changed_hosts: set[str], bi_searcher: "BISearcher") -> bool:
+        """Tell whether changes of the given hosts may change the compilation
+
+        bi_searcher has to know the current data of the changed hosts, if they still exist."""
+        if not self.hosts.isdisjoint(changed_hosts):
+            return True
+
+        all_hosts = list(bi_searcher.hosts.values())
+        for kind, argument in self.searches.values():
+            match kind:
+                case "hosts":
+                    found = bool(bi_searcher.search_hosts(argument))
+                case "services":
+                    found = bool(bi_searcher.search_services(argument))
+                case "host_name":
+                    found = bool(bi_searcher.get_host_name_matches(all_hosts, argument)[0])
+                case "host_alias":
+                    found = bool(bi_searcher.get_host_alias_matches(all_hosts, argument)[0])
+            if found:
+                return True
+        return False
+
+
+class _RecordingHosts(dict[str, BIHostData]):
+    """The hosts of the searcher, recording the ones looked up"""
+
+    def __init__(self, hosts: Mapping[str, BIHostData]) -> None:
+        super().__init__(hosts)
+        self.dependencies: BISearchDependencies | None = None
+
+    def __getitem__(self, key: str) -> BIHostData:
+        if self.dependencies is not None:
+            self.dependencies.hosts.add(key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key: object) -> bool:
+        if self.dependencies is not None and isinstance(key, str):
+            self.dependencies.hosts.add(key)
+        return super().__contains__(key)
+
+
 #   .--BISearcher----------------------------------------------------------.
 #   |         ____ ___ ____                      _                         |
 #   |        | __ )_ _/ ___|  ___  __ _ _ __ ___| |__   ___ _ __           |
@@ -35,10 +95,14 @@ from cmk.bi.lib import ABCBISearcher, BIHostData, BIHostSearchMatch, BIServiceSe
 
 
 class BISearcher(ABCBISearcher):
+    def __init__(self) -> None:
+        super().__init__()
+        self._search_depth = 0
+
     def set_hosts(self, hosts: dict[str, BIHostData]) -> None:
         self.cleanup()
         # The key may be a pattern / regex, so `str` is the correct type for the key.
-        self.hosts = hosts
+        self.hosts = _RecordingHosts(hosts)
 
     def cleanup(self) -> None:
         # Note: Do not call clear() on hosts
@@ -47,14 +111,51 @@ class BISearcher(ABCBISearcher):
         self._host_regex_match_cache.clear()
         self._host_regex_miss_cache.clear()
 
+    @contextmanager
+    def record_dependencies(self) -> Iterator[BISearchDependencies]:
+        """Record what the searches done in this context depend on
+
+        Code searching through all hosts has to do this with the search functions of the searcher,
+        only looking up single hosts is recorded otherwise."""
+        if not isinstance(self.hosts, _RecordingHosts):
+            self.hosts = _RecordingHosts(self.hosts)
+        dependencies = self.hosts.dependencies = BISearchDependencies()
+        try:
+            yield dependencies
+        finally:
+            self.hosts.dependencies = None
+
+    @contextmanager
+    def _recorded_search(
+        self, kind: SearchKind, argument: Any
+    ) -> Iterator[BISearchDependencies | None]:
+        if not isinstance(self.hosts, _RecordingHosts) or self.hosts.dependencies is None:
+            yield None
+            return
+
+        # Only the outermost search matters, e.g. not the host search of a service search
+        if self._search_depth == 0:
+            self.hosts.dependencies.add_search(kind, argument)
+        self._search_depth += 1
+        try:
+            yield self.hosts.dependencies
+        finally:
+            self._search_depth -= 1
+
     def search_hosts(self, conditions: dict) -> list[BIHostSearchMatch]:
-        hosts, matched_re_groups = self.filter_host_choice(
-            list(self.hosts.values()), conditions["host_choice"]
-        )
-        matched_hosts = self.filter_host_folder(hosts, conditions["host_folder"])
-        matched_hosts = self.filter_host_tags(matched_hosts, conditions["host_tags"])
-        matched_hosts = self.filter_host_labels(matched_hosts, conditions["host_label_groups"])
-        return [BIHostSearchMatch(x, matched_re_groups[x.name]) for x in matched_hosts]
+        with self._recorded_search("hosts", conditions) as dependencies:
+            hosts, matched_re_groups = self.filter_host_choice(
+                list(self.hosts.values()), conditions["host_choice"]
+            )
+            matched_hosts = self.filter_host_folder(hosts, conditions["host_folder"])
+            matched_hosts = self.filter_host_tags(matched_hosts, conditions["host_tags"])
+            matched_hosts = self.filter_host_labels(matched_hosts, conditions["host_label_groups"])
+            search_matches = [
+                BIHostSearchMatch(x, matched_re_groups[x.name]) for x in matched_hosts
+            ]
+        if dependencies is not None:
+            dependencies.hosts.update(x.host.name for x in search_matches)
+        return search_matches
 
     def filter_host_choice(
         self,
@@ -79,6 +180,17 @@ class BISearcher(ABCBISearcher):
         self,
         hosts: list[BIHostData],
         pattern: str,
+    ) -> tuple[list[BIHostData], dict]:
+        with self._recorded_search("host_name", pattern) as dependencies:
+            matched_hosts, matched_re_groups = self._get_host_name_matches(hosts, pattern)
+        if dependencies is not None:
+            dependencies.hosts.update(x.name for x in matched_hosts)
+        return matched_hosts, matched_re_groups
+
+    def _get_host_name_matches(
+        self,
+        hosts: list[BIHostData],
+        pattern: str,
     ) -> tuple[list[BIHostData], dict]:
         if pattern == "(.*)":
             return hosts, self._host_match_groups(hosts)
@@ -124,6 +236,17 @@ class BISearcher(ABCBISearcher):
         self,
         hosts: list[BIHostData],
         pattern: str,
+    ) -> tuple[list[BIHostData], dict]:
+        with self._recorded_search("host_alias", pattern) as dependencies:
+            matched_hosts, matched_re_groups = self._get_host_alias_matches(hosts, pattern)
+        if dependencies is not None:
+            dependencies.hosts.update(x.name for x in matched_hosts)
+        return matched_hosts, matched_re_groups
+
+    def _get_host_alias_matches(
+        self,
+        hosts: list[BIHostData],
+        pattern: str,
     ) -> tuple[list[BIHostData], dict]:
         if pattern == "(.*)":
             return hosts, self._host_match_groups(hosts, "alias")
@@ -157,13 +280,14 @@ class BISearcher(ABCBISearcher):
         return matched_services
 
     def search_services(self, conditions: dict) -> list[BIServiceSearchMatch]:
-        host_matches: list[BIHostSearchMatch] = self.search_hosts(conditions)
-        service_matches = self.get_service_description_matches(
-            host_matches, conditions["service_regex"]
-        )
-        service_matches = self.filter_service_labels(
-            service_matches, conditions["service_label_groups"]
-        )
+        with self._recorded_search("services", conditions):
+            host_matches: list[BIHostSearchMatch] = self.search_hosts(conditions)
+            service_matches = self.get_service_description_matches(
+                host_matches, conditions["service_regex"]
+            )
+            service_matches = self.filter_service_labels(
+                service_matches, conditions["service_label_groups"]
+            )
         return service_matches
 
     def filter_host_folder(
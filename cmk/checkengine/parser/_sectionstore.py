@@ -2,11 +2,30 @@
 # Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
+"""Store for the persisted sections of a host
+
+The file starts with a magic number followed by one record per section::
+
+    name length, created at, valid until, content length  (struct "<IqqI")
+    name                                                  (UTF-8)
+    content                                               (pickle)
+
+Changing sections are appended to the file, a record with the content length
+0xFFFFFFFF removes a section. The last record of a section wins. The file is
+rewritten as soon as the superseded records outweigh the current ones.
+
+The file is memory mapped when loading, only the headers of the records are
+read. The content of a section is unpickled on first access.
+"""
 
 import logging
-from collections.abc import Callable
+import mmap
+import os
+import pickle
+import struct
+from collections.abc import Callable, Iterator, Mapping, MutableMapping
 from pathlib import Path
-from typing import Final, Generic, TypeVar
+from typing import Final, Generic, NamedTuple, TypeVar
 
 import cmk.ccc.store as _store
 
@@ -16,6 +35,155 @@ __all__ = ["SectionStore"]
 
 _T = TypeVar("_T")
 
+_MAGIC: Final = b"CMKSECT\x01"
+_HEADER: Final = struct.Struct("<IqqI")
+_REMOVED: Final = 0xFFFFFFFF
+# Don't bother to rewrite smaller files
+_MIN_COMPACTION_SIZE: Final = 4096
+
+
+class _Record(NamedTuple):
+    created_at: int
+    valid_until: int
+    offset: int
+    length: int
+
+
+def _encode_record(
+    section_name: SectionName, created_at: int, valid_until: int, content: bytes | None
+) -> bytes:
+    name = str(section_name).encode("utf-8")
+    return b"".join(
+        (
+            _HEADER.pack(
+                len(name), created_at, valid_until, _REMOVED if content is None else len(content)
+            ),
+            name,
+            content or b"",
+        )
+    )
+
+
+class _PersistedSections(MutableMapping[SectionName, tuple[int, int, _T]]):
+    """The persisted sections of a host
+
+    The sections loaded from the store are unpickled on first access. The changes
+    are tracked, so that only these have to be written.
+    """
+
+    def __init__(self, raw: bytes | mmap.mmap = b"", inode: int | None = None) -> None:
+        self._raw: Final = raw
+        self._entries: dict[SectionName, _Record | tuple[int, int, _T]] = {}
+        self._changed: set[SectionName] = set()
+        self._removed: set[SectionName] = set()
+        self.superseded_bytes = 0
+        end = self._read_records()
+        # Changes can only be appended to the file the records have been read from
+        self.file_id: Final = None if inode is None else (inode, end)
+
+    def _read_records(self) -> int:
+        offset = len(_MAGIC)
+        sizes: dict[SectionName, int] = {}
+        while offset + _HEADER.size <= len(self._raw):
+            name_length, created_at, valid_until, length = _HEADER.unpack_from(self._raw, offset)
+            content_offset = offset + _HEADER.size + name_length
+            end = content_offset + (0 if length == _REMOVED else length)
+            if end > len(self._raw):
+                break  # Incomplete record of an interrupted write
+
+            section_name = SectionName(
+                bytes(self._raw[offset + _HEADER.size : content_offset]).decode("utf-8")
+            )
+            self.superseded_bytes += sizes.pop(section_name, 0)
+            self._entries.pop(section_name, None)
+            if length == _REMOVED:
+                self.superseded_bytes += end - offset
+            else:
+                sizes[section_name] = end - offset
+                self._entries[section_name] = _Record(
+                    created_at, valid_until, content_offset, length
+                )
+            offset = end
+        return offset
+
+    def __getitem__(self, section_name: SectionName) -> tuple[int, int, _T]:
+        entry = self._entries[section_name]
+        if not isinstance(entry, _Record):
+            return entry
+        value = (
+            entry.created_at,
+            entry.valid_until,
+            pickle.loads(self._raw[entry.offset : entry.offset + entry.length]),
+        )
+        self._entries[section_name] = value
+        return value
+
+    def __setitem__(self, section_name: SectionName, value: tuple[int, int, _T]) -> None:
+        self._entries[section_name] = value
+        self._changed.add(section_name)
+        self._removed.discard(section_name)
+
+    def __delitem__(self, section_name: SectionName) -> None:
+        del self._entries[section_name]
+        self._changed.discard(section_name)
+        self._removed.add(section_name)
+
+    def __iter__(self) -> Iterator[SectionName]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def validity(self, section_name: SectionName) -> tuple[int, int]:
+        """Creation time and end of validity of a section, without unpickling it"""
+        entry = self._entries[section_name]
+        return (entry.created_at, entry.valid_until) if isinstance(entry, _Record) else entry[:2]
+
+    def needs_compaction(self) -> bool:
+        return self.superseded_bytes > max(_MIN_COMPACTION_SIZE, len(self._raw) // 2)
+
+    def _encode(self, section_name: SectionName) -> bytes:
+        entry = self._entries[section_name]
+        if isinstance(entry, _Record):
+            return _encode_record(
+                section_name,
+                entry.created_at,
+                entry.valid_until,
+                bytes(self._raw[entry.offset : entry.offset + entry.length]),
+            )
+        created_at, valid_until, content = entry
+        return _encode_record(section_name, created_at, valid_until, pickle.dumps(content))
+
+    def serialize(self) -> bytes:
+        return b"".join((_MAGIC, *(self._encode(section_name) for section_name in self)))
+
+    def serialize_changes(self) -> bytes:
+        return b"".join(
+            (
+                *(self._encode(section_name) for section_name in self._changed),
+                *(_encode_record(section_name, 0, 0, None) for section_name in self._removed),
+            )
+        )
+
+
+def _serialize(sections: Mapping[SectionName, tuple[int, int, _T]]) -> bytes:
+    if isinstance(sections, _PersistedSections):
+        return sections.serialize()
+    persisted_sections = _PersistedSections[_T]()
+    persisted_sections.update(sections)
+    return persisted_sections.serialize()
+
+
+def _validities(
+    sections: Mapping[SectionName, tuple[int, int, _T]],
+) -> Iterator[tuple[SectionName, int, int]]:
+    if isinstance(sections, _PersistedSections):
+        for section_name in sections:
+            yield section_name, *sections.validity(section_name)
+        return
+    for section_name, (created_at, valid_until, *_rest) in sections.items():
+        yield section_name, created_at, valid_until
+
 
 class SectionStore(Generic[_T]):
     def __init__(
@@ -38,13 +206,40 @@ class SectionStore(Generic[_T]):
             return
 
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        _store.save_object_to_pickle_file(
-            self.path,
-            {str(k): v for k, v in sections.items()},
-        )
+        with _store.locked(self.path):
+            if (
+                isinstance(sections, _PersistedSections)
+                and self._file_id() == sections.file_id
+                and not sections.needs_compaction()
+            ):
+                with self.path.open("ab") as file:
+                    file.write(sections.serialize_changes())
+            else:
+                _store.save_bytes_to_file(self.path, _serialize(sections))
         self._logger.debug("Stored persisted sections: %s", ", ".join(str(s) for s in sections))
 
+    def _file_id(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
     def load(self) -> MutableSectionMap[tuple[int, int, _T]]:
+        try:
+            with self.path.open("rb") as file:
+                stat = os.fstat(file.fileno())
+                if not stat.st_size:
+                    return _PersistedSections[_T]()
+                raw = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return _PersistedSections[_T]()
+
+        if raw[: len(_MAGIC)] == _MAGIC:
+            return _PersistedSections[_T](raw, stat.st_ino)
+
+        # Pickled by previous versions, rewritten on the next change
+        raw.close()
         raw_sections_data = _store.load_object_from_pickle_file(self.path, default={})
         return {SectionName(k): v for k, v in raw_sections_data.items()}
 
@@ -79,28 +274,29 @@ class SectionStore(Generic[_T]):
         now: int,
         keep_outdated: bool,
     ) -> MutableSectionMap[tuple[int, int, _T]]:
-        # TODO: This is not race condition free when modifying the data. Either remove
-        # the possible write here and simply ignore the outdated sections or lock when
-        # reading and unlock after writing
-        persisted_sections = self.load()
-
         new_sections = {
             section_name: persist_info + (section_content,)
             for section_name, section_content in sections.items()
             if (persist_info := lookup_persist(section_name)) is not None
         }
-        store_sections = bool(new_sections)
-        persisted_sections.update(new_sections)
-
-        if not keep_outdated:
-            for section_name in tuple(persisted_sections):
-                (_created_at, valid_until, _section_content) = persisted_sections[section_name]
-                if section_outdated(valid_until, now):
-                    store_sections = True
-                    del persisted_sections[section_name]
-
-        if store_sections:
-            self.store(persisted_sections)
+        if not new_sections and keep_outdated:
+            return self.load()
+
+        # Lock from reading until writing, so that no concurrent update gets lost
+        with _store.locked(self.path):
+            persisted_sections = self.load()
+
+            store_sections = bool(new_sections)
+            persisted_sections.update(new_sections)
+
+            if not keep_outdated:
+                for section_name, _created_at, valid_until in list(_validities(persisted_sections)):
+                    if section_outdated(valid_until, now):
+                        store_sections = True
+                        del persisted_sections[section_name]
+
+            if store_sections:
+                self.store(persisted_sections)
         return persisted_sections
 
     def _add_persisted_sections(
@@ -112,15 +308,12 @@ class SectionStore(Generic[_T]):
         cache_info.update(
             {
                 section_name: (created_at, valid_until - created_at)
-                for section_name, (created_at, valid_until, *_rest) in persisted_sections.items()
+                for section_name, created_at, valid_until in _validities(persisted_sections)
                 if section_name not in sections
             }
         )
         result: MutableSectionMap[_T] = dict(sections.items())
-        for section_name, entry in persisted_sections.items():
-            if len(entry) == 2:
-                continue  # Skip entries of "old" format
-
+        for section_name in persisted_sections:
             # Don't overwrite sections that have been received from the source with this call
             if section_name in sections:
                 self._logger.debug(
@@ -129,6 +322,10 @@ class SectionStore(Generic[_T]):
                 )
                 continue
 
+            entry = persisted_sections[section_name]
+            if len(entry) == 2:
+                continue  # Skip entries of "old" format
+
             self._logger.debug("Using persisted section %r", section_name)
             result[section_name] = entry[-1]
         return result
@@ -317,7 +317,7 @@ class SNMPCredential(SNMPCredentialBase, total=False):
 # This is what we get from the outside.
 class ConfigFromWATO(TypedDict):
     actions: Sequence[Action]
-    archive_mode: Literal["file", "mongodb", "sqlite"]
+    archive_mode: Literal["file", "file_indexed", "mongodb", "sqlite"]
     archive_orphans: bool
     debug_rules: bool
     event_limit: EventLimits
@@ -333,10 +333,13 @@ class ConfigFromWATO(TypedDict):
     replication: Replication | None
     retention_interval: int
     rule_optimizer: bool
+    rule_prefilter: bool
     rule_packs: Sequence[ECRulePack]
     rules: Collection[Rule]
     sqlite_housekeeping_interval: int
     sqlite_freelist_size: int
+    sqlite_flush_interval: int
+    sqlite_batch_size: int
     snmp_credentials: Collection[SNMPCredential]
     socket_queue_len: int
     statistics_interval: int
@@ -40,6 +40,7 @@ def default_config() -> ConfigFromWATO:
         actions=[],
         debug_rules=False,
         rule_optimizer=True,
+        rule_prefilter=False,
         log_level=LogConfig(
             {
                 "cmk.mkeventd": logging.INFO,
@@ -56,6 +57,8 @@ def default_config() -> ConfigFromWATO:
         housekeeping_interval=60,
         sqlite_housekeeping_interval=3600,  # seconds ValueSpec Age
         sqlite_freelist_size=50 * 1024 * 1024,  # bytes ValueSpec FIlesize
+        sqlite_flush_interval=1,  # seconds ValueSpec Age
+        sqlite_batch_size=1000,  # entries ValueSpec Integer
         statistics_interval=5,
         history_lifetime=365,  # days
         history_rotation="daily",
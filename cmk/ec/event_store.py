@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Indexed storage of the currently existing events of the Event Console
+
+The event status used to keep all events in a plain list, so that every
+lookup for a rule, a host or an event id had to scan all existing events.
+The store below keeps the events in insertion order (which is the order of
+their ids, so the first event is always the oldest one) and maintains
+secondary indexes for the lookups done during event processing.
+
+All buckets are dicts keyed by the event id, so each bucket preserves the
+age ordering of its events and removal is O(1).
+
+The store is not thread safe on its own, it is protected by the lock of the
+EventStatus like the list it replaces.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from typing import TypeVar
+
+from .event import Event
+
+_RuleID = str | None
+_BreedKey = tuple[_RuleID, str]
+
+_K = TypeVar("_K")
+
+
+class EventStore:
+    def __init__(self, events: Iterable[Event] = ()) -> None:
+        self._by_id: dict[int, Event] = {}
+        self._by_rule: dict[_RuleID, dict[int, Event]] = {}
+        self._by_host: dict[str, dict[int, Event]] = {}
+        self._by_breed: dict[_BreedKey, dict[int, Event]] = {}
+        # The keys an event has been indexed with. The events are mutable dicts
+        # and their host may be rewritten while they exist, see reindex().
+        self._keys: dict[int, _BreedKey] = {}
+        for event in events:
+            self.add(event)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, event: Event) -> bool:
+        return self._by_id.get(event["id"]) is event
+
+    def to_list(self) -> list[Event]:
+        return list(self._by_id.values())
+
+    def get(self, event_id: int) -> Event | None:
+        return self._by_id.get(event_id)
+
+    def oldest(self) -> Event | None:
+        return next(iter(self._by_id.values()), None)
+
+    def oldest_of_rule(self, rule_id: _RuleID) -> Event | None:
+        return next(iter(self._by_rule.get(rule_id, {}).values()), None)
+
+    def oldest_of_host(self, host: str) -> Event | None:
+        return next(iter(self._by_host.get(host, {}).values()), None)
+
+    def by_rule(self, rule_id: _RuleID) -> list[Event]:
+        """Events of the given rule, oldest first. Safe to modify the store while iterating."""
+        return list(self._by_rule.get(rule_id, {}).values())
+
+    def by_host(self, host: str) -> list[Event]:
+        """Events of the given host, oldest first. Safe to modify the store while iterating."""
+        return list(self._by_host.get(host, {}).values())
+
+    def by_breed(self, rule_id: _RuleID, host: str) -> list[Event]:
+        """Events of the same "breed" (rule and host), oldest first."""
+        return list(self._by_breed.get((rule_id, host), {}).values())
+
+    def add(self, event: Event) -> None:
+        event_id = event["id"]
+        if event_id in self._by_id:
+            raise ValueError(f"Event {event_id} is already present")
+        key = (event["rule_id"], event["host"])
+        self._by_id[event_id] = event
+        self._keys[event_id] = key
+        self._index(event_id, event, key)
+
+    def remove(self, event: Event) -> None:
+        """Remove the event, raises a KeyError if it is not present"""
+        event_id = event["id"]
+        if self._by_id.get(event_id) is not event:
+            raise KeyError(event_id)
+        del self._by_id[event_id]
+        self._unindex(event_id, self._keys.pop(event_id))
+
+    def reindex(self, event: Event) -> None:
+        """Update the indexes after the rule or host of a stored event has been changed"""
+        event_id = event["id"]
+        old_key = self._keys.get(event_id)
+        new_key = (event["rule_id"], event["host"])
+        if old_key is None or old_key == new_key:
+            return
+        self._unindex(event_id, old_key)
+        self._keys[event_id] = new_key
+        self._index(event_id, event, new_key)
+
+    def _index(self, event_id: int, event: Event, key: _BreedKey) -> None:
+        rule_id, host = key
+        _insert_ordered(self._by_rule.setdefault(rule_id, {}), event_id, event)
+        _insert_ordered(self._by_host.setdefault(host, {}), event_id, event)
+        _insert_ordered(self._by_breed.setdefault(key, {}), event_id, event)
+
+    def _unindex(self, event_id: int, key: _BreedKey) -> None:
+        rule_id, host = key
+        _remove_from_bucket(self._by_rule, rule_id, event_id)
+        _remove_from_bucket(self._by_host, host, event_id)
+        _remove_from_bucket(self._by_breed, key, event_id)
+
+
+def _insert_ordered(bucket: dict[int, Event], event_id: int, event: Event) -> None:
+    """Insert the event while keeping the bucket ordered by event id (i.e. age)
+
+    New events always have the highest id, so this is an append in all cases
+    but re-indexing an older event.
+    """
+    if not bucket or event_id > next(reversed(bucket)):
+        bucket[event_id] = event
+        return
+    bucket[event_id] = event
+    ordered = sorted(bucket.items())
+    bucket.clear()
+    bucket.update(ordered)
+
+
+def _remove_from_bucket(buckets: dict[_K, dict[int, Event]], key: _K, event_id: int) -> None:
+    bucket = buckets[key]
+    del bucket[event_id]
+    if not bucket:
+        del buckets[key]
@@ -11,7 +11,7 @@ import time
 from collections.abc import Callable, Iterable, Sequence
 from logging import Logger
 from pathlib import Path
-from typing import Any
+from typing import Any, Final
 
 from cmk.utils.log import VERBOSE
 from cmk.utils.render import date_and_time
@@ -22,6 +22,9 @@ from .history import _log_event, ActiveHistoryPeriod, get_logfile, History, Hist
 from .query import Columns, OperatorName, QueryFilter, QueryGET
 from .settings import Settings
 
+# Sidecar files next to the logfiles, see IndexedFileHistory
+INDEX_SUFFIX: Final = ".idx"
+
 
 class FileHistory(History):
     def __init__(
@@ -152,6 +155,7 @@ def _expire_logfiles(
                         "Deleting log file %s (age %s)", path, date_and_time(path.stat().st_mtime)
                     )
                     path.unlink()
+                    path.with_suffix(INDEX_SUFFIX).unlink(missing_ok=True)
         except Exception as e:
             if settings.options.debug:
                 raise
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""EC History file backend with sidecar indexes
+
+The plain FileHistory pipes every logfile whose time span intersects the query
+through grep and parses all lines grep lets through. IndexedFileHistory uses
+the same logfiles, but keeps an index file next to each of them. The index
+splits the logfile into blocks of lines and records for each block its byte
+range, its time range and the distinct hosts, event IDs, rule IDs and phases
+of its lines. A query only reads the blocks that can contain matching lines,
+and the lines are parsed lazily, newest first, so that a query with a limit
+stops as soon as it has enough rows.
+
+The indexes are just a cache: Before each query the lines appended since the
+last query are indexed, and an index is rebuilt if its logfile has been
+replaced in the meantime.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from logging import Logger
+from pathlib import Path
+from typing import Any, Final
+
+from cmk.ccc import store
+
+from .config import Config
+from .history_file import (
+    _get_logfile_timespan,
+    _greatest_lower_bound_for_filters,
+    _GREPABLE_COLUMNS,
+    _intersects,
+    _least_upper_bound_for_filters,
+    convert_history_line,
+    FileHistory,
+    INDEX_SUFFIX,
+)
+from .query import Columns, QueryFilter, QueryGET
+from .settings import Settings
+
+INDEX_VERSION: Final = 1
+
+# Number of lines per block: Smaller blocks are skipped more precisely, but
+# make the index bigger.
+BLOCK_SIZE: Final = 1000
+
+# The indexed columns with the conversion of their values, see convert_history_line()
+INDEXED_COLUMNS: Final[Mapping[str, Callable[[str], object]]] = {
+    "event_id": int,
+    "event_host": str,
+    "event_rule_id": str,
+    "event_phase": str,
+}
+
+
+@dataclass
+class _Block:
+    offset: int
+    end: int
+    first_line: int
+    num_lines: int = 0
+    min_time: float | None = None
+    max_time: float | None = None
+    values: dict[str, set[Any]] = field(
+        default_factory=lambda: {column: set() for column in INDEXED_COLUMNS}
+    )
+
+    def serialize(self) -> dict[str, Any]:
+        return {
+            "offset": self.offset,
+            "end": self.end,
+            "first_line": self.first_line,
+            "num_lines": self.num_lines,
+            "min_time": self.min_time,
+            "max_time": self.max_time,
+            "values": {column: sorted(values) for column, values in self.values.items()},
+        }
+
+    @classmethod
+    def deserialize(cls, raw: dict[str, Any]) -> _Block:
+        return cls(
+            offset=raw["offset"],
+            end=raw["end"],
+            first_line=raw["first_line"],
+            num_lines=raw["num_lines"],
+            min_time=raw["min_time"],
+            max_time=raw["max_time"],
+            values={column: set(raw["values"][column]) for column in INDEXED_COLUMNS},
+        )
+
+
+@dataclass
+class _LogfileIndex:
+    """Index of the complete lines of a logfile, i.e. the first 'size' bytes of it"""
+
+    inode: int
+    size: int = 0
+    num_lines: int = 0
+    blocks: list[_Block] = field(default_factory=list)
+    dirty: bool = False
+
+    def serialize(self) -> str:
+        return json.dumps(
+            {
+                "version": INDEX_VERSION,
+                "inode": self.inode,
+                "size": self.size,
+                "num_lines": self.num_lines,
+                "blocks": [block.serialize() for block in self.blocks],
+            }
+        )
+
+    @classmethod
+    def deserialize(cls, text: str) -> _LogfileIndex | None:
+        try:
+            raw = json.loads(text)
+            if raw["version"] != INDEX_VERSION:
+                return None
+            return cls(
+                inode=raw["inode"],
+                size=raw["size"],
+                num_lines=raw["num_lines"],
+                blocks=[_Block.deserialize(block) for block in raw["blocks"]],
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+class _LineIndexer:
+    """Extracts the indexed values from a raw line of a logfile"""
+
+    def __init__(self, history_columns: Columns) -> None:
+        # The lines in the file don't contain the history_line column
+        positions = {name: nr - 1 for nr, (name, _defval) in enumerate(history_columns)}
+        self._time_position = positions["history_time"]
+        self._columns = [
+            (column, positions[column], convert) for column, convert in INDEXED_COLUMNS.items()
+        ]
+        self._max_split = max(position for _column, position, _type in self._columns) + 1
+
+    def add_line(self, block: _Block, line: bytes) -> None:
+        try:
+            parts = line.decode("utf-8").split("\t", self._max_split)
+            time = float(parts[self._time_position])
+            values = [
+                (column, convert(parts[position])) for column, position, convert in self._columns
+            ]
+        except (UnicodeDecodeError, ValueError, IndexError):
+            # Such lines can't be parsed when querying either, so they will
+            # never be part of a result.
+            return
+        block.min_time = time if block.min_time is None else min(block.min_time, time)
+        block.max_time = time if block.max_time is None else max(block.max_time, time)
+        for column, value in values:
+            block.values[column].add(value)
+
+
+def _block_may_match(
+    block: _Block,
+    value_filters: Sequence[QueryFilter],
+    time_range: tuple[float | None, float | None],
+) -> bool:
+    if block.min_time is None:
+        return False  # no valid lines at all
+    if not _intersects(time_range, (block.min_time, block.max_time)):
+        return False
+    for f in value_filters:
+        values = block.values[f.column_name]
+        if f.operator_name == "=":
+            if f.argument not in values:
+                return False
+        else:
+            try:
+                if not any(f.predicate(value) for value in values):
+                    return False
+            except Exception:
+                pass  # Let the row filter decide
+    return True
+
+
+def _required_substrings(filters: Iterable[QueryFilter]) -> list[bytes]:
+    """Texts a line has to contain to match, like the grep pipeline of FileHistory"""
+    return [
+        f.argument.encode("utf-8")
+        for f in filters
+        if f.column_name in _GREPABLE_COLUMNS
+        and f.operator_name == "="
+        and isinstance(f.argument, str)
+        and f.argument
+    ]
+
+
+class IndexedFileHistory(FileHistory):
+    def __init__(
+        self,
+        settings: Settings,
+        config: Config,
+        logger: Logger,
+        event_columns: Columns,
+        history_columns: Columns,
+    ) -> None:
+        super().__init__(settings, config, logger, event_columns, history_columns)
+        self._line_indexer = _LineIndexer(history_columns)
+        self._index_lock = threading.Lock()
+        self._indexes: dict[Path, _LogfileIndex] = {}
+
+    def flush(self) -> None:
+        super().flush()
+        with self._index_lock:
+            self._indexes.clear()
+
+    def housekeeping(self) -> None:
+        super().housekeeping()
+        self._save_indexes()
+
+    def close(self) -> None:
+        self._save_indexes()
+
+    def get(self, query: QueryGET) -> Iterable[Sequence[object]]:
+        if not self._settings.paths.history_dir.value.exists():
+            return []
+
+        filters = query.filters
+        self._logger.debug("Filters: %r", filters)
+        self._logger.debug("Limit: %r", query.limit)
+
+        time_range = (
+            _greatest_lower_bound_for_filters(
+                (f.operator_name, f.argument) for f in filters if f.column_name == "history_time"
+            ),
+            _least_upper_bound_for_filters(
+                (f.operator_name, f.argument) for f in filters if f.column_name == "history_time"
+            ),
+        )
+        self._logger.debug("time range: %r", time_range)
+
+        # Same as FileHistory: Newer logfiles first, skip the ones outside of
+        # the time range without looking at their index at all.
+        blocks: list[tuple[Path, list[_Block]]] = []
+        for path in sorted(self._settings.paths.history_dir.value.glob("*.log"), reverse=True):
+            if not _intersects(time_range, _get_logfile_timespan(path)):
+                self._logger.debug("skipping history file %s because of time filters", path)
+                continue
+            if (index := self._updated_index(path)) is not None:
+                blocks.append((path, list(index.blocks)))
+
+        entries = self._entries(
+            query,
+            blocks,
+            [f for f in filters if f.column_name in INDEXED_COLUMNS],
+            _required_substrings(filters),
+            time_range,
+        )
+        return entries if query.limit is None else itertools.islice(entries, query.limit)
+
+    def _entries(
+        self,
+        query: QueryGET,
+        blocks: Sequence[tuple[Path, list[_Block]]],
+        value_filters: Sequence[QueryFilter],
+        substrings: Sequence[bytes],
+        time_range: tuple[float | None, float | None],
+    ) -> Iterator[list[Any]]:
+        for path, logfile_blocks in blocks:
+            try:
+                with path.open("rb") as f:
+                    for block in reversed(logfile_blocks):
+                        if not _block_may_match(block, value_filters, time_range):
+                            continue
+                        # The last block may grow while we are reading it, but
+                        # its end is always at the end of a line.
+                        first_line = block.first_line
+                        f.seek(block.offset)
+                        data = f.read(block.end - block.offset)
+                        if not all(substring in data for substring in substrings):
+                            continue
+                        lines = data.split(b"\n")[:-1]
+                        numbers: Sequence[int] = range(len(lines))
+                        for substring in substrings:
+                            numbers = [nr for nr in numbers if substring in lines[nr]]
+                        for nr in reversed(numbers):
+                            if (row := self._parse_line(path, first_line + nr, lines[nr])) is None:
+                                continue
+                            try:
+                                matches = query.filter_row(row)
+                            except Exception:
+                                self._logger.exception("Cannot filter line %r", row)
+                                continue
+                            if matches:
+                                yield row
+            except FileNotFoundError:
+                self._logger.debug("history file %s vanished during query", path)
+
+    def _parse_line(self, path: Path, line_number: int, line: bytes) -> list[Any] | None:
+        try:
+            parts: list[Any] = [line_number, *line.decode("utf-8").split("\t")]
+            convert_history_line(self._history_columns, parts)
+            return parts
+        except Exception:
+            self._logger.exception("Invalid line '%r' in history file %s", line, path)
+            return None
+
+    def _updated_index(self, path: Path) -> _LogfileIndex | None:
+        """Index the lines appended to the logfile since the last call"""
+        with self._index_lock:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                self._indexes.pop(path, None)
+                return None
+            index = self._indexes.get(path) or self._load_index(path)
+            if index is None or index.inode != stat.st_ino or index.size > stat.st_size:
+                index = _LogfileIndex(inode=stat.st_ino)
+            self._indexes[path] = index
+            if index.size == stat.st_size:
+                return index
+
+            is_new = index.size == 0
+            try:
+                self._index_lines(path, index)
+            except FileNotFoundError:
+                self._indexes.pop(path, None)
+                return None
+            if is_new:
+                # Rebuilding is expensive, so don't wait for the housekeeping
+                self._save_index(path, index)
+            return index
+
+    def _index_lines(self, path: Path, index: _LogfileIndex) -> None:
+        with path.open("rb") as f:
+            f.seek(index.size)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written, we will see it next time
+                if not index.blocks or index.blocks[-1].num_lines >= BLOCK_SIZE:
+                    index.blocks.append(
+                        _Block(offset=index.size, end=index.size, first_line=index.num_lines + 1)
+                    )
+                block = index.blocks[-1]
+                self._line_indexer.add_line(block, line[:-1])
+                block.num_lines += 1
+                index.num_lines += 1
+                index.size += len(line)
+                block.end = index.size
+                index.dirty = True
+
+    def _load_index(self, path: Path) -> _LogfileIndex | None:
+        if not (text := store.load_text_from_file(path.with_suffix(INDEX_SUFFIX))):
+            return None
+        return _LogfileIndex.deserialize(text)
+
+    def _save_index(self, path: Path, index: _LogfileIndex) -> None:
+        try:
+            store.save_text_to_file(path.with_suffix(INDEX_SUFFIX), index.serialize())
+            index.dirty = False
+        except OSError as e:
+            self._logger.warning("Cannot save index of history file %s: %s", path, e)
+
+    def _save_indexes(self) -> None:
+        with self._index_lock:
+            for path, index in list(self._indexes.items()):
+                if not path.exists():
+                    del self._indexes[path]
+                elif index.dirty:
+                    self._save_index(path, index)
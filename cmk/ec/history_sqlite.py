@@ -7,7 +7,9 @@
 import itertools
 import json
 import sqlite3
+import threading
 import time
+from collections import deque
 from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 from datetime import timedelta
@@ -18,6 +20,7 @@ from typing import Final, Literal
 from .config import Config
 from .event import Event
 from .history import History, HistoryWhat
+from .perfcounters import Perfcounters
 from .query import Columns, QueryFilter, QueryGET
 from .settings import Options, Paths, Settings
 
@@ -54,6 +57,13 @@ TABLE_COLUMNS: Final = (
     "match_groups_syslog_application",
 )
 
+# Columns of type JSON, they contain (mutable) sequences
+JSON_COLUMNS: Final = (
+    "match_groups",
+    "contact_groups",
+    "match_groups_syslog_application",
+)
+
 INDEXED_COLUMNS: Final = (
     "time",
     "id",
@@ -66,6 +76,20 @@ SQLITE_PRAGMAS = {
     "PRAGMA busy_timeout = 2000;": "2 seconds timeout for busy handler. Avoids database is locked errors",
 }
 
+# Always the same statement, so the sqlite3 module can reuse the prepared statement
+INSERT_STATEMENT: Final = f"""INSERT INTO
+    history ({', '.join(TABLE_COLUMNS[1:])})
+        VALUES ({', '.join(itertools.repeat('?', len(TABLE_COLUMNS[1:])))});"""
+
+# Maximum number of pending entries in multiples of the batch size. They only
+# pile up beyond the batch size if writing to the database fails.
+MAX_PENDING_BATCHES: Final = 10
+
+# Delays in seconds before writing the buffered entries is retried by the timer.
+# It backs off between them while writing keeps failing.
+MIN_WRITE_RETRY_DELAY: Final = 1.0
+MAX_WRITE_RETRY_DELAY: Final = 60.0
+
 SQLITE_INDEXES = [
     f"CREATE INDEX IF NOT EXISTS idx_{column} ON history ({column});" for column in INDEXED_COLUMNS
 ]
@@ -144,6 +168,21 @@ class SQLiteSettings:
 
 
 class SQLiteHistory(History):
+    """History in a sqlite database
+
+    New entries are not written one by one, because a commit per entry makes
+    the history the bottleneck of the event processing during message bursts.
+    They are collected in a write-behind buffer instead, which is written in
+    a single transaction as soon as it contains sqlite_batch_size entries or
+    its oldest entry is older than sqlite_flush_interval. A timer writes the
+    buffer in case no further entries arrive. Queries write the buffer first,
+    so they always see all entries.
+
+    The buffer is bounded: If writing fails, e.g. because the database is
+    locked, the entries are kept for the next attempt, but only up to
+    MAX_PENDING_BATCHES batches. Beyond that the oldest entries are dropped.
+    """
+
     def __init__(
         self,
         settings: SQLiteSettings,
@@ -151,15 +190,31 @@ class SQLiteHistory(History):
         logger: Logger,
         event_columns: Columns,
         history_columns: Columns,
+        perfcounters: Perfcounters | None = None,
     ):
         self._settings = settings
         self._config = config
         self._logger = logger
         self._event_columns = event_columns
         self._history_columns = history_columns
+        self._perfcounters = perfcounters
+        self._event_keys = [
+            (colname.removeprefix("event_"), defval) for colname, defval in event_columns
+        ]
+        self._json_indexes = [
+            nr for nr, (key, _defval) in enumerate(self._event_keys) if key in JSON_COLUMNS
+        ]
         self._last_housekeeping = 0.0
         self._page_size = 4096
 
+        # Protects the buffer and the connection, add() and get() are called
+        # from the event and the status server thread.
+        self._lock = threading.RLock()
+        self._pending: deque[tuple[object, ...]] = deque()
+        self._oldest_pending = 0.0
+        self._write_timer: threading.Timer | None = None
+        self._write_retry_delay = 0.0
+
         if isinstance(self._settings.database, Path):
             self._settings.database.parent.mkdir(parents=True, exist_ok=True)
             self._settings.database.touch(exist_ok=True)
@@ -221,31 +276,92 @@ class SQLiteHistory(History):
                 connection.execute(index_statement)
 
     def flush(self) -> None:
-        """Delete all entries the history table."""
-        with self.conn as connection:
-            connection.execute("DELETE FROM history;")
+        """Delete all entries the history table, including the ones not written yet."""
+        with self._lock:
+            self._pending.clear()
+            with self.conn as connection:
+                connection.execute("DELETE FROM history;")
 
     def add(self, event: Event, what: HistoryWhat, who: str = "", addinfo: str = "") -> None:
         """Add a single entry to the history table.
 
+        The entry is buffered and written together with other entries, see write_pending().
         No need to include the line column, as it is autoincremented.
         """
-        with self.conn as connection:
-            cur = connection.cursor()
-            cur.execute(
-                f"""INSERT INTO
-                    history ({', '.join(TABLE_COLUMNS[1:])})
-                        VALUES ({', '.join(itertools.repeat('?', len(TABLE_COLUMNS[1:])))});""",
-                tuple(
-                    itertools.chain(
-                        (time.time(), what, who, addinfo),
-                        [
-                            event.get(colname.removeprefix("event_"), defval)
-                            for colname, defval in self._event_columns
-                        ],
-                    )
+        now = time.time()
+        values = [event.get(key, defval) for key, defval in self._event_keys]
+        # The event is modified later on, so we have to take a snapshot of it.
+        for nr in self._json_indexes:
+            if isinstance(value := values[nr], list):
+                values[nr] = tuple(value)
+        entry = (now, what, who, addinfo, *values)
+        with self._lock:
+            if not self._pending:
+                self._oldest_pending = now
+            self._pending.append(entry)
+            if len(self._pending) >= self._config["sqlite_batch_size"]:
+                # The event processing has to wait for the database now.
+                self._count("history_stalls")
+                self.write_pending()
+            elif now - self._oldest_pending >= self._config["sqlite_flush_interval"]:
+                self.write_pending()
+            if self._pending:
+                self._schedule_write(self._config["sqlite_flush_interval"])
+
+    def _schedule_write(self, delay: float) -> None:
+        if self._write_timer is not None:
+            return
+        self._write_timer = threading.Timer(delay, self._write_pending_by_timer)
+        self._write_timer.daemon = True
+        self._write_timer.start()
+
+    def _write_pending_by_timer(self) -> None:
+        with self._lock:
+            self._write_timer = None
+            self.write_pending()
+            if not self._pending:
+                self._write_retry_delay = 0.0
+                return
+            # Writing failed, don't hammer the database
+            self._write_retry_delay = min(
+                max(
+                    2 * self._write_retry_delay,
+                    self._config["sqlite_flush_interval"],
+                    MIN_WRITE_RETRY_DELAY,
                 ),
+                MAX_WRITE_RETRY_DELAY,
             )
+            self._schedule_write(self._write_retry_delay)
+
+    def write_pending(self) -> None:
+        """Write all buffered entries to the history table in a single transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            tic = time.time()
+            try:
+                with self.conn as connection:
+                    connection.executemany(INSERT_STATEMENT, self._pending)
+            except sqlite3.Error as e:
+                self._logger.error("Cannot write %d history entries: %s", len(self._pending), e)
+                self._drop_excess_pending()
+                return
+            if self._perfcounters is not None:
+                self._perfcounters.count("history_writes", len(self._pending))
+                self._perfcounters.count_time("history_flush", time.time() - tic)
+            self._pending.clear()
+
+    def _drop_excess_pending(self) -> None:
+        max_pending = MAX_PENDING_BATCHES * self._config["sqlite_batch_size"]
+        while len(self._pending) > max_pending:
+            self._pending.popleft()
+            self._count("history_drops")
+        # Retry after the next flush interval, not with every new entry
+        self._oldest_pending = time.time()
+
+    def _count(self, counter: str) -> None:
+        if self._perfcounters is not None:
+            self._perfcounters.count(counter)
 
     def add_entries(self, entries: Sequence[Sequence[object]]) -> None:
         """Add multiple entries to the history table.
@@ -253,14 +369,10 @@ class SQLiteHistory(History):
         Used only by the cmk-update-config during EC history migration to sqlite.
         The first column is the line number, which is autoincremented, so ignored in TABLE_COLUMNS.
         """
-        with self.conn as connection:
-            cur = connection.cursor()
-            cur.executemany(
-                f"""INSERT INTO
-                    history ({', '.join(TABLE_COLUMNS[1:])})
-                        VALUES ({', '.join(itertools.repeat('?', len(TABLE_COLUMNS[1:])))});""",
-                (entry[1:] for entry in entries),
-            )
+        with self._lock:
+            self.write_pending()
+            with self.conn as connection:
+                connection.executemany(INSERT_STATEMENT, (entry[1:] for entry in entries))
 
     def get(self, query: QueryGET) -> Iterable[Sequence[object]]:
         """Retrieve entries from the history table.
@@ -271,25 +383,30 @@ class SQLiteHistory(History):
         if query.limit:
             sqlite_query += " LIMIT ?"
             sqlite_arguments += f" {query.limit + 1}"
-        with self.conn as connection:
-            cur = connection.cursor()
-            cur.execute(sqlite_query, sqlite_arguments)
-            return cur.fetchall()
+        with self._lock:
+            self.write_pending()
+            with self.conn as connection:
+                cur = connection.cursor()
+                cur.execute(sqlite_query, sqlite_arguments)
+                return cur.fetchall()
 
     def housekeeping(self) -> None:
         """Remove old entries from the history table.
 
         And performs a vacuum to shrink the database file.
         """
-        now = time.time()
-        if now - self._last_housekeeping > self._config["sqlite_housekeeping_interval"]:
-            delta = now - timedelta(days=self._config["history_lifetime"]).total_seconds()
-            with self.conn as connection:
-                cur = connection.cursor()
-                cur.execute("DELETE FROM history WHERE time <= ?;", (delta,))
-            # should be executed outside of the transaction
-            self._vacuum()
-            self._last_housekeeping = now
+        with self._lock:
+            # Entries must not wait for new ones if there are no new ones
+            self.write_pending()
+            now = time.time()
+            if now - self._last_housekeeping > self._config["sqlite_housekeeping_interval"]:
+                delta = now - timedelta(days=self._config["history_lifetime"]).total_seconds()
+                with self.conn as connection:
+                    cur = connection.cursor()
+                    cur.execute("DELETE FROM history WHERE time <= ?;", (delta,))
+                # should be executed outside of the transaction
+                self._vacuum()
+                self._last_housekeeping = now
 
     def _vacuum(self) -> None:
         """Run VACUUM command only if the free pages in DB are greater than 50 Mb."""
@@ -305,6 +422,12 @@ class SQLiteHistory(History):
 
         Used during a new object instantiation,
         to avoid sqlite3.OperationalError: database is locked.
+        Buffered entries are written before.
         """
-        self.conn.commit()
-        self.conn.close()
+        with self._lock:
+            if self._write_timer is not None:
+                self._write_timer.cancel()
+                self._write_timer = None
+            self.write_pending()
+            self.conn.commit()
+            self.conn.close()
@@ -64,9 +64,11 @@ from .config import (
 from .core_queries import HostInfo, query_hosts_scheduled_downtime_depth
 from .crash_reporting import CrashReportStore, ECCrashReport
 from .event import create_events_from_syslog_messages, Event, scrub_string
+from .event_store import EventStore
 from .helpers import ECLock, parse_bytes_into_syslog_messages
 from .history import ActiveHistoryPeriod, get_logfile, History, HistoryWhat, quote_tab, TimedHistory
 from .history_file import FileHistory
+from .history_file_indexed import IndexedFileHistory
 from .history_mongo import MongoDBHistory
 from .history_sqlite import SQLiteHistory, SQLiteSettings
 from .host_config import HostConfig
@@ -83,6 +85,7 @@ from .query import (
 )
 from .rule_matcher import compile_rule, match, MatchFailure, MatchResult, MatchSuccess, RuleMatcher
 from .rule_packs import load_active_config
+from .rule_prefilter import RulePrefilter
 from .settings import create_settings, FileDescriptor, PortNumber, Settings
 from .snmp import SNMPTrapParser
 from .syslog import SyslogFacility, SyslogPriority
@@ -182,11 +185,14 @@ def create_history_raw(
     logger: Logger,
     event_columns: Columns,
     history_columns: Columns,
+    perfcounters: Perfcounters | None = None,
 ) -> History:
     """Factory for History objects based on the current configuration."""
     match config["archive_mode"]:
         case "file":
             return FileHistory(settings, config, logger, event_columns, history_columns)
+        case "file_indexed":
+            return IndexedFileHistory(settings, config, logger, event_columns, history_columns)
         case "mongodb":
             return MongoDBHistory(settings, config, logger, event_columns, history_columns)
         case "sqlite":
@@ -199,6 +205,7 @@ def create_history_raw(
                 logger,
                 event_columns,
                 history_columns,
+                perfcounters,
             )
         case _ as default:
             assert_never(default)
@@ -210,9 +217,12 @@ def create_history(
     logger: Logger,
     event_columns: Columns,
     history_columns: Columns,
+    perfcounters: Perfcounters | None = None,
 ) -> History:
     """Factory for History objects based on the current configuration, optionally augmented with timing information."""
-    history = create_history_raw(settings, config, logger, event_columns, history_columns)
+    history = create_history_raw(
+        settings, config, logger, event_columns, history_columns, perfcounters
+    )
     return TimedHistory(history) if logger.isEnabledFor(DEBUG) else history
 
 
@@ -390,6 +400,7 @@ class EventServer(ECServerThread):
         self._rules: list[Rule] = []
         self._rule_by_id: dict[str | None, Rule] = {}
         self._rule_hash: dict[int, dict[int, Any]] = {}
+        self._rule_prefilter: RulePrefilter | None = None
         self._hash_stats: list[list[int]] = []  # facility/priority
         for _unused_facility in range(32):
             self._hash_stats.append([0] * 8)
@@ -995,9 +1006,8 @@ class EventServer(ECServerThread):
                 # First look for case 1: rule that already have at least one hit
                 # and this events in the state "counting" exist.
                 events_to_delete: list[tuple[Event, HistoryWhat]] = []
-                events = self._event_status.events()
-                for event in events:
-                    if event["rule_id"] == rule["id"] and event["phase"] == "counting":
+                for event in self._event_status.events_of_rule(rule["id"]):
+                    if event["phase"] == "counting":
                         # time has elapsed. Now lets see if we have reached
                         # the necessary count:
                         if event["count"] < expect["count"]:  # no -> trigger alarm
@@ -1048,10 +1058,8 @@ class EventServer(ECServerThread):
             merge, reset_ack = merge  # type: ignore[unreachable]
 
         if merge != "never":
-            for event in self._event_status.events():
-                if event["rule_id"] == rule["id"] and (
-                    event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked")
-                ):
+            for event in self._event_status.events_of_rule(rule["id"]):
+                if event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked"):
                     merge_event = event
                     break
 
@@ -1070,6 +1078,7 @@ class EventServer(ECServerThread):
             # Better rewrite (again). Rule might have changed. Also we have changed
             # the text and the user might have his own text added via set_text.
             self.rewrite_event(rule, merge_event, MatchGroups(), set_first=False)
+            self._event_status.reindex_event(merge_event)
             self._history.add(merge_event, "COUNTFAILED")
         else:
             # Create artificial event from scratch. Make sure that all important
@@ -1112,6 +1121,10 @@ class EventServer(ECServerThread):
                 event["phase"] = "closed"
                 self._event_status.remove_event(event, "AUTODELETE")
 
+    def close_history(self) -> None:
+        """Close the current history, which may have been replaced by a reload"""
+        self._history.close()
+
     def reload_configuration(self, config: Config, history: History) -> None:
         self._config = config
         self._history = history
@@ -1195,6 +1208,21 @@ class EventServer(ECServerThread):
                     ]
                     self._logger.info(" %-12s: %s", SyslogFacility(facility), " ".join(stats))
 
+        self._rule_prefilter = (
+            RulePrefilter(self._rules, self._rule_hash if self._config["rule_optimizer"] else None)
+            if self._config["rule_prefilter"]
+            else None
+        )
+        if self._rule_prefilter is not None:
+            self._logger.info(
+                "Rule prefilter: %d rules - %d by host, %d by application, %d by text, %d unspecific",
+                len(self._rules),
+                self._rule_prefilter.num_indexed_rules("host"),
+                self._rule_prefilter.num_indexed_rules("application"),
+                self._rule_prefilter.num_indexed_rules("text"),
+                self._rule_prefilter.num_unspecific_rules(),
+            )
+
     def hash_rule(self, rule: Rule) -> None:
         """Construct rule hash for faster execution."""
         facility = rule.get("match_facility")
@@ -1249,6 +1277,13 @@ class EventServer(ECServerThread):
                 count,
                 (100.0 * count / float(total_count)),
             )
+        if self._rule_prefilter is not None and (stats := self._rule_prefilter.stats).events:
+            self._logger.info(
+                "Rule prefilter: %d events, %.1f rules tried on average instead of %.1f",
+                stats.events,
+                stats.rules_after / stats.events,
+                stats.rules_before / stats.events,
+            )
 
     def process_potential_event(self, event: Event) -> None:  # pylint: disable=too-many-branches
         self.do_translate_hostname(event)
@@ -1260,6 +1295,9 @@ class EventServer(ECServerThread):
         # Rule optimizer
         if self._config["rule_optimizer"]:
             self._hash_stats[event["facility"]][event["priority"]] += 1
+        if self._rule_prefilter is not None:
+            rule_candidates = self._rule_prefilter.candidates(event)
+        elif self._config["rule_optimizer"]:
             rule_candidates = self._rule_hash.get(event["facility"], {}).get(event["priority"], [])
         else:
             rule_candidates = self._rules
@@ -2252,14 +2290,14 @@ class StatusServer(ECServerThread):
         if len(arguments) != 2:
             raise MKClientError("Wrong number of arguments for DELETE")
         event_ids, user = arguments
-        ids = {int(event_id) for event_id in event_ids.split(",")}
-        self._event_status.delete_events_by(lambda event: event["id"] in ids, user)
+        ids = sorted({int(event_id) for event_id in event_ids.split(",")})
+        self._event_status.delete_events_by_id(ids, user)
 
     def handle_command_delete_events_of_host(self, arguments: list[str]) -> None:
         if len(arguments) != 2:
             raise MKClientError("Wrong number of arguments for DELETE_EVENTS_OF_HOST")
         hostname, user = arguments
-        self._event_status.delete_events_by(lambda event: event["host"] == hostname, user)
+        self._event_status.delete_events_of_host(hostname, user)
 
     def handle_command_update(self, arguments: list[str]) -> None:
         event_ids, user, acknowledged, comment, contact = arguments
@@ -2305,6 +2343,7 @@ class StatusServer(ECServerThread):
             getLogger("cmk.mkeventd"),
             self._lock_configuration,
             self._history,
+            self._perfcounters,
             self._event_status,
             self._event_server,
             self,
@@ -2500,6 +2539,7 @@ def run_eventd(  # pylint: disable=too-many-branches
                     logger,
                     lock_configuration,
                     history,
+                    perfcounters,
                     event_status,
                     event_server,
                     status_server,
@@ -2555,8 +2595,7 @@ class EventStatus:
         self._history = history
 
     def flush(self) -> None:
-        # TODO: Improve types!
-        self._events: list[Event] = []
+        self._events = EventStore()
         self._next_event_id = 1
         self._rule_stats: dict[str, int] = {}
         # needed for expecting rules
@@ -2569,14 +2608,27 @@ class EventStatus:
         # - number of rule misses
 
     def events(self) -> list[Event]:
-        # TODO: Improve type!
-        return self._events
+        """A snapshot of all existing events, oldest first. Safe to remove events while iterating."""
+        return self._events.to_list()
 
     def event(self, eid: int) -> Event | None:
-        for event in self._events:
-            if event["id"] == eid:
-                return event
-        return None
+        return self._events.get(eid)
+
+    def events_of_rule(self, rule_id: str) -> list[Event]:
+        """All existing events of the given rule, oldest first"""
+        return self._events.by_rule(rule_id)
+
+    def reindex_event(self, event: Event) -> None:
+        """Needs to be called after the host of an existing event has been rewritten"""
+        old_host_key = self._host_keys.get(event["id"])
+        new_host_key = (event["host"], event["core_host"])
+        if old_host_key is not None and old_host_key != new_host_key:
+            self.num_existing_events_by_host[old_host_key] -= 1
+            self.num_existing_events_by_host[new_host_key] = (
+                self.num_existing_events_by_host.get(new_host_key, 0) + 1
+            )
+            self._host_keys[event["id"]] = new_host_key
+        self._events.reindex(event)
 
     def interval_start(self, rule_id: str, interval: ExpectInterval) -> int:
         """
@@ -2621,16 +2673,17 @@ class EventStatus:
     def pack_status(self) -> PackedEventStatus:
         return PackedEventStatus(
             next_event_id=self._next_event_id,
-            events=self._events,
+            events=self._events.to_list(),
             rule_stats=self._rule_stats,
             interval_starts=self._interval_starts,
         )
 
     def unpack_status(self, status: PackedEventStatus) -> None:
         self._next_event_id = status["next_event_id"]
-        self._events = status["events"]
+        self._events = EventStore(status["events"])
         self._rule_stats = status["rule_stats"]
         self._interval_starts = status["interval_starts"]
+        self._initialize_event_limit_status()
 
     def save_status(self) -> None:
         now = time.time()
@@ -2656,11 +2709,12 @@ class EventStatus:
 
     def load_status(self, event_server: EventServer) -> None:
         path = self.settings.paths.status_file.value
+        events = self._events.to_list()
         if path.exists():
             try:
                 status = ast.literal_eval(path.read_text(encoding="utf-8"))
                 self._next_event_id = status["next_event_id"]
-                self._events = status["events"]
+                events = status["events"]
                 self._rule_stats = status["rule_stats"]
                 self._interval_starts = status.get("interval_starts", {})
                 self._logger.info("Loaded event state from %s.", path)
@@ -2669,7 +2723,7 @@ class EventStatus:
                 raise
 
         # Add new columns and fix broken events
-        for event in self._events:
+        for event in events:
             event.setdefault("ipaddress", "")
             event.setdefault("host", HostName(""))
             event.setdefault("application", "")
@@ -2680,6 +2734,7 @@ class EventStatus:
                 event["host_in_downtime"] = False
 
         # core_host is needed to initialize the status
+        self._events = EventStore(events)
         self._initialize_event_limit_status()
 
     def _initialize_event_limit_status(self) -> None:
@@ -2692,11 +2747,14 @@ class EventStatus:
 
         self.num_existing_events_by_host: dict[tuple[str, HostName | None], int] = {}
         self.num_existing_events_by_rule: dict[Any, int] = {}
+        # The host key each event has been counted with, see reindex_event()
+        self._host_keys: dict[int, tuple[str, HostName | None]] = {}
         for event in self._events:
             self._count_event_add(event)
 
     def _count_event_add(self, event: Event) -> None:
         host_key = (event["host"], event["core_host"])
+        self._host_keys[event["id"]] = host_key
         if host_key not in self.num_existing_events_by_host:
             self.num_existing_events_by_host[host_key] = 1
         else:
@@ -2708,7 +2766,7 @@ class EventStatus:
             self.num_existing_events_by_rule[event["rule_id"]] += 1
 
     def _count_event_remove(self, event: Event) -> None:
-        host_key = (event["host"], event["core_host"])
+        host_key = self._host_keys.pop(event["id"], (event["host"], event["core_host"]))
 
         self.num_existing_events -= 1
         self.num_existing_events_by_host[host_key] -= 1
@@ -2718,7 +2776,7 @@ class EventStatus:
         self._perfcounters.count("events")
         event["id"] = self._next_event_id
         self._next_event_id += 1
-        self._events.append(event)
+        self._events.add(event)
         self.num_existing_events += 1
         self._count_event_add(event)
         self._history.add(event, "NEW")
@@ -2735,15 +2793,15 @@ class EventStatus:
             self._events.remove(event)
             self._history.add(event, delete_reason, user)
             self._count_event_remove(event)
-        except ValueError:
+        except KeyError:
             self._logger.exception("Cannot remove event %d: not present", event["id"])
 
     # protected by self.lock
     def remove_oldest_event(self, ty: LimitKind, event: Event) -> None:
         if ty == "overall":
             self._logger.log(VERBOSE, "  Removing oldest event")
-            oldest_event = self._events[0]
-            self.remove_event(oldest_event, "AUTODELETE")
+            if (oldest_event := self._events.oldest()) is not None:
+                self.remove_event(oldest_event, "AUTODELETE")
         elif ty == "by_rule" and event["rule_id"] is not None:
             self._logger.log(VERBOSE, '  Removing oldest event of rule "%s"', event["rule_id"])
             self._remove_oldest_event_of_rule(event["rule_id"])
@@ -2753,17 +2811,13 @@ class EventStatus:
 
     # protected by self.lock
     def _remove_oldest_event_of_rule(self, rule_id: str) -> None:
-        for event in self._events:
-            if event["rule_id"] == rule_id:
-                self.remove_event(event, "AUTODELETE")
-                return
+        if (event := self._events.oldest_of_rule(rule_id)) is not None:
+            self.remove_event(event, "AUTODELETE")
 
     # protected by self.lock
     def _remove_oldest_event_of_host(self, hostname: str) -> None:
-        for event in self._events:
-            if event["host"] == hostname:
-                self.remove_event(event, "AUTODELETE")
-                return
+        if (event := self._events.oldest_of_host(hostname)) is not None:
+            self.remove_event(event, "AUTODELETE")
 
     # protected by self.lock
     def get_num_existing_events_by(self, ty: LimitKind, event: Event) -> int:
@@ -2791,10 +2845,11 @@ class EventStatus:
         """
         with self.lock:
             to_delete = []
-            for event in self._events:
-                if event["rule_id"] == rule["id"] and self.cancelling_match(
-                    match_groups, new_event, event, rule
-                ):
+            # Only events with the (rewritten) host of the cancelling event can match,
+            # see cancelling_match().
+            host = self._cancelling_host(match_groups, new_event, rule)
+            for event in self._events.by_breed(rule["id"], host):
+                if self.cancelling_match(match_groups, new_event, event, rule):
                     # Fill a few fields of the cancelled event with data from
                     # the cancelling event so that action scripts have useful
                     # values and the logfile entry if more relevant.
@@ -2846,21 +2901,7 @@ class EventStatus:
     ) -> bool:
         debug = self._config["debug_rules"]
 
-        # The match_groups of the canceling match only contain the *_ok match groups
-        # Since the rewrite definitions are based on the positive match, we need to
-        # create some missing keys. O.o
-        match_groups["match_groups_message"] = match_groups.get("match_groups_message_ok", ())
-        match_groups["match_groups_syslog_application"] = match_groups.get(
-            "match_groups_syslog_application_ok", ()
-        )
-
-        # Note: before we compare host and application we need to
-        # apply the rewrite rules to the event. Because if in the previous
-        # the hostname was rewritten, it wouldn't match anymore here.
-        host = new_event["host"]
-        if "set_host" in rule:
-            host = HostName(replace_groups(rule["set_host"], host, match_groups))
-
+        host = self._cancelling_host(match_groups, new_event, rule)
         if event["host"] != host:
             if debug:
                 self._logger.info(
@@ -2946,6 +2987,23 @@ class EventStatus:
 
         return True
 
+    def _cancelling_host(self, match_groups: MatchGroups, new_event: Event, rule: Rule) -> HostName:
+        # The match_groups of the canceling match only contain the *_ok match groups
+        # Since the rewrite definitions are based on the positive match, we need to
+        # create some missing keys. O.o
+        match_groups["match_groups_message"] = match_groups.get("match_groups_message_ok", ())
+        match_groups["match_groups_syslog_application"] = match_groups.get(
+            "match_groups_syslog_application_ok", ()
+        )
+
+        # Note: before we compare host and application we need to
+        # apply the rewrite rules to the event. Because if in the previous
+        # the hostname was rewritten, it wouldn't match anymore here.
+        host = new_event["host"]
+        if "set_host" in rule:
+            host = HostName(replace_groups(rule["set_host"], host, match_groups))
+        return host
+
     def count_rule_match(self, rule_id: str) -> None:
         with self.lock:
             self._rule_stats.setdefault(rule_id, 0)
@@ -2967,10 +3025,12 @@ class EventStatus:
                 preserve["contact"] = found["contact"]
         found.update(event)
         found.update(preserve)
+        # The new occurrence may come from another host, e.g. when not counting separately
+        self.reindex_event(found)
 
     def count_expected_event(self, event_server: EventServer, event: Event) -> None:
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"] and ev["phase"] == "counting":
+        for ev in self._events.by_rule(event["rule_id"]):
+            if ev["phase"] == "counting":
                 self.count_event_up(ev, event)
                 return
 
@@ -2987,31 +3047,32 @@ class EventStatus:
         since the event has been created because the count was too
         low in the specified period of time.
         """
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"]:
-                if ev["phase"] == "ack" and not count["count_ack"]:
-                    continue  # skip acknowledged events
-
-                if count["separate_host"] and ev["host"] != event["host"]:
-                    continue  # treat events with separated hosts separately
+        candidates = (
+            self._events.by_breed(event["rule_id"], event["host"])
+            if count["separate_host"]  # treat events with separated hosts separately
+            else self._events.by_rule(event["rule_id"])
+        )
+        for ev in candidates:
+            if ev["phase"] == "ack" and not count["count_ack"]:
+                continue  # skip acknowledged events
 
-                if count["separate_application"] and ev["application"] != event["application"]:
-                    continue  # same for application
+            if count["separate_application"] and ev["application"] != event["application"]:
+                continue  # same for application
 
-                if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
-                    continue
+            if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
+                continue
 
-                count_duration = count.get("count_duration")
-                if count_duration is not None and ev["first"] + count_duration < event["time"]:
-                    # Counting has been discontinued on this event after a certain time
-                    continue
+            count_duration = count.get("count_duration")
+            if count_duration is not None and ev["first"] + count_duration < event["time"]:
+                # Counting has been discontinued on this event after a certain time
+                continue
 
-                if ev["host_in_downtime"] != event["host_in_downtime"]:
-                    continue  # treat events with different downtime states separately
+            if ev["host_in_downtime"] != event["host_in_downtime"]:
+                continue  # treat events with different downtime states separately
 
-                found = ev
-                self.count_event_up(found, event)
-                break
+            found = ev
+            self.count_event_up(found, event)
+            break
         else:
             event["count"] = 1
             event["phase"] = "counting"
@@ -3025,12 +3086,22 @@ class EventStatus:
         return None  # do not do event action
 
     def delete_events_by(self, predicate: Callable[[Event], bool], user: str) -> None:
-        for event in self._events[:]:
-            if predicate(event):
-                event["phase"] = "closed"
-                if user:
-                    event["owner"] = user
-                self.remove_event(event, "DELETE", user)
+        self._delete_events((event for event in self._events.to_list() if predicate(event)), user)
+
+    def delete_events_by_id(self, event_ids: Iterable[int], user: str) -> None:
+        self._delete_events(
+            (event for eid in event_ids if (event := self._events.get(eid)) is not None), user
+        )
+
+    def delete_events_of_host(self, host_name: str, user: str) -> None:
+        self._delete_events(self._events.by_host(host_name), user)
+
+    def _delete_events(self, events: Iterable[Event], user: str) -> None:
+        for event in list(events):
+            event["phase"] = "closed"
+            if user:
+                event["owner"] = user
+            self.remove_event(event, "DELETE", user)
 
     def get_events(self) -> Iterable[Event]:
         return self._events
@@ -3347,6 +3418,7 @@ def reload_configuration(
     logger: Logger,
     lock_configuration: ECLock,
     history: History,
+    perfcounters: Perfcounters,
     event_status: EventStatus,
     event_server: EventServer,
     status_server: StatusServer,
@@ -3357,7 +3429,12 @@ def reload_configuration(
 
         history.close()
         history = create_history(
-            settings, config, logger, StatusTableEvents.columns, StatusTableHistory.columns
+            settings,
+            config,
+            logger,
+            StatusTableEvents.columns,
+            StatusTableHistory.columns,
+            perfcounters,
         )
         event_server.reload_configuration(config, history)
 
@@ -3399,8 +3476,14 @@ def main() -> None:
 
         slave_status = default_slave_status_master()
         config = load_configuration(settings, logger, slave_status)
+        perfcounters = Perfcounters(logger.getChild("lock.perfcounters"))
         history = create_history(
-            settings, config, logger, StatusTableEvents.columns, StatusTableHistory.columns
+            settings,
+            config,
+            logger,
+            StatusTableEvents.columns,
+            StatusTableHistory.columns,
+            perfcounters,
         )
 
         pid_path = settings.paths.pid_file.value
@@ -3423,7 +3506,6 @@ def main() -> None:
         settings.paths.status_file.value.parent.mkdir(parents=True, exist_ok=True)
 
         # First do all things that might fail, before daemonizing
-        perfcounters = Perfcounters(logger.getChild("lock.perfcounters"))
         event_status = EventStatus(
             settings, config, perfcounters, history, logger.getChild("EventStatus")
         )
@@ -3504,6 +3586,9 @@ def main() -> None:
         logger.log(VERBOSE, "Saving final event state")
         event_status.save_status()
 
+        logger.log(VERBOSE, "Closing history")
+        event_server.close_history()
+
         logger.log(VERBOSE, "Cleaning up sockets")
         settings.paths.unix_socket.value.unlink()
         settings.paths.event_socket.value.unlink()
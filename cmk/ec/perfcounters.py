@@ -28,6 +28,10 @@ class Perfcounters:
         "overflows",
         "events",
         "connects",
+        # History write-behind buffer, see SQLiteHistory
+        "history_writes",
+        "history_stalls",
+        "history_drops",
     ]
 
     # Average processing times
@@ -35,6 +39,7 @@ class Perfcounters:
         "processing": 0.99,  # event processing
         "sync": 0.95,  # Replication sync
         "request": 0.95,  # Client requests
+        "history_flush": 0.95,  # Writing buffered history entries
     }
 
     # TODO: Why aren't self._times / self._rates / ... not initialized with their defaults?
@@ -51,9 +56,9 @@ class Perfcounters:
 
         self._logger = logger.getChild("Perfcounters")
 
-    def count(self, counter: str) -> None:
+    def count(self, counter: str, value: int = 1) -> None:
         with self._lock:
-            self._counters[counter] += 1
+            self._counters[counter] += value
 
     def count_time(self, counter: str, ptime: float) -> None:
         with self._lock:
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Prefilter for the rules an event has to be matched against
+
+The RuleMatcher evaluates every condition of every candidate rule, which is
+expensive for large rule packs, because most of the rules will not match an
+event anyway. The prefilter derives a cheap *necessary* condition for the
+host, the syslog application and the message text from the rule patterns:
+
+* plain string patterns are compared completely (host) or as substrings,
+* regex patterns are reduced to a literal prefix (anchored patterns) or to
+  the longest literal the pattern requires.
+
+All rules are indexed by these conditions, and for an incoming event only the
+rules whose conditions hold are returned, in their original order. Rules we
+can not say anything about are always returned, so the first matching rule
+is the same as without the prefilter.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Final, Literal
+
+from .config import Rule, TextPattern
+from .event import Event
+
+# The regex parser is private to the re module and may change with any Python
+# release. Without it, no conditions are derived from regexes.
+try:
+    from re import _constants as sre_constants  # type: ignore[attr-defined]
+    from re import _parser as sre_parser  # type: ignore[attr-defined]
+except ImportError:
+    sre_constants = sre_parser = None
+
+ConditionKind = Literal["exact", "prefix", "substring"]
+
+
+@dataclass(frozen=True)
+class _Literal:
+    kind: ConditionKind
+    value: str
+    # Conditions derived from regexes only hold for ASCII texts: The IGNORECASE
+    # matching of the re module is not the same as comparing lower case strings.
+    ascii_only: bool
+
+
+# None means "we do not know anything", so the rule is always a candidate
+_Condition = frozenset[_Literal] | None
+
+
+class AhoCorasick:
+    """Finds all occurrences of a set of words in a text with a single pass"""
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._output: list[frozenset[str]] = [frozenset()]
+        for word in words:
+            state = 0
+            for char in word:
+                if (next_state := self._goto[state].get(char)) is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._output.append(frozenset())
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state] = self._output[state] | {word}
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = (
+                    self._output[next_state] | self._output[self._fail[next_state]]
+                )
+
+    def find_all(self, text: str) -> set[str]:
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found: set[str] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+def _literal_runs(items: Iterable[tuple[object, object]]) -> Iterator[str]:
+    """All runs of consecutive (ASCII) literals in a parsed sequence"""
+    run: list[str] = []
+    for op, av in items:
+        if op is sre_constants.LITERAL and isinstance(av, int) and av < 128:
+            run.append(chr(av))
+            continue
+        if run:
+            yield "".join(run)
+            run = []
+        if op is sre_constants.SUBPATTERN and isinstance(av, tuple):
+            # A group is as mandatory as a literal. Only the literals inside of
+            # it can be used, a branch would need all alternatives to be known.
+            yield from _literal_runs(av[-1])
+    if run:
+        yield "".join(run)
+
+
+def _sequence_condition(
+    items: Sequence[tuple[object, object]], multiline: bool, anchored: bool = False
+) -> _Condition:
+    if len(items) == 1:
+        op, av = items[0]
+        if op is sre_constants.BRANCH and isinstance(av, tuple):
+            return _alternatives_condition(av[1], multiline, anchored)
+        if op is sre_constants.SUBPATTERN and isinstance(av, tuple):
+            return _sequence_condition(av[-1], multiline, anchored)
+
+    if items and items[0][0] is sre_constants.AT:
+        anchor = items[0][1]
+        if anchor is sre_constants.AT_BEGINNING_STRING or (
+            anchor is sre_constants.AT_BEGINNING and not multiline
+        ):
+            return _sequence_condition(items[1:], multiline, anchored=True)
+
+    if anchored and items:
+        prefix = ""
+        for op, av in items:
+            if op is not sre_constants.LITERAL or not isinstance(av, int) or av >= 128:
+                break
+            prefix += chr(av)
+        if prefix:
+            return frozenset([_Literal("prefix", prefix.lower(), ascii_only=True)])
+        # The parser moves common prefixes out of branches, e.g. "^db|^web"
+        # becomes "^" followed by the branch "db|web".
+        op, av = items[0]
+        if op is sre_constants.BRANCH and isinstance(av, tuple):
+            if (condition := _alternatives_condition(av[1], multiline, anchored)) is not None:
+                return condition
+
+    longest = max(_literal_runs(items), key=len, default="")
+    if not longest:
+        return None
+    return frozenset([_Literal("substring", longest.lower(), ascii_only=True)])
+
+
+def _alternatives_condition(
+    alternatives: Iterable[Sequence[tuple[object, object]]], multiline: bool, anchored: bool
+) -> _Condition:
+    literals: set[_Literal] = set()
+    for alternative in alternatives:
+        if (condition := _sequence_condition(alternative, multiline, anchored)) is None:
+            return None
+        literals |= condition
+    return frozenset(literals)
+
+
+def regex_condition(pattern: re.Pattern[str]) -> _Condition:
+    """Derive a necessary condition for pattern.search() to find something"""
+    if sre_parser is None:
+        return None
+    try:
+        parsed = sre_parser.parse(pattern.pattern, pattern.flags)
+        return _sequence_condition(list(parsed), bool(parsed.state.flags & re.MULTILINE))
+    except Exception:
+        # Whatever the parser of this Python version gives us, we can always
+        # fall back to matching the rule.
+        return None
+
+
+def pattern_condition(pattern: TextPattern, complete: bool) -> _Condition:
+    """The necessary condition for cmk.ec.rule_matcher.match() to succeed"""
+    if isinstance(pattern, str):
+        return frozenset([_Literal("exact" if complete else "substring", pattern, False)])
+    return regex_condition(pattern)
+
+
+def _any_of(conditions: Iterable[_Condition]) -> _Condition:
+    literals: set[_Literal] = set()
+    for condition in conditions:
+        if condition is None:
+            return None
+        literals |= condition
+    return frozenset(literals)
+
+
+def host_condition(rule: Rule) -> _Condition:
+    if (pattern := rule.get("match_host")) is None:
+        return None
+    return pattern_condition(pattern, complete=True)
+
+
+def application_condition(rule: Rule) -> _Condition:
+    # Either a matching or a cancelling application is needed, see
+    # RuleMatcher.event_rule_matches_syslog_application()
+    patterns = [
+        pattern
+        for pattern in (rule.get("match_application"), rule.get("cancel_application"))
+        if pattern is not None
+    ]
+    if not patterns:
+        return None
+    return _any_of(pattern_condition(pattern, complete=False) for pattern in patterns)
+
+
+def text_condition(rule: Rule) -> _Condition:
+    # A missing "match" matches every text, see RuleMatcher.event_rule_matches_message()
+    if "match" not in rule:
+        return None
+    patterns = [
+        pattern for pattern in (rule.get("match"), rule.get("match_ok")) if pattern is not None
+    ]
+    return _any_of(pattern_condition(pattern, complete=False) for pattern in patterns)
+
+
+@dataclass
+class _FieldIndex:
+    """Bitmasks of the rules whose condition on one field of the event holds"""
+
+    unconstrained: int = 0
+    ascii_only: int = 0
+    exact: dict[str, int] = field(default_factory=dict)
+    prefix: dict[str, int] = field(default_factory=dict)
+    substring: dict[str, int] = field(default_factory=dict)
+    _prefix_lengths: list[int] = field(default_factory=list)
+    _automaton: AhoCorasick | None = None
+
+    def add(self, bit: int, condition: _Condition) -> None:
+        if condition is None:
+            self.unconstrained |= bit
+            return
+        for literal in condition:
+            if literal.ascii_only:
+                self.ascii_only |= bit
+            index = getattr(self, literal.kind)
+            index[literal.value] = index.get(literal.value, 0) | bit
+
+    def freeze(self) -> None:
+        self._prefix_lengths = sorted({len(prefix) for prefix in self.prefix})
+        self._automaton = AhoCorasick(self.substring) if self.substring else None
+
+    @property
+    def num_indexed(self) -> int:
+        return len(self.exact) + len(self.prefix) + len(self.substring)
+
+    def candidates(self, value: str) -> int:
+        mask = self.unconstrained
+        if not value.isascii():
+            mask |= self.ascii_only
+        value = value.lower()
+        mask |= self.exact.get(value, 0)
+        for length in self._prefix_lengths:
+            if length > len(value):
+                break
+            mask |= self.prefix.get(value[:length], 0)
+        if self._automaton is not None:
+            for word in self._automaton.find_all(value):
+                mask |= self.substring[word]
+        return mask
+
+
+@dataclass
+class PrefilterStats:
+    events: int = 0
+    rules_before: int = 0
+    rules_after: int = 0
+
+
+class RulePrefilter:
+    """Index of the compiled rules for selecting the candidate rules of an event"""
+
+    FIELDS: Final = ("host", "application", "text")
+
+    def __init__(
+        self,
+        rules: Sequence[Rule],
+        rule_hash: Mapping[int, Mapping[int, Sequence[Rule]]] | None,
+    ) -> None:
+        self._rules = list(rules)
+        self._all_rules = (1 << len(self._rules)) - 1
+        position = {id(rule): nr for nr, rule in enumerate(self._rules)}
+
+        self._fields = {name: _FieldIndex() for name in self.FIELDS}
+        for nr, rule in enumerate(self._rules):
+            bit = 1 << nr
+            if rule.get("invert_matching") or rule.get("disabled"):
+                # Inverted rules match what the conditions do not, and disabled
+                # rules may not have been compiled at all: We can't skip them.
+                for index in self._fields.values():
+                    index.add(bit, None)
+                continue
+            self._fields["host"].add(bit, host_condition(rule))
+            self._fields["application"].add(bit, application_condition(rule))
+            self._fields["text"].add(bit, text_condition(rule))
+        for index in self._fields.values():
+            index.freeze()
+
+        # The facility/priority hash of the rule optimizer as bitmasks
+        self._hash_masks: dict[int, dict[int, int]] | None = (
+            None
+            if rule_hash is None
+            else {
+                facility: {
+                    priority: sum(1 << position[id(rule)] for rule in entries)
+                    for priority, entries in priorities.items()
+                }
+                for facility, priorities in rule_hash.items()
+            }
+        )
+        self.stats = PrefilterStats()
+
+    def num_indexed_rules(self, field_name: str) -> int:
+        return (self._all_rules & ~self._fields[field_name].unconstrained).bit_count()
+
+    def num_unspecific_rules(self) -> int:
+        unspecific = self._all_rules
+        for index in self._fields.values():
+            unspecific &= index.unconstrained
+        return unspecific.bit_count()
+
+    def candidates(self, event: Event) -> list[Rule]:
+        """The rules that may match the event, in the order of the rule packs"""
+        if self._hash_masks is None:
+            mask = self._all_rules
+        else:
+            mask = self._hash_masks.get(event["facility"], {}).get(event["priority"], 0)
+        self.stats.events += 1
+        self.stats.rules_before += mask.bit_count()
+
+        if mask:
+            mask &= self._fields["host"].candidates(event["host"])
+        if mask:
+            mask &= self._fields["application"].candidates(event["application"])
+        if mask:
+            mask &= self._fields["text"].candidates(event["text"])
+
+        candidates = []
+        while mask:
+            lowest = mask & -mask
+            candidates.append(self._rules[lowest.bit_length() - 1])
+            mask ^= lowest
+        self.stats.rules_after += len(candidates)
+        return candidates
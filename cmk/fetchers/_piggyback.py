@@ -6,7 +6,7 @@
 import json
 import logging
 import time
-from collections.abc import Sequence
+from collections.abc import Mapping, Sequence
 from typing import Final
 
 from cmk.utils.agentdatatype import AgentRawData
@@ -14,7 +14,7 @@ from cmk.utils.hostaddress import HostAddress, HostName
 from cmk.utils.log import VERBOSE
 from cmk.utils.paths import omd_root
 
-from cmk.piggyback import get_messages_for, PiggybackMessage
+from cmk.piggyback import get_messages_for_hosts, PiggybackMessage
 from cmk.piggyback.config import Config as PiggybackConfig
 
 from ._abstract import Fetcher, Mode
@@ -59,12 +59,9 @@ class PiggybackFetcher(Fetcher[AgentRawData]):
         )
 
     def open(self) -> None:
-        self._sources.extend(
-            line
-            for origin in (self.hostname, self.address)
-            if origin
-            for line in PiggybackFetcher._raw_data(origin)
-        )
+        origins = [origin for origin in (self.hostname, self.address) if origin]
+        messages = PiggybackFetcher._raw_data(origins)
+        self._sources.extend(line for origin in origins for line in messages[origin])
 
     def close(self) -> None:
         self._sources.clear()
@@ -116,5 +113,7 @@ class PiggybackFetcher(Fetcher[AgentRawData]):
         return ("<<<labels:sep(0)>>>\n%s\n" % json.dumps(labels)).encode("utf-8")
 
     @staticmethod
-    def _raw_data(hostname: HostAddress) -> Sequence[PiggybackMessage]:
-        return get_messages_for(hostname, omd_root)
+    def _raw_data(
+        hostnames: Sequence[HostAddress],
+    ) -> Mapping[HostAddress, Sequence[PiggybackMessage]]:
+        return get_messages_for_hosts(hostnames, omd_root)
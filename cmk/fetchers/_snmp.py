@@ -237,13 +237,17 @@ class SNMPFetcher(Fetcher[SNMPRawData]):
         self._backend = None
 
     def _detect(
-        self, *, select_from: Collection[SectionName], backend: SNMPBackend
+        self, *, select_from: Collection[SectionName], backend: SNMPBackend, mode: Mode
     ) -> frozenset[SectionName]:
-        """Detect the applicable sections for the device in question"""
+        """Detect the applicable sections for the device in question
+
+        A discovery is an explicit rescan, so the cached OIDs are not used.
+        """
         return gather_available_raw_section_names(
             sections=[(name, self.plugin_store[name].detect_spec) for name in select_from],
             scan_config=self.scan_config,
             backend=backend,
+            refresh_oid_cache=mode is Mode.DISCOVERY,
         )
 
     def _get_selection(self, mode: Mode) -> frozenset[SectionName]:
@@ -307,7 +311,9 @@ class SNMPFetcher(Fetcher[SNMPRawData]):
         persisted_sections = self._section_store.load() if mode is Mode.CHECKING else {}
         section_names = self._get_selection(mode)
         section_names |= self._detect(
-            select_from=self._get_detected_sections(mode) - section_names, backend=self._backend
+            select_from=self._get_detected_sections(mode) - section_names,
+            backend=self._backend,
+            mode=mode,
         )
         if mode is Mode.DISCOVERY and not section_names:
             # Nothing to discover? That can't be right.
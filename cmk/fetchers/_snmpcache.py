@@ -2,10 +2,28 @@
 # Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
-"""SNMP caching"""
+"""SNMP caching
 
+The values of the single OIDs fetched during the SNMP scan (the system
+description and object and the OIDs of the detection specifications) are
+cached per host. The caches of the most recently used hosts are kept in
+memory, so that a keepalive helper switching between hosts does not have
+to fetch them again. Each value expires after a TTL. OIDs which could not
+be fetched are only remembered until the next scan of the host, so that a
+device coming back is not reported as lacking them.
+
+On disk, the cache of a host is stored in the marshal format as
+(version, {oid: (value, expires_at)}).
+"""
+
+import marshal
 import os
+import time
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Final
 
 from cmk.ccc import store
 
@@ -14,52 +32,213 @@ from cmk.utils.hostaddress import HostAddress, HostName
 
 from cmk.snmplib import OID, SNMPDecodedString
 
-# TODO: Replace this by generic caching
-_g_single_oid_hostname: HostName | None = None
-_g_single_oid_ipaddress: HostAddress | None = None
-_g_single_oid_cache: dict[OID, SNMPDecodedString | None] | None = None
+_FORMAT_VERSION: Final = 1
+
+# Number of hosts whose caches are kept in memory
+MAX_CACHED_HOSTS: Final = 500
+
+# Seconds until a cached value has to be fetched again
+DEFAULT_TTL: Final = 300.0
+
+
+@dataclass
+class SingleOIDCacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+
+    def copy(self) -> "SingleOIDCacheStats":
+        return SingleOIDCacheStats(hits=self.hits, misses=self.misses, expired=self.expired)
+
+    def __sub__(self, other: "SingleOIDCacheStats") -> "SingleOIDCacheStats":
+        return SingleOIDCacheStats(
+            hits=self.hits - other.hits,
+            misses=self.misses - other.misses,
+            expired=self.expired - other.expired,
+        )
+
+
+class SingleOIDCache(MutableMapping[OID, SNMPDecodedString | None]):
+    """The cached single OID values of a host
+
+    Looking up a missing or expired OID raises a KeyError and counts as a miss.
+    Failed lookups (None) are not persisted and are forgotten by forget_failures().
+    """
+
+    def __init__(
+        self,
+        entries: dict[OID, tuple[SNMPDecodedString | None, float]] | None = None,
+        *,
+        ttl: float = DEFAULT_TTL,
+    ) -> None:
+        self._entries: dict[OID, tuple[SNMPDecodedString | None, float]] = entries or {}
+        self._failed: set[OID] = set()
+        self.ttl = ttl
+        self.stats = SingleOIDCacheStats()
+        self.dirty = False
+
+    def __getitem__(self, oid: OID) -> SNMPDecodedString | None:
+        if oid in self._failed:
+            self.stats.hits += 1
+            _STATS.hits += 1
+            return None
+        try:
+            value, expires_at = self._entries[oid]
+        except KeyError:
+            self._count_miss()
+            raise
+        if expires_at <= time.time():
+            del self._entries[oid]
+            self.stats.expired += 1
+            _STATS.expired += 1
+            self._count_miss()
+            raise KeyError(oid)
+        self.stats.hits += 1
+        _STATS.hits += 1
+        return value
+
+    def _count_miss(self) -> None:
+        self.stats.misses += 1
+        _STATS.misses += 1
+
+    def __setitem__(self, oid: OID, value: SNMPDecodedString | None) -> None:
+        if value is None:
+            self._failed.add(oid)
+            if self._entries.pop(oid, None) is not None:
+                self.dirty = True
+            return
+        self._failed.discard(oid)
+        self._entries[oid] = (value, time.time() + self.ttl)
+        self.dirty = True
+
+    def __delitem__(self, oid: OID) -> None:
+        if oid in self._failed:
+            self._failed.remove(oid)
+            return
+        del self._entries[oid]
+        self.dirty = True
+
+    def __contains__(self, oid: object) -> bool:
+        # Don't count this as a hit or miss
+        return isinstance(oid, str) and (
+            oid in self._failed or (oid in self._entries and self._entries[oid][1] > time.time())
+        )
+
+    def __iter__(self) -> Iterator[OID]:
+        now = time.time()
+        return iter(
+            [oid for oid, (_value, expires_at) in self._entries.items() if expires_at > now]
+            + list(self._failed)
+        )
+
+    def forget_failures(self) -> None:
+        self._failed.clear()
+
+    def __len__(self) -> int:
+        return sum(1 for _oid in self)
+
+    def serialize(self) -> bytes:
+        now = time.time()
+        return marshal.dumps(
+            (
+                _FORMAT_VERSION,
+                {oid: entry for oid, entry in self._entries.items() if entry[1] > now},
+            )
+        )
+
+    @classmethod
+    def deserialize(cls, raw: bytes, *, ttl: float = DEFAULT_TTL) -> "SingleOIDCache":
+        """Create the cache from serialized data, dropping the expired values
+
+        Data in an unknown format (like the one of older versions) is ignored.
+        """
+        now = time.time()
+        try:
+            version, entries = marshal.loads(raw)
+            if version != _FORMAT_VERSION:
+                return cls(ttl=ttl)
+            return cls(
+                {
+                    oid: (value, expires_at)
+                    for oid, (value, expires_at) in entries.items()
+                    if expires_at > now and value is not None
+                },
+                ttl=ttl,
+            )
+        except (ValueError, EOFError, TypeError, AttributeError):
+            return cls(ttl=ttl)
+
+
+_STATS: Final = SingleOIDCacheStats()
+_g_host_caches: Final[OrderedDict[tuple[HostName, HostAddress | None], SingleOIDCache]] = (
+    OrderedDict()
+)
+_g_current_host: tuple[HostName, HostAddress | None] | None = None
 
 
 def initialize_single_oid_cache(
-    host_name: HostName, ipaddress: HostAddress | None, from_disk: bool = False, *, cache_dir: Path
+    host_name: HostName,
+    ipaddress: HostAddress | None,
+    from_disk: bool = False,
+    *,
+    cache_dir: Path,
+    ttl: float = DEFAULT_TTL,
+    refresh: bool = False,
 ) -> None:
-    global _g_single_oid_cache, _g_single_oid_ipaddress, _g_single_oid_hostname
+    """Make the cache of the host the current one
 
-    if (
-        _g_single_oid_hostname != host_name
-        or _g_single_oid_ipaddress != ipaddress
-        or _g_single_oid_cache is None
-    ):
-        _g_single_oid_hostname = host_name
-        _g_single_oid_ipaddress = ipaddress
-        if from_disk:
-            _g_single_oid_cache = _load_single_oid_cache(host_name, ipaddress, cache_dir=cache_dir)
-        else:
-            _g_single_oid_cache = {}
+    The cache is taken from memory if possible, otherwise it is loaded from
+    disk if from_disk is set. With refresh, e.g. for an explicit rescan, the
+    cache starts empty. The least recently used hosts are evicted.
+    """
+    global _g_current_host
+
+    key = (host_name, ipaddress)
+    _g_current_host = key
+    if not refresh and (cache := _g_host_caches.get(key)) is not None:
+        _g_host_caches.move_to_end(key)
+        cache.ttl = ttl
+        cache.forget_failures()
+        return
+
+    _g_host_caches[key] = (
+        _load_single_oid_cache(host_name, ipaddress, cache_dir=cache_dir, ttl=ttl)
+        if from_disk and not refresh
+        else SingleOIDCache(ttl=ttl)
+    )
+    _g_host_caches.move_to_end(key)
+    while len(_g_host_caches) > MAX_CACHED_HOSTS:
+        _g_host_caches.popitem(last=False)
 
 
 def write_single_oid_cache(
     host_name: HostName, ipaddress: HostAddress | None, *, cache_dir: Path
 ) -> None:
-    if not _g_single_oid_cache:
+    cache = _g_host_caches.get((host_name, ipaddress))
+    if not cache or not cache.dirty:
         return
 
     if not os.path.exists(cache_dir):
         os.makedirs(cache_dir)
-    cache_path = f"{cache_dir}/{host_name}.{ipaddress}"
-    store.save_object_to_file(cache_path, _g_single_oid_cache, pretty=False)
+    store.save_bytes_to_file(cache_dir / f"{host_name}.{ipaddress}", cache.serialize())
+    cache.dirty = False
 
 
 def _load_single_oid_cache(
-    host_name: HostName, ipaddress: HostAddress | None, cache_dir: Path
-) -> dict[OID, SNMPDecodedString | None]:
+    host_name: HostName, ipaddress: HostAddress | None, cache_dir: Path, ttl: float
+) -> SingleOIDCache:
     cache_path = cache_dir / f"{host_name}.{ipaddress}"
-    return store.load_object_from_file(cache_path, default={})
+    return SingleOIDCache.deserialize(store.load_bytes_from_file(cache_path), ttl=ttl)
+
+
+def single_oid_cache() -> SingleOIDCache:
+    assert _g_current_host is not None
+    return _g_host_caches[_g_current_host]
 
 
-def single_oid_cache() -> dict[OID, SNMPDecodedString | None]:
-    assert _g_single_oid_cache is not None
-    return _g_single_oid_cache
+def cache_stats() -> SingleOIDCacheStats:
+    """The hits and misses of all host caches of this process"""
+    return _STATS.copy()
 
 
 def cleanup_host_caches() -> None:
@@ -70,8 +249,8 @@ cmk.utils.cleanup.register_cleanup(cleanup_host_caches)
 
 
 def _clear_other_hosts_oid_cache(hostname: HostName | None) -> None:
-    global _g_single_oid_cache, _g_single_oid_ipaddress, _g_single_oid_hostname
-    if _g_single_oid_hostname != hostname:
-        _g_single_oid_cache = None
-        _g_single_oid_hostname = hostname
-        _g_single_oid_ipaddress = None
+    global _g_current_host
+    for key in [key for key in _g_host_caches if key[0] != hostname]:
+        del _g_host_caches[key]
+    if _g_current_host is not None and _g_current_host[0] != hostname:
+        _g_current_host = None
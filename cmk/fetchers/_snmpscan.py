@@ -37,12 +37,18 @@ def gather_available_raw_section_names(
     *,
     scan_config: SNMPScanConfig,
     backend: SNMPBackend,
+    refresh_oid_cache: bool = False,
 ) -> frozenset[SectionName]:
     if not sections:
         return frozenset()
 
     try:
-        return _snmp_scan(sections, scan_config=scan_config, backend=backend)
+        return _snmp_scan(
+            sections,
+            scan_config=scan_config,
+            backend=backend,
+            refresh_oid_cache=refresh_oid_cache,
+        )
     except MKTimeout:
         raise
     except Exception as e:
@@ -63,11 +69,16 @@ def _snmp_scan(
     *,
     scan_config: SNMPScanConfig,
     backend: SNMPBackend,
+    refresh_oid_cache: bool,
 ) -> frozenset[SectionName]:
     snmp_cache.initialize_single_oid_cache(
-        backend.config.hostname, backend.config.ipaddress, cache_dir=scan_config.oid_cache_dir
+        backend.config.hostname,
+        backend.config.ipaddress,
+        cache_dir=scan_config.oid_cache_dir,
+        refresh=refresh_oid_cache,
     )
     backend.logger.debug("  SNMP scan:")
+    stats_before = snmp_cache.single_oid_cache().stats.copy()
 
     if scan_config.missing_sys_description:
         _fake_description_object(backend.logger)
@@ -80,6 +91,13 @@ def _snmp_scan(
         backend=backend,
     )
     _output_snmp_check_plugins("SNMP scan found", found_sections, backend.logger)
+    stats = snmp_cache.single_oid_cache().stats - stats_before
+    backend.logger.debug(
+        "   SNMP scan used %d cached OIDs and fetched %d OIDs (%d of them expired)",
+        stats.hits,
+        stats.misses,
+        stats.expired,
+    )
     snmp_cache.write_single_oid_cache(
         backend.config.hostname, backend.config.ipaddress, cache_dir=scan_config.oid_cache_dir
     )
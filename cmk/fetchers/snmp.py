@@ -64,6 +64,12 @@ def make_backend(
     if snmp_config.snmp_backend is SNMPBackendEnum.CLASSIC:
         return ClassicSNMPBackend(snmp_config, logger)
 
+    if snmp_config.snmp_backend is SNMPBackendEnum.PYSNMP:
+        # Only import pysnmp if it is used, it takes a while.
+        from .snmp_backend.pysnmp_backend import PySNMPBackend
+
+        return PySNMPBackend(snmp_config, logger)
+
     raise NotImplementedError(f"Unknown SNMP backend: {snmp_config.snmp_backend}")
 
 
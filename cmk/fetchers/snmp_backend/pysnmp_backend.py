@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""SNMP backend speaking SNMP itself instead of running the Net-SNMP tools
+
+The requests are sent with pysnmp from an asyncio event loop. Walks use
+GETBULK requests (GETNEXT for SNMPv1 and hosts without bulk walks), and
+several requests to the same host can be in flight at the same time, see
+PySNMPBackend.walk_many(). The number of requests in flight is configured by
+the "max_concurrent_requests" of the SNMP timing settings.
+
+All backends of a process share one event loop, but every backend has its own
+SNMP engine: pysnmp configures the credentials per engine, and hosts may use
+the same SNMPv3 user name with different keys.
+"""
+
+import asyncio
+import contextlib
+import logging
+import weakref
+from collections.abc import Coroutine, Sequence
+from dataclasses import dataclass
+from typing import Any, Final, TypeVar
+
+from pyasn1.type import univ  # type: ignore[import-untyped]
+from pysnmp.hlapi.asyncio import (  # type: ignore[import-untyped]
+    bulkCmd,
+    CommunityData,
+    ContextData,
+    getCmd,
+    nextCmd,
+    ObjectIdentity,
+    ObjectType,
+    SnmpEngine,
+    Udp6TransportTarget,
+    UdpTransportTarget,
+    usmAesBlumenthalCfb192Protocol,
+    usmAesBlumenthalCfb256Protocol,
+    usmAesCfb128Protocol,
+    usmDESPrivProtocol,
+    usmHMAC128SHA224AuthProtocol,
+    usmHMAC192SHA256AuthProtocol,
+    usmHMAC256SHA384AuthProtocol,
+    usmHMAC384SHA512AuthProtocol,
+    usmHMACMD5AuthProtocol,
+    usmHMACSHAAuthProtocol,
+    UsmUserData,
+)
+from pysnmp.proto import rfc1902, rfc1905  # type: ignore[import-untyped]
+
+from cmk.ccc.exceptions import MKGeneralException, MKSNMPError
+
+from cmk.utils import tty
+from cmk.utils.log import VERBOSE
+from cmk.utils.sectionname import SectionName
+
+from cmk.snmplib import (
+    OID,
+    SNMPBackend,
+    SNMPContext,
+    SNMPHostConfig,
+    SNMPRawValue,
+    SNMPRowInfo,
+    SNMPVersion,
+)
+
+__all__ = ["PySNMPBackend"]
+
+_T = TypeVar("_T")
+
+# Default number of requests a backend has in flight at the same time
+MAX_CONCURRENT_REQUESTS: Final = 10
+
+# Same as the Net-SNMP defaults used by the classic backend
+DEFAULT_TIMEOUT: Final = 1.0
+DEFAULT_RETRIES: Final = 5
+
+_AUTH_PROTOCOLS: Final = {
+    "md5": usmHMACMD5AuthProtocol,
+    "sha": usmHMACSHAAuthProtocol,
+    "SHA-224": usmHMAC128SHA224AuthProtocol,
+    "SHA-256": usmHMAC192SHA256AuthProtocol,
+    "SHA-384": usmHMAC256SHA384AuthProtocol,
+    "SHA-512": usmHMAC384SHA512AuthProtocol,
+}
+
+# Net-SNMP uses the key extension of Blumenthal for AES-192 and AES-256
+_PRIV_PROTOCOLS: Final = {
+    "DES": usmDESPrivProtocol,
+    "AES": usmAesCfb128Protocol,
+    "AES-192": usmAesBlumenthalCfb192Protocol,
+    "AES-256": usmAesBlumenthalCfb256Protocol,
+}
+
+_V1_NO_SUCH_NAME: Final = 2
+
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _run(coroutine: Coroutine[Any, Any, _T]) -> _T:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coroutine)
+
+
+def _close_engine(engine: SnmpEngine) -> None:
+    if engine.transportDispatcher is not None:
+        with contextlib.suppress(RuntimeError):  # The event loop may be closed already
+            engine.transportDispatcher.closeDispatcher()
+
+
+def _parse_oid(oid: OID) -> univ.ObjectIdentifier:
+    try:
+        return univ.ObjectIdentifier(oid.strip("."))
+    except Exception:
+        raise MKGeneralException(f"Invalid OID {oid}")
+
+
+def _is_exception_value(value: object) -> bool:
+    return isinstance(value, rfc1905.NoSuchObject | rfc1905.NoSuchInstance | rfc1905.EndOfMibView)
+
+
+def raw_value(value: object) -> SNMPRawValue:
+    """The value like the other backends return it
+
+    Strings are returned as they are, everything else the way the Net-SNMP
+    tools print it with the options of the classic backend.
+    """
+    if isinstance(value, rfc1902.IpAddress):
+        return ".".join(str(octet) for octet in value.asNumbers()).encode()
+    if isinstance(value, univ.OctetString):
+        return value.asOctets()
+    if isinstance(value, univ.ObjectIdentifier):
+        return f".{value}".encode()
+    if isinstance(value, univ.Integer):
+        return str(int(value)).encode()
+    if isinstance(value, univ.Null):
+        return b""
+    return str(value.prettyPrint()).encode()  # type: ignore[attr-defined]
+
+
+@dataclass(frozen=True, kw_only=True)
+class _LoopResources:
+    loop: asyncio.AbstractEventLoop
+    engine: SnmpEngine
+    semaphore: asyncio.Semaphore
+    close: weakref.finalize
+
+
+class PySNMPBackend(SNMPBackend):
+    def __init__(self, snmp_config: SNMPHostConfig, logger: logging.Logger) -> None:
+        super().__init__(snmp_config, logger)
+        self.max_concurrent_requests: Final[int] = max(
+            1, snmp_config.timing.get("max_concurrent_requests", MAX_CONCURRENT_REQUESTS)
+        )
+        self._loop_resources: _LoopResources | None = None
+
+    def get(self, /, oid: OID, *, context: SNMPContext) -> SNMPRawValue | None:
+        return _run(self.get_async(oid, context=context))
+
+    def walk(
+        self,
+        /,
+        oid: OID,
+        *,
+        context: SNMPContext,
+        section_name: SectionName | None = None,
+        table_base_oid: OID | None = None,
+    ) -> SNMPRowInfo:
+        return _run(self.walk_async(oid, context=context))
+
+    def walk_many(
+        self,
+        /,
+        oids: Sequence[OID],
+        *,
+        context: SNMPContext,
+        section_name: SectionName | None = None,
+        table_base_oid: OID | None = None,
+    ) -> Sequence[SNMPRowInfo]:
+        """Walk several OIDs with up to max_concurrent_requests requests in flight"""
+        return _run(self.walk_many_async(oids, context=context))
+
+    async def walk_many_async(
+        self, oids: Sequence[OID], *, context: SNMPContext
+    ) -> Sequence[SNMPRowInfo]:
+        # Let all walks finish, so that none of them is left behind in the loop
+        results = await asyncio.gather(
+            *(self.walk_async(oid, context=context) for oid in oids), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results  # type: ignore[return-value]
+
+    async def get_async(self, oid: OID, *, context: SNMPContext) -> SNMPRawValue | None:
+        if oid.endswith(".*"):
+            prefix = _parse_oid(oid[:-2])
+            error_indication, error_status, _error_index, var_bind_table = await self._request(
+                nextCmd, context, prefix
+            )
+            var_binds = [var_bind for row in var_bind_table for var_bind in row]
+        else:
+            prefix = None
+            error_indication, error_status, _error_index, var_binds = await self._request(
+                getCmd, context, _parse_oid(oid)
+            )
+
+        if error_indication or error_status:
+            self._logger.log(
+                VERBOSE,
+                f"{tty.red}{tty.bold}ERROR: {tty.normal}SNMP error: "
+                f"{error_indication or error_status.prettyPrint()}",
+            )
+            return None
+        if not var_binds:
+            return None
+
+        name, value = var_binds[0]
+        self._logger.debug(f"SNMP answer: ==> [{value.prettyPrint()}]")
+        if _is_exception_value(value):
+            return None
+        # In case of .*, check if prefix is the one we are looking for
+        if prefix is not None and not (prefix.isPrefixOf(name) and name != prefix):
+            return None
+        return raw_value(value)
+
+    async def walk_async(self, oid: OID, *, context: SNMPContext) -> SNMPRowInfo:
+        base = _parse_oid(oid)
+        rowinfo: SNMPRowInfo = []
+        # We don't insist on increasing OIDs (like "snmpwalk -Cc"), but we don't
+        # want to walk in circles either.
+        seen = set()
+        current = base
+        while True:
+            if self.config.use_bulkwalk:
+                response = await self._request(
+                    bulkCmd, context, 0, self.config.bulk_walk_size_of, current
+                )
+            else:
+                response = await self._request(nextCmd, context, current)
+            error_indication, error_status, _error_index, var_bind_table = response
+
+            if error_indication:
+                raise MKSNMPError(f"SNMP Error on {self.config.ipaddress}: {error_indication}")
+            if error_status:
+                if int(error_status) == _V1_NO_SUCH_NAME:
+                    break  # End of the MIB view for SNMPv1
+                raise MKSNMPError(
+                    f"SNMP Error on {self.config.ipaddress}: {error_status.prettyPrint()}"
+                )
+
+            var_binds = [var_bind for row in var_bind_table for var_bind in row]
+            done = not var_binds
+            for name, value in var_binds:
+                if isinstance(value, rfc1905.EndOfMibView) or not base.isPrefixOf(name):
+                    done = True
+                    break
+                if name in seen:
+                    self._logger.debug(f"OID {name} returned twice, stopping the walk")
+                    done = True
+                    break
+                seen.add(name)
+                current = name
+                if not _is_exception_value(value):
+                    rowinfo.append((f".{name}", raw_value(value)))
+            if done:
+                break
+
+        if not rowinfo:
+            # Like snmpwalk: If there is nothing below the OID, try the OID itself.
+            if (value := await self.get_async(oid, context=context)) is not None:
+                rowinfo.append((f".{base}", value))
+        return rowinfo
+
+    async def _request(self, command: Any, context: SNMPContext, *args: Any) -> Any:
+        async with self._resources().semaphore:
+            *params, oid = args
+            return await command(
+                self._resources().engine,
+                self._auth_data(),
+                self._transport_target(),
+                self._context_data(context),
+                *params,
+                ObjectType(ObjectIdentity(oid)),
+                lookupMib=False,
+            )
+
+    def _resources(self) -> _LoopResources:
+        # The engine and the semaphore have to be created in the event loop
+        # they are used from.
+        loop = asyncio.get_running_loop()
+        if self._loop_resources is not None:
+            if self._loop_resources.loop is loop:
+                return self._loop_resources
+            self._loop_resources.close()
+        engine = SnmpEngine()
+        self._loop_resources = _LoopResources(
+            loop=loop,
+            engine=engine,
+            semaphore=asyncio.Semaphore(self.max_concurrent_requests),
+            close=weakref.finalize(self, _close_engine, engine),
+        )
+        return self._loop_resources
+
+    def _transport_target(self) -> UdpTransportTarget | Udp6TransportTarget:
+        address = (self.config.ipaddress or "0.0.0.0", self.config.port)
+        timeout = self.config.timing.get("timeout", DEFAULT_TIMEOUT)
+        retries = self.config.timing.get("retries", DEFAULT_RETRIES)
+        if self.config.is_ipv6_primary:
+            return Udp6TransportTarget(address, timeout=timeout, retries=retries)
+        return UdpTransportTarget(address, timeout=timeout, retries=retries)
+
+    def _context_data(self, context: SNMPContext) -> ContextData:
+        if context and self.config.snmp_version is SNMPVersion.V3:
+            return ContextData(contextName=context)
+        return ContextData()
+
+    # See ClassicSNMPBackend._snmp_base_command() for the credentials
+    def _auth_data(self) -> CommunityData | UsmUserData:
+        credentials = self.config.credentials
+        if self.config.snmp_version is not SNMPVersion.V3:
+            if not isinstance(credentials, str):
+                raise TypeError()
+            return CommunityData(
+                credentials, mpModel=0 if self.config.snmp_version is SNMPVersion.V1 else 1
+            )
+
+        if not (isinstance(credentials, tuple) and len(credentials) in (2, 4, 6)):
+            raise MKGeneralException(
+                f"Invalid SNMP credentials '{credentials!r}' for host {self.config.hostname}: "
+                "must be string, 2-tuple, 4-tuple or 6-tuple"
+            )
+        sec_level, sec_name = credentials[0], credentials[1 if len(credentials) == 2 else 2]
+        if sec_level == "noAuthNoPriv" or len(credentials) == 2:
+            return UsmUserData(sec_name)
+        auth = {
+            "authKey": credentials[3],
+            "authProtocol": _auth_protocol_for(credentials[1]),
+        }
+        if sec_level == "authNoPriv" or len(credentials) == 4:
+            return UsmUserData(sec_name, **auth)
+        return UsmUserData(
+            sec_name,
+            **auth,
+            privKey=credentials[5],
+            privProtocol=_priv_protocol_for(credentials[4]),
+        )
+
+
+def _auth_protocol_for(proto_name: str) -> tuple[int, ...]:
+    try:
+        return _AUTH_PROTOCOLS[proto_name]
+    except KeyError:
+        raise MKGeneralException(f"Invalid SNMP auth protocol: {proto_name}")
+
+
+def _priv_protocol_for(proto_name: str) -> tuple[int, ...]:
+    try:
+        return _PRIV_PROTOCOLS[proto_name]
+    except KeyError:
+        raise MKGeneralException(f"Invalid SNMP priv protocol: {proto_name}")
@@ -4,8 +4,10 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 """Abstract classes and types."""
 
+import bisect
 import logging
-from collections.abc import Sequence
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
 from pathlib import Path
 from typing import Final
 
@@ -28,14 +30,17 @@ class StoredWalkSNMPBackend(SNMPBackend):
             raise MKSNMPError(f"No snmpwalk file {self.path}")
 
     def get(self, /, oid: OID, *, context: SNMPContext) -> SNMPRawValue | None:
-        walk = self.walk(oid, context=context)
-        # get_stored_snmpwalk returns all oids that start with oid but here
-        # we need an exact match
-        if len(walk) == 1 and oid == walk[0][0]:
-            return walk[0][1]
-        if oid.endswith(".*") and len(walk) > 0:
-            return walk[0][1]
-        return None
+        if oid.endswith(".*"):
+            walk = self.walk(oid, context=context)
+            return walk[0][1] if walk else None
+        # walk() returns all oids that start with oid but here we need an
+        # exact match without any oids below it.
+        index = self._walk_index()
+        if (position := index.positions.get(oid)) is None:
+            return None
+        if position + 1 < len(index.oids) and index.is_below(position + 1, index.oids[position]):
+            return None
+        return index.value(position)
 
     def walk(
         self,
@@ -57,34 +62,36 @@ class StoredWalkSNMPBackend(SNMPBackend):
             dot_star = False
 
         self._logger.debug(f"  Loading {oid}")
-        lines = self.read_walk_data()
-
-        begin = 0
-        end = len(lines)
-        hit = None
-        while end - begin > 0:
-            current = (begin + end) // 2
-            parts = lines[current].split(None, 1)
-            comp = parts[0]
-            hit = StoredWalkSNMPBackend._compare_oids(oid_prefix, comp)
-            if hit == 0:
-                break
-            if hit == 1:  # we are too low
-                begin = current + 1
-            else:
-                end = current
-
-        if hit != 0:
-            return []  # not found
-
-        rowinfo = StoredWalkSNMPBackend._collect_until(oid, oid_prefix, lines, current, -1)
-        rowinfo.reverse()
-        rowinfo += StoredWalkSNMPBackend._collect_until(oid, oid_prefix, lines, current + 1, 1)
+        index = self._walk_index()
+        prefix = StoredWalkSNMPBackend._to_bin_string(oid_prefix)
+        begin, end = index.find(prefix)
 
         if dot_star:
-            return [rowinfo[0]]
+            # Only the first OID below the prefix, not the prefix itself
+            if begin < end and index.oids[begin] == prefix:
+                begin += 1
+            end = min(end, begin + 1)
+
+        return [(index.rows[nr][0], index.value(nr)) for nr in range(begin, end)]
+
+    def _walk_index(self) -> "_WalkIndex":
+        """The parsed walk file, only parsed again if the file has changed"""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            raise MKSNMPError(f"No snmpwalk file {self.path}")
+        key = (stat.st_mtime_ns, stat.st_size)
 
-        return rowinfo
+        if (cached := _WALK_CACHE.get(self.path)) is not None and cached[0] == key:
+            _WALK_CACHE.move_to_end(self.path)
+            return cached[1]
+
+        index = _WalkIndex.parse(self.read_walk_data(), self._logger)
+        _WALK_CACHE[self.path] = (key, index)
+        _WALK_CACHE.move_to_end(self.path)
+        while len(_WALK_CACHE) > _WALK_CACHE_SIZE:
+            _WALK_CACHE.popitem(last=False)
+        return index
 
     @staticmethod
     def read_walk_from_path(path: Path, logger: logging.Logger) -> Sequence[str]:
@@ -106,16 +113,6 @@ class StoredWalkSNMPBackend(SNMPBackend):
         except OSError:
             raise MKSNMPError(f"No snmpwalk file {self.path}")
 
-    @staticmethod
-    def _compare_oids(a: OID, b: OID) -> int:
-        aa = StoredWalkSNMPBackend._to_bin_string(a)
-        bb = StoredWalkSNMPBackend._to_bin_string(b)
-        if len(aa) <= len(bb) and bb[: len(aa)] == aa:
-            result = 0
-        else:
-            result = (aa > bb) - (aa < bb)
-        return result
-
     @staticmethod
     def _to_bin_string(oid: OID) -> tuple[int, ...]:
         try:
@@ -125,32 +122,52 @@ class StoredWalkSNMPBackend(SNMPBackend):
         except Exception:
             raise MKGeneralException(f"Invalid OID {oid}")
 
-    @staticmethod
-    def _collect_until(
-        oid: OID, oid_prefix: OID, lines: Sequence[str], index: int, direction: int
-    ) -> SNMPRowInfo:
+
+class _WalkIndex:
+    """The lines of a walk file sorted by their tokenized OIDs
+
+    All rows below an OID are next to each other, so they can be found by
+    bisection. The values are only decoded for the rows that are asked for.
+    """
+
+    def __init__(self, rows: Sequence[tuple[tuple[int, ...], OID, str]]) -> None:
+        self.oids: Final = [tokens for tokens, _oid, _value in rows]
+        self.rows: Final = [(oid, value) for _tokens, oid, value in rows]
+        self.positions: Final = {oid: nr for nr, (oid, _value) in enumerate(self.rows)}
+
+    @classmethod
+    def parse(cls, lines: Iterable[str], logger: logging.Logger) -> "_WalkIndex":
         rows = []
-        # Handle case, where we run after the end of the lines list
-        if index >= len(lines):
-            if direction > 0:
-                return []
-            index -= 1
-        while True:
-            line = lines[index]
+        for line in lines:
             parts = line.split(None, 1)
-            o = parts[0]
-            if o.startswith("."):
-                o = o[1:]
-            if o == oid or o.startswith(oid_prefix + "."):
-                if len(parts) > 1:
-                    value = parts[1]
-                else:
-                    value = ""
-                # Fix for missing starting oids
-                rows.append(("." + o, strip_snmp_value(value)))
-                index += direction
-                if index < 0 or index >= len(lines):
-                    break
-            else:
-                break
-        return rows
+            if not parts:
+                continue
+            oid = parts[0] if parts[0].startswith(".") else f".{parts[0]}"
+            try:
+                tokens = StoredWalkSNMPBackend._to_bin_string(oid)
+            except MKGeneralException:
+                logger.debug(f"  Skipping line with invalid OID {oid}")
+                continue
+            rows.append((tokens, oid, parts[1] if len(parts) > 1 else ""))
+        # Stored walks are sorted already, this only makes sure bisecting works.
+        rows.sort(key=lambda row: row[0])
+        return cls(rows)
+
+    def find(self, prefix: tuple[int, ...]) -> tuple[int, int]:
+        """The range of the rows for the OID prefix and all OIDs below it"""
+        begin = bisect.bisect_left(self.oids, prefix)
+        end = bisect.bisect_left(self.oids, (*prefix[:-1], prefix[-1] + 1), lo=begin)
+        return begin, end
+
+    def is_below(self, position: int, prefix: tuple[int, ...]) -> bool:
+        return self.oids[position][: len(prefix)] == prefix
+
+    def value(self, position: int) -> SNMPRawValue:
+        return strip_snmp_value(self.rows[position][1])
+
+
+# Parsing a walk file is expensive compared to looking up OIDs, and the same
+# files are used again and again, e.g. for simulated hosts. Keep the most
+# recently used ones, they are invalidated when their file changes.
+_WALK_CACHE_SIZE: Final = 16
+_WALK_CACHE: Final[OrderedDict[Path, tuple[tuple[int, int], _WalkIndex]]] = OrderedDict()
@@ -34,7 +34,7 @@ from cmk.utils.servicename import ServiceName
 
 from cmk.gui import sites
 from cmk.gui.bi import BIManager
-from cmk.gui.data_source import query_livestatus
+from cmk.gui.data_source import iter_query_livestatus, query_livestatus
 from cmk.gui.exceptions import MKUserError
 from cmk.gui.http import request
 from cmk.gui.i18n import _
@@ -1023,23 +1023,25 @@ def get_availability_rawdata(
     headers += filterheaders
     logrow_limit = avoptions["logrow_limit"]
 
+    # The rows are converted while they are received, the statehist table can be huge
     with CPUTracker(logger.debug) as fetch_rows_tracker:
-        data = query_livestatus(
-            Query(
-                QuerySpecification(
-                    table="statehist",
-                    columns=columns,
-                    headers=headers,
-                )
-            ),
-            only_sites=only_sites,
-            limit=logrow_limit or None,
-            auth_domain="read",
-        )
-
-    columns = ["site"] + columns
-    spans: list[AVSpan] = [dict(zip(columns, span)) for span in data]
-    amount_filtered_rows = len(spans)
+        span_columns = ["site"] + columns
+        spans: list[AVSpan] = [
+            dict(zip(span_columns, span))
+            for span in iter_query_livestatus(
+                Query(
+                    QuerySpecification(
+                        table="statehist",
+                        columns=columns,
+                        headers=headers,
+                    )
+                ),
+                only_sites=only_sites,
+                limit=logrow_limit or None,
+                auth_domain="read",
+            )
+        ]
+    amount_unfiltered_rows = amount_filtered_rows = len(spans)
 
     # When a group filter is set, only care about these groups in the group fields
     with CPUTracker(logger.debug) as filter_rows_tracker:
@@ -1051,12 +1053,12 @@ def get_availability_rawdata(
     # If this limit was exceeded then we cut off the last element
     # because it might be incomplete.
     exceeded_log_row_limit: bool = False
-    if logrow_limit and len(data) > logrow_limit:
+    if logrow_limit and amount_unfiltered_rows > logrow_limit:
         exceeded_log_row_limit = True
         spans = spans[:-1]
 
     if view_process_tracking:
-        view_process_tracking.amount_unfiltered_rows = len(data)
+        view_process_tracking.amount_unfiltered_rows = amount_unfiltered_rows
         view_process_tracking.amount_filtered_rows = amount_filtered_rows
         view_process_tracking.amount_rows_after_limit = len(spans)
         view_process_tracking.duration_fetch_rows = fetch_rows_tracker.duration
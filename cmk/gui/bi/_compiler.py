@@ -10,7 +10,7 @@ from cmk.bi.compiler import BICompiler
 from cmk.bi.lib import SitesCallback
 from cmk.bi.packs import BIAggregationPacks
 
-from .bi_manager import all_sites_with_id_and_online, bi_livestatus_query, BIManager
+from .bi_manager import all_sites_with_id_and_online, bi_compiler, bi_livestatus_query
 
 
 def is_part_of_aggregation(host: str, service: str) -> bool:
@@ -21,7 +21,4 @@ def is_part_of_aggregation(host: str, service: str) -> bool:
 
 @request_memoize()
 def _get_cached_bi_compiler() -> BICompiler:
-    return BICompiler(
-        BIManager.bi_configuration_file(),
-        SitesCallback(all_sites_with_id_and_online, bi_livestatus_query, _),
-    )
+    return bi_compiler(SitesCallback(all_sites_with_id_and_online, bi_livestatus_query, _))
@@ -14,6 +14,7 @@ from cmk.ccc.exceptions import MKGeneralException
 from cmk.utils.paths import default_config_dir
 
 from cmk.gui import sites
+from cmk.gui.config import active_config
 from cmk.gui.hooks import request_memoize
 from cmk.gui.i18n import _
 
@@ -28,7 +29,7 @@ from cmk.bi.trees import BICompiledAggregation, BICompiledRule
 class BIManager:
     def __init__(self) -> None:
         sites_callback = SitesCallback(all_sites_with_id_and_online, bi_livestatus_query, _)
-        self.compiler = BICompiler(self.bi_configuration_file(), sites_callback)
+        self.compiler = bi_compiler(sites_callback)
         self.compiler.load_compiled_aggregations()
         self.status_fetcher = BIStatusFetcher(sites_callback)
         self.computer = BIComputer(self.compiler.compiled_aggregations, self.status_fetcher)
@@ -38,6 +39,17 @@ class BIManager:
         return str(Path(default_config_dir) / "multisite.d" / "wato" / "bi_config.bi")
 
 
+def bi_compiler(sites_callback: SitesCallback) -> BICompiler:
+    return BICompiler(
+        BIManager.bi_configuration_file(),
+        sites_callback,
+        compilation_processes=active_config.bi_parallel_compilation["processes"],
+        min_aggregations_per_process=active_config.bi_parallel_compilation[
+            "min_aggregations_per_process"
+        ],
+    )
+
+
 def all_sites_with_id_and_online() -> list[tuple[SiteId, bool]]:
     return [
         (site_id, site_status["state"] == "online")
@@ -5,7 +5,12 @@
 
 from .base import ABCDataSource, RowTable
 from .datasources import register_data_sources
-from .livestatus import DataSourceLivestatus, query_livestatus, RowTableLivestatus
+from .livestatus import (
+    DataSourceLivestatus,
+    iter_query_livestatus,
+    query_livestatus,
+    RowTableLivestatus,
+)
 from .registry import data_source_registry, DataSourceRegistry, row_id
 
 __all__ = [
@@ -17,5 +22,6 @@ __all__ = [
     "data_source_registry",
     "DataSourceLivestatus",
     "RowTableLivestatus",
+    "iter_query_livestatus",
     "query_livestatus",
 ]
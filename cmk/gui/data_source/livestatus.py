@@ -6,7 +6,7 @@
 from __future__ import annotations
 
 import functools
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Iterator, Sequence
 from typing import cast
 
 from livestatus import LivestatusColumn, LivestatusRow, OnlySites, Query, QuerySpecification
@@ -125,6 +125,35 @@ class RowTableLivestatus(RowTable):
 def query_livestatus(
     query: Query, only_sites: OnlySites, limit: int | None, auth_domain: str
 ) -> list[LivestatusRow]:
+    _show_debug_query(query)
+
+    sites.live().set_auth_domain(auth_domain)
+    with sites.only_sites(only_sites), sites.prepend_site(), sites.set_limit(limit):
+        data = sites.live().query(query)
+
+    sites.live().set_auth_domain("read")
+
+    return data
+
+
+def iter_query_livestatus(
+    query: Query, only_sites: OnlySites, limit: int | None, auth_domain: str
+) -> Iterator[LivestatusRow]:
+    """Like query_livestatus, but yields the rows while the responses are received
+
+    The sites are queried one after another. Consume the rows before issuing other
+    queries, the connection is set up for this query until then."""
+    _show_debug_query(query)
+
+    sites.live().set_auth_domain(auth_domain)
+    try:
+        with sites.only_sites(only_sites), sites.prepend_site(), sites.set_limit(limit):
+            yield from sites.live().iter_query(query)
+    finally:
+        sites.live().set_auth_domain("read")
+
+
+def _show_debug_query(query: Query) -> None:
     if all(
         (
             active_config.debug_livestatus_queries,
@@ -136,14 +165,6 @@ def query_livestatus(
         html.tt(str(query).replace("\n", "<br>\n"))
         html.close_div()
 
-    sites.live().set_auth_domain(auth_domain)
-    with sites.only_sites(only_sites), sites.prepend_site(), sites.set_limit(limit):
-        data = sites.live().query(query)
-
-    sites.live().set_auth_domain("read")
-
-    return data
-
 
 def _merge_data(
     data: list[LivestatusRow],
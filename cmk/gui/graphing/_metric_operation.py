@@ -13,6 +13,7 @@ from dataclasses import dataclass
 from itertools import chain
 from typing import Annotated, assert_never, final, Literal, TypeVar
 
+import numpy as np
 from pydantic import BaseModel, computed_field, PlainValidator, SerializeAsAny
 
 from livestatus import SiteId
@@ -25,7 +26,7 @@ from cmk.utils.metrics import MetricName
 from cmk.utils.servicename import ServiceName
 
 from cmk.gui.i18n import _
-from cmk.gui.time_series import TimeSeries, TimeSeriesValues
+from cmk.gui.time_series import TimeSeries, TimeSeriesArray, TimeSeriesValues
 from cmk.gui.utils import escaping
 
 GraphConsolidationFunction = Literal["max", "min", "average"]
@@ -154,6 +155,70 @@ def time_series_operators() -> (
     }
 
 
+# The array operators work on all points at once: They get a two-dimensional array
+# with one row per operand and return one value per point. Missing values are NaN.
+# As with op_func_wrapper, points without any value are missing in the result.
+
+
+def _array_operator_sum(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return np.where(np.isnan(operands).all(axis=0), np.nan, np.nansum(operands, axis=0))
+
+
+def _array_operator_product(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return np.prod(operands, axis=0)
+
+
+def _array_operator_difference(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return operands[0] - operands[1]
+
+
+def _array_operator_fraction(operands: TimeSeriesArray) -> TimeSeriesArray:
+    result = np.full(operands.shape[1], np.nan)
+    return np.divide(operands[0], operands[1], out=result, where=operands[1] != 0)
+
+
+def _array_operator_maximum(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return np.fmax.reduce(operands, axis=0)
+
+
+def _array_operator_minimum(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return np.fmin.reduce(operands, axis=0)
+
+
+def _array_operator_average(operands: TimeSeriesArray) -> TimeSeriesArray:
+    counts = np.count_nonzero(~np.isnan(operands), axis=0)
+    result = np.full(operands.shape[1], np.nan)
+    return np.divide(np.nansum(operands, axis=0), counts, out=result, where=counts > 0)
+
+
+def _array_operator_merge(operands: TimeSeriesArray) -> TimeSeriesArray:
+    first_present = np.argmax(~np.isnan(operands), axis=0)
+    return operands[first_present, np.arange(operands.shape[1])]
+
+
+def time_series_array_operators() -> dict[Operators, Callable[[TimeSeriesArray], TimeSeriesArray]]:
+    return {
+        "+": _array_operator_sum,
+        "*": _array_operator_product,
+        "-": _array_operator_difference,
+        "/": _array_operator_fraction,
+        "MAX": _array_operator_maximum,
+        "MIN": _array_operator_minimum,
+        "AVERAGE": _array_operator_average,
+        "MERGE": _array_operator_merge,
+    }
+
+
+def time_series_array_math(
+    operator_id: Operators, operands: Sequence[TimeSeries]
+) -> TimeSeriesArray:
+    """Apply the operator point by point, the result is as long as the shortest operand"""
+    length = min(len(operand) for operand in operands)
+    stacked = np.stack([operand.array[:length] for operand in operands])
+    with np.errstate(invalid="ignore", over="ignore"):
+        return time_series_array_operators()[operator_id](stacked)
+
+
 @dataclass(frozen=True)
 class TranslationKey:
     host_name: HostName
@@ -248,8 +313,7 @@ def _time_series_math(
     operator_id: Operators,
     operands_evaluated: list[TimeSeries],
 ) -> TimeSeries | None:
-    operators = time_series_operators()
-    if operator_id not in operators:
+    if operator_id not in time_series_array_operators():
         raise MKGeneralException(
             _("Undefined operator '%s' in graph expression")
             % escaping.escape_attribute(operator_id)
@@ -265,11 +329,8 @@ def _time_series_math(
         # Silently return so to get an empty graph slot
         return None
 
-    _op_title, op_func = operators[operator_id]
-    twindow = operands_evaluated[0].twindow
-
-    return TimeSeries(
-        [op_func_wrapper(op_func, list(tsp)) for tsp in zip(*operands_evaluated)], twindow
+    return TimeSeries.from_array(
+        time_series_array_math(operator_id, operands_evaluated), operands_evaluated[0].twindow
     )
 
 
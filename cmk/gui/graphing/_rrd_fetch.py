@@ -23,7 +23,7 @@ from cmk.utils.servicename import ServiceName
 
 from cmk.gui import sites
 from cmk.gui.i18n import _
-from cmk.gui.time_series import TimeSeries, TimeSeriesValues
+from cmk.gui.time_series import TimeSeries, TimeSeriesValues, to_values
 from cmk.gui.type_defs import ColumnName
 
 from ._graph_specification import GraphDataRange, GraphRecipe
@@ -36,10 +36,9 @@ from ._legacy import (
 )
 from ._metric_operation import (
     GraphConsolidationFunction,
-    op_func_wrapper,
     RRDData,
     RRDDataKey,
-    time_series_operators,
+    time_series_array_math,
 )
 from ._metrics import get_metric_spec
 from ._translated_metrics import find_matching_translation, TranslationSpec
@@ -112,13 +111,13 @@ def _align_and_resample_rrds(
         if start_time is None:
             start_time, end_time, step = time_series.twindow
         elif (start_time, end_time, step) != time_series.twindow:
-            time_series.values = (
-                time_series.downsample(
+            time_series.array = (
+                time_series.downsample_array(
                     (start_time, end_time, step),
                     key.consolidation_function or consolidation_function,
                 )
                 if step >= time_series.twindow[2]
-                else time_series.forward_fill_resample((start_time, end_time, step))
+                else time_series.forward_fill_resample_array((start_time, end_time, step))
             )
 
 
@@ -148,7 +147,7 @@ def _chop_last_empty_step(graph_data_range: GraphDataRange, rrd_data: RRDData) -
 
 def _chop_end_of_the_curve(rrd_data: RRDData, step: int) -> None:
     for data in rrd_data.values():
-        del data.values[-1]
+        data.array = data.array[:-1]
         data.end -= step
 
 
@@ -303,11 +302,8 @@ def translate_and_merge_rrd_columns(
     if not relevant_ts:
         return TimeSeries([0, 0, 0])
 
-    _op_title, op_func = time_series_operators()["MERGE"]
-    single_value_series = [op_func_wrapper(op_func, list(tsp)) for tsp in zip(*relevant_ts)]
-
     return TimeSeries(
-        single_value_series,
+        to_values(time_series_array_math("MERGE", relevant_ts)),
         time_window=relevant_ts[0].twindow,
         conversion=get_conversion_function(get_metric_spec(metric_name).unit_spec),
     )
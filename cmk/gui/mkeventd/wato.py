@@ -241,6 +241,7 @@ def register(
     config_var_registry.register(ConfigVariableEventConsoleStatisticsInterval)
     config_var_registry.register(ConfigVariableEventConsoleLogMessages)
     config_var_registry.register(ConfigVariableEventConsoleRuleOptimizer)
+    config_var_registry.register(ConfigVariableEventConsoleRulePrefilter)
     config_var_registry.register(ConfigVariableEventConsoleActions)
     config_var_registry.register(ConfigVariableEventConsoleArchiveOrphans)
     config_var_registry.register(ConfigVariableHostnameTranslation)
@@ -262,6 +263,8 @@ def register(
     config_var_registry.register(ConfigVariableEventConsoleServiceLevels)
     config_var_registry.register(ConfigVariableEventConsoleSqliteHousekeepingInterval)
     config_var_registry.register(ConfigVariableEventConsoleSqliteFreelistSize)
+    config_var_registry.register(ConfigVariableEventConsoleSqliteFlushInterval)
+    config_var_registry.register(ConfigVariableEventConsoleSqliteBatchSize)
 
     rulespec_group_registry.register(RulespecGroupEventConsole)
     rulespec_registry.register(ECEventLimitRulespec)
@@ -4147,6 +4150,52 @@ class ConfigVariableEventConsoleSqliteFreelistSize(ConfigVariable):
         )
 
 
+class ConfigVariableEventConsoleSqliteFlushInterval(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupEventConsoleGeneric
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainEventConsole
+
+    def ident(self) -> str:
+        return "sqlite_flush_interval"
+
+    def valuespec(self) -> ValueSpec:
+        return Age(
+            title=_("Event Console history write interval"),
+            help=_(
+                "New entries of the Event Console history are collected in memory and "
+                "written to the history database in a single transaction. Here you can "
+                "specify the maximum time entries are kept in memory. Queries of the "
+                "history always include the entries not written yet. Set this to zero "
+                "to write every entry immediately."
+            ),
+        )
+
+
+class ConfigVariableEventConsoleSqliteBatchSize(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupEventConsoleGeneric
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainEventConsole
+
+    def ident(self) -> str:
+        return "sqlite_batch_size"
+
+    def valuespec(self) -> ValueSpec:
+        return Integer(
+            title=_("Event Console history write batch size"),
+            help=_(
+                "The maximum number of Event Console history entries that are collected "
+                "in memory before they are written to the history database, regardless "
+                "of the write interval."
+            ),
+            unit=_("entries"),
+            minvalue=1,
+        )
+
+
 class ConfigVariableEventConsoleStatisticsInterval(ConfigVariable):
     def group(self) -> type[ConfigVariableGroup]:
         return ConfigVariableGroupEventConsoleGeneric
@@ -4211,6 +4260,31 @@ class ConfigVariableEventConsoleRuleOptimizer(ConfigVariable):
         )
 
 
+class ConfigVariableEventConsoleRulePrefilter(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupEventConsoleGeneric
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainEventConsole
+
+    def ident(self) -> str:
+        return "rule_prefilter"
+
+    def valuespec(self) -> ValueSpec:
+        return Checkbox(
+            title=_("Prefilter rules by host, application and message text"),
+            label=_("enable rule prefilter"),
+            help=_(
+                "This option indexes all rules by the literal texts their host, application "
+                "and message conditions require. Incoming messages are then only matched "
+                "against rules whose required texts occur in the message, which speeds up "
+                "the processing of messages considerably if you have large rule packs. "
+                "The rule matching itself is not changed, the first matching rule is "
+                "always the same as without the prefilter."
+            ),
+        )
+
+
 class ConfigVariableEventConsoleActions(ConfigVariable):
     def group(self) -> type[ConfigVariableGroup]:
         return ConfigVariableGroupEventConsoleGeneric
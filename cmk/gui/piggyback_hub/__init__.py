@@ -1,5 +1,6 @@
 from cmk.gui.piggyback_hub.config_domain import ConfigDomainDistributedPiggyback
 from cmk.gui.piggyback_hub.settings import (
+    ConfigVariableBatches,
     ConfigVariableEnable,
     ConfigVariableGroupDistributedPiggyback,
 )
@@ -18,3 +19,4 @@ def register(
     config_domain_registry.register(ConfigDomainDistributedPiggyback())
     config_variable_group_registry.register(ConfigVariableGroupDistributedPiggyback)
     config_variable_registry.register(ConfigVariableEnable)
+    config_variable_registry.register(ConfigVariableBatches)
@@ -58,4 +58,4 @@ class ConfigDomainDistributedPiggyback(ABCConfigDomain):
             return ["Failed to restart the piggyback hub: %s" % (traceback.format_exc())]
 
     def default_globals(self) -> Mapping[str, object]:
-        return {"piggyback_hub_enabled": True}
+        return {"piggyback_hub_enabled": True, "piggyback_hub_batches": None}
@@ -5,7 +5,7 @@
 
 from cmk.gui.i18n import _
 from cmk.gui.piggyback_hub.config_domain import ConfigDomainDistributedPiggyback
-from cmk.gui.valuespec import Checkbox, ValueSpec
+from cmk.gui.valuespec import Checkbox, DropdownChoice, ValueSpec
 from cmk.gui.watolib.config_domain_name import ABCConfigDomain, ConfigVariable, ConfigVariableGroup
 
 
@@ -36,3 +36,31 @@ class ConfigVariableEnable(ConfigVariable):
             ),
             default_value=True,
         )
+
+
+class ConfigVariableBatches(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupDistributedPiggyback
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainDistributedPiggyback
+
+    def ident(self) -> str:
+        return "piggyback_hub_batches"
+
+    def valuespec(self) -> ValueSpec:
+        return DropdownChoice(
+            title=_("Receive piggyback data in batches"),
+            help=_(
+                "Other sites send the piggyback data for the hosts of this site in batches of "
+                "many payloads instead of one message per payload. Only enable this once all "
+                "sites sending piggyback data to this site have been updated to a version "
+                "supporting it."
+            ),
+            choices=[
+                (None, _("Receive every payload in its own message")),
+                ("zlib", _("Receive batches compressed with zlib")),
+                ("none", _("Receive uncompressed batches")),
+            ],
+            default_value=None,
+        )
@@ -519,6 +519,7 @@ class CREConfig:
     log_level: int = 0
     log_rulehits: bool = False
     rule_optimizer: bool = True
+    rule_prefilter: bool = False
 
     mkeventd_service_levels: list[tuple[int, str]] = field(
         default_factory=lambda: [
@@ -631,6 +632,12 @@ class CREConfig:
             "aggregations": {},
         }
     )
+    bi_parallel_compilation: dict[str, int] = field(
+        default_factory=lambda: {
+            "processes": 1,
+            "min_aggregations_per_process": 20,
+        }
+    )
 
     # Deprecated. Kept for compatibility.
     bi_compile_log: str | None = None
@@ -3,14 +3,31 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import math
 from collections.abc import Callable, Iterator, Sequence
-from statistics import fmean
+
+import numpy as np
+import numpy.typing as npt
 
 Timestamp = int
 
 TimeWindow = tuple[Timestamp, Timestamp, int]
 TimeSeriesValue = float | None
 TimeSeriesValues = Sequence[TimeSeriesValue]
+# Missing values are NaN
+TimeSeriesArray = npt.NDArray[np.float64]
+
+
+def to_array(values: TimeSeriesValues) -> TimeSeriesArray:
+    return np.array([math.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def to_values(array: TimeSeriesArray) -> list[TimeSeriesValue]:
+    return [None if math.isnan(v) else v for v in array.tolist()]
+
+
+def _no_conversion(v: float) -> float:
+    return v
 
 
 def rrd_timestamps(time_window: TimeWindow) -> list[Timestamp]:
@@ -22,20 +39,33 @@ def aggregation_functions(series: TimeSeriesValues, aggr: str | None) -> TimeSer
     """Aggregate data in series list according to aggr
 
     If series has None values they are dropped before aggregation"""
-    cleaned_series = [x for x in series if x is not None]
-    if not cleaned_series:
-        return None
+    aggregated = aggregate_buckets(to_array(series), np.zeros(len(series), dtype=np.intp), 1, aggr)
+    return to_values(aggregated)[0]
+
+
+def aggregate_buckets(
+    array: TimeSeriesArray, buckets: npt.NDArray[np.intp], num_buckets: int, aggr: str | None
+) -> TimeSeriesArray:
+    """Aggregate the values of the array into num_buckets buckets according to aggr
 
+    buckets holds the bucket of each value. Missing values are dropped, buckets
+    without any value are missing in the result."""
     aggr = "max" if aggr is None else aggr.lower()
+    result = np.full(num_buckets, math.nan)
     match aggr:
         case "average":
-            return fmean(cleaned_series)
+            present = ~np.isnan(array)
+            sums = np.zeros(num_buckets)
+            np.add.at(sums, buckets[present], array[present])
+            counts = np.bincount(buckets[present], minlength=num_buckets)
+            np.divide(sums, counts, out=result, where=counts > 0)
         case "max":
-            return max(cleaned_series)
+            np.fmax.at(result, buckets, array)
         case "min":
-            return min(cleaned_series)
+            np.fmin.at(result, buckets, array)
         case _:
             raise ValueError(f"Invalid Aggregation function {aggr}, only max, min, average allowed")
+    return result
 
 
 class TimeSeries:
@@ -47,6 +77,11 @@ class TimeSeries:
     - The Series describes the interval [start; end[
     - Start has no associated value to it.
 
+    The values are held in a float array with NaN for missing values, so that
+    computations on them can be vectorized. The list of values with None for
+    missing values is still available as values. It is built once and kept until
+    another array is assigned, so don't modify the array or the list in place.
+
     args:
         data : list
             Includes [start, end, step, *values]
@@ -61,7 +96,7 @@ class TimeSeries:
         self,
         data: TimeSeriesValues,
         time_window: TimeWindow | None = None,
-        conversion: Callable[[float], float] = lambda v: v,
+        conversion: Callable[[float], float] = _no_conversion,
     ) -> None:
         if time_window is None:
             if not data or data[0] is None or data[1] is None or data[2] is None:
@@ -74,7 +109,36 @@ class TimeSeries:
         self.start = int(time_window[0])
         self.end = int(time_window[1])
         self.step = int(time_window[2])
-        self.values = [v if v is None else conversion(v) for v in data]
+        self.array = to_array(
+            data
+            if conversion is _no_conversion
+            else [v if v is None else conversion(v) for v in data]
+        )
+
+    @classmethod
+    def from_array(cls, array: TimeSeriesArray, time_window: TimeWindow) -> "TimeSeries":
+        time_series = cls([], time_window)
+        time_series.array = array
+        return time_series
+
+    @property
+    def array(self) -> TimeSeriesArray:
+        return self._array
+
+    @array.setter
+    def array(self, array: TimeSeriesArray) -> None:
+        self._array = array
+        self._values: list[TimeSeriesValue] | None = None
+
+    @property
+    def values(self) -> list[TimeSeriesValue]:
+        if self._values is None:
+            self._values = to_values(self._array)
+        return self._values
+
+    @values.setter
+    def values(self, values: TimeSeriesValues) -> None:
+        self.array = to_array(values)
 
     @property
     def twindow(self) -> TimeWindow:
@@ -86,15 +150,14 @@ class TimeSeries:
         twindow : 3-tuple, (start, end, step)
              description of target time interval
         """
-        if twindow == self.twindow:
-            return self.values
+        return to_values(self.forward_fill_resample_array(twindow))
 
-        idx_max = len(self.values) - 1
+    def forward_fill_resample_array(self, twindow: TimeWindow) -> TimeSeriesArray:
+        if twindow == self.twindow:
+            return self.array
 
-        return [
-            self.values[max(0, min(int((t - self.start) / self.step), idx_max))]
-            for t in range(*twindow)
-        ]
+        indices = ((np.arange(*twindow) - self.start) / self.step).astype(np.intp)
+        return self.array[np.clip(indices, 0, len(self.array) - 1)]
 
     def downsample(self, twindow: TimeWindow, cf: str | None = "max") -> TimeSeriesValues:
         """Downsample time series by consolidation function
@@ -104,26 +167,19 @@ class TimeSeries:
         cf : str ('max', 'average', 'min')
              consolidation function imitating RRD methods
         """
+        return to_values(self.downsample_array(twindow, cf))
+
+    def downsample_array(self, twindow: TimeWindow, cf: str | None = "max") -> TimeSeriesArray:
         if twindow == self.twindow:
-            return self.values
-
-        dwsa = []
-        co: list[TimeSeriesValue] = []
-        desired_times = rrd_timestamps(twindow)
-        i = 0
-        for t, val in self.time_data_pairs():
-            if t > desired_times[i]:
-                dwsa.append(aggregation_functions(co, cf))
-                co = []
-                i += 1
-            co.append(val)
-
-        diff_len = len(desired_times) - len(dwsa)
-        if diff_len > 0:
-            dwsa.append(aggregation_functions(co, cf))
-            dwsa += [None] * (diff_len - 1)
-
-        return dwsa
+            return self.array
+
+        start, end, step = twindow
+        num_buckets = len(range(start, end, step))
+        # A value belongs to the first desired timestamp not before its own timestamp
+        timestamps = self.start + self.step * np.arange(1, len(self.array) + 1)
+        buckets = np.maximum(np.ceil((timestamps - (start + step)) / step), 0).astype(np.intp)
+        in_window = buckets < num_buckets
+        return aggregate_buckets(self.array[in_window], buckets[in_window], num_buckets, cf)
 
     def time_data_pairs(self) -> list[tuple[Timestamp, TimeSeriesValue]]:
         return list(zip(rrd_timestamps(self.twindow), self.values))
@@ -139,17 +195,20 @@ class TimeSeries:
             self.start == other.start
             and self.end == other.end
             and self.step == other.step
-            and self.values == other.values
+            and np.array_equal(self.array, other.array, equal_nan=True)
         )
 
     def __getitem__(self, i: int) -> TimeSeriesValue:
-        return self.values[i]
+        value = float(self.array[i])
+        return None if math.isnan(value) else value
 
     def __len__(self) -> int:
-        return len(self.values)
+        return len(self.array)
 
     def __iter__(self) -> Iterator[TimeSeriesValue]:
         yield from self.values
 
     def count(self, /, v: TimeSeriesValue) -> int:
-        return self.values.count(v)
+        if v is None:
+            return int(np.count_nonzero(np.isnan(self.array)))
+        return int(np.count_nonzero(self.array == v))
@@ -523,6 +523,7 @@ AllViewSpecs = dict[tuple[UserId, ViewName], ViewSpec]
 PermittedViewSpecs = dict[ViewName, ViewSpec]
 
 SorterFunction = Callable[[ColumnName, Row, Row], int]
+SorterKeyFunction = Callable[[ColumnName, Row], Any]
 FilterHeader = str
 
 
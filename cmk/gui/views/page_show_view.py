@@ -10,7 +10,7 @@ from __future__ import annotations
 import functools
 import json
 from collections.abc import Callable, Iterable, Mapping, Sequence
-from itertools import chain
+from itertools import chain, groupby
 from typing import Any
 from urllib.parse import quote_plus
 
@@ -630,10 +630,55 @@ def _link_to_folder_by_path(path: str) -> str:
 
 
 def _sort_data(data: Rows, sorters: list[SorterEntry]) -> None:
-    """Sort data according to list of sorters."""
+    """Sort data according to list of sorters.
+
+    Consecutive sorters in the same direction are sorted in one pass. Sorters
+    providing a key function are sorted by a key which is computed once per row,
+    the others by calling their cmp functions. As sorting is stable, sorting the
+    passes from the last to the first one results in the order of all sorters."""
     if not sorters:
         return
 
+    passes = [
+        (has_key, negate, list(entries))
+        for (has_key, negate), entries in groupby(
+            sorters, key=lambda entry: (entry.sorter.key is not None, entry.negate)
+        )
+    ]
+    for has_key, negate, entries in reversed(passes):
+        if has_key:
+            data.sort(key=_sort_key_function(entries), reverse=negate)
+        else:
+            data.sort(key=_cmp_sort_key_function(entries), reverse=negate)
+
+
+def _sort_key_function(sorters: Sequence[SorterEntry]) -> Callable[[Row], Any]:
+    key_functions = [_entry_sort_key_function(entry) for entry in sorters]
+    if len(key_functions) == 1:
+        return key_functions[0]
+    return lambda row: tuple(key_function(row) for key_function in key_functions)
+
+
+def _entry_sort_key_function(entry: SorterEntry) -> Callable[[Row], Any]:
+    key_function = entry.sorter.key
+    assert key_function is not None
+    key = functools.partial(
+        key_function, parameters=entry.parameters, config=active_config, request=request
+    )
+    if not entry.join_key:
+        return key
+
+    join_key = entry.join_key
+
+    # Handle case where join columns are not present for all rows: These come first
+    def join_row_key(row: Row) -> tuple[bool, Any]:
+        joined_row = row["JOIN"].get(join_key)
+        return (False, None) if joined_row is None else (True, key(joined_row))
+
+    return join_row_key
+
+
+def _cmp_sort_key_function(sorters: Sequence[SorterEntry]) -> Callable[[Row], Any]:
     # Handle case where join columns are not present for all rows
     def safe_compare(
         compfunc: SorterProtocol,
@@ -659,10 +704,8 @@ def _sort_data(data: Rows, sorters: list[SorterEntry]) -> None:
 
     def multisort(e1: Row, e2: Row) -> int:
         for entry in sorters:
-            neg = -1 if entry.negate else 1
-
             if entry.join_key:  # Sorter for join column, use JOIN info
-                c = neg * safe_compare(
+                c = safe_compare(
                     entry.sorter.cmp,
                     e1["JOIN"].get(entry.join_key),
                     e2["JOIN"].get(entry.join_key),
@@ -671,7 +714,7 @@ def _sort_data(data: Rows, sorters: list[SorterEntry]) -> None:
                     request,
                 )
             else:
-                c = neg * entry.sorter.cmp(
+                c = entry.sorter.cmp(
                     e1,
                     e2,
                     parameters=entry.parameters,
@@ -683,4 +726,4 @@ def _sort_data(data: Rows, sorters: list[SorterEntry]) -> None:
                 return c
         return 0  # equal
 
-    data.sort(key=functools.cmp_to_key(multisort))
+    return functools.cmp_to_key(multisort)
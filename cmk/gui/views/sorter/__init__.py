@@ -4,7 +4,7 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 
-from .base import ParameterizedSorter, Sorter, SorterEntry, SorterProtocol
+from .base import ParameterizedSorter, Sorter, SorterEntry, SorterKeyProtocol, SorterProtocol
 from .helpers import (
     cmp_custom_variable,
     cmp_insensitive_string,
@@ -14,6 +14,14 @@ from .helpers import (
     cmp_simple_string,
     cmp_string_list,
     compare_ips,
+    key_function_of,
+    key_insensitive_string,
+    key_ip,
+    key_ip_address,
+    key_num_split,
+    key_simple_number,
+    key_simple_string,
+    key_string_list,
 )
 from .registry import (
     declare_1to1_sorter,
@@ -27,6 +35,7 @@ from .sorters import register_sorters
 __all__ = [
     "Sorter",
     "SorterProtocol",
+    "SorterKeyProtocol",
     "ParameterizedSorter",
     "SorterEntry",
     "SorterRegistry",
@@ -38,6 +47,14 @@ __all__ = [
     "cmp_simple_string",
     "cmp_string_list",
     "compare_ips",
+    "key_function_of",
+    "key_insensitive_string",
+    "key_ip",
+    "key_ip_address",
+    "key_num_split",
+    "key_simple_number",
+    "key_simple_string",
+    "key_string_list",
     "declare_simple_sorter",
     "declare_1to1_sorter",
     "sorter_registry",
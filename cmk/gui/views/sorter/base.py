@@ -42,6 +42,24 @@ class SorterProtocol(Protocol):
         """
 
 
+class SorterKeyProtocol(Protocol):
+    def __call__(
+        self,
+        row: Row,
+        *,
+        parameters: Mapping[str, Any] | None,
+        config: Config,
+        request: Request,
+    ) -> Any:
+        """The optional key function computes a value for a data row once per sorting.
+        Sorting the rows by these values must lead to the same order as sorting them
+        with the cmp function of the sorter.
+
+        This is a lot faster than calling cmp for every comparison of two rows. Sorters
+        without key function are still sorted with their cmp function.
+        """
+
+
 class SorterEntry(NamedTuple):
     sorter: Sorter
     negate: bool
@@ -59,11 +77,13 @@ class Sorter:
         columns: Sequence[ColumnName],
         sort_function: SorterProtocol,
         load_inv: bool = False,
+        key_function: SorterKeyProtocol | None = None,
     ):
         self.ident = ident
         self._title = title
         self.columns = columns
         self.cmp = sort_function
+        self.key = key_function
         self.load_inv = load_inv
 
     @property
@@ -80,6 +100,7 @@ class ParameterizedSorter(Sorter):
         sort_function: SorterProtocol,
         parameter_valuespec: Callable[[Config, Sequence[ColumnSpec]], Dictionary],
         load_inv: bool = False,
+        key_function: SorterKeyProtocol | None = None,
     ):
-        super().__init__(ident, title, columns, sort_function, load_inv)
+        super().__init__(ident, title, columns, sort_function, load_inv, key_function)
         self.vs_parameters = parameter_valuespec
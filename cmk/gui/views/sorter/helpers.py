@@ -3,8 +3,11 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from typing import Any
+
 from cmk.gui.num_split import cmp_num_split as _cmp_num_split
-from cmk.gui.type_defs import ColumnName, Row, SorterFunction
+from cmk.gui.num_split import key_num_split as _key_num_split
+from cmk.gui.type_defs import ColumnName, Row, SorterFunction, SorterKeyFunction
 
 
 def cmp_simple_number(column: ColumnName, r1: Row, r2: Row) -> int:
@@ -13,15 +16,27 @@ def cmp_simple_number(column: ColumnName, r1: Row, r2: Row) -> int:
     return (v1 > v2) - (v1 < v2)
 
 
+def key_simple_number(column: ColumnName, row: Row) -> Any:
+    return row[column]
+
+
 def cmp_num_split(column: ColumnName, r1: Row, r2: Row) -> int:
     return _cmp_num_split(r1[column].lower(), r2[column].lower())
 
 
+def key_num_split(column: ColumnName, row: Row) -> tuple[int | str, ...]:
+    return _key_num_split(row[column].lower())
+
+
 def cmp_simple_string(column: ColumnName, r1: Row, r2: Row) -> int:
     v1, v2 = r1.get(column, ""), r2.get(column, "")
     return cmp_insensitive_string(v1, v2)
 
 
+def key_simple_string(column: ColumnName, row: Row) -> tuple[str, str]:
+    return key_insensitive_string(row.get(column, ""))
+
+
 def cmp_insensitive_string(v1: str, v2: str) -> int:
     c = (v1.lower() > v2.lower()) - (v1.lower() < v2.lower())
     # force a strict order in case of equal spelling but different
@@ -31,12 +46,20 @@ def cmp_insensitive_string(v1: str, v2: str) -> int:
     return c
 
 
+def key_insensitive_string(v: str) -> tuple[str, str]:
+    return v.lower(), v
+
+
 def cmp_string_list(column: ColumnName, r1: Row, r2: Row) -> int:
     v1 = "".join(r1.get(column, []))
     v2 = "".join(r2.get(column, []))
     return cmp_insensitive_string(v1, v2)
 
 
+def key_string_list(column: ColumnName, row: Row) -> tuple[str, str]:
+    return key_insensitive_string("".join(row.get(column, [])))
+
+
 def cmp_custom_variable(r1: Row, r2: Row, key: str, cmp_func: SorterFunction) -> int:
     return (_get_custom_var(r1, key) > _get_custom_var(r2, key)) - (
         _get_custom_var(r1, key) < _get_custom_var(r2, key)
@@ -47,17 +70,36 @@ def cmp_ip_address(column: ColumnName, r1: Row, r2: Row) -> int:
     return compare_ips(r1.get(column, ""), r2.get(column, ""))
 
 
+def key_ip_address(column: ColumnName, row: Row) -> tuple:
+    return key_ip(row.get(column, ""))
+
+
 def compare_ips(ip1: str, ip2: str) -> int:
-    def split_ip(ip: str) -> tuple:
-        try:
-            return tuple(int(part) for part in ip.split("."))
-        except ValueError:
-            # Make hostnames comparable with IPv4 address representations
-            return (255, 255, 255, 255, ip)
-
-    v1, v2 = split_ip(ip1), split_ip(ip2)
+    v1, v2 = key_ip(ip1), key_ip(ip2)
     return (v1 > v2) - (v1 < v2)
 
 
+def key_ip(ip: str) -> tuple:
+    try:
+        return tuple(int(part) for part in ip.split("."))
+    except ValueError:
+        # Make hostnames comparable with IPv4 address representations
+        return (255, 255, 255, 255, ip)
+
+
+_KEY_FUNCTIONS: dict[SorterFunction, SorterKeyFunction] = {
+    cmp_simple_number: key_simple_number,
+    cmp_num_split: key_num_split,
+    cmp_simple_string: key_simple_string,
+    cmp_string_list: key_string_list,
+    cmp_ip_address: key_ip_address,
+}
+
+
+def key_function_of(func: SorterFunction) -> SorterKeyFunction | None:
+    """The key function leading to the same order as one of the cmp functions above"""
+    return _KEY_FUNCTIONS.get(func)
+
+
 def _get_custom_var(row: Row, key: str) -> str:
     return row["custom_variables"].get(key, "")
@@ -16,10 +16,11 @@ from cmk.gui.logged_in import user
 from cmk.gui.painter.v0.base import EmptyCell, painter_registry
 from cmk.gui.painter.v0.helpers import RenderLink
 from cmk.gui.painter_options import PainterOptions
-from cmk.gui.type_defs import ColumnName, PainterName, SorterFunction
+from cmk.gui.type_defs import ColumnName, PainterName, SorterFunction, SorterKeyFunction
 from cmk.gui.utils.theme import theme
 
-from .base import Sorter
+from .base import Sorter, SorterKeyProtocol
+from .helpers import key_function_of
 
 
 class SorterRegistry(Registry[Sorter]):
@@ -43,19 +44,38 @@ def register_sorter(ident: str, spec: dict[str, Any]) -> None:
     )
 
 
-def declare_simple_sorter(name: str, title: str, column: ColumnName, func: SorterFunction) -> None:
+def declare_simple_sorter(
+    name: str,
+    title: str,
+    column: ColumnName,
+    func: SorterFunction,
+    key_func: SorterKeyFunction | None = None,
+) -> None:
     sorter_registry.register(
         Sorter(
             ident=name,
             title=title,
             columns=[column],
             sort_function=lambda r1, r2, **_kwargs: func(column, r1, r2),
+            key_function=_column_key_function(column, key_func or key_function_of(func)),
         )
     )
 
 
+def _column_key_function(
+    column: ColumnName, key_func: SorterKeyFunction | None
+) -> SorterKeyProtocol | None:
+    if key_func is None:
+        return None
+    return lambda row, **_kwargs: key_func(column, row)
+
+
 def declare_1to1_sorter(
-    painter_name: PainterName, func: SorterFunction, col_num: int = 0, reverse: bool = False
+    painter_name: PainterName,
+    func: SorterFunction,
+    col_num: int = 0,
+    reverse: bool = False,
+    key_func: SorterKeyFunction | None = None,
 ) -> PainterName:
     painter = painter_registry[painter_name](
         user=user,
@@ -76,6 +96,14 @@ def declare_1to1_sorter(
                 if reverse
                 else lambda r1, r2, **_kwargs: func(painter.columns[col_num], r1, r2)
             ),
+            # The keys can't be reversed in general, these sorters are sorted with cmp
+            key_function=(
+                None
+                if reverse
+                else _column_key_function(
+                    painter.columns[col_num], key_func or key_function_of(func)
+                )
+            ),
         )
     )
 
@@ -15,7 +15,7 @@ from cmk.gui.i18n import _, _l
 from cmk.gui.painter.v0.helpers import get_tag_groups
 from cmk.gui.painter.v1.helpers import get_perfdata_nth_value
 from cmk.gui.site_config import get_site_config
-from cmk.gui.type_defs import ColumnSpec, Row
+from cmk.gui.type_defs import ColumnName, ColumnSpec, Row
 from cmk.gui.valuespec import Dictionary, DropdownChoice
 from cmk.gui.view_utils import get_labels
 
@@ -28,6 +28,9 @@ from .helpers import (
     cmp_simple_string,
     cmp_string_list,
     compare_ips,
+    key_insensitive_string,
+    key_ip,
+    key_num_split,
 )
 from .registry import declare_1to1_sorter, declare_simple_sorter, SorterRegistry
 
@@ -56,7 +59,9 @@ def register_sorters(registry: SorterRegistry) -> None:
     registry.register(SorterHostIpv4Address)
     registry.register(SorterNumProblems)
 
-    declare_simple_sorter("svcdescr", _("Service name"), "service_description", cmp_service_name)
+    declare_simple_sorter(
+        "svcdescr", _("Service name"), "service_description", cmp_service_name, key_service_name
+    )
     declare_simple_sorter(
         "svcdispname",
         _("Service alternative display name"),
@@ -203,7 +208,7 @@ def register_sorters(registry: SorterRegistry) -> None:
     declare_1to1_sorter("log_time", cmp_simple_number)
     declare_1to1_sorter("log_lineno", cmp_simple_number)
 
-    declare_1to1_sorter("log_what", cmp_log_what)
+    declare_1to1_sorter("log_what", cmp_log_what, key_func=key_log_what)
 
     declare_1to1_sorter("log_date", cmp_date)
 
@@ -256,11 +261,18 @@ def _sort_service_state(
     return (cmp_state_equiv(r1) > cmp_state_equiv(r2)) - (cmp_state_equiv(r1) < cmp_state_equiv(r2))
 
 
+def _key_service_state(
+    row: Row, *, parameters: Mapping[str, Any] | None, config: Config, request: Request
+) -> int:
+    return cmp_state_equiv(row)
+
+
 SorterSvcstate = Sorter(
     ident="svcstate",
     title=_l("Service state"),
     columns=["service_state", "service_has_been_checked"],
     sort_function=_sort_service_state,
+    key_function=_key_service_state,
 )
 
 
@@ -277,11 +289,18 @@ def _sort_host_state(
     )
 
 
+def _key_host_state(
+    row: Row, *, parameters: Mapping[str, Any] | None, config: Config, request: Request
+) -> int:
+    return cmp_host_state_equiv(row)
+
+
 SorterHoststate = Sorter(
     ident="hoststate",
     title=_l("Host state"),
     columns=["host_state", "host_has_been_checked"],
     sort_function=_sort_host_state,
+    key_function=_key_host_state,
 )
 
 
@@ -298,11 +317,18 @@ def _sort_site_host(
     )
 
 
+def _key_site_host(
+    row: Row, *, parameters: Mapping[str, Any] | None, config: Config, request: Request
+) -> tuple[str, tuple[int | str, ...]]:
+    return row["site"], key_num_split("host_name", row)
+
+
 SorterSiteHost = Sorter(
     ident="site_host",
     title=_l("Host site and name"),
     columns=["site", "host_name"],
     sort_function=_sort_site_host,
+    key_function=_key_site_host,
 )
 
 
@@ -317,11 +343,18 @@ def _sort_host_name(
     return cmp_num_split("host_name", r1, r2)
 
 
+def _key_host_name(
+    row: Row, *, parameters: Mapping[str, Any] | None, config: Config, request: Request
+) -> tuple[int | str, ...]:
+    return key_num_split("host_name", row)
+
+
 SorterHostName = Sorter(
     ident="host",
     title=_l("Host name"),
     columns=["host_name"],
     sort_function=_sort_host_name,
+    key_function=_key_host_name,
 )
 
 
@@ -340,11 +373,18 @@ def _sort_site_alias(
     )
 
 
+def _key_site_alias(
+    row: Row, *, parameters: Mapping[str, Any] | None, config: Config, request: Request
+) -> str:
+    return get_site_config(config, row["site"])["alias"]
+
+
 SorterSitealias = Sorter(
     ident="sitealias",
     title=_l("Site Alias"),
     columns=["site"],
     sort_function=_sort_site_alias,
+    key_function=_key_site_alias,
 )
 
 
@@ -362,11 +402,23 @@ def _sort_tags(
     return (tag_groups_1 > tag_groups_2) - (tag_groups_1 < tag_groups_2)
 
 
+def _key_tags(
+    row: Row,
+    *,
+    parameters: Mapping[str, Any] | None,
+    config: Config,
+    request: Request,
+    object_type: str,
+) -> list[tuple[str, str]]:
+    return sorted(get_tag_groups(row, object_type).items())
+
+
 SorterHostTags = Sorter(
     ident="host",
     title=_l("Host Tags"),
     columns=["host_tags"],
     sort_function=partial(_sort_tags, object_type="host"),
+    key_function=partial(_key_tags, object_type="host"),
 )
 
 SorterServiceTags = Sorter(
@@ -374,6 +426,7 @@ SorterServiceTags = Sorter(
     title=_l("Service Tags"),
     columns=["service_tags"],
     sort_function=partial(_sort_tags, object_type="service"),
+    key_function=partial(_key_tags, object_type="service"),
 )
 
 
@@ -391,11 +444,23 @@ def _sort_labels(
     return (labels_1 > labels_2) - (labels_1 < labels_2)
 
 
+def _key_labels(
+    row: Row,
+    *,
+    parameters: Mapping[str, Any] | None,
+    config: Config,
+    request: Request,
+    object_type: str,
+) -> list[tuple[str, str]]:
+    return sorted(get_labels(row, object_type).items())
+
+
 SorterHostLabels = Sorter(
     ident="host_labels",
     title=_l("Host labels"),
     columns=["host_labels"],
     sort_function=partial(_sort_labels, object_type="host"),
+    key_function=partial(_key_labels, object_type="host"),
 )
 
 
@@ -404,6 +469,7 @@ SorterServiceLabels = Sorter(
     title=_l("Service labels"),
     columns=["service_labels"],
     sort_function=partial(_sort_labels, object_type="service"),
+    key_function=partial(_key_labels, object_type="service"),
 )
 
 
@@ -413,6 +479,10 @@ def cmp_service_name(column, r1, r2):
     ) or cmp_num_split(column, r1, r2)
 
 
+def key_service_name(column: ColumnName, row: Row) -> tuple[int, tuple[int | str, ...]]:
+    return utils.cmp_service_name_equiv(row[column]), key_num_split(column, row)
+
+
 def _sort_service_perf_val(
     r1: Row,
     r2: Row,
@@ -427,11 +497,23 @@ def _sort_service_perf_val(
     return (v1 > v2) - (v1 < v2)
 
 
+def _key_service_perf_val(
+    row: Row,
+    *,
+    parameters: Mapping[str, Any] | None,
+    config: Config,
+    request: Request,
+    num: int,
+) -> float:
+    return utils.savefloat(get_perfdata_nth_value(row, num - 1, True))
+
+
 SorterSvcPerfVal01 = Sorter(
     ident="svc_perf_val01",
     title=_("Service performance data - value number 01"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=1),
+    key_function=partial(_key_service_perf_val, num=1),
 )
 
 SorterSvcPerfVal02 = Sorter(
@@ -439,6 +521,7 @@ SorterSvcPerfVal02 = Sorter(
     title=_("Service performance data - value number 02"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=2),
+    key_function=partial(_key_service_perf_val, num=2),
 )
 
 SorterSvcPerfVal03 = Sorter(
@@ -446,6 +529,7 @@ SorterSvcPerfVal03 = Sorter(
     title=_("Service performance data - value number 03"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=3),
+    key_function=partial(_key_service_perf_val, num=3),
 )
 
 
@@ -454,6 +538,7 @@ SorterSvcPerfVal04 = Sorter(
     title=_("Service performance data - value number 04"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=4),
+    key_function=partial(_key_service_perf_val, num=4),
 )
 
 SorterSvcPerfVal05 = Sorter(
@@ -461,6 +546,7 @@ SorterSvcPerfVal05 = Sorter(
     title=_("Service performance data - value number 05"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=5),
+    key_function=partial(_key_service_perf_val, num=5),
 )
 
 
@@ -469,6 +555,7 @@ SorterSvcPerfVal06 = Sorter(
     title=_("Service performance data - value number 06"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=6),
+    key_function=partial(_key_service_perf_val, num=6),
 )
 
 SorterSvcPerfVal07 = Sorter(
@@ -476,6 +563,7 @@ SorterSvcPerfVal07 = Sorter(
     title=_("Service performance data - value number 07"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=7),
+    key_function=partial(_key_service_perf_val, num=7),
 )
 
 SorterSvcPerfVal08 = Sorter(
@@ -483,6 +571,7 @@ SorterSvcPerfVal08 = Sorter(
     title=_("Service performance data - value number 08"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=8),
+    key_function=partial(_key_service_perf_val, num=8),
 )
 
 SorterSvcPerfVal09 = Sorter(
@@ -490,6 +579,7 @@ SorterSvcPerfVal09 = Sorter(
     title=_("Service performance data - value number 09"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=9),
+    key_function=partial(_key_service_perf_val, num=9),
 )
 
 SorterSvcPerfVal10 = Sorter(
@@ -497,6 +587,7 @@ SorterSvcPerfVal10 = Sorter(
     title=_("Service performance data - value number 10"),
     columns=["service_perf_data"],
     sort_function=partial(_sort_service_perf_val, num=10),
+    key_function=partial(_key_service_perf_val, num=10),
 )
 
 
@@ -511,14 +602,24 @@ def _sort_host_custom_variable(
     assert parameters is not None
     variable_name = parameters["ident"].upper()
 
-    def _get_value(row: Row) -> str:
-        try:
-            index = row["host_custom_variable_names"].index(variable_name)
-        except ValueError:
-            return ""
-        return row["host_custom_variable_values"][index]
+    return cmp_insensitive_string(
+        _host_custom_variable(r1, variable_name), _host_custom_variable(r2, variable_name)
+    )
 
-    return cmp_insensitive_string(_get_value(r1), _get_value(r2))
+
+def _key_host_custom_variable(
+    row: Row, *, parameters: Mapping[str, Any] | None, config: Config, request: Request
+) -> tuple[str, str]:
+    assert parameters is not None
+    return key_insensitive_string(_host_custom_variable(row, parameters["ident"].upper()))
+
+
+def _host_custom_variable(row: Row, variable_name: str) -> str:
+    try:
+        index = row["host_custom_variable_names"].index(variable_name)
+    except ValueError:
+        return ""
+    return row["host_custom_variable_values"][index]
 
 
 def _sort_host_custom_variable_parameter_valuespec(
@@ -549,6 +650,7 @@ SorterCustomHostVariable = ParameterizedSorter(
     columns=["host_custom_variable_names", "host_custom_variable_values"],
     sort_function=_sort_host_custom_variable,
     parameter_valuespec=_sort_host_custom_variable_parameter_valuespec,
+    key_function=_key_host_custom_variable,
 )
 
 
@@ -560,13 +662,18 @@ def _sort_host_ipv4_address(
     config: Config,
     request: Request,
 ) -> int:
-    def get_address(row):
-        custom_vars = dict(
-            zip(row["host_custom_variable_names"], row["host_custom_variable_values"])
-        )
-        return custom_vars.get("ADDRESS_4", "")
+    return compare_ips(_host_ipv4_address(r1), _host_ipv4_address(r2))
+
+
+def _key_host_ipv4_address(
+    row: Row, *, parameters: Mapping[str, Any] | None, config: Config, request: Request
+) -> tuple:
+    return key_ip(_host_ipv4_address(row))
 
-    return compare_ips(get_address(r1), get_address(r2))
+
+def _host_ipv4_address(row: Row) -> str:
+    custom_vars = dict(zip(row["host_custom_variable_names"], row["host_custom_variable_values"]))
+    return custom_vars.get("ADDRESS_4", "")
 
 
 SorterHostIpv4Address = Sorter(
@@ -574,6 +681,7 @@ SorterHostIpv4Address = Sorter(
     title=_l("Host IPv4 address"),
     columns=["host_custom_variable_names", "host_custom_variable_values"],
     sort_function=_sort_host_ipv4_address,
+    key_function=_key_host_ipv4_address,
 )
 
 
@@ -594,11 +702,18 @@ def _sort_num_problems(
     )
 
 
+def _key_num_problems(
+    row: Row, *, parameters: Mapping[str, Any] | None, config: Config, request: Request
+) -> int:
+    return row["host_num_services"] - row["host_num_services_ok"] - row["host_num_services_pending"]
+
+
 SorterNumProblems = Sorter(
     ident="num_problems",
     title=_l("Number of problems"),
     columns=["host_num_services", "host_num_services_ok", "host_num_services_pending"],
     sort_function=_sort_num_problems,
+    key_function=_key_num_problems,
 )
 
 
@@ -606,6 +721,10 @@ def cmp_log_what(col, a, b):
     return (log_what(a[col]) > log_what(b[col])) - (log_what(a[col]) < log_what(b[col]))
 
 
+def key_log_what(col, row):
+    return log_what(row[col])
+
+
 def log_what(t):
     if "HOST" in t:
         return 1
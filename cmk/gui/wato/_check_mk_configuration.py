@@ -153,6 +153,7 @@ def register(
     config_variable_registry.register(ConfigVariableStartURL)
     config_variable_registry.register(ConfigVariablePageHeading)
     config_variable_registry.register(ConfigVariableBIDefaultLayout)
+    config_variable_registry.register(ConfigVariableBIParallelCompilation)
     config_variable_registry.register(ConfigVariablePagetitleDateFormat)
     config_variable_registry.register(ConfigVariableEscapePluginOutput)
     config_variable_registry.register(ConfigVariableDrawRuleIcon)
@@ -971,6 +972,47 @@ class ConfigVariablePageHeading(ConfigVariable):
         )
 
 
+class ConfigVariableBIParallelCompilation(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupUserInterface
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainGUI
+
+    def ident(self) -> str:
+        return "bi_parallel_compilation"
+
+    def valuespec(self) -> ValueSpec:
+        return Dictionary(
+            title=_("Parallel BI compilation"),
+            help=_(
+                "The BI aggregations are compiled by the web server process which needs them "
+                "first after a change. With many aggregations to compile, they can be distributed "
+                "over several processes forked from this process. Forking is only done if there "
+                "are at least the given number of aggregations for each process, as it has its "
+                "own costs. Only use this if the compilation of your aggregations takes long."
+            ),
+            elements=[
+                (
+                    "processes",
+                    Integer(
+                        title=_("Maximum number of processes"),
+                        help=_("With a single process the aggregations are compiled sequentially."),
+                        minvalue=1,
+                    ),
+                ),
+                (
+                    "min_aggregations_per_process",
+                    Integer(
+                        title=_("Minimum number of aggregations per process"),
+                        minvalue=1,
+                    ),
+                ),
+            ],
+            optional_keys=[],
+        )
+
+
 class ConfigVariableBIDefaultLayout(ConfigVariable):
     def group(self) -> type[ConfigVariableGroup]:
         return ConfigVariableGroupUserInterface
@@ -3212,20 +3254,25 @@ class ConfigVariableUseDNSCache(ConfigVariable):
 
 
 def transform_snmp_backend_default_to_valuespec(
-    backend: Literal["classic", "inline"],
+    backend: Literal["classic", "inline", "pysnmp_async"],
 ) -> SNMPBackendEnum:
     return {
         "classic": SNMPBackendEnum.CLASSIC,
         "inline": SNMPBackendEnum.INLINE,
+        "pysnmp_async": SNMPBackendEnum.PYSNMP,
     }[backend]
 
 
-def transform_snmp_backend_from_valuespec(backend: SNMPBackendEnum) -> Literal["classic", "inline"]:
+def transform_snmp_backend_from_valuespec(
+    backend: SNMPBackendEnum,
+) -> Literal["classic", "inline", "pysnmp_async"]:
     match backend:
         case SNMPBackendEnum.CLASSIC:
             return "classic"
         case SNMPBackendEnum.INLINE:
             return "inline"
+        case SNMPBackendEnum.PYSNMP:
+            return "pysnmp_async"
         case _:
             raise MKConfigError("SNMPBackendEnum %r not implemented" % backend)
 
@@ -3249,6 +3296,7 @@ class ConfigVariableChooseSNMPBackend(ConfigVariable):
                 choices=[
                     (SNMPBackendEnum.CLASSIC, _("Use Classic SNMP Backend")),
                     (SNMPBackendEnum.INLINE, _("Use Inline SNMP Backend")),
+                    (SNMPBackendEnum.PYSNMP, _("Use PySNMP Backend")),
                 ],
                 help=_(
                     "By default Checkmk uses command line calls of Net-SNMP tools like snmpget or "
@@ -3257,7 +3305,8 @@ class ConfigVariableChooseSNMPBackend(ConfigVariable):
                     "which calls the respective libraries directly via its python bindings. This "
                     "should increase the performance of SNMP checks in a significant way. Both "
                     "SNMP modes are features which improve the performance for large installations and are "
-                    "only available via our subscription."
+                    "only available via our subscription. The PySNMP backend speaks SNMP itself "
+                    "without executing any programs and queries several OIDs concurrently."
                 ),
             ),
             to_valuespec=transform_snmp_backend_hosts_to_valuespec,
@@ -5635,6 +5684,21 @@ def _valuespec_snmp_timing():
                     maxvalue=50,
                 ),
             ),
+            (
+                "max_concurrent_requests",
+                Integer(
+                    title=_("Maximum number of concurrent requests"),
+                    help=_(
+                        "The PySNMP backend walks the columns of an SNMP table concurrently. "
+                        "This limits the number of requests it sends to a device without "
+                        "waiting for the answers. The other backends send one request after "
+                        "the other."
+                    ),
+                    default_value=10,
+                    minvalue=1,
+                    maxvalue=100,
+                ),
+            ),
         ],
     )
 
@@ -5683,10 +5747,13 @@ def transform_snmp_backend_hosts_to_valuespec(backend):
     # we need to accept this as value as well.
     if backend in [False, "inline", "inline_legacy"]:
         return SNMPBackendEnum.INLINE
+    # "pysnmp" is the backend we dropped during the 2.1 beta because it was slow
+    # and unreliable. Its hosts keep using the classic backend, the current
+    # PySNMP backend is stored as "pysnmp_async".
     if backend in [True, "classic", "pysnmp"]:
-        # We dropped pysnmp during the 2.1 beta because it is currently slow
-        # and unreliable.
         return SNMPBackendEnum.CLASSIC
+    if backend == "pysnmp_async":
+        return SNMPBackendEnum.PYSNMP
     raise MKConfigError("SNMPBackendEnum %r not implemented" % backend)
 
 
@@ -5697,6 +5764,7 @@ def _valuespec_snmp_backend():
             choices=[
                 (SNMPBackendEnum.INLINE, _("Use Inline SNMP backend")),
                 (SNMPBackendEnum.CLASSIC, _("Use Classic backend")),
+                (SNMPBackendEnum.PYSNMP, _("Use PySNMP backend")),
             ],
         ),
         to_valuespec=transform_snmp_backend_hosts_to_valuespec,
@@ -10,14 +10,17 @@ from __future__ import annotations
 import ast
 import enum
 import errno
+import gzip
 import hashlib
 import io
 import logging
+import marshal
 import multiprocessing
 import os
 import re
 import shutil
 import subprocess
+import threading
 import time
 import traceback
 from collections.abc import (
@@ -34,7 +37,7 @@ from datetime import datetime
 from itertools import filterfalse
 from multiprocessing.pool import AsyncResult, ThreadPool
 from pathlib import Path
-from typing import Any, Literal, NamedTuple, TypedDict
+from typing import Any, Final, Literal, NamedTuple, TypedDict
 from urllib.parse import urlparse
 
 from setproctitle import setthreadtitle
@@ -164,6 +167,8 @@ ACTIVATION_PERISTED_DIR = cmk.utils.paths.var_dir + "/wato/activation"
 
 RABBITMQ_DEFS_HASH_PATH = ACTIVATION_PERISTED_DIR + "/rabbitmq_defs_hash"
 
+CONFIG_SYNC_FILE_HASH_CACHE_PATH = cmk.utils.paths.tmp_dir / "wato/config_sync_file_hashes"
+
 var_dir = cmk.utils.paths.var_dir + "/wato/"
 
 
@@ -661,7 +666,7 @@ def _set_sync_state(
 
 def _get_config_sync_state(
     site_id: SiteId, replication_paths: Sequence[ReplicationPath]
-) -> tuple[ConfigSyncFileInfos, int]:
+) -> tuple[ConfigSyncFileInfos, int, Sequence[str]]:
     """Get the config file states from the remote sites
 
     Calls the automation call "get-config-sync-state" on the remote site,
@@ -674,24 +679,25 @@ def _get_config_sync_state(
     )
 
     assert isinstance(response, tuple)
-    return {k: ConfigSyncFileInfo(*v) for k, v in response[0].items()}, response[1]
+    # Remote sites of older versions don't report the supported compressions
+    return (
+        {k: ConfigSyncFileInfo(*v) for k, v in response[0].items()},
+        response[1],
+        response[2] if len(response) > 2 else [],
+    )
 
 
 def _synchronize_files(
     site_id: SiteId,
-    files_to_sync: list[str],
+    sync_archive: bytes,
     files_to_delete: list[str],
     remote_config_generation: int,
-    site_config_dir: Path,
 ) -> None:
-    """Pack the files in a simple tar archive and send it to the remote site
+    """Send the tar archive with the files to be synchronized to the remote site
 
-    We build a simple tar archive containing all files to be synchronized.  The list of file to
-    be deleted and the current config generation is handed over using dedicated HTTP parameters.
+    The list of file to be deleted and the current config generation is handed over using
+    dedicated HTTP parameters.
     """
-
-    sync_archive = _get_sync_archive(files_to_sync, site_config_dir)
-
     site = get_site_config(active_config, site_id)
     response = cmk.gui.watolib.automations.do_remote_automation(
         site,
@@ -713,6 +719,7 @@ class SyncState:
     central_file_infos: ConfigSyncFileInfos
     remote_file_infos: ConfigSyncFileInfos
     remote_config_generation: int
+    remote_sync_archive_compressions: Sequence[str] = ()
 
 
 def fetch_sync_state(
@@ -734,8 +741,8 @@ def fetch_sync_state(
             _set_sync_state(site_activation_state, _("Fetching sync state"))
             site_logger.debug("Starting config sync (%r)", site_activation_state)
 
-            remote_file_infos, remote_config_generation = _get_config_sync_state(
-                site_id, replication_paths
+            remote_file_infos, remote_config_generation, remote_compressions = (
+                _get_config_sync_state(site_id, replication_paths)
             )
             site_logger.debug("Received %d file infos from remote", len(remote_file_infos))
 
@@ -744,6 +751,7 @@ def fetch_sync_state(
                     central_file_infos=central_file_infos,
                     remote_file_infos=remote_file_infos,
                     remote_config_generation=remote_config_generation,
+                    remote_sync_archive_compressions=remote_compressions,
                 ),
                 site_activation_state,
                 sync_start,
@@ -792,7 +800,16 @@ def synchronize_files(
     site_activation_state: SiteActivationState,
     sync_start: float,
     origin_span: trace.Span,
+    *,
+    central_file_infos: ConfigSyncFileInfos | None = None,
+    compress: bool = False,
+    sync_archives: SyncArchives | None = None,
 ) -> SiteActivationState | None:
+    """Transfer the files to the remote site
+
+    Sites sharing the sync_archives get the archives built for others if they need the same files
+    with the same contents, as told by the central_file_infos.
+    """
     site_id = site_activation_state["_site_id"]
     site_logger = logger.getChild(f"site[{site_id}]")
 
@@ -818,12 +835,14 @@ def synchronize_files(
                     len(sync_delta.to_delete),
                 ),
             )
-            _synchronize_files(
-                site_id,
+            sync_archive = (sync_archives or SyncArchives()).get(
                 sync_delta.to_sync_new + sync_delta.to_sync_changed,
-                sync_delta.to_delete,
-                remote_config_generation,
                 site_config_dir,
+                central_file_infos or {},
+                compress,
+            )
+            _synchronize_files(
+                site_id, sync_archive, sync_delta.to_delete, remote_config_generation
             )
             site_logger.debug("Finished config sync")
             return site_activation_state
@@ -835,6 +854,61 @@ def synchronize_files(
             update_activation_time(site_id, ACTIVATION_TIME_SYNC, duration)
 
 
+def sync_and_activate_site(
+    activate_changes: ActivateChanges,
+    snapshot_settings: SnapshotSettings,
+    central_file_infos: ConfigSyncFileInfos,
+    file_filter_func: FileFilterFunc,
+    prevent_activate: bool,
+    sync_archives: SyncArchives,
+    site_activation_state: SiteActivationState,
+    origin_span: trace.Span,
+) -> SiteActivationState | None:
+    """Run all steps of the activation of a site one after the other
+
+    Each site runs through its steps on its own, so that a slow site does not hold up the
+    others. The steps handle their exceptions, the activation of the site stops at the first
+    step failing.
+    """
+    if (
+        fetch_sync_state_result := fetch_sync_state(
+            snapshot_settings.snapshot_components,
+            site_activation_state,
+            central_file_infos,
+            origin_span,
+        )
+    ) is None:
+        return None
+    sync_state, site_activation_state, sync_start = fetch_sync_state_result
+
+    if (
+        calc_sync_delta_result := calc_sync_delta(
+            sync_state, file_filter_func, site_activation_state, sync_start, origin_span
+        )
+    ) is None:
+        return None
+    sync_delta, site_activation_state, sync_start = calc_sync_delta_result
+
+    if (
+        synchronize_files_result := synchronize_files(
+            sync_delta,
+            sync_state.remote_config_generation,
+            Path(snapshot_settings.work_dir),
+            site_activation_state,
+            sync_start,
+            origin_span,
+            central_file_infos=central_file_infos,
+            compress=SYNC_ARCHIVE_COMPRESSION in sync_state.remote_sync_archive_compressions,
+            sync_archives=sync_archives,
+        )
+    ) is None:
+        return None
+
+    return activate_site_changes(
+        activate_changes, prevent_activate, synchronize_files_result, origin_span
+    )
+
+
 def _set_done_result(
     configuration_warnings: ConfigWarnings, site_activation_state: SiteActivationState
 ) -> None:
@@ -2013,6 +2087,7 @@ class ReplicationPathType(enum.StrEnum):
 
 def _get_config_sync_file_infos_per_inode(
     replication_paths: Sequence[ReplicationPath],
+    hash_cache: ConfigSyncFileHashCache | None = None,
 ) -> Mapping[int, ConfigSyncFileInfo]:
     inode_sync_states = {}
 
@@ -2024,11 +2099,11 @@ def _get_config_sync_file_infos_per_inode(
 
         if replication_path.ty == ReplicationPathType.FILE:
             inode_sync_states[os.stat(replication_path_full).st_ino] = _get_config_sync_file_info(
-                replication_path_full
+                replication_path_full, hash_cache
             )
         elif replication_path.ty == ReplicationPathType.DIR:
             _get_replication_dir_config_sync_file_infos_per_inode(
-                inode_sync_states, replication_path_full, replication_path.excludes
+                inode_sync_states, replication_path_full, replication_path.excludes, hash_cache
             )
         else:
             raise NotImplementedError()
@@ -2040,6 +2115,7 @@ def _get_replication_dir_config_sync_file_infos_per_inode(
     inode_sync_states: MutableMapping[int, ConfigSyncFileInfo],
     replication_path: str,
     replication_path_excludes: Sequence[str],
+    hash_cache: ConfigSyncFileHashCache | None,
 ) -> None:
     # Use os functionality instead of pathlib since it is faster
     for root, dir_names, file_names in os.walk(replication_path):
@@ -2054,12 +2130,16 @@ def _get_replication_dir_config_sync_file_infos_per_inode(
                 and os.path.islink(dir_path)
                 and not dir_name == GENERAL_DIR_EXCLUDE
             ):
-                inode_sync_states[os.stat(dir_path).st_ino] = _get_config_sync_file_info(dir_path)
+                inode_sync_states[os.stat(dir_path).st_ino] = _get_config_sync_file_info(
+                    dir_path, hash_cache
+                )
 
         for file_name in file_names:
             file_path = os.path.join(root, file_name)
             if os.path.exists(file_path):
-                inode_sync_states[os.stat(file_path).st_ino] = _get_config_sync_file_info(file_path)
+                inode_sync_states[os.stat(file_path).st_ino] = _get_config_sync_file_info(
+                    file_path, hash_cache
+                )
 
 
 def _prepare_for_activation_tasks(
@@ -2069,8 +2149,11 @@ def _prepare_for_activation_tasks(
     time_started: float,
     source: ActivationSource,
 ) -> tuple[Mapping[SiteId, ConfigSyncFileInfos], Mapping[SiteId, SiteActivationState]]:
+    # The files are hard linked to the site specific snapshot directories on every activation,
+    # which changes their ctime. Only the inode, size and mtime tell whether they are unchanged.
+    hash_cache = ConfigSyncFileHashCache.load(CONFIG_SYNC_FILE_HASH_CACHE_PATH, check_ctime=False)
     config_sync_file_infos_per_inode = _get_config_sync_file_infos_per_inode(
-        list(replication_path_registry.values())
+        list(replication_path_registry.values()), hash_cache
     )
     central_file_infos_per_site = {}
     site_activation_states_per_site = {}
@@ -2088,13 +2171,16 @@ def _prepare_for_activation_tasks(
 
             if activate_changes.is_sync_needed(site_id):
                 central_file_infos_per_site[site_id] = _get_site_central_file_infos(
-                    site_id, snapshot_settings, config_sync_file_infos_per_inode
+                    site_id, snapshot_settings, config_sync_file_infos_per_inode, hash_cache
                 )
         except Exception as e:
             _handle_activation_changes_exception(
                 logger.getChild(f"site[{site_id}]"), str(e), site_activation_state
             )
             _cleanup_activation(site_id, activation_id, source)
+
+    hash_cache.save(CONFIG_SYNC_FILE_HASH_CACHE_PATH)
+    hash_cache.log_statistics()
     return central_file_infos_per_site, site_activation_states_per_site
 
 
@@ -2102,6 +2188,7 @@ def _get_site_central_file_infos(
     site_id: SiteId,
     snapshot_settings: SnapshotSettings,
     config_sync_file_infos_per_inode: Mapping[int, ConfigSyncFileInfo],
+    hash_cache: ConfigSyncFileHashCache,
 ) -> ConfigSyncFileInfos:
     # In case we experience performance issues here, we could postpone the hashing of the
     # central files to only be done ad-hoc in get_file_names_to_sync when the other attributes
@@ -2112,6 +2199,7 @@ def _get_site_central_file_infos(
         snapshot_settings.snapshot_components,
         site_config_dir,
         config_sync_file_infos_per_inode,
+        hash_cache,
     )
 
     logger.getChild(f"site[{site_id}]").debug(
@@ -2120,13 +2208,6 @@ def _get_site_central_file_infos(
     return central_file_infos
 
 
-class ActiveTasks(TypedDict):
-    fetch_sync_state: MutableMapping[SiteId, AsyncResult]
-    calc_sync_delta: MutableMapping[SiteId, AsyncResult]
-    synchronize_files: MutableMapping[SiteId, AsyncResult]
-    activate_site_changes: MutableMapping[SiteId, AsyncResult]
-
-
 def _error_callback(error: BaseException) -> None:
     # for exceptions that could not be handled within the function, e.g. calling with incorrect
     # number of arguments
@@ -2187,28 +2268,25 @@ def sync_and_activate(
         )
         clean_dead_sites_certs(list(get_all_replicated_sites()))
 
-        active_tasks = ActiveTasks(
-            fetch_sync_state={},
-            calc_sync_delta={},
-            synchronize_files={},
-            activate_site_changes={},
-        )
-
+        sync_archives = SyncArchives()
         for site_id, site_activation_state in site_activation_states.items():
             if activate_changes.is_sync_needed(site_id):
-                async_result = task_pool.apply_async(
-                    func=copy_request_context(fetch_sync_state),
+                task_pool.apply_async(
+                    func=copy_request_context(sync_and_activate_site),
                     args=(
-                        site_snapshot_settings[site_id].snapshot_components,
-                        site_activation_state,
+                        activate_changes,
+                        site_snapshot_settings[site_id],
                         site_central_file_infos[site_id],
+                        file_filter_func,
+                        prevent_activate,
+                        sync_archives,
+                        site_activation_state,
                         trace.get_current_span(),
                     ),
                     error_callback=_error_callback,
                 )
-                active_tasks["fetch_sync_state"][site_id] = async_result
             else:
-                async_result = task_pool.apply_async(
+                task_pool.apply_async(
                     func=copy_request_context(activate_site_changes),
                     args=(
                         activate_changes,
@@ -2218,29 +2296,10 @@ def sync_and_activate(
                     ),
                     error_callback=_error_callback,
                 )
-                active_tasks["activate_site_changes"][site_id] = async_result
-
-        remote_config_generation_per_site: dict[SiteId, int] = {}
-        # we want to mostly parallelize the activation steps, but if one site takes longer,
-        # it should not hold up the other sites
-        # -> monitor active tasks to handle results as soon as one finishes and start a task for
-        # the next step
-        while (
-            len(active_tasks["fetch_sync_state"]) > 0
-            or len(active_tasks["calc_sync_delta"]) > 0
-            or len(active_tasks["synchronize_files"]) > 0
-            or len(active_tasks["activate_site_changes"]) > 0
-        ):
-            time.sleep(0.1)
-            _handle_active_tasks(
-                active_tasks,
-                activate_changes,
-                file_filter_func,
-                prevent_activate,
-                remote_config_generation_per_site,
-                site_snapshot_settings,
-                task_pool,
-            )
+
+        task_pool.close()
+        task_pool.join()
+        sync_archives.log_statistics()
 
     except Exception:
         handle_exception_as_gui_crash_report(fail_silently=True)
@@ -2336,86 +2395,6 @@ def _cleanup_activation(
     )
 
 
-def _handle_active_tasks(
-    active_tasks: ActiveTasks,
-    activate_changes: ActivateChanges,
-    file_filter_func: FileFilterFunc,
-    prevent_activate: bool,
-    remote_config_generation_per_site: MutableMapping[SiteId, int],
-    site_snapshot_settings: Mapping[SiteId, SnapshotSettings],
-    task_pool: ThreadPool,
-) -> None:
-    for site_id, async_result in list(active_tasks["fetch_sync_state"].items()):
-        if not async_result.ready():
-            return
-
-        active_tasks["fetch_sync_state"].pop(site_id)
-        if (fetch_sync_state_results := async_result.get()) is None:
-            return  # exception handling happens in thread
-
-        sync_state, activation_state, sync_start_time = fetch_sync_state_results
-        remote_config_generation_per_site[site_id] = sync_state.remote_config_generation
-
-        active_tasks["calc_sync_delta"][site_id] = task_pool.apply_async(
-            func=copy_request_context(calc_sync_delta),
-            args=(
-                sync_state,
-                file_filter_func,
-                activation_state,
-                sync_start_time,
-                trace.get_current_span(),
-            ),
-            error_callback=_error_callback,
-        )
-
-    for site_id, async_result in list(active_tasks["calc_sync_delta"].items()):
-        if not async_result.ready():
-            return
-
-        active_tasks["calc_sync_delta"].pop(site_id)
-        if (calc_sync_delta_result := async_result.get()) is None:
-            return  # exception handling happens in thread
-
-        sync_delta, activation_state, sync_start_time = calc_sync_delta_result
-        active_tasks["synchronize_files"][site_id] = task_pool.apply_async(
-            func=copy_request_context(synchronize_files),
-            args=(
-                sync_delta,
-                remote_config_generation_per_site[site_id],
-                Path(site_snapshot_settings[site_id].work_dir),
-                activation_state,
-                sync_start_time,
-                trace.get_current_span(),
-            ),
-            error_callback=_error_callback,
-        )
-
-    for site_id, async_result in list(active_tasks["synchronize_files"].items()):
-        if not async_result.ready():
-            return
-
-        active_tasks["synchronize_files"].pop(site_id)
-        if (activation_state := async_result.get()) is None:
-            return  # exception handling happens in thread
-
-        active_tasks["activate_site_changes"][site_id] = task_pool.apply_async(
-            func=copy_request_context(activate_site_changes),
-            args=(
-                activate_changes,
-                prevent_activate,
-                activation_state,
-                trace.get_current_span(),
-            ),
-            error_callback=_error_callback,
-        )
-
-    for site_id, async_result in list(active_tasks["activate_site_changes"].items()):
-        if not async_result.ready():
-            return
-
-        active_tasks["activate_site_changes"].pop(site_id)
-
-
 class ActivateChangesSchedulerBackgroundJob(BackgroundJob):
     job_prefix = "activate-changes-scheduler"
     housekeeping_max_age_sec = 86400 * 30
@@ -2871,6 +2850,64 @@ def _filter_remote_files(remote_files: set[str]) -> set[str]:
     return remote_files_to_keep
 
 
+class SyncArchives:
+    """Build the sync archives of an activation, each distinct one only once
+
+    The archives are content addressed: the files to be synchronized together with their infos
+    (mode, size, link target and hash) identify an archive. Usually most of the sites need the same
+    files, they share the archive built for the first of them. The number of archives built at the
+    same time is limited, as packing and compressing them is CPU bound.
+    """
+
+    def __init__(self, max_parallel_builds: int | None = None) -> None:
+        self._lock = threading.Lock()
+        self._archives: dict[str, bytes] = {}
+        self._building: dict[str, threading.Lock] = {}
+        self._build_slots = threading.BoundedSemaphore(max_parallel_builds or os.cpu_count() or 1)
+        self.built = 0
+        self.reused = 0
+
+    def get(
+        self,
+        to_sync: list[str],
+        base_dir: Path,
+        file_infos: Mapping[str, ConfigSyncFileInfo],
+        compress: bool,
+    ) -> bytes:
+        if any(f not in file_infos for f in to_sync):
+            # Without knowing the contents, the archive can not be shared
+            return self._build(to_sync, base_dir, compress)
+
+        key = hashlib.sha256(
+            repr((compress, sorted((f, tuple(file_infos[f])) for f in to_sync))).encode()
+        ).hexdigest()
+        with self._lock:
+            building = self._building.setdefault(key, threading.Lock())
+
+        with building:
+            with self._lock:
+                if (sync_archive := self._archives.get(key)) is not None:
+                    self.reused += 1
+                    return sync_archive
+
+            sync_archive = self._build(to_sync, base_dir, compress)
+            with self._lock:
+                self._archives[key] = sync_archive
+            return sync_archive
+
+    def _build(self, to_sync: list[str], base_dir: Path, compress: bool) -> bytes:
+        with self._build_slots:
+            sync_archive = _get_sync_archive(to_sync, base_dir)
+            if compress:
+                sync_archive = gzip.compress(sync_archive, compresslevel=1, mtime=0)
+        with self._lock:
+            self.built += 1
+        return sync_archive
+
+    def log_statistics(self) -> None:
+        logger.info("Sync archives: %d built, %d shared with other sites", self.built, self.reused)
+
+
 def _get_sync_archive(to_sync: list[str], base_dir: Path) -> bytes:
     # Use native tar instead of python tarfile for performance reasons
     completed_process = subprocess.run(
@@ -2910,6 +2947,7 @@ def _unpack_sync_archive(sync_archive: bytes, base_dir: Path) -> None:
         [
             "tar",
             "-x",
+            *(["-z"] if sync_archive.startswith(_GZIP_MAGIC) else []),
             "-C",
             str(base_dir),
             "-f",
@@ -2945,7 +2983,13 @@ class ConfigSyncFileInfo(NamedTuple):
 #    ("file_infos", dict[str, ConfigSyncFileInfo]),
 #    ("config_generation", int),
 # ])
-GetConfigSyncStateResponse = tuple[dict[str, tuple[int, int, str | None, str | None]], int]
+GetConfigSyncStateResponse = tuple[
+    dict[str, tuple[int, int, str | None, str | None]], int, list[str]
+]
+
+# The compression of the sync archives the remote sites report to understand
+SYNC_ARCHIVE_COMPRESSION = "gzip"
+_GZIP_MAGIC = b"\x1f\x8b"
 
 ConfigSyncFileInfos = dict[str, ConfigSyncFileInfo]
 
@@ -2962,8 +3006,9 @@ class AutomationGetConfigSyncState(AutomationCommand[list[ReplicationPath]]):
 
     The central site hands over the list of replication paths it will try to synchronize later.  The
     remote site computes the list of replication files and sends it back together with the current
-    configuration generation ID. The config generation ID is increased on every Setup modification
-    and ensures that nothing is changed between the two config sync steps.
+    configuration generation ID and the compressions of the sync archive it understands. The config
+    generation ID is increased on every Setup modification and ensures that nothing is changed
+    between the two config sync steps.
     """
 
     def command_name(self) -> str:
@@ -2977,11 +3022,20 @@ class AutomationGetConfigSyncState(AutomationCommand[list[ReplicationPath]]):
 
     def execute(self, api_request: list[ReplicationPath]) -> GetConfigSyncStateResponse:
         with store.lock_checkmk_configuration(configuration_lockfile):
-            file_infos = _get_config_sync_file_infos(api_request, base_dir=cmk.utils.paths.omd_root)
+            hash_cache = ConfigSyncFileHashCache.load(CONFIG_SYNC_FILE_HASH_CACHE_PATH)
+            file_infos = _get_config_sync_file_infos(
+                api_request, base_dir=cmk.utils.paths.omd_root, hash_cache=hash_cache
+            )
+            hash_cache.save(CONFIG_SYNC_FILE_HASH_CACHE_PATH)
+            hash_cache.log_statistics()
             transport_file_infos = {
                 k: (v.st_mode, v.st_size, v.link_target, v.file_hash) for k, v in file_infos.items()
             }
-            return (transport_file_infos, _get_current_config_generation())
+            return (
+                transport_file_infos,
+                _get_current_config_generation(),
+                [SYNC_ARCHIVE_COMPRESSION],
+            )
 
 
 def _get_config_sync_paths(
@@ -3017,13 +3071,15 @@ def _get_config_sync_file_infos(
     replication_paths: list[ReplicationPath],
     base_dir: Path,
     config_sync_file_infos_per_inode: Mapping[int, ConfigSyncFileInfo] | None = None,
+    hash_cache: ConfigSyncFileHashCache | None = None,
 ) -> ConfigSyncFileInfos:
     """Scans the given replication paths for the information needed for the config sync
 
     It produces a dictionary of sync file infos. One entry is created for each file.  Directories
     are not added to the dictionary unless it is a symlink.
     Since files to be synced for different site are copied as hardlink, the sync file infos can be
-    precomputed and the relevant info then identified via the files inode
+    precomputed and the relevant info then identified via the files inode.
+    The hashes of unchanged files are taken from the hash_cache, if given.
     """
     if config_sync_file_infos_per_inode is None:
         config_sync_file_infos_per_inode = {}
@@ -3036,7 +3092,9 @@ def _get_config_sync_file_infos(
             continue  # Only report back existing things
 
         if replication_path.ty == ReplicationPathType.FILE:
-            infos[replication_path.site_path] = _get_config_sync_file_info(replication_path_full)
+            infos[replication_path.site_path] = _get_config_sync_file_info(
+                replication_path_full, hash_cache
+            )
 
         elif replication_path.ty == ReplicationPathType.DIR:
             _get_replication_dir_config_sync_file_infos(
@@ -3045,6 +3103,7 @@ def _get_config_sync_file_infos(
                 base_dir,
                 replication_path_full,
                 replication_path.excludes,
+                hash_cache=hash_cache,
             )
         else:
             raise NotImplementedError()
@@ -3057,6 +3116,8 @@ def _get_replication_dir_config_sync_file_infos(
     base_dir: Path,
     replication_path: str,
     replication_path_excludes: Sequence[str],
+    *,
+    hash_cache: ConfigSyncFileHashCache | None,
 ) -> None:
     # Use os functionality instead of pathlib since it is faster
     for root, dir_names, file_names in os.walk(replication_path):
@@ -3076,22 +3137,96 @@ def _get_replication_dir_config_sync_file_infos(
                 ):
                     infos[valid_site_path] = sync_file_info
                 else:
-                    infos[valid_site_path] = _get_config_sync_file_info(config_sync_path)
+                    infos[valid_site_path] = _get_config_sync_file_info(
+                        config_sync_path, hash_cache
+                    )
             except FileNotFoundError:  # e.g. broken symlinks
-                infos[valid_site_path] = _get_config_sync_file_info(config_sync_path)
+                infos[valid_site_path] = _get_config_sync_file_info(config_sync_path, hash_cache)
 
 
-def _get_config_sync_file_info(file_path: str) -> ConfigSyncFileInfo:
+def _get_config_sync_file_info(
+    file_path: str, hash_cache: ConfigSyncFileHashCache | None = None
+) -> ConfigSyncFileInfo:
     stat = os.lstat(file_path)
-    is_symlink = os.path.islink(file_path)
+    if is_symlink := os.path.islink(file_path):
+        file_hash = None
+    elif hash_cache is None:
+        file_hash = _create_config_sync_file_hash(file_path)
+    else:
+        file_hash = hash_cache.file_hash(file_path, stat)
     return ConfigSyncFileInfo(
         stat.st_mode,
         stat.st_size,
         os.readlink(str(file_path)) if is_symlink else None,
-        _create_config_sync_file_hash(file_path) if not is_symlink else None,
+        file_hash,
     )
 
 
+class ConfigSyncFileHashCache:
+    """Persistent cache of the hashes of the files to be synchronized
+
+    A hash is reused as long as the path, inode, size, mtime and ctime (unless check_ctime is
+    disabled) of the file are unchanged. Only the entries used since loading the cache are saved,
+    so that the hashes of removed files are dropped.
+
+    On disk, the cache is stored in the marshal format as
+    (version, {path: (inode, size, mtime_ns, ctime_ns, hash)}).
+    """
+
+    _FORMAT_VERSION: Final = 1
+    # The timestamps of files changed that recently may not change on the next modification,
+    # depending on the granularity of the file system. Don't cache their hashes.
+    _MIN_AGE_NS: Final = 2 * 10**9
+
+    def __init__(
+        self,
+        entries: Mapping[str, tuple[int, int, int, int, str]] | None = None,
+        *,
+        check_ctime: bool = True,
+    ) -> None:
+        self._entries = entries or {}
+        self._key_length = 4 if check_ctime else 3
+        self._used: dict[str, tuple[int, int, int, int, str]] = {}
+        self._created_ns = time.time_ns()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: Path, *, check_ctime: bool = True) -> ConfigSyncFileHashCache:
+        try:
+            version, entries = marshal.loads(store.load_bytes_from_file(path))
+        except (EOFError, ValueError, TypeError):
+            return cls(check_ctime=check_ctime)
+        if version != cls._FORMAT_VERSION:
+            return cls(check_ctime=check_ctime)
+        return cls(entries, check_ctime=check_ctime)
+
+    def save(self, path: Path) -> None:
+        store.save_bytes_to_file(path, marshal.dumps((self._FORMAT_VERSION, self._used)))
+
+    def file_hash(self, file_path: str, stat: os.stat_result) -> str:
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+        if (entry := self._entries.get(file_path)) is not None and (
+            entry[: self._key_length] == key[: self._key_length]
+        ):
+            self.hits += 1
+            file_hash = entry[4]
+        else:
+            self.misses += 1
+            file_hash = _create_config_sync_file_hash(file_path)
+
+        if stat.st_mtime_ns < self._created_ns - self._MIN_AGE_NS:
+            self._used[file_path] = (*key, file_hash)
+        return file_hash
+
+    def log_statistics(self) -> None:
+        logger.info(
+            "Config sync file hashes: %d taken from the cache, %d computed",
+            self.hits,
+            self.misses,
+        )
+
+
 def _create_config_sync_file_hash(file_path: str) -> str:
     sha256 = hashlib.sha256()
     with open(file_path, "rb") as f:
@@ -13,7 +13,7 @@ from cmk.utils.paths import omd_root
 from cmk.gui.type_defs import GlobalSettings
 from cmk.gui.watolib.site_changes import ChangeSpec
 
-from cmk.piggyback_hub.config import distribute_config, PiggybackHubConfig
+from cmk.piggyback_hub.config import Compression, distribute_config, PiggybackHubConfig
 
 _HOST_CHANGES = (
     "edit-host",
@@ -59,7 +59,19 @@ def compute_new_config(
             if target_site != for_site and target_site in sites_to_update
         }
 
-    return {site: PiggybackHubConfig(targets=_make_targets(site)) for site in sites_to_update}
+    batch_sites = {
+        site_id: Compression(compression)
+        for site_id, site_config in sites_to_update.items()
+        if (compression := _piggyback_hub_batches(site_config, global_settings)) is not None
+    }
+
+    return {
+        site: PiggybackHubConfig(
+            targets=_make_targets(site),
+            batch_sites={s: c for s, c in batch_sites.items() if s != site},
+        )
+        for site in sites_to_update
+    }
 
 
 def _piggyback_hub_enabled(site_config: SiteConfiguration, global_settings: GlobalSettings) -> bool:
@@ -68,6 +80,14 @@ def _piggyback_hub_enabled(site_config: SiteConfiguration, global_settings: Glob
     return global_settings.get("piggyback_hub_enabled", True)
 
 
+def _piggyback_hub_batches(
+    site_config: SiteConfiguration, global_settings: GlobalSettings
+) -> str | None:
+    if "piggyback_hub_batches" in (site_globals := site_config.get("globals", {})):
+        return site_globals["piggyback_hub_batches"]
+    return global_settings.get("piggyback_hub_batches")
+
+
 def _filter_for_enabled_piggyback_hub(
     global_settings: GlobalSettings, configured_sites: Mapping[SiteId, SiteConfiguration]
 ) -> Mapping[SiteId, SiteConfiguration]:
@@ -7,12 +7,15 @@ from . import config
 from ._storage import (
     cleanup_piggyback_files,
     get_messages_for,
+    get_messages_for_hosts,
+    get_piggyback_meta_data,
     get_piggybacked_host_with_sources,
     move_for_host_rename,
     PiggybackMessage,
     PiggybackMetaData,
     remove_source_status_file,
     store_piggyback_raw_data,
+    watch_new_message_batches,
     watch_new_messages,
 )
 
@@ -20,11 +23,14 @@ __all__ = [
     "cleanup_piggyback_files",
     "config",
     "get_messages_for",
+    "get_messages_for_hosts",
+    "get_piggyback_meta_data",
     "get_piggybacked_host_with_sources",
     "move_for_host_rename",
     "PiggybackMessage",
     "PiggybackMetaData",
     "remove_source_status_file",
     "store_piggyback_raw_data",
+    "watch_new_message_batches",
     "watch_new_messages",
 ]
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Index of the stored piggyback data
+
+For every source host we keep an index file recording the piggybacked hosts
+it has payload files for, the modification times of these files and the last
+contact (the modification time of the source status file). This way readers
+know which payload files exist and whether they are valid without listing the
+directories and looking at every single file.
+
+The index files are append only logs of records, so that storing the data of
+a single piggybacked host stays cheap. They are compacted as soon as they
+mostly consist of outdated records. Readers keep the parsed index files in
+memory and only read the records appended since. Writers touch the index
+directory on every change, so as long as its modification time stays the same
+readers don't look at the index files at all.
+
+The index is complete once it has been built from the files on disk. Whoever
+changes the piggyback files other than by the functions of this package has
+to invalidate it, so that it is rebuilt.
+"""
+
+import dataclasses
+import os
+import time
+from collections.abc import Callable, Iterable, Mapping
+from functools import partial
+from pathlib import Path
+from typing import Final
+
+from cmk.ccc import store
+
+from cmk.utils.hostaddress import HostName
+
+from ._paths import index_dir
+
+_COMPLETE_MARKER: Final = ".complete"
+
+# Compact an index file if it has that many more records than entries
+_MAX_OUTDATED_RECORDS: Final = 1000
+
+# Changes within this time may not alter the modification time of the directory
+# (coarse file system timestamps), so a recently modified directory is not trusted.
+_RACY_INTERVAL_NS: Final = 1_000_000_000
+
+
+@dataclasses.dataclass
+class SourceIndex:
+    last_contact: int | None = None
+    last_updates: dict[HostName, int] = dataclasses.field(default_factory=dict)
+    """Modification times of the payload files by piggybacked host"""
+    records: int = 0
+
+    def apply(self, record: bytes) -> None:
+        match record.split(b" ", 2):
+            case [b"U", mtime, piggybacked]:
+                self.last_updates[HostName(piggybacked.decode())] = int(mtime)
+            case [b"D", piggybacked]:
+                self.last_updates.pop(HostName(piggybacked.decode()), None)
+            case [b"C", b"-"]:
+                self.last_contact = None
+            case [b"C", mtime]:
+                self.last_contact = int(mtime)
+            case _:
+                return
+        self.records += 1
+
+    def serialize(self) -> bytes:
+        return record_contact(self.last_contact) + b"".join(
+            record_update(piggybacked, mtime) for piggybacked, mtime in self.last_updates.items()
+        )
+
+
+def record_update(piggybacked: HostName, mtime: int) -> bytes:
+    return b"U %d %s\n" % (mtime, piggybacked.encode())
+
+
+def record_removal(piggybacked: HostName) -> bytes:
+    return b"D %s\n" % piggybacked.encode()
+
+
+def record_contact(mtime: int | None) -> bytes:
+    return b"C -\n" if mtime is None else b"C %d\n" % mtime
+
+
+@dataclasses.dataclass
+class _LoadedIndex:
+    header: bytes
+    offset: int
+    index: SourceIndex
+
+
+# The index files parsed so far, by path
+_LOADED: dict[Path, _LoadedIndex] = {}
+
+# The complete index last loaded and the state of the directory it was loaded from
+_LOADED_DIRECTORIES: dict[Path, tuple[tuple[int, int, int], Mapping[HostName, SourceIndex]]] = {}
+
+
+def load_index(omd_root: Path) -> Mapping[HostName, SourceIndex] | None:
+    """Return the index by source host, or None if it is not complete"""
+    directory = index_dir(omd_root)
+    try:
+        stat = os.stat(directory)
+    except FileNotFoundError:
+        _LOADED_DIRECTORIES.pop(directory, None)
+        return None
+
+    directory_state = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+    if (loaded := _LOADED_DIRECTORIES.get(directory)) is not None and loaded[0] == directory_state:
+        return loaded[1]
+
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return None
+
+    if _COMPLETE_MARKER not in names:
+        _LOADED_DIRECTORIES.pop(directory, None)
+        return None
+
+    index = {
+        HostName(name): source_index
+        for name in names
+        if not name.startswith(".")
+        and (source_index := _load_source_index(directory / name)) is not None
+    }
+    if time.time_ns() - stat.st_mtime_ns > _RACY_INTERVAL_NS:
+        _LOADED_DIRECTORIES[directory] = (directory_state, index)
+    else:
+        _LOADED_DIRECTORIES.pop(directory, None)
+    return index
+
+
+def _load_source_index(path: Path) -> SourceIndex | None:
+    try:
+        with path.open("rb") as f:
+            header = f.readline()
+            loaded = _LOADED.get(path)
+            if loaded is None or loaded.header != header:
+                loaded = _LOADED[path] = _LoadedIndex(header, len(header), SourceIndex())
+
+            f.seek(loaded.offset)
+            appended = f.read()
+    except FileNotFoundError:
+        _LOADED.pop(path, None)
+        return None
+
+    # A record may currently be written, only take the complete ones.
+    if complete := appended[: appended.rfind(b"\n") + 1]:
+        # Don't modify the index handed out before
+        loaded.index = dataclasses.replace(
+            loaded.index, last_updates=dict(loaded.index.last_updates)
+        )
+        for record in complete.splitlines():
+            loaded.index.apply(record)
+        loaded.offset += len(complete)
+    return loaded.index
+
+
+def append_to_index(omd_root: Path, source: HostName, records: Iterable[bytes]) -> None:
+    if not (data := b"".join(records)):
+        return
+
+    path = index_dir(omd_root) / str(source)
+    with store.locked(path):
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o660)
+        try:
+            if os.fstat(fd).st_size == 0:
+                data = _header() + data
+            while data:
+                data = data[os.write(fd, data) :]
+        finally:
+            os.close(fd)
+        # Appending doesn't change the directory, tell the readers about it
+        os.utime(path.parent)
+
+        if (source_index := _load_source_index(path)) is not None and (
+            source_index.records > len(source_index.last_updates) + _MAX_OUTDATED_RECORDS
+        ):
+            _write_source_index(path, source_index)
+
+
+def replace_source_index(
+    omd_root: Path, source: HostName, replace: Callable[[SourceIndex], SourceIndex | None]
+) -> None:
+    """Replace the index of a source, None removes it
+
+    The current index of the source is passed to replace."""
+    path = index_dir(omd_root) / str(source)
+    with store.locked(path):
+        new_index = replace(_load_source_index(path) or SourceIndex())
+        if new_index is None:
+            path.unlink(missing_ok=True)
+            return
+        _write_source_index(path, new_index)
+
+
+def _write_source_index(path: Path, source_index: SourceIndex) -> None:
+    tmp_path = path.with_name(f".{path.name}.new")
+    tmp_path.write_bytes(_header() + source_index.serialize())
+    tmp_path.rename(path)
+
+
+def _header() -> bytes:
+    # Tells the readers that the file has been replaced
+    return b"piggyback index %d %d\n" % (time.time_ns(), os.getpid())
+
+
+def rebuild_index(
+    omd_root: Path,
+    scanned: Mapping[HostName, SourceIndex],
+    payload_exists: Callable[[HostName, HostName], bool],
+) -> None:
+    """Replace the index by what has been found on disk
+
+    Data stored while scanning the files has been appended to the index in the
+    meantime, it is kept."""
+
+    def merge(source: HostName, current: SourceIndex) -> SourceIndex | None:
+        new_index = scanned.get(source, SourceIndex())
+        new_index.last_updates.update(
+            (piggybacked, mtime)
+            for piggybacked, mtime in current.last_updates.items()
+            if piggybacked not in new_index.last_updates and payload_exists(source, piggybacked)
+        )
+        if current.last_contact is not None and (
+            new_index.last_contact is None or new_index.last_contact < current.last_contact
+        ):
+            new_index.last_contact = current.last_contact
+        return new_index if new_index.last_updates or new_index.last_contact is not None else None
+
+    try:
+        indexed = {HostName(n) for n in os.listdir(index_dir(omd_root)) if not n.startswith(".")}
+    except FileNotFoundError:
+        indexed = set()
+
+    for source in sorted({*scanned, *indexed}):
+        replace_source_index(omd_root, source, partial(merge, source))
+
+    index_dir(omd_root).mkdir(mode=0o770, parents=True, exist_ok=True)
+    (index_dir(omd_root) / _COMPLETE_MARKER).touch()
+
+
+def invalidate_index(omd_root: Path) -> None:
+    (index_dir(omd_root) / _COMPLETE_MARKER).unlink(missing_ok=True)
@@ -163,7 +163,7 @@ class INotify:
         while True:
             yield from self.read()
 
-    def read(self, timeout: int | None = None) -> Sequence[Event]:
+    def read(self, timeout: float | None = None) -> Sequence[Event]:
         """Read occured events once.
 
         If timeout is set and there are no events, wait up to `timeout`
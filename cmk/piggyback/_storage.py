@@ -3,6 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import dataclasses
 import datetime
 import errno
 import json
@@ -10,6 +11,7 @@ import logging
 import os
 import shutil
 import tempfile
+import time
 from collections.abc import Iterable, Iterator, Mapping, Sequence
 from dataclasses import asdict, dataclass
 from pathlib import Path
@@ -17,6 +19,16 @@ from typing import Self
 
 from cmk.utils.hostaddress import HostAddress, HostName
 
+from ._index import (
+    append_to_index,
+    invalidate_index,
+    load_index,
+    rebuild_index,
+    record_contact,
+    record_removal,
+    record_update,
+    SourceIndex,
+)
 from ._inotify import Event, INotify, Masks
 from ._paths import payload_dir, source_status_dir
 
@@ -70,23 +82,47 @@ class PiggybackMessage:
 
 def watch_new_messages(omd_root: Path) -> Iterator[PiggybackMessage]:
     """Yields piggyback messages as they come in."""
+    for messages in watch_new_message_batches(omd_root, max_delay=0):
+        yield from messages
+
+
+def watch_new_message_batches(
+    omd_root: Path, max_delay: float
+) -> Iterator[Sequence[PiggybackMessage]]:
+    """Yields piggyback messages as they come in, in batches.
+
+    Once a message came in, further messages are collected for up to `max_delay` seconds."""
 
     inotify = INotify()
     watch_for_new_piggybacked_hosts = inotify.add_watch(payload_dir(omd_root), Masks.CREATE)
     for folder in _get_piggybacked_host_folders(omd_root):
         inotify.add_watch(folder, Masks.MOVED_TO)
 
-    for event in inotify.read_forever():
-        # check if a new piggybacked host folder was created
-        if event.watchee == watch_for_new_piggybacked_hosts:
-            if event.type & Masks.CREATE:
-                inotify.add_watch(event.watchee.path / event.name, Masks.MOVED_TO)
-                # Handle all files already in the folder (we rather have duplicates than missing files)
-                yield from get_messages_for(HostAddress(event.name), omd_root)
-            continue
+    def _make_messages(events: Iterable[Event]) -> Iterator[PiggybackMessage]:
+        for event in events:
+            # check if a new piggybacked host folder was created
+            if event.watchee == watch_for_new_piggybacked_hosts:
+                if event.type & Masks.CREATE:
+                    inotify.add_watch(event.watchee.path / event.name, Masks.MOVED_TO)
+                    # Handle all files already in the folder (we rather have duplicates than missing files)
+                    # They may not have made it into the index yet, so look at the files themselves.
+                    yield from _read_messages(
+                        _scan_payload_meta_data(HostAddress(event.name), omd_root), omd_root
+                    )
+                continue
+
+            if message := _make_message_from_event(event, omd_root):
+                yield message
 
-        if message := _make_message_from_event(event, omd_root):
-            yield message
+    while True:
+        messages = list(_make_messages(inotify.read()))
+        deadline = time.monotonic() + max_delay
+        while (remaining := deadline - time.monotonic()) > 0 and (
+            events := inotify.read(timeout=remaining)
+        ):
+            messages.extend(_make_messages(events))
+        if messages:
+            yield messages
 
 
 def _make_message_from_event(event: Event, omd_root: Path) -> PiggybackMessage | None:
@@ -113,24 +149,58 @@ def get_messages_for(
     piggybacked_hostname: HostAddress, omd_root: Path
 ) -> Sequence[PiggybackMessage]:
     """Returns piggyback messages for the given host"""
-    piggyback_meta_data = _get_payload_meta_data(piggybacked_hostname, omd_root)
+    piggyback_meta_data = get_piggyback_meta_data(piggybacked_hostname, omd_root)
     logger.debug("%s piggyback files for '%s'.", len(piggyback_meta_data), piggybacked_hostname)
+    return _read_messages(piggyback_meta_data, omd_root)
+
+
+def get_messages_for_hosts(
+    piggybacked_hostnames: Iterable[HostAddress], omd_root: Path
+) -> Mapping[HostAddress, Sequence[PiggybackMessage]]:
+    """Returns piggyback messages for all the given hosts
+
+    The index is only consulted once, for every host only its payload files are read."""
+    index = _get_index(omd_root)
+    return {
+        piggybacked_hostname: _read_messages(
+            _meta_data_from_index(index, piggybacked_hostname), omd_root
+        )
+        for piggybacked_hostname in piggybacked_hostnames
+    }
+
+
+def get_piggyback_meta_data(
+    piggybacked_hostname: HostAddress, omd_root: Path
+) -> Sequence[PiggybackMetaData]:
+    """Returns the meta data of the piggyback messages for the given host
+
+    This is taken from the index, no payload or status file is looked at."""
+    return _meta_data_from_index(_get_index(omd_root), piggybacked_hostname)
 
+
+def _read_messages(
+    piggyback_meta_data: Iterable[PiggybackMetaData], omd_root: Path
+) -> Sequence[PiggybackMessage]:
     piggyback_data = []
     for meta_data in piggyback_meta_data:
         content_path = _get_piggybacked_file_path(meta_data.source, meta_data.piggybacked, omd_root)
         try:
-            # Raw data is always stored as bytes. Later the content is
-            # converted to unicode in abstact.py:_parse_info which respects
-            # 'encoding' in section options.
-            raw_data = content_path.read_bytes()
+            with content_path.open("rb") as content_file:
+                # The file may have been written after we looked up the meta data.
+                last_update = int(os.fstat(content_file.fileno()).st_mtime)
+                # Raw data is always stored as bytes. Later the content is
+                # converted to unicode in abstact.py:_parse_info which respects
+                # 'encoding' in section options.
+                raw_data = content_file.read()
 
         except FileNotFoundError:
             # race condition: file was removed between listing and reading
             continue
 
         logger.debug("Read piggyback file '%s'", content_path)
-        piggyback_data.append(PiggybackMessage(meta_data, raw_data))
+        piggyback_data.append(
+            PiggybackMessage(dataclasses.replace(meta_data, last_update=last_update), raw_data)
+        )
 
     return piggyback_data
 
@@ -139,11 +209,18 @@ def get_piggybacked_host_with_sources(
     omd_root: Path,
 ) -> Mapping[HostAddress, Sequence[PiggybackMetaData]]:
     """Generates all piggyback pig/piggybacked host pairs"""
-    return {
-        piggybacked_host: _get_payload_meta_data(piggybacked_host, omd_root)
-        for piggybacked_host_folder in _get_piggybacked_host_folders(omd_root)
-        if (piggybacked_host := HostAddress(piggybacked_host_folder.name))
-    }
+    piggybacked_hosts: dict[HostAddress, list[PiggybackMetaData]] = {}
+    for source, source_index in _get_index(omd_root).items():
+        for piggybacked, last_update in source_index.last_updates.items():
+            piggybacked_hosts.setdefault(piggybacked, []).append(
+                PiggybackMetaData(
+                    source=source,
+                    piggybacked=piggybacked,
+                    last_update=last_update,
+                    last_contact=source_index.last_contact,
+                )
+            )
+    return dict(sorted(piggybacked_hosts.items()))
 
 
 def _remove_piggyback_file(piggyback_file_path: Path) -> bool:
@@ -158,7 +235,10 @@ def remove_source_status_file(source_hostname: HostName, omd_root: Path) -> bool
     """Remove the source_status_file of this piggyback host which will
     mark the piggyback data from this source as outdated."""
     source_status_path = _get_source_status_file_path(source_hostname, omd_root)
-    return _remove_piggyback_file(source_status_path)
+    if not _remove_piggyback_file(source_status_path):
+        return False
+    append_to_index(omd_root, source_hostname, [record_contact(None)])
+    return True
 
 
 def store_piggyback_raw_data(
@@ -174,6 +254,7 @@ def store_piggyback_raw_data(
         remove_source_status_file(source_hostname, omd_root)
         return
 
+    index_records = []
     for piggybacked_hostname, lines in piggybacked_raw_data.items():
         logger.debug("Storing piggyback data for: %r", piggybacked_hostname)
         # Raw data is always stored as bytes. Later the content is
@@ -184,6 +265,7 @@ def store_piggyback_raw_data(
             content=b"%s\n" % b"\n".join(lines),
             mtime=timestamp,
         )
+        index_records.append(record_update(piggybacked_hostname, int(timestamp)))
 
     # Store the last contact with this piggyback source to be able to filter outdated data later
     # We use the mtime of this file later for comparison.
@@ -196,6 +278,8 @@ def store_piggyback_raw_data(
     _write_file_with_mtime(
         file_path=status_file_path, content=b"", mtime=status_file_timestamp or timestamp
     )
+    index_records.append(record_contact(int(status_file_timestamp or timestamp)))
+    append_to_index(omd_root, source_hostname, index_records)
 
 
 def _write_file_with_mtime(
@@ -227,7 +311,52 @@ def _write_file_with_mtime(
 #   '----------------------------------------------------------------------'
 
 
-def _get_payload_meta_data(
+def _get_index(omd_root: Path) -> Mapping[HostName, SourceIndex]:
+    if (index := load_index(omd_root)) is None:
+        _rebuild_index(omd_root)
+        index = load_index(omd_root) or {}
+    return index
+
+
+def _rebuild_index(omd_root: Path) -> None:
+    logger.debug("Build the piggyback index")
+    scanned: dict[HostName, SourceIndex] = {}
+    for source_state_file in _get_source_state_files(omd_root):
+        if (mtime := _get_mtime(source_state_file)) is not None:
+            scanned.setdefault(HostName(source_state_file.name), SourceIndex()).last_contact = mtime
+
+    for piggybacked_host_folder in _get_piggybacked_host_folders(omd_root):
+        for payload_file in _files_in(piggybacked_host_folder):
+            if (mtime := _get_mtime(payload_file)) is not None:
+                scanned.setdefault(HostName(payload_file.name), SourceIndex()).last_updates[
+                    HostName(piggybacked_host_folder.name)
+                ] = mtime
+
+    rebuild_index(
+        omd_root,
+        scanned,
+        lambda source, piggybacked: _get_piggybacked_file_path(
+            source, piggybacked, omd_root
+        ).exists(),
+    )
+
+
+def _meta_data_from_index(
+    index: Mapping[HostName, SourceIndex], piggybacked_hostname: HostName
+) -> Sequence[PiggybackMetaData]:
+    return [
+        PiggybackMetaData(
+            source=source,
+            piggybacked=piggybacked_hostname,
+            last_update=last_update,
+            last_contact=source_index.last_contact,
+        )
+        for source, source_index in index.items()
+        if (last_update := source_index.last_updates.get(piggybacked_hostname)) is not None
+    ]
+
+
+def _scan_payload_meta_data(
     piggybacked_hostname: HostName, omd_root: Path
 ) -> Sequence[PiggybackMetaData]:
     """Gather a list of piggyback files to read for further processing.
@@ -312,18 +441,15 @@ def cleanup_piggyback_files(cut_off_timestamp: float, omd_root: Path) -> None:
         cut_off_timestamp,
     )
 
-    piggybacked_hosts_settings = [
-        (piggybacked_host_folder, _files_in(piggybacked_host_folder))
-        for piggybacked_host_folder in _get_piggybacked_host_folders(omd_root)
-    ]
-
-    _cleanup_old_source_status_files(_get_source_state_files(omd_root), cut_off_timestamp)
-    _cleanup_old_piggybacked_files(piggybacked_hosts_settings, cut_off_timestamp)
+    index = _get_index(omd_root)
+    _cleanup_old_source_status_files(_get_source_state_files(omd_root), cut_off_timestamp, omd_root)
+    _cleanup_old_piggybacked_files(index, cut_off_timestamp, omd_root)
 
 
 def _cleanup_old_source_status_files(
     source_state_files: Sequence[Path],
     cut_off_timestamp: float,
+    omd_root: Path,
 ) -> None:
     """Remove source status files which exceed provided maximum age."""
     for source_state_file in source_state_files:
@@ -336,20 +462,28 @@ def _cleanup_old_source_status_files(
                 source_state_file,
                 _render_datetime(mtime),
             )
-            _remove_piggyback_file(source_state_file)
+            if _remove_piggyback_file(source_state_file):
+                append_to_index(omd_root, HostName(source_state_file.name), [record_contact(None)])
 
 
 def _cleanup_old_piggybacked_files(
-    piggybacked_hosts_settings: Iterable[tuple[Path, Iterable[Path]]], cut_off_timestamp: float
+    index: Mapping[HostName, SourceIndex], cut_off_timestamp: float, omd_root: Path
 ) -> None:
-    """Remove piggybacked data files which exceed provided maximum age."""
-
-    for piggybacked_host_folder, source_hosts in piggybacked_hosts_settings:
-        for piggybacked_host_source in source_hosts:
-            if (mtime := _get_mtime(piggybacked_host_source)) is None:
+    """Remove piggybacked data files which exceed provided maximum age.
+
+    Only the files the index considers too old are looked at."""
+    piggybacked_hosts = set()
+    for source, source_index in index.items():
+        removal_records = []
+        for piggybacked, last_update in source_index.last_updates.items():
+            if last_update >= cut_off_timestamp:
                 continue
 
-            if mtime < cut_off_timestamp:
+            piggybacked_host_source = _get_piggybacked_file_path(source, piggybacked, omd_root)
+            # The index may lag behind the file being written right now
+            if (mtime := _get_mtime(piggybacked_host_source)) is not None:
+                if mtime >= cut_off_timestamp:
+                    continue
                 logger.debug(
                     "Piggyback file '%s' too old (%s). Remove it.",
                     piggybacked_host_source,
@@ -357,9 +491,18 @@ def _cleanup_old_piggybacked_files(
                 )
                 _remove_piggyback_file(piggybacked_host_source)
 
-        # Remove empty backed host directory
+            removal_records.append(record_removal(piggybacked))
+            piggybacked_hosts.add(piggybacked)
+
+        append_to_index(omd_root, source, removal_records)
+
+    # Remove empty backed host directories
+    for piggybacked in sorted(piggybacked_hosts):
+        piggybacked_host_folder = payload_dir(omd_root) / piggybacked
         try:
             piggybacked_host_folder.rmdir()
+        except FileNotFoundError:
+            continue
         except OSError as e:
             if e.errno == errno.ENOTEMPTY:
                 continue
@@ -412,7 +555,10 @@ def move_for_host_rename(omd_root: Path, old_host: str, new_host: str) -> tuple[
         old_path.rename(new_path)
         yield "piggyback-pig"
 
-    return tuple(
+    actions = tuple(
         *_rename_piggybacked_dir(old_host, new_host),
         *_rename_payload_file(piggyback_dir, old_host, new_host),
     )
+    if actions:
+        invalidate_index(omd_root)
+    return actions
@@ -3,6 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import enum
 import logging
 import os
 from collections.abc import Callable, Mapping
@@ -23,16 +24,24 @@ CONFIG_ROUTE = RoutingKey("config")
 CONFIG_QUEUE = QueueName("config")
 
 
+class Compression(enum.StrEnum):
+    NONE = "none"
+    ZLIB = "zlib"
+
+
 class PiggybackHubConfig(BaseModel):
     targets: Mapping[HostName, str] = {}
+    batch_sites: Mapping[str, Compression] = {}
+    """The sites receiving the payloads in batches, and how they are compressed"""
 
 
 class _PersistedPiggybackHubConfig(BaseModel):
     targets: Mapping[HostName, str] = {}
+    batch_sites: Mapping[str, Compression] = {}
 
 
 def _save_config(paths: PiggybackHubPaths, config: PiggybackHubConfig) -> None:
-    persisted = _PersistedPiggybackHubConfig(targets=config.targets)
+    persisted = _PersistedPiggybackHubConfig(targets=config.targets, batch_sites=config.batch_sites)
     paths.config.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
     tmp_path = paths.config.with_suffix(f".{os.getpid()}.tmp")
     tmp_path.write_text(f"{persisted.model_dump_json()}\n")
@@ -63,7 +72,7 @@ def load_config(paths: PiggybackHubPaths) -> PiggybackHubConfig:
         persisted = _PersistedPiggybackHubConfig.model_validate_json(paths.config.read_text())
     except FileNotFoundError:
         return PiggybackHubConfig()
-    return PiggybackHubConfig(targets=persisted.targets)
+    return PiggybackHubConfig(targets=persisted.targets, batch_sites=persisted.batch_sites)
 
 
 def distribute_config(configs: Mapping[str, PiggybackHubConfig], omd_root: Path) -> None:
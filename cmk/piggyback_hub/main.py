@@ -21,7 +21,7 @@ from cmk.messaging import QueueName, set_logging_level
 
 from .config import CONFIG_QUEUE, PiggybackHubConfig, save_config_on_message
 from .payload import (
-    PiggybackPayload,
+    PiggybackPayloadMessage,
     save_payload_on_message,
     SendingPayloadProcess,
 )
@@ -100,11 +100,12 @@ def run_piggyback_hub(
         ReceivingProcess(
             logger,
             omd_root,
-            PiggybackPayload,
+            PiggybackPayloadMessage,
             save_payload_on_message(logger, omd_root),
             crash_report_callback,
             QueueName("payload"),
             message_ttl=600,
+            drop_invalid=True,
         ),
         SendingPayloadProcess(logger, omd_root, reload_config, crash_report_callback),
         ReceivingProcess(
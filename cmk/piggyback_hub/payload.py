@@ -3,29 +3,40 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import base64
+import itertools
 import logging
 import multiprocessing
 import signal
-from collections.abc import Callable
+import time
+import zlib
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from multiprocessing.synchronize import Event
 from pathlib import Path
-from typing import Self
+from typing import Final, Self
 
-from pydantic import BaseModel
+from pydantic import BaseModel, RootModel, TypeAdapter
 
 from cmk.utils.hostaddress import HostName
+from cmk.utils.log import VERBOSE
 
 from cmk.messaging import Channel, CMKConnectionError, DeliveryTag, RoutingKey
 from cmk.piggyback import (
     PiggybackMessage,
     store_piggyback_raw_data,
-    watch_new_messages,
+    watch_new_message_batches,
 )
 
-from .config import load_config, PiggybackHubConfig
+from .config import Compression, load_config, PiggybackHubConfig
 from .paths import create_paths
 from .utils import make_connection, make_log_and_exit
 
+# Collect the piggyback data coming in for that many seconds before sending it
+_MAX_BATCH_DELAY: Final = 1.0
+# Send up to that many bytes of piggyback data in one message
+_MAX_BATCH_SIZE: Final = 4 * 1024 * 1024
+_STATISTICS_INTERVAL: Final = 60.0
+
 
 class PiggybackPayload(BaseModel):
     source_host: str
@@ -45,28 +56,151 @@ class PiggybackPayload(BaseModel):
         )
 
 
+_PAYLOADS: Final = TypeAdapter(list[PiggybackPayload])
+
+
+class PiggybackPayloadBatch(BaseModel):
+    """The piggyback payloads sent to a site in one message"""
+
+    compression: Compression
+    data: str = ""
+    """The base64 encoded, compressed payloads"""
+    plain: list[PiggybackPayload] = []
+    """The payloads if they are not compressed"""
+
+    @classmethod
+    def from_payloads(cls, payloads: Sequence[PiggybackPayload], compression: Compression) -> Self:
+        if compression is Compression.NONE:
+            return cls(compression=compression, plain=list(payloads))
+        data = zlib.compress(_PAYLOADS.dump_json(list(payloads)))
+        return cls(compression=compression, data=base64.b64encode(data).decode("ascii"))
+
+    def payloads(self) -> Sequence[PiggybackPayload]:
+        if self.compression is Compression.NONE:
+            return self.plain
+        return _PAYLOADS.validate_json(zlib.decompress(base64.b64decode(self.data)))
+
+    def size(self) -> int:
+        """The approximate number of bytes transferred"""
+        if self.compression is Compression.NONE:
+            return sum(len(p.sections) for p in self.plain)
+        return len(self.data)
+
+
+class PiggybackPayloadMessage(RootModel[PiggybackPayloadBatch | PiggybackPayload]):
+    """A message received on the payload queue
+
+    Sites of older versions send every payload in its own message."""
+
+    def payloads(self) -> Sequence[PiggybackPayload]:
+        if isinstance(self.root, PiggybackPayload):
+            return [self.root]
+        return self.root.payloads()
+
+    def size(self) -> int:
+        if isinstance(self.root, PiggybackPayload):
+            return len(self.root.sections)
+        return self.root.size()
+
+
+class TransferStatistics:
+    """Counts the transferred payloads and logs the rates every `interval` seconds"""
+
+    def __init__(self, logger: logging.Logger, what: str, interval: float) -> None:
+        self.logger = logger
+        self.what = what
+        self.interval = interval
+        self._reset(time.monotonic())
+
+    def _reset(self, now: float) -> None:
+        self._started = now
+        self.payloads = 0
+        self.messages = 0
+        self.payload_bytes = 0
+        self.message_bytes = 0
+
+    def count(self, payloads: Sequence[PiggybackPayload], message_bytes: int) -> None:
+        self.payloads += len(payloads)
+        self.messages += 1
+        self.payload_bytes += sum(len(p.sections) for p in payloads)
+        self.message_bytes += message_bytes
+
+        if (elapsed := (now := time.monotonic()) - self._started) >= self.interval:
+            self.logger.log(
+                VERBOSE,
+                "%s: %.1f payloads/s (%.1f kB/s) in %.1f messages/s (%.1f kB/s)",
+                self.what,
+                self.payloads / elapsed,
+                self.payload_bytes / elapsed / 1000,
+                self.messages / elapsed,
+                self.message_bytes / elapsed / 1000,
+            )
+            self._reset(now)
+
+
 def save_payload_on_message(
     logger: logging.Logger,
     omd_root: Path,
-) -> Callable[[Channel[PiggybackPayload], DeliveryTag, PiggybackPayload], None]:
+) -> Callable[[Channel[PiggybackPayloadMessage], DeliveryTag, PiggybackPayloadMessage], None]:
+    statistics = TransferStatistics(logger, "Received", _STATISTICS_INTERVAL)
+
     def _on_message(
-        channel: Channel[PiggybackPayload], delivery_tag: DeliveryTag, received: PiggybackPayload
+        channel: Channel[PiggybackPayloadMessage],
+        delivery_tag: DeliveryTag,
+        received: PiggybackPayloadMessage,
     ) -> None:
-        logger.debug(
-            "Received payload for piggybacked host '%s' from source host '%s'",
-            received.target_host,
-            received.source_host,
-        )
+        try:
+            payloads = received.payloads()
+        except (ValueError, zlib.error) as exc:
+            # Acknowledge it anyway, otherwise it is delivered again and again
+            logger.error("Dropping invalid payload batch: %s", exc)
+            channel.acknowledge(delivery_tag)
+            return
+        statistics.count(payloads, received.size())
+        logger.debug("Received %d payloads", len(payloads))
+        store_payloads(payloads, omd_root)
+        channel.acknowledge(delivery_tag)
+
+    return _on_message
+
+
+def store_payloads(payloads: Iterable[PiggybackPayload], omd_root: Path) -> None:
+    """Store the payloads, writing the data of a source in one go
+
+    Older data is stored first, so that it is overwritten by newer data."""
+
+    def _key(payload: PiggybackPayload) -> tuple[str, int, int]:
+        return payload.source_host, payload.last_update, payload.last_contact or -1
+
+    for (source_host, last_update, _last_contact), group in itertools.groupby(
+        sorted(payloads, key=_key), key=_key
+    ):
+        first, *others = group
         store_piggyback_raw_data(
-            source_hostname=HostName(received.source_host),
-            piggybacked_raw_data={HostName(received.target_host): (received.sections,)},
-            timestamp=received.last_update,
+            source_hostname=HostName(source_host),
+            piggybacked_raw_data={HostName(p.target_host): (p.sections,) for p in (first, *others)},
+            timestamp=last_update,
             omd_root=omd_root,
-            status_file_timestamp=received.last_contact,
+            status_file_timestamp=first.last_contact,
         )
-        channel.acknowledge(delivery_tag)
 
-    return _on_message
+
+def make_batches(
+    payloads: Sequence[PiggybackPayload], max_size: int
+) -> Iterator[Sequence[PiggybackPayload]]:
+    """Split the payloads in batches of about `max_size` bytes of piggyback data
+
+    A single payload exceeding `max_size` is sent in its own batch."""
+    batch: list[PiggybackPayload] = []
+    size = 0
+    for payload in payloads:
+        if batch and size + len(payload.sections) > max_size:
+            yield batch
+            batch, size = [], 0
+        batch.append(payload)
+        size += len(payload.sections)
+    if batch:
+        yield batch
 
 
 class SendingPayloadProcess(multiprocessing.Process):
@@ -95,14 +229,18 @@ class SendingPayloadProcess(multiprocessing.Process):
 
         config = load_config(self.paths)
         self.logger.debug("Loaded configuration: %r", config)
+        statistics = TransferStatistics(self.logger, "Sent", _STATISTICS_INTERVAL)
 
         try:
             while True:
                 with make_connection(self.omd_root, self.logger, self.task_name) as conn:
                     try:
-                        channel = conn.channel(PiggybackPayload)
-                        for piggyback_message in watch_new_messages(self.omd_root):
-                            self._handle_message(channel, config, piggyback_message)
+                        channel = conn.channel(PiggybackPayloadMessage)
+                        for piggyback_messages in watch_new_message_batches(
+                            self.omd_root, _MAX_BATCH_DELAY
+                        ):
+                            config = self._check_for_config_reload(config)
+                            self._handle_messages(channel, config, piggyback_messages, statistics)
                     except CMKConnectionError as exc:
                         self.logger.info("Reconnecting: %s: %s", self.task_name, exc)
         except CMKConnectionError as exc:
@@ -113,27 +251,43 @@ class SendingPayloadProcess(multiprocessing.Process):
             self.logger.error(crash_report_msg)
             raise
 
-    def _handle_message(
+    def _handle_messages(
         self,
-        channel: Channel[PiggybackPayload],
+        channel: Channel[PiggybackPayloadMessage],
         config: PiggybackHubConfig,
-        message: PiggybackMessage,
+        messages: Iterable[PiggybackMessage],
+        statistics: TransferStatistics,
     ) -> None:
-        config = self._check_for_config_reload(config)
+        payloads_by_site: dict[str, list[PiggybackPayload]] = {}
+        for message in messages:
+            if (site_id := config.targets.get(message.meta.piggybacked, self.site)) == self.site:
+                continue
+            payloads_by_site.setdefault(site_id, []).append(PiggybackPayload.from_message(message))
 
-        if (site_id := config.targets.get(message.meta.piggybacked, self.site)) == self.site:
-            return
+        for site_id, payloads in payloads_by_site.items():
+            if (compression := config.batch_sites.get(site_id)) is None:
+                # Sites of older versions only understand single payloads
+                for payload in payloads:
+                    self.logger.debug(
+                        "%s: %s to site '%s'",
+                        self.task_name.title(),
+                        payload.target_host,
+                        site_id,
+                    )
+                    hub_message = PiggybackPayloadMessage(payload)
+                    channel.publish_for_site(site_id, hub_message, routing=RoutingKey("payload"))
+                    statistics.count([payload], hub_message.size())
+                continue
 
-        self.logger.debug(
-            "%s: from host '%s' to host '%s' on site '%s'",
-            self.task_name.title(),
-            message.meta.source,
-            message.meta.piggybacked,
-            site_id,
-        )
-        channel.publish_for_site(
-            site_id, PiggybackPayload.from_message(message), routing=RoutingKey("payload")
-        )
+            for batch in make_batches(payloads, _MAX_BATCH_SIZE):
+                self.logger.debug(
+                    "%s: %d payloads to site '%s'", self.task_name.title(), len(batch), site_id
+                )
+                hub_message = PiggybackPayloadMessage(
+                    PiggybackPayloadBatch.from_payloads(batch, compression)
+                )
+                channel.publish_for_site(site_id, hub_message, routing=RoutingKey("payload"))
+                statistics.count(batch, hub_message.size())
 
     def _check_for_config_reload(self, current_config: PiggybackHubConfig) -> PiggybackHubConfig:
         if not self.reload_config.is_set():
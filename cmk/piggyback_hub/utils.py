@@ -41,6 +41,7 @@ class ReceivingProcess(multiprocessing.Process, Generic[_ModelT]):
         crash_report_callback: Callable[[], str],
         queue: QueueName,
         message_ttl: int | None,
+        drop_invalid: bool = False,
     ) -> None:
         super().__init__()
         self.logger = logger
@@ -50,6 +51,7 @@ class ReceivingProcess(multiprocessing.Process, Generic[_ModelT]):
         self.crash_report_callback = crash_report_callback
         self.queue = queue
         self.message_ttl = message_ttl
+        self.drop_invalid = drop_invalid
         self.task_name = f"receiving on queue '{self.queue.value}'"
 
     def run(self) -> None:
@@ -66,7 +68,7 @@ class ReceivingProcess(multiprocessing.Process, Generic[_ModelT]):
                         channel.queue_declare(queue=self.queue, message_ttl=self.message_ttl)
 
                         self.logger.debug("Consuming: %s", self.task_name)
-                        channel.consume(self.queue, self.callback)
+                        channel.consume(self.queue, self.callback, drop_invalid=self.drop_invalid)
                     except CMKConnectionError as exc:
                         self.logger.info(
                             "Interrupted by failed connection: %s: %s", self.task_name, exc
@@ -6,7 +6,7 @@
 
 import contextlib
 import hashlib
-from collections.abc import Callable, MutableMapping, Sequence
+from collections.abc import Callable, Mapping, MutableMapping, Sequence
 from functools import partial
 from typing import assert_never
 
@@ -58,6 +58,20 @@ def get_snmp_table(
     max_len = 0
     max_len_col = -1
 
+    # Walk all columns at once, backends may query the device concurrently.
+    walks = get_snmpwalks(
+        section_name,
+        tree.base,
+        [
+            (f"{tree.base}.{oid.column}", oid.save_to_cache)
+            for oid in tree.oids
+            if not isinstance(oid.column, SpecialColumn)
+        ],
+        walk_cache=walk_cache,
+        backend=backend,
+        log=log,
+    )
+
     for oid in tree.oids:
         fetchoid: OID = f"{tree.base}.{oid.column}"
         # column may be integer or string like "1.5.4.2.3"
@@ -78,15 +92,7 @@ def get_snmp_table(
             index_column = len(columns)
             index_format = oid.column
         else:
-            rowinfo = get_snmpwalk(
-                section_name,
-                tree.base,
-                fetchoid,
-                walk_cache=walk_cache,
-                save_walk_cache=oid.save_to_cache,
-                backend=backend,
-                log=log,
-            )
+            rowinfo = walks[(fetchoid, oid.save_to_cache)]
             if len(rowinfo) > max_len:
                 max_len_col = len(columns)
 
@@ -186,19 +192,50 @@ def get_snmpwalk(
     backend: SNMPBackend,
     log: Callable[[str], None],
 ) -> SNMPRowInfo:
+    return get_snmpwalks(
+        section_name,
+        base_oid,
+        [(fetchoid, save_walk_cache)],
+        walk_cache=walk_cache,
+        backend=backend,
+        log=log,
+    )[(fetchoid, save_walk_cache)]
+
+
+def get_snmpwalks(
+    section_name: SectionName | None,
+    base_oid: str,
+    fetchoids: Sequence[tuple[OID, bool]],
+    *,
+    walk_cache: MutableMapping[tuple[str, str, bool], SNMPRowInfo],
+    backend: SNMPBackend,
+    log: Callable[[str], None],
+) -> Mapping[tuple[OID, bool], SNMPRowInfo]:
+    """Walk the OIDs not found in the walk cache with a single call of the backend
+
+    The OIDs come with the flag whether to save the walk in the cache.
+    """
     contexts = backend.config.snmpv3_contexts_of(section_name).contexts
     context_string = "-".join(["no_context" if not c else c for c in contexts])
 
     # contexts are hashed in order not to exceed max pathname length
     context_hash = hashlib.shake_256(context_string.encode("utf-8")).hexdigest(15)
 
-    with contextlib.suppress(KeyError):
-        cache_info = walk_cache[(fetchoid, context_hash, save_walk_cache)]
-        log(f"Already fetched OID: {fetchoid}")
-        return cache_info
+    walks: dict[tuple[OID, bool], SNMPRowInfo] = {}
+    for fetchoid, save_walk_cache in fetchoids:
+        with contextlib.suppress(KeyError):
+            walks[(fetchoid, save_walk_cache)] = walk_cache[
+                (fetchoid, context_hash, save_walk_cache)
+            ]
+            log(f"Already fetched OID: {fetchoid}")
+
+    missing = list(dict.fromkeys(key for key in fetchoids if key not in walks))
+    if not missing:
+        return walks
 
-    added_oids: set[OID] = set()
-    rowinfo: SNMPRowInfo = []
+    missing_oids = list(dict.fromkeys(fetchoid for fetchoid, _save_walk_cache in missing))
+    added_oids: dict[OID, set[OID]] = {fetchoid: set() for fetchoid in missing_oids}
+    rowinfos: dict[OID, SNMPRowInfo] = {fetchoid: [] for fetchoid in missing_oids}
 
     skip: set[SNMPContext] = set()
     context_config = backend.config.snmpv3_contexts_of(section_name)
@@ -207,8 +244,8 @@ def get_snmpwalk(
             continue
 
         try:
-            rows = backend.walk(
-                fetchoid,
+            walked = backend.walk_many(
+                missing_oids,
                 section_name=section_name,
                 table_base_oid=base_oid,
                 context=context,
@@ -221,26 +258,29 @@ def get_snmpwalk(
             skip.add(context)
             continue
 
-        # I've seen a broken device (Mikrotik Router), that broke after an
-        # update to RouterOS v6.22. It would return 9 time the same OID when
-        # .1.3.6.1.2.1.1.1.0 was being walked. We try to detect these situations
-        # by removing any duplicate OID information
-        if len(rows) > 1 and rows[0][0] == rows[1][0]:
-            log("Detected broken SNMP agent. Ignoring duplicate OID {rows[0][0]}.")
-            rows = rows[:1]
-
-        for row_oid, val in rows:
-            if row_oid in added_oids:
-                log(f"Duplicate OID found: {row_oid} ({val!r})")
-            else:
-                rowinfo.append((row_oid, val))
-                added_oids.add(row_oid)
-
-    if skip and not rowinfo:
+        for fetchoid, rows in zip(missing_oids, walked):
+            # I've seen a broken device (Mikrotik Router), that broke after an
+            # update to RouterOS v6.22. It would return 9 time the same OID when
+            # .1.3.6.1.2.1.1.1.0 was being walked. We try to detect these situations
+            # by removing any duplicate OID information
+            if len(rows) > 1 and rows[0][0] == rows[1][0]:
+                log("Detected broken SNMP agent. Ignoring duplicate OID {rows[0][0]}.")
+                rows = rows[:1]
+
+            for row_oid, val in rows:
+                if row_oid in added_oids[fetchoid]:
+                    log(f"Duplicate OID found: {row_oid} ({val!r})")
+                else:
+                    rowinfos[fetchoid].append((row_oid, val))
+                    added_oids[fetchoid].add(row_oid)
+
+    if skip and not all(rowinfos.values()):
         raise MKSNMPError("SNMP Error on %s: SNMP query timed out" % backend.config.hostname)
 
-    walk_cache[(fetchoid, context_hash, save_walk_cache)] = rowinfo
-    return rowinfo
+    for fetchoid, save_walk_cache in missing:
+        walk_cache[(fetchoid, context_hash, save_walk_cache)] = rowinfos[fetchoid]
+        walks[(fetchoid, save_walk_cache)] = rowinfos[fetchoid]
+    return walks
 
 
 def _decode_column(
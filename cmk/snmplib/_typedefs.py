@@ -57,6 +57,7 @@ class SNMPBackendEnum(enum.Enum):
     INLINE = "Inline"
     CLASSIC = "Classic"
     STORED_WALK = "StoredWalk"
+    PYSNMP = "PySNMP"
 
     def serialize(self) -> str:
         return self.name
@@ -221,6 +222,26 @@ class SNMPBackend(abc.ABC):
     ) -> SNMPRowInfo:
         return []
 
+    def walk_many(
+        self,
+        /,
+        oids: Sequence[OID],
+        *,
+        context: SNMPContext,
+        section_name: SectionName | None = None,
+        table_base_oid: OID | None = None,
+    ) -> Sequence[SNMPRowInfo]:
+        """Walk several OIDs, by default one after the other
+
+        Backends that can query a device concurrently override this.
+        """
+        return [
+            self.walk(
+                oid, context=context, section_name=section_name, table_base_oid=table_base_oid
+            )
+            for oid in oids
+        ]
+
 
 class SpecialColumn(enum.IntEnum):
     # Until we remove all but the first, its worth having an enum
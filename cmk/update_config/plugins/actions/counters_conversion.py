@@ -14,12 +14,13 @@ import cmk.utils.paths
 from cmk.update_config.registry import update_action_registry, UpdateAction
 
 
-def _is_json(raw: str) -> bool:
-    try:
-        _ = json.loads(raw)
-    except json.JSONDecodeError:
-        return False
-    return True
+def _is_repr(raw: bytes) -> bool:
+    """The counters used to be stored as repr of a dict
+
+    Since then they have been stored as JSON list and in lines of JSON with a header, neither of
+    which start with '{'.
+    """
+    return raw.startswith(b"{")
 
 
 def _ls(counters_path: Path) -> Sequence[Path]:
@@ -36,12 +37,12 @@ class ConvertCounters(UpdateAction):
     @staticmethod
     def convert_counter_files(counters_path: Path) -> None:
         for f in _ls(counters_path):
-            if not (content := f.read_text().strip()) or _is_json(content):
+            if not (content := f.read_bytes().strip()) or not _is_repr(content):
                 continue
 
             f.write_text(
                 json.dumps(
-                    [(k, repr(v)) for k, v in ast.literal_eval(content).items()],
+                    [(k, repr(v)) for k, v in ast.literal_eval(content.decode()).items()],
                 )
             )
 
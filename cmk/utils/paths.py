@@ -56,6 +56,7 @@ data_source_cache_dir = _omd_path_str("tmp/check_mk/data_source_cache")
 snmp_scan_cache_dir = _omd_path_str("tmp/check_mk/snmp_scan_cache")
 include_cache_dir = _omd_path_str("tmp/check_mk/check_includes")
 tmp_dir = _omd_path("tmp/check_mk")
+rule_match_index_file = _omd_path("tmp/check_mk/rule_match_index")
 logwatch_dir = _omd_path_str("var/check_mk/logwatch")
 nagios_objects_file = _omd_path_str("etc/nagios/conf.d/check_mk_objects.cfg")
 nagios_command_pipe_path = _omd_path_str("tmp/run/nagios.cmd")
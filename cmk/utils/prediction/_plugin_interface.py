@@ -5,7 +5,7 @@
 """Code for predictive monitoring / anomaly detection"""
 
 import logging
-from collections.abc import Callable, Mapping
+from collections.abc import Callable, Mapping, Sequence
 from typing import assert_never, Literal
 
 from cmk.utils.log import VERBOSE
@@ -13,7 +13,7 @@ from cmk.utils.log import VERBOSE
 from cmk.agent_based.prediction_backend import PredictionInfo
 
 from ._prediction import (
-    compute_prediction,
+    compute_predictions,
     LevelsSpec,
     MetricRecord,
     PredictionData,
@@ -27,15 +27,28 @@ logger = logging.getLogger("cmk.prediction")
 
 def make_updated_predictions(
     store: PredictionStore,
-    get_recorded_data: Callable[[str, int, int], MetricRecord | None],
+    get_recorded_data: Callable[[Sequence[str], int, int], Mapping[str, MetricRecord]],
     now: float,
 ) -> Mapping[int, tuple[float | None, tuple[float, float] | None]]:
+    """Compute the reference values and levels of all predictions in the store
+
+    Outdated predictions are computed together, see compute_predictions."""
     store.remove_outdated_predictions(now)
+    predictions = {
+        hash(meta): (meta, valid_prediction)
+        for meta, valid_prediction in store.iter_all_valid_predictions(now)
+    }
+    updated_predictions = _update_predictions(
+        store,
+        [meta for meta, valid_prediction in predictions.values() if valid_prediction is None],
+        get_recorded_data,
+        now,
+    )
     return {
-        hash(meta): _make_reference_and_prediction(
-            meta, valid_prediction or _update_prediction(store, meta, get_recorded_data), now
+        meta_hash: _make_reference_and_prediction(
+            meta, valid_prediction or updated_predictions.get(meta_hash), now
         )
-        for meta, valid_prediction in store.iter_all_valid_predictions(now)
+        for meta_hash, (meta, valid_prediction) in predictions.items()
     }
 
 
@@ -56,22 +69,27 @@ def _make_reference_and_prediction(
     )
 
 
-def _update_prediction(
+def _update_predictions(
     store: PredictionStore,
-    meta: PredictionInfo,
-    get_recorded_data: Callable[[str, int, int], MetricRecord | None],
-) -> PredictionData | None:
-    logger.log(
-        VERBOSE,
-        "Predicting %s / %s / %s",
-        meta.metric,
-        meta.params.period,
-        meta.valid_interval[0],
-    )
-    if (prediction := compute_prediction(meta, get_recorded_data)) is None:
-        return None
-    store.save_prediction(meta, prediction)
-    return prediction
+    metas: Sequence[PredictionInfo],
+    get_recorded_data: Callable[[Sequence[str], int, int], Mapping[str, MetricRecord]],
+    now: float,
+) -> Mapping[int, PredictionData]:
+    for meta in metas:
+        logger.log(
+            VERBOSE,
+            "Predicting %s / %s / %s",
+            meta.metric,
+            meta.params.period,
+            meta.valid_interval[0],
+        )
+    computed = [
+        (meta, prediction)
+        for meta, prediction in zip(metas, compute_predictions(metas, get_recorded_data))
+        if prediction is not None
+    ]
+    store.save_predictions(computed, now)
+    return {hash(meta): prediction for meta, prediction in computed}
 
 
 def estimate_levels(
@@ -3,14 +3,24 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import atexit
+import dataclasses
 import logging
 import math
-from collections.abc import Callable, Iterable, Iterator, Sequence
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Final, Literal, NamedTuple, Protocol, Self
+from typing import ClassVar, Final, Literal, NamedTuple, Protocol
 
+import numpy as np
+import numpy.typing as npt
 from pydantic import BaseModel
 
+from cmk.ccc.store import PydanticStore
+
+from cmk.utils import cleanup
+
 from cmk.agent_based.prediction_backend import PredictionInfo
 
 from ._grouping import time_slices
@@ -23,6 +33,9 @@ LevelsSpec = tuple[Literal["absolute", "relative", "stdev"], tuple[float, float]
 
 _DAY = 86400
 
+# Missing values are NaN
+_ValuesArray = npt.NDArray[np.float64]
+
 
 class MetricRecord(Protocol):
     @property
@@ -38,17 +51,6 @@ class DataStat(NamedTuple):
     max_: float
     stdev: float | None
 
-    @classmethod
-    def from_values(cls, values: Sequence[float]) -> Self:
-        """Statistically summarize all the measured values"""
-        average = sum(values) / float(len(values))
-        return cls(
-            average=average,
-            min_=min(values),
-            max_=max(values),
-            stdev=_std_dev(values, average),
-        )
-
 
 class PredictionData(BaseModel, frozen=True):
     points: list[DataStat | None]
@@ -63,6 +65,134 @@ class PredictionData(BaseModel, frozen=True):
         return self.points[unbound_index % len(self.points)]
 
 
+class _CachedPrediction(BaseModel, frozen=True):
+    meta: PredictionInfo
+    info_mtime_ns: int
+    prediction: PredictionData
+
+
+class _CachedPredictions(BaseModel, frozen=True):
+    predictions: dict[str, _CachedPrediction] = {}
+
+
+@dataclass
+class _LoadedPredictions:
+    # modification time and size of the file the predictions have been read from
+    signature: tuple[int, int] | None
+    predictions: Mapping[str, _CachedPrediction]
+    # not written yet
+    pending: dict[str, _CachedPrediction] = field(default_factory=dict)
+    dirty: bool = False
+    now: float = 0.0
+
+
+class PredictionCache:
+    """The computed predictions of all services of a host in a single file
+
+    The predictions are keyed by service and info file, that is by metric, period,
+    start of the validity and direction. An entry is only used as long as its info
+    file has not been modified since, so changed parameters invalidate it.
+    The file is parsed once per process and kept in memory until it changes,
+    which spares the keepalive helpers to read it for every check. The files of
+    the MAX_LOADED_HOSTS most recently used hosts are kept.
+
+    Updates are collected per host and written at once, as soon as the cache of
+    another host is used, or by write_all(). The cache is only an additional layer
+    on top of the info and data files, so nothing is lost if that never happens.
+    """
+
+    FILE_NAME = ".predictions"
+    MAX_LOADED_HOSTS: ClassVar = 100
+
+    _loaded: ClassVar[OrderedDict[Path, _LoadedPredictions]] = OrderedDict()
+
+    def __init__(self, host_path: Path) -> None:
+        self.path: Final = host_path / self.FILE_NAME
+
+    def load(self) -> Mapping[str, _CachedPrediction]:
+        return self._load().predictions
+
+    def _load(self) -> _LoadedPredictions:
+        self._write_other_hosts()
+        signature = _signature(self.path)
+        loaded = self._loaded.get(self.path)
+        if loaded is None or loaded.signature != signature:
+            stored = (
+                {}
+                if signature is None
+                else PydanticStore(self.path, _CachedPredictions)
+                .read_obj(default=_CachedPredictions())
+                .predictions
+            )
+            loaded = (
+                _LoadedPredictions(signature, stored)
+                if loaded is None
+                else dataclasses.replace(
+                    loaded, signature=signature, predictions={**stored, **loaded.pending}
+                )
+            )
+            self._loaded[self.path] = loaded
+        self._loaded.move_to_end(self.path)
+        while len(self._loaded) > self.MAX_LOADED_HOSTS:
+            _write(*self._loaded.popitem(last=False))
+        return loaded
+
+    def update(self, predictions: Mapping[str, _CachedPrediction], now: float) -> None:
+        """Add the predictions and drop the ones that are no longer valid"""
+        loaded = self._load()
+        loaded.pending.update(predictions)
+        loaded.predictions = {**loaded.predictions, **predictions}
+        loaded.now = max(loaded.now, now)
+        loaded.dirty = True
+
+    def write(self) -> None:
+        if (loaded := self._loaded.get(self.path)) is not None:
+            _write(self.path, loaded)
+
+    @classmethod
+    def write_all(cls) -> None:
+        for path, loaded in cls._loaded.items():
+            _write(path, loaded)
+
+    def _write_other_hosts(self) -> None:
+        for path, loaded in self._loaded.items():
+            if path != self.path:
+                _write(path, loaded)
+
+
+def _signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _write(path: Path, loaded: _LoadedPredictions) -> None:
+    if not loaded.dirty:
+        return
+    store = PydanticStore(path, _CachedPredictions)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    with store.locked():
+        predictions = {
+            key: cached
+            for key, cached in {
+                **store.read_obj(default=_CachedPredictions()).predictions,
+                **loaded.pending,
+            }.items()
+            if loaded.now < cached.meta.valid_interval[1]
+        }
+        store.write_obj(_CachedPredictions(predictions=predictions))
+        loaded.signature = _signature(path)
+    loaded.predictions = predictions
+    loaded.pending = {}
+    loaded.dirty = False
+
+
+cleanup.register_cleanup(PredictionCache.write_all)
+atexit.register(PredictionCache.write_all)
+
+
 class PredictionStore:
     DATA_FILE_SUFFIX = ""
     INFO_FILE_SUFFIX = ".info"
@@ -77,8 +207,13 @@ class PredictionStore:
     def __init__(
         self,
         path: Path,
+        cache: PredictionCache | None = None,
     ) -> None:
         self.path: Final = path
+        self.cache: Final = cache
+        # modification times of the info files the predictions have been read for
+        self._info_mtimes_ns: dict[Path, int] = {}
+        self._uncached: dict[str, _CachedPrediction] = {}
         self.meta_file_path_template: Final = (
             # make base dir safe for .format call
             str(self.path).replace("{", "{{").replace("}", "}}")
@@ -108,6 +243,32 @@ class PredictionStore:
         data_file.parent.mkdir(exist_ok=True, parents=True)
         data_file.write_text(prediction.model_dump_json())
 
+    def save_predictions(
+        self, predictions: Sequence[tuple[PredictionInfo, PredictionData]], now: float
+    ) -> None:
+        """Save the computed predictions
+
+        The cache is updated with them and the predictions read from data files."""
+        for meta, prediction in predictions:
+            self.save_prediction(meta, prediction)
+
+        if self.cache is None:
+            return
+
+        for meta, prediction in predictions:
+            info_path = self._data_file(meta).with_suffix(self.INFO_FILE_SUFFIX)
+            if (info_mtime_ns := self._info_mtimes_ns.get(info_path)) is not None:
+                self._uncached[self._cache_key(info_path)] = _CachedPrediction(
+                    meta=meta, info_mtime_ns=info_mtime_ns, prediction=prediction
+                )
+
+        if self._uncached:
+            self.cache.update(self._uncached, now)
+            self._uncached.clear()
+
+    def _cache_key(self, info_path: Path) -> str:
+        return f"{self.path.name}/{info_path.relative_to(self.path)}"
+
     def iter_all_metadata_files(self) -> Iterable[Path]:
         if not self.path.exists():
             return ()
@@ -124,45 +285,90 @@ class PredictionStore:
     def iter_all_valid_predictions(
         self, now: float
     ) -> Iterator[tuple[PredictionInfo, PredictionData | None]]:
+        """Yield the predictions valid now, the data is None if it has to be computed"""
+        cached_predictions = {} if self.cache is None else self.cache.load()
         for info_path in self.iter_all_metadata_files():
             try:
-                meta = PredictionInfo.model_validate_json(info_path.read_text())
+                info_mtime_ns = info_path.stat().st_mtime_ns
             except FileNotFoundError:
                 continue
+            self._info_mtimes_ns[info_path] = info_mtime_ns
 
-            if not meta.valid_interval[0] <= now < meta.valid_interval[1]:
+            if (
+                cached := cached_predictions.get(self._cache_key(info_path))
+            ) is not None and cached.info_mtime_ns == info_mtime_ns:
+                if cached.meta.valid_interval[0] <= now < cached.meta.valid_interval[1]:
+                    yield cached.meta, cached.prediction
                 continue
 
-            data_path = info_path.with_suffix(self.DATA_FILE_SUFFIX)
             try:
-                if info_path.stat().st_mtime >= data_path.stat().st_mtime:
-                    yield meta, PredictionData.model_validate_json(data_path.read_text())
+                meta = PredictionInfo.model_validate_json(info_path.read_text())
             except FileNotFoundError:
-                pass
+                continue
 
-            yield meta, None
+            if not meta.valid_interval[0] <= now < meta.valid_interval[1]:
+                continue
+
+            if (prediction := self._read_prediction_data(info_path, info_mtime_ns)) is not None:
+                self._uncached[self._cache_key(info_path)] = _CachedPrediction(
+                    meta=meta, info_mtime_ns=info_mtime_ns, prediction=prediction
+                )
+            yield meta, prediction
+
+    def _read_prediction_data(self, info_path: Path, info_mtime_ns: int) -> PredictionData | None:
+        data_path = info_path.with_suffix(self.DATA_FILE_SUFFIX)
+        try:
+            # The data is outdated if the info file has been rewritten since.
+            if info_mtime_ns <= data_path.stat().st_mtime_ns:
+                return PredictionData.model_validate_json(data_path.read_text())
+        except FileNotFoundError:
+            pass
+        return None
 
 
 def compute_prediction(
     info: PredictionInfo,
     get_recorded_data: Callable[[str, int, int], MetricRecord | None],
 ) -> PredictionData | None:
-    time_windows = time_slices(
-        info.valid_interval[0], info.params.horizon * 86400, info.params.period
-    )
-
-    from_time = time_windows[0][0]
-    raw_slices = [
-        (
-            response.window,
-            response.values,
-            from_time - start,
+    def get_recorded_data_batch(
+        rpns: Sequence[str], start: int, end: int
+    ) -> Mapping[str, MetricRecord]:
+        return {rpn: record for rpn in rpns if (record := get_recorded_data(rpn, start, end))}
+
+    return compute_predictions([info], get_recorded_data_batch)[0]
+
+
+def compute_predictions(
+    infos: Sequence[PredictionInfo],
+    get_recorded_data: Callable[[Sequence[str], int, int], Mapping[str, MetricRecord]],
+) -> list[PredictionData | None]:
+    """Compute the predictions of many metrics
+
+    Predictions sharing their time slices are computed together, fetching the
+    recorded data of all their metrics at once for each time slice."""
+    infos_by_time_windows: dict[tuple[tuple[int, int], ...], list[int]] = {}
+    for index, info in enumerate(infos):
+        time_windows = time_slices(
+            info.valid_interval[0], info.params.horizon * 86400, info.params.period
         )
-        for start, end in time_windows
-        if (response := get_recorded_data(f"{info.metric}.max", start, end))
-    ]
-
-    return _calculate_data_for_prediction(raw_slices[0][0], raw_slices) if raw_slices else None
+        infos_by_time_windows.setdefault(tuple(time_windows), []).append(index)
+
+    predictions: list[PredictionData | None] = [None] * len(infos)
+    for time_windows, indices in infos_by_time_windows.items():
+        rpns = list(dict.fromkeys(f"{infos[index].metric}.max" for index in indices))
+        from_time = time_windows[0][0]
+        responses = [(start, get_recorded_data(rpns, start, end)) for start, end in time_windows]
+        for index in indices:
+            rpn = f"{infos[index].metric}.max"
+            raw_slices = [
+                (response.window, response.values, from_time - start)
+                for start, records in responses
+                if (response := records.get(rpn))
+            ]
+            if raw_slices:
+                predictions[index] = _calculate_data_for_prediction(raw_slices[0][0], raw_slices)
+
+    return predictions
 
 
 def _calculate_data_for_prediction(
@@ -174,7 +380,7 @@ def _calculate_data_for_prediction(
     slices = [
         _forward_fill_resample(
             current_range,
-            values,
+            _to_array(values),
             range(youngest_range.start - shift, youngest_range.stop - shift, youngest_range.step),
         )
         for current_range, values, shift in raw_slices
@@ -187,34 +393,54 @@ def _calculate_data_for_prediction(
     )
 
 
+def _to_array(values: Iterable[float | None]) -> _ValuesArray:
+    return np.array([math.nan if v is None else v for v in values], dtype=np.float64)
+
+
 def _forward_fill_resample(
-    current_range: range, values: Sequence[float | None], new_range: range
-) -> Sequence[float | None]:
+    current_range: range, values: _ValuesArray, new_range: range
+) -> _ValuesArray:
     if current_range == new_range:
         return values
 
-    idx_max = len(values) - 1
-    return [
-        values[max(0, min(int((t - current_range.start) / current_range.step), idx_max))]
-        for t in new_range
-    ]
+    indices = (
+        (np.arange(new_range.start, new_range.stop, new_range.step) - current_range.start)
+        / current_range.step
+    ).astype(np.intp)
+    return values[np.clip(indices, 0, len(values) - 1)]
 
 
-def _data_stats(slices: Iterable[Iterable[float | None]]) -> list[DataStat | None]:
+def _data_stats(slices: Iterable[Iterable[float | None] | _ValuesArray]) -> list[DataStat | None]:
     "Statistically summarize all the upsampled RRD data"
-    return [  # can't inline this b/c it is unit tested :-/
+    arrays = [s if isinstance(s, np.ndarray) else _to_array(s) for s in slices]
+    if not arrays:
+        return []
+
+    # The time columns are the points of all slices at the same relative time
+    columns = np.stack([a[: min(len(a) for a in arrays)] for a in arrays])
+    samples = np.count_nonzero(~np.isnan(columns), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = np.nansum(columns, axis=0) / samples
+        minima = np.fmin.reduce(columns, axis=0)
+        maxima = np.fmax.reduce(columns, axis=0)
+        stdevs = _std_dev(columns, averages, samples)
+
+    return [
         (
-            DataStat.from_values(point_line)
-            if (point_line := [x for x in time_column if x is not None])
+            DataStat(average=average, min_=min_, max_=max_, stdev=None if count == 1 else stdev)
+            if count
             else None
         )
-        for time_column in zip(*slices)
+        for count, average, min_, max_, stdev in zip(
+            samples.tolist(), averages.tolist(), minima.tolist(), maxima.tolist(), stdevs.tolist()
+        )
     ]
 
 
-def _std_dev(point_line: Sequence[float], average: float) -> float | None:
-    samples = len(point_line)
-    # In the case of a single data-point an unbiased standard deviation is undefined.
-    if samples == 1:
-        return None
-    return math.sqrt(abs(sum(p**2 for p in point_line) - average**2 * samples) / float(samples - 1))
+def _std_dev(
+    columns: _ValuesArray, averages: _ValuesArray, samples: npt.NDArray[np.intp]
+) -> _ValuesArray:
+    """Unbiased standard deviation of each time column
+
+    In the case of a single data-point it is undefined, we get NaN or inf."""
+    return np.sqrt(np.abs(np.nansum(columns**2, axis=0) - averages**2 * samples) / (samples - 1))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Persisted index of the hosts matching the host conditions of rules
+
+Finding the hosts matching the folder, host tag and host name conditions of
+all rules is the cold start phase of every process evaluating the rulesets.
+The index stores these host sets as bitsets (plain ints) over the sorted
+configured hosts, so that the next process can skip it.
+
+The host sets only depend on the names, folders and tags of the hosts. The
+index is dropped as soon as one of them changes. The conditions are identified
+by their contents, so changed rules simply lead to new entries. Conditions on
+host labels are not indexed at all: The discovered host labels change without
+any configuration change.
+"""
+
+import hashlib
+import marshal
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Final
+
+from cmk.ccc import store
+
+from cmk.utils.hostaddress import HostName
+
+INDEX_VERSION: Final = 1
+
+
+def hosts_fingerprint(
+    host_paths: Mapping[HostName, str],
+    host_tags: Mapping[HostName, Iterable[tuple[str, str | None]]],
+) -> str:
+    """Identify the host configuration the matching hosts depend on"""
+    return hashlib.sha256(
+        repr(
+            [
+                (host_name, host_paths[host_name], sorted(host_tags[host_name], key=repr))
+                for host_name in sorted(host_paths)
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+class HostMatchIndex:
+    def __init__(
+        self,
+        hosts: Iterable[HostName],
+        fingerprint: str,
+        bitsets: dict[str, int] | None = None,
+    ) -> None:
+        self.hosts: Final = tuple(sorted(hosts))
+        self.fingerprint: Final = fingerprint
+        self._positions: Final = {host_name: nr for nr, host_name in enumerate(self.hosts)}
+        self._bitsets: Final = bitsets or {}
+        # Only the used entries are saved, the others belong to changed or removed rules
+        self._used: Final[set[str]] = set()
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._bitsets)
+
+    def get(self, key: str) -> int | None:
+        if (bitset := self._bitsets.get(key)) is not None:
+            self._used.add(key)
+        return bitset
+
+    def add(self, key: str, hosts: Iterable[HostName]) -> int:
+        bitset = self.bitset(hosts)
+        self._bitsets[key] = bitset
+        self._used.add(key)
+        self.dirty = True
+        return bitset
+
+    def bitset(self, hosts: Iterable[HostName]) -> int:
+        if not self.hosts:
+            return 0
+        # Most significant bit first, as expected by int()
+        bits = bytearray(b"0" * len(self.hosts))
+        last = len(self.hosts) - 1
+        for host_name in hosts:
+            bits[last - self._positions[host_name]] = ord("1")
+        return int(bits, 2)
+
+    def hosts_of(self, bitset: int) -> set[HostName]:
+        bits = format(bitset, "b")[::-1]
+        hosts: set[HostName] = set()
+        position = bits.find("1")
+        while position != -1:
+            hosts.add(self.hosts[position])
+            position = bits.find("1", position + 1)
+        return hosts
+
+    def serialize(self) -> bytes:
+        return marshal.dumps(
+            (
+                INDEX_VERSION,
+                self.fingerprint,
+                {key: self._bitsets[key] for key in self._used},
+            )
+        )
+
+    @classmethod
+    def deserialize(
+        cls, raw: bytes, hosts: Iterable[HostName], fingerprint: str
+    ) -> "HostMatchIndex":
+        """Create the index from the serialized data if it fits the host configuration"""
+        try:
+            version, stored_fingerprint, bitsets = marshal.loads(raw)
+        except (ValueError, EOFError, TypeError):
+            return cls(hosts, fingerprint)
+        if version != INDEX_VERSION or stored_fingerprint != fingerprint:
+            return cls(hosts, fingerprint)
+        return cls(hosts, fingerprint, bitsets)
+
+    @classmethod
+    def load(cls, path: Path, hosts: Iterable[HostName], fingerprint: str) -> "HostMatchIndex":
+        return cls.deserialize(store.load_bytes_from_file(path), hosts, fingerprint)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        store.save_bytes_to_file(path, self.serialize())
+        self.dirty = False
@@ -6,7 +6,9 @@
 
 import contextlib
 import dataclasses
+import re
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
 from re import Pattern
 from typing import (
     Any,
@@ -35,6 +37,7 @@ from cmk.utils.labels import (
 )
 from cmk.utils.parameters import merge_parameters
 from cmk.utils.regex import combine_patterns, regex
+from cmk.utils.rulesets.match_index import HostMatchIndex, hosts_fingerprint
 from cmk.utils.rulesets.ruleset_matching_stats import (
     HostRulesetMatchingStats,
     persist_matching_stats,
@@ -189,6 +192,7 @@ class RulesetMatcher:
         nodes_of: Mapping[HostName, Sequence[HostName]],
         builtin_host_labels_store: BuiltinHostLabelsStore,
         debug_matching_stats: bool = False,
+        match_index_path: Path | None = None,
     ) -> None:
         super().__init__()
 
@@ -202,12 +206,13 @@ class RulesetMatcher:
             nodes_of,
             builtin_host_labels_store,
             debug_matching_stats,
+            match_index_path,
         )
         self.labels_of_host = self.ruleset_optimizer.labels_of_host
         self.labels_of_service = self.ruleset_optimizer.labels_of_service
         self.label_sources_of_host = self.ruleset_optimizer.label_sources_of_host
         self.label_sources_of_service = self.ruleset_optimizer.label_sources_of_service
-        self.clear_caches = self.ruleset_optimizer.clear_caches
+        self.persist_match_index = self.ruleset_optimizer.persist_match_index
 
         self._service_match_cache: dict[
             tuple[
@@ -219,9 +224,18 @@ class RulesetMatcher:
         self.__service_match_obj: dict[
             tuple[HostName, ServiceName, Item | None], RulesetMatchObject
         ] = {}
+        # The values of the rulesets for all services of the last prepared host
+        self._prepared_service_values: dict[
+            tuple[HostName, int],
+            tuple[Sequence[RuleSpec[Any]], Mapping[ServiceName, Sequence[Any]]],
+        ] = {}
 
         self._debug_matching_stats = debug_matching_stats
 
+    def clear_caches(self) -> None:
+        self.ruleset_optimizer.clear_caches()
+        self._prepared_service_values.clear()
+
     def persist_matching_stats(
         self,
         base_dir: str,
@@ -331,8 +345,13 @@ class RulesetMatcher:
         Depending on the value the outcome is negated or not.
 
         """
-        for value in self.get_service_ruleset_values(
-            self._service_match_object(hostname, description), ruleset
+        values = self._prepared_values(hostname, description, ruleset)
+        for value in (
+            self.get_service_ruleset_values(
+                self._service_match_object(hostname, description), ruleset
+            )
+            if values is None
+            else values
         ):
             # See `get_host_bool_value()`.
             assert isinstance(value, bool)
@@ -349,25 +368,134 @@ class RulesetMatcher:
         The first dict setting a key defines the final value.
 
         """
-        return merge_parameters(
-            list(
-                self.get_service_ruleset_values(
-                    self._service_match_object(hostname, description), ruleset
-                )
-            ),
-            default={},
-        )
+        return merge_parameters(self.service_extra_conf(hostname, description, ruleset), default={})
 
     def service_extra_conf(
         self, hostname: HostName, description: ServiceName, ruleset: Sequence[RuleSpec[TRuleValue]]
     ) -> list[TRuleValue]:
         """Compute outcome of a service rule set that has an item."""
+        if (values := self._prepared_values(hostname, description, ruleset)) is not None:
+            return list(values)
         return list(
             self.get_service_ruleset_values(
                 self._service_match_object(hostname, description), ruleset
             )
         )
 
+    def prepare_service_rulesets(
+        self,
+        hostname: HostName,
+        descriptions: Iterable[ServiceName],
+        rulesets: Iterable[Sequence[RuleSpec[Any]]],
+    ) -> None:
+        """Evaluate the rulesets for all given services of the host at once
+
+        The lookups of these rulesets for the services of the host are answered
+        from the results afterwards. Only the results of the last prepared host
+        are kept.
+        """
+        self._prepared_service_values.clear()
+        if self._debug_matching_stats:
+            # The matching stats are tracked per service lookup
+            return
+
+        descriptions = list(descriptions)
+        for ruleset in rulesets:
+            self._prepared_service_values[(hostname, id(ruleset))] = (
+                ruleset,
+                self.get_service_ruleset_values_of_host(hostname, descriptions, ruleset),
+            )
+
+    def _prepared_values(
+        self, hostname: HostName, description: ServiceName, ruleset: Sequence[RuleSpec[TRuleValue]]
+    ) -> Sequence[TRuleValue] | None:
+        try:
+            prepared_ruleset, values = self._prepared_service_values[(hostname, id(ruleset))]
+        except KeyError:
+            return None
+        # The id of a garbage collected ruleset may be reused
+        return values.get(description) if prepared_ruleset is ruleset else None
+
+    def get_service_ruleset_values_of_host(
+        self,
+        hostname: HostName,
+        descriptions: Iterable[ServiceName],
+        ruleset: Sequence[RuleSpec[TRuleValue]],
+    ) -> Mapping[ServiceName, Sequence[TRuleValue]]:
+        """Returns the values of the matched rules for all given services of the host
+
+        The outcome is the same as the one of service_extra_conf() for every single
+        service, but every rule is evaluated only once for all of them: The label
+        conditions are evaluated once per distinct set of service labels and the
+        service description pattern once for all services. Rules sharing the same
+        conditions share the outcome as well. The service description patterns of
+        all rules are combined to a single regex first, so the patterns of the
+        single rules are only applied to the services matching any of them.
+        """
+        descriptions = list(dict.fromkeys(descriptions))
+        if self._debug_matching_stats:
+            return {
+                description: self.service_extra_conf(hostname, description, ruleset)
+                for description in descriptions
+            }
+
+        with_foreign_hosts = hostname not in self.ruleset_optimizer.all_processed_hosts()
+        optimized_ruleset = self.ruleset_optimizer.get_service_ruleset(ruleset, with_foreign_hosts)
+
+        values: dict[ServiceName, list[TRuleValue]] = {
+            description: [] for description in descriptions
+        }
+        all_services = frozenset(descriptions)
+        services_by_labels: dict[
+            FrozenSet[tuple[str, str]] | None, tuple[Labels | None, list[ServiceName]]
+        ] = {}
+        for description in descriptions:
+            labels = self._service_match_object(hostname, description).service_labels
+            services_by_labels.setdefault(
+                None if labels is None else frozenset(labels.items()), (labels, [])
+            )[1].append(description)
+
+        host_rules = [rule for rule in optimized_ruleset if hostname in rule[2]]
+        candidates = _prefilter_service_descriptions(
+            {rule[5][1] for rule in host_rules}, all_services
+        )
+
+        label_matches: dict[tuple[tuple[str, object], ...], frozenset[ServiceName]] = {}
+        pattern_matches: dict[PreprocessedPattern, frozenset[ServiceName]] = {}
+        for (
+            _rule_id,
+            value,
+            _hosts,
+            service_label_groups,
+            service_label_groups_cache_id,
+            service_description_condition,
+        ) in host_rules:
+            if (matched := pattern_matches.get(service_description_condition)) is None:
+                matched = pattern_matches.setdefault(
+                    service_description_condition,
+                    _matching_service_descriptions(
+                        service_description_condition, all_services, candidates
+                    ),
+                )
+
+            if service_label_groups:
+                if (label_matched := label_matches.get(service_label_groups_cache_id)) is None:
+                    label_matched = label_matches.setdefault(
+                        service_label_groups_cache_id,
+                        frozenset(
+                            description
+                            for labels, group in services_by_labels.values()
+                            if matches_labels(labels, service_label_groups)
+                            for description in group
+                        ),
+                    )
+                matched &= label_matched
+
+            for description in matched:
+                values[description].append(value)
+
+        return values
+
     def get_checkgroup_ruleset_values(
         self,
         hostname: HostName,
@@ -488,7 +616,7 @@ class RulesetMatcher:
 
 # TODO: improve and cleanup types
 ConditionCacheID: TypeAlias = tuple[
-    tuple[str, ...],
+    tuple[str, ...] | None,
     tuple[tuple[TagGroupID, object], ...],
     LabelGroupsCacheId,
     str,
@@ -510,6 +638,7 @@ class RulesetOptimizer:
         nodes_of: Mapping[HostName, Sequence[HostName]],
         builtin_host_labels_store: BuiltinHostLabelsStore,
         debug_matching_stats: bool = False,
+        match_index_path: Path | None = None,
     ) -> None:
         super().__init__()
         self.__labels_of_host: dict[HostName, Labels] = {}
@@ -539,6 +668,11 @@ class RulesetOptimizer:
             tuple[ConditionCacheID, bool], set[HostName]
         ] = {}
 
+        # The persisted matching hosts of the conditions, loaded on first use
+        self._match_index_path = match_index_path
+        self._match_index: HostMatchIndex | None = None
+        self._processed_hosts_bitset: int | None = None
+
         # Reference dirname -> hosts in this dir including subfolders
         self._folder_host_lookup: dict[tuple[bool, str], set[HostName]] = {}
 
@@ -586,6 +720,7 @@ class RulesetOptimizer:
         # Only add references to configured hosts
         nodes_and_clusters.intersection_update(self._all_configured_hosts)
         self._all_processed_hosts = frozenset(nodes_and_clusters)
+        self._processed_hosts_bitset = None
 
         # The folder host lookup includes a list of all -processed- hosts within a given
         # folder. Any update with set_all_processed hosts invalidates this cache, because
@@ -756,15 +891,12 @@ class RulesetOptimizer:
             with_foreign_hosts,
         )
 
-    def _all_matching_hosts(  # pylint: disable=too-many-branches
+    def _all_matching_hosts(
         self, condition: RuleConditionsSpec, with_foreign_hosts: bool
     ) -> set[HostName]:
         """Returns a set containing the names of hosts that match the given
         tags and hostlist conditions."""
-        hostlist = condition.get("host_name")
-        tag_conditions: Mapping[TagGroupID, TagCondition] = condition.get("host_tags", {})
         label_groups: LabelGroups = condition.get("host_label_groups", [])
-        rule_path = condition.get("host_folder", "/")
 
         cache_id = self._get_cache_id(condition, with_foreign_hosts)
         try:
@@ -772,6 +904,24 @@ class RulesetOptimizer:
         except KeyError:
             pass
 
+        if not label_groups and (match_index := self._get_match_index()) is not None:
+            return self._indexed_matching_hosts(
+                match_index, condition, cache_id, with_foreign_hosts
+            )
+
+        return self._compute_all_matching_hosts(condition, cache_id, with_foreign_hosts)
+
+    def _compute_all_matching_hosts(  # pylint: disable=too-many-branches
+        self,
+        condition: RuleConditionsSpec,
+        cache_id: tuple[ConditionCacheID, bool],
+        with_foreign_hosts: bool,
+    ) -> set[HostName]:
+        hostlist = condition.get("host_name")
+        tag_conditions: Mapping[TagGroupID, TagCondition] = condition.get("host_tags", {})
+        label_groups: LabelGroups = condition.get("host_label_groups", [])
+        rule_path = condition.get("host_folder", "/")
+
         # Thin out the valid hosts further. If the rule is located in a folder
         # we only need the intersection of the folders hosts and the previously determined valid_hosts
         valid_hosts = self._get_hosts_within_folder(rule_path, with_foreign_hosts)
@@ -831,6 +981,58 @@ class RulesetOptimizer:
         self._all_matching_hosts_match_cache[cache_id] = matching
         return matching
 
+    def _indexed_matching_hosts(
+        self,
+        match_index: HostMatchIndex,
+        condition: RuleConditionsSpec,
+        cache_id: tuple[ConditionCacheID, bool],
+        with_foreign_hosts: bool,
+    ) -> set[HostName]:
+        # The index contains the matching hosts of all configured hosts. The
+        # matching processed hosts are a subset of them.
+        key = repr(cache_id[0])
+        if (bitset := match_index.get(key)) is None:
+            foreign_cache_id = (cache_id[0], True)
+            if foreign_cache_id in self._all_matching_hosts_match_cache:
+                matching = self._all_matching_hosts_match_cache[foreign_cache_id]
+            else:
+                matching = self._compute_all_matching_hosts(condition, foreign_cache_id, True)
+            bitset = match_index.add(key, matching)
+            if with_foreign_hosts:
+                return matching
+
+        if not with_foreign_hosts:
+            if self._processed_hosts_bitset is None:
+                self._processed_hosts_bitset = match_index.bitset(self._all_processed_hosts)
+            bitset &= self._processed_hosts_bitset
+
+        return self._all_matching_hosts_match_cache.setdefault(
+            cache_id, match_index.hosts_of(bitset)
+        )
+
+    def _get_match_index(self) -> HostMatchIndex | None:
+        if self._match_index_path is None:
+            return None
+        if self._match_index is None:
+            self._match_index = HostMatchIndex.load(
+                self._match_index_path,
+                self._all_configured_hosts,
+                hosts_fingerprint(
+                    {hn: self._host_paths.get(hn, "/") for hn in self._all_configured_hosts},
+                    self._host_tags,
+                ),
+            )
+        return self._match_index
+
+    def persist_match_index(self) -> None:
+        """Save the matching hosts of the conditions used so far for the next process"""
+        if (
+            self._match_index_path is not None
+            and self._match_index is not None
+            and self._match_index.dirty
+        ):
+            self._match_index.save(self._match_index_path)
+
     @staticmethod
     def _condition_cache_id(
         hostlist: HostOrServiceConditions | None,
@@ -855,7 +1057,8 @@ class RulesetOptimizer:
                 host_parts.append(h)
 
         return (
-            tuple(sorted(host_parts)),
+            # An empty host list matches no host at all, unlike a missing one
+            None if hostlist is None else tuple(sorted(host_parts)),
             tuple(
                 (taggroup_id, _tags_cache_id(tag_condition))
                 for taggroup_id, tag_condition in tag_conditions.items()
@@ -1199,6 +1402,44 @@ def matches_service_conditions(
     return True
 
 
+def _prefilter_service_descriptions(
+    patterns: Iterable[Pattern[str]], descriptions: FrozenSet[ServiceName]
+) -> FrozenSet[ServiceName]:
+    """Returns the descriptions matching any of the patterns
+
+    The descriptions are matched against all patterns combined to a single regex."""
+    patterns = [pattern for pattern in patterns if pattern.pattern]
+    if len(patterns) < 2 or any(pattern.groups for pattern in patterns):
+        # Numbered back references would refer to the wrong groups once combined
+        return descriptions
+    try:
+        # Not cached by regex(), the combinations differ from host to host
+        combined = re.compile(combine_patterns([pattern.pattern for pattern in patterns]))
+    except re.error:
+        return descriptions
+    return frozenset(
+        description for description in descriptions if combined.match(description) is not None
+    )
+
+
+def _matching_service_descriptions(
+    service_description_condition: tuple[bool, Pattern[str]],
+    descriptions: FrozenSet[ServiceName],
+    candidates: FrozenSet[ServiceName],
+) -> FrozenSet[ServiceName]:
+    """Returns the descriptions the condition applies to
+
+    Only the candidates may match the pattern of the condition."""
+    negate, pattern = service_description_condition
+    if not pattern.pattern:
+        # The empty pattern matches everything
+        return frozenset() if negate else descriptions
+    matching = frozenset(
+        description for description in candidates if pattern.match(description) is not None
+    )
+    return descriptions - matching if negate else matching
+
+
 def matches_service_description_condition(
     service_description_condition: tuple[bool, Pattern[str]],
     match_object: RulesetMatchObject,
@@ -3,14 +3,22 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from collections.abc import Iterator
 from enum import Enum
-from zlib import decompress
+from typing import BinaryIO, Final
+from zlib import decompress, decompressobj
 from zlib import error as zlibError
 
+# Read and decompress the data in chunks of that size
+_CHUNK_SIZE: Final = 64 * 1024
+
 
 class DecompressionError(Exception): ...
 
 
+class DecompressedSizeError(DecompressionError): ...
+
+
 class Decompressor(Enum):
     ZLIB = "zlib"
 
@@ -22,6 +30,18 @@ class Decompressor(Enum):
         """
         return {Decompressor.ZLIB: Decompressor._zlib_decompress}[self](data)
 
+    def decompress_stream(self, source: BinaryIO, max_size: int) -> Iterator[bytes]:
+        """Decompress the data read from source chunk by chunk
+
+        Raises DecompressedSizeError as soon as the decompressed data exceeds max_size bytes.
+
+        >>> from io import BytesIO
+        >>> from zlib import compress
+        >>> b"".join(Decompressor("zlib").decompress_stream(BytesIO(compress(b"blablub")), 7))
+        b'blablub'
+        """
+        return {Decompressor.ZLIB: Decompressor._zlib_decompress_stream}[self](source, max_size)
+
     @staticmethod
     def _zlib_decompress(data: bytes) -> bytes:
         """
@@ -37,3 +57,43 @@ class Decompressor(Enum):
             return decompress(data)
         except zlibError as e:
             raise DecompressionError(f"Decompression with zlib failed: {e}") from e
+
+    @staticmethod
+    def _zlib_decompress_stream(source: BinaryIO, max_size: int) -> Iterator[bytes]:
+        """
+        >>> from io import BytesIO
+        >>> from zlib import compress
+        >>> list(Decompressor._zlib_decompress_stream(BytesIO(compress(b"blablub")), 6))
+        Traceback (most recent call last):
+            ...
+        cmk.agent_receiver.decompression.DecompressedSizeError: ...
+        >>> list(Decompressor._zlib_decompress_stream(BytesIO(compress(b"blablub")[:-1]), 7))
+        Traceback (most recent call last):
+            ...
+        cmk.agent_receiver.decompression.DecompressionError: ...
+        """
+        decompressor = decompressobj()
+        size = 0
+        data = b""
+        try:
+            while not decompressor.eof:
+                # The output is limited, the rest of the input is kept in unconsumed_tail. Even
+                # without further input there may be more output if the last one was cut off.
+                if (
+                    not (chunk := decompressor.unconsumed_tail or source.read(_CHUNK_SIZE))
+                    and len(data) < _CHUNK_SIZE
+                ):
+                    break
+                data = decompressor.decompress(chunk, _CHUNK_SIZE)
+                if (size := size + len(data)) > max_size:
+                    raise DecompressedSizeError(
+                        f"Decompressed data exceeds the maximum size of {max_size} bytes"
+                    )
+                yield data
+        except zlibError as e:
+            raise DecompressionError(f"Decompression with zlib failed: {e}") from e
+
+        if not decompressor.eof:
+            raise DecompressionError(
+                "Decompression with zlib failed: incomplete or truncated stream"
+            )
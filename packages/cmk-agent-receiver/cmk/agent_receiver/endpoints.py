@@ -3,11 +3,15 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import asyncio
 import os
 import tempfile
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from functools import cache
 from pathlib import Path
-from typing import assert_never
+from typing import assert_never, BinaryIO, Final
 
 from cryptography.x509 import Certificate
 from fastapi import Depends, File, Header, HTTPException, Response, UploadFile
@@ -18,6 +22,7 @@ from starlette.status import (
     HTTP_400_BAD_REQUEST,
     HTTP_403_FORBIDDEN,
     HTTP_404_NOT_FOUND,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
     HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_501_NOT_IMPLEMENTED,
 )
@@ -41,7 +46,7 @@ from .checkmk_rest_api import (
     post_csr,
     register,
 )
-from .decompression import DecompressionError, Decompressor
+from .decompression import DecompressedSizeError, DecompressionError, Decompressor
 from .log import logger
 from .models import (
     CertificateRenewalBody,
@@ -64,7 +69,7 @@ from .models import (
     RenewCertResponse,
     RequestForRegistration,
 )
-from .site_context import site_name
+from .site_context import max_agent_data_size, site_name
 from .utils import (
     internal_credentials,
     NotRegisteredException,
@@ -348,9 +353,28 @@ def _validate_is_allowed(credentials: HTTPBasicCredentials, uuid: UUID4) -> None
         )
 
 
+# Reading, decompressing and storing the agent data is done by these threads, so that large agent
+# outputs don't block the handling of other requests.
+_AGENT_DATA_EXECUTOR: Final = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-data")
+
+
+def _decompress_and_store_agent_data(
+    target_dir: Path,
+    decompressor: Decompressor,
+    monitoring_data: BinaryIO,
+    queued: float,
+) -> tuple[float, float]:
+    """Returns how long the data was queued and how long it took to process it"""
+    started = time.perf_counter()
+    _store_agent_data(
+        target_dir, decompressor.decompress_stream(monitoring_data, max_agent_data_size())
+    )
+    return started - queued, time.perf_counter() - started
+
+
 def _store_agent_data(
     target_dir: Path,
-    decompressed_data: bytes,
+    decompressed_data: Iterable[bytes],
 ) -> None:
     target_dir.resolve().mkdir(parents=True, exist_ok=True)
     with tempfile.NamedTemporaryFile(
@@ -358,7 +382,9 @@ def _store_agent_data(
         delete=False,
     ) as temp_file:
         try:
-            temp_file.write(decompressed_data)
+            for chunk in decompressed_data:
+                temp_file.write(chunk)
+            temp_file.flush()
             os.rename(temp_file.name, target_dir / "agent_output")
         finally:
             Path(temp_file.name).unlink(missing_ok=True)
@@ -409,7 +435,24 @@ async def agent_data(
         ) from e
 
     try:
-        decompressed_agent_data = decompressor(monitoring_data.file.read())
+        queue_time, processing_time = await asyncio.get_running_loop().run_in_executor(
+            _AGENT_DATA_EXECUTOR,
+            _decompress_and_store_agent_data,
+            host.source_path,
+            decompressor,
+            monitoring_data.file,
+            time.perf_counter(),
+        )
+    except DecompressedSizeError as e:
+        logger.error(
+            "uuid=%s Agent data too large: %s",
+            uuid,
+            e,
+        )
+        raise HTTPException(
+            status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Decompressed agent data exceeds the maximum size",
+        ) from e
     except DecompressionError as e:
         logger.error(
             "uuid=%s Decompression of agent data failed: %s",
@@ -421,16 +464,20 @@ async def agent_data(
             detail="Decompression of agent data failed",
         ) from e
 
-    _store_agent_data(
-        host.source_path,
-        decompressed_agent_data,
-    )
-
     logger.info(
-        "uuid=%s Agent data saved",
+        "uuid=%s Agent data saved (queued %.3fs, processed in %.3fs)",
         uuid,
+        queue_time,
+        processing_time,
+    )
+    return Response(
+        status_code=HTTP_204_NO_CONTENT,
+        headers={
+            "Server-Timing": (
+                f"queue;dur={queue_time * 1000:.1f}, process;dur={processing_time * 1000:.1f}"
+            )
+        },
     )
-    return Response(status_code=HTTP_204_NO_CONTENT)
 
 
 @UUID_VALIDATION_ROUTER.get(
@@ -9,11 +9,12 @@ from fastapi import FastAPI
 from . import endpoints  # noqa: F401 # pylint: disable=unused-import
 from .apps_and_routers import AGENT_RECEIVER_APP, UUID_VALIDATION_ROUTER
 from .log import configure_logger
-from .site_context import log_path, site_name
+from .site_context import log_path, max_agent_data_size, site_name
 
 
 def main_app() -> FastAPI:
     configure_logger(log_path())
+    max_agent_data_size()
 
     # this must happen *after* registering the endpoints
     AGENT_RECEIVER_APP.include_router(UUID_VALIDATION_ROUTER)
@@ -4,6 +4,7 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import os
+from functools import cache
 from pathlib import Path
 
 
@@ -15,6 +16,23 @@ def site_name() -> str:
     return os.environ["OMD_SITE"]
 
 
+@cache
+def max_agent_data_size() -> int:
+    """Maximum size of the decompressed agent data of a single host in bytes
+
+    Read once, main_app() does so to fail on invalid values right at the start."""
+    raw = os.environ.get("AGENT_RECEIVER_MAX_AGENT_DATA_SIZE", str(256 * 1024 * 1024))
+    try:
+        size = int(raw)
+    except ValueError:
+        size = 0
+    if size <= 0:
+        raise ValueError(
+            f"AGENT_RECEIVER_MAX_AGENT_DATA_SIZE must be a positive number of bytes, got {raw!r}"
+        )
+    return size
+
+
 def agent_output_dir() -> Path:
     return _omd_root() / "var/agent-receiver/received-outputs"
 
@@ -133,6 +133,7 @@ def site_env(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
     site_dir.mkdir()
     monkeypatch.setenv("OMD_ROOT", str(site_dir))
     monkeypatch.setenv("OMD_SITE", site_id)
+    site_context.max_agent_data_size.cache_clear()
 
 
 @pytest.fixture(autouse=True)
@@ -5,7 +5,9 @@
 
 import io
 import stat
-from collections.abc import MutableMapping
+import threading
+from collections.abc import Iterable, MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from uuid import uuid4
 from zlib import compress
@@ -17,9 +19,11 @@ from fastapi.testclient import TestClient
 from pydantic import UUID4
 from pytest_mock import MockerFixture
 
-from cmk.agent_receiver import site_context
+from cmk.agent_receiver import endpoints, site_context
+from cmk.agent_receiver.apps_and_routers import AGENT_RECEIVER_APP
 from cmk.agent_receiver.certs import serialize_to_pem
 from cmk.agent_receiver.checkmk_rest_api import CMKEdition, HostConfiguration, RegisterResponse
+from cmk.agent_receiver.main import main_app
 from cmk.agent_receiver.models import ConnectionMode, R4RStatus, RequestForRegistration
 from cmk.agent_receiver.utils import R4R
 
@@ -681,6 +685,89 @@ def test_agent_data_success(
     assert file_path.read_text() == "mock file"
 
     assert response.status_code == 204
+    assert response.headers["Server-Timing"].startswith("queue;dur=")
+
+
+@pytest.mark.usefixtures("symlink_push_host")
+def test_agent_data_too_large(
+    tmp_path: Path,
+    client: TestClient,
+    uuid: UUID4,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("AGENT_RECEIVER_MAX_AGENT_DATA_SIZE", "1000")
+    site_context.max_agent_data_size.cache_clear()
+
+    response = _push_agent_data(client, uuid, b"x" * 1001)
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Decompressed agent data exceeds the maximum size"}
+    assert not list((tmp_path / "push-agent" / "hostname").iterdir())
+
+
+def _register_push_hosts(tmp_path: Path, count: int) -> list[UUID4]:
+    uuids = [uuid4() for _ in range(count)]
+    for n, uuid in enumerate(uuids):
+        (target_dir := tmp_path / "push-agent" / f"host{n}").mkdir(parents=True)
+        (site_context.agent_output_dir() / str(uuid)).symlink_to(target_dir)
+    return uuids
+
+
+def _push_agent_data(client: TestClient, uuid: UUID4, agent_data: bytes) -> httpx.Response:
+    return client.post(
+        f"/agent_data/{uuid}",
+        headers={"compression": "zlib", "verified-uuid": str(uuid)},
+        files={"monitoring_data": ("filename", io.BytesIO(compress(agent_data)))},
+    )
+
+
+def test_agent_data_is_processed_concurrently(tmp_path: Path, mocker: MockerFixture) -> None:
+    # This deadlocks if the agent data is stored on the event loop
+    all_arrived = threading.Barrier(4, timeout=10)
+    store_agent_data = endpoints._store_agent_data
+
+    def _store_when_all_arrived(target_dir: Path, decompressed_data: Iterable[bytes]) -> None:
+        all_arrived.wait()
+        store_agent_data(target_dir, decompressed_data)
+
+    mocker.patch(
+        "cmk.agent_receiver.endpoints._store_agent_data", side_effect=_store_when_all_arrived
+    )
+    uuids = _register_push_hosts(tmp_path, 4)
+
+    main_app()
+    with TestClient(AGENT_RECEIVER_APP) as client, ThreadPoolExecutor(4) as executor:
+        responses = list(executor.map(lambda uuid: _push_agent_data(client, uuid, b"data"), uuids))
+
+    assert [r.status_code for r in responses] == [204] * 4
+
+
+def test_agent_data_of_many_hosts(tmp_path: Path) -> None:
+    hosts = 8
+    agent_data = b"<<<check_mk>>>\nVersion: 2.4.0\n<<<df>>>\n/dev/sda1 ext4 1000 500 500 50% /\n"
+    uuids = _register_push_hosts(tmp_path, hosts)
+
+    main_app()
+    with TestClient(AGENT_RECEIVER_APP) as client, ThreadPoolExecutor(4) as executor:
+        responses = list(
+            executor.map(lambda uuid: _push_agent_data(client, uuid, agent_data), uuids * 2)
+        )
+
+    assert all(r.status_code == 204 for r in responses)
+    assert all(
+        (tmp_path / "push-agent" / f"host{n}" / "agent_output").read_bytes() == agent_data
+        for n in range(hosts)
+    )
+
+
+@pytest.mark.parametrize("max_size", ["", "1k", "0", "-1"])
+def test_invalid_max_agent_data_size_fails_at_start(
+    monkeypatch: pytest.MonkeyPatch, max_size: str
+) -> None:
+    monkeypatch.setenv("AGENT_RECEIVER_MAX_AGENT_DATA_SIZE", max_size)
+
+    with pytest.raises(ValueError, match="AGENT_RECEIVER_MAX_AGENT_DATA_SIZE"):
+        main_app()
 
 
 @pytest.fixture(name="registration_status_headers")
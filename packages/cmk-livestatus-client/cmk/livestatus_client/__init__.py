@@ -12,21 +12,24 @@
 from __future__ import annotations
 
 import ast
+import codecs
 import contextlib
 import json
 import os
 import re
 import select
+import selectors
 import socket
 import ssl
 import threading
 import time
-from collections.abc import Callable, Iterator, Sequence
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
+from concurrent.futures import as_completed, Executor, Future
 from dataclasses import dataclass, field
 from enum import Enum
-from functools import cache
+from functools import cache, partial
 from io import BytesIO
-from typing import Any, Literal, NamedTuple, NewType, override, TypedDict
+from typing import Any, Literal, NamedTuple, NewType, NoReturn, override, TypedDict
 
 from opentelemetry import trace
 
@@ -369,6 +372,26 @@ class Helpers:
             result.append(dict(zip(headers, line)))
         return result
 
+    def iter_query(
+        self, query: QueryTypes, add_headers: str = ""
+    ) -> Generator[LivestatusRow, None, None]:
+        """Issues a query and yields the lines of the response one by one
+
+        Connections supporting it receive and parse the response while the lines
+        are being consumed, so that large responses never have to be held in
+        memory completely."""
+        yield from self.query(query, add_headers)
+
+    def iter_query_table_assoc(self, query: QueryTypes) -> Iterator[dict[str, Any]]:
+        """Like query_table_assoc, but yields the dictionaries one by one while
+        the response is being received"""
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+
+        rows = self.iter_query(normalized_query, "ColumnHeaders: on\n")
+        headers: LivestatusRow = next(rows, LivestatusRow([]))
+        for line in rows:
+            yield dict(zip(headers, line))
+
     def query_summed_stats(self, query: QueryTypes, add_headers: str = "") -> list[int]:
         """Convenience function for adding up numbers from Stats queries
         Adds up results column-wise. This is useful for multisite queries."""
@@ -680,28 +703,42 @@ class SingleSiteConnection(Helpers):
                 pass
 
     def receive_data(self, size: int, timeout: float | None = None) -> bytes:
+        data = BytesIO()
+        for packet in self.receive_data_chunks(size, timeout, chunk_size=size):
+            data.write(packet)
+        return data.getvalue()
+
+    def receive_data_chunks(
+        self, size: int, timeout: float | None = None, chunk_size: int = 65536
+    ) -> Iterator[bytes]:
+        """Yields the data as it is read from the socket, at most chunk_size bytes at once
+
+        The timeout only applies to the time spent waiting for the socket, not to
+        the time the caller needs to process the chunks."""
         if self.socket is None:
             raise MKLivestatusSocketError("Socket to '%s' is not connected" % self.socketurl)
 
-        data = BytesIO()
         self.socket.settimeout(timeout)
-        receive_start = time.time()
-        while size > 0:
+        received = 0
+        receive_duration = 0.0
+        while received < size:
+            receive_start = time.time()
+            packet = b""
             if is_socket_readable(self.socket, 0.1):
-                packet = self.socket.recv(size)
+                packet = self.socket.recv(min(size - received, chunk_size))
                 if not packet:
                     raise MKLivestatusSocketClosed(
                         "Read zero data from socket, remote peer closed connection."
                     )
-                size -= len(packet)
-                data.write(packet)
-            if timeout is not None and (time.time() - receive_start) > timeout:
+                received += len(packet)
+            receive_duration += time.time() - receive_start
+            if timeout is not None and receive_duration > timeout:
                 raise MKLivestatusSocketError(
                     f"{timeout}s while reading data from socket. "
-                    "Received data: {data.getbuffer().nbytes}/{size} bytes"
+                    f"Received data: {received}/{size} bytes"
                 )
-
-        return data.getvalue()
+            if packet:
+                yield packet
 
     def do_query(self, query: Query, add_headers: str = "") -> LivestatusResponse:
         with (
@@ -726,6 +763,33 @@ class SingleSiteConnection(Helpers):
                 self.disconnect()
                 raise
 
+    def do_iter_query(
+        self, query: Query, add_headers: str = ""
+    ) -> Generator[LivestatusRow, None, None]:
+        """Like do_query, but parses the rows while the response is being received"""
+        with (
+            tracer.start_as_current_span(
+                "do_iter_query",
+                kind=trace.SpanKind.CLIENT,
+                attributes={
+                    "cmk.livestatus.target_site_id": str(self.site_name),
+                },
+            ) as span,
+            _livestatus_output_format_switcher(query, self),
+        ):
+            str_query = self.build_query(query, add_headers)
+            span.set_attribute("cmk.livestatus.query", str_query)
+            self.send_query(str_query)
+
+        with contextlib.closing(
+            self.receive_response_chunks(str_query, query.suppress_exceptions)
+        ) as chunks:
+            try:
+                yield from iter_response_rows(chunks, query.supports_json_format())
+            except MKLivestatusQueryError:
+                self.disconnect()
+                raise
+
     def build_query(self, query_obj: Query, add_headers: str) -> str:
         # Prevent injection of further livestatus commands inside AuthUser header.
         if "\n" in self.auth_header[:-1]:
@@ -778,17 +842,7 @@ class SingleSiteConnection(Helpers):
         timeout_at: float | None = None,
     ) -> bytes:
         try:
-            # Headers are always ASCII encoded
-            resp = self.receive_data(16)
-            code = resp[0:3].decode("ascii")
-            try:
-                length = int(resp[4:15].lstrip())
-            except Exception:
-                self.disconnect()
-                raise MKLivestatusSocketError(
-                    f"Malformed response header {resp!r}. Livestatus TCP socket might be "
-                    "unreachable or wrong encryption settings are used."
-                )
+            code, length = self._receive_response_header()
 
             # Apply a lower timeout for the content because the data is already available
             # in the socket. The liveproxyd (same system) has the complete data available
@@ -799,45 +853,10 @@ class SingleSiteConnection(Helpers):
             if code == "200":
                 return data
 
-            error_info = data.decode("utf-8")
-            if code == "404":
-                raise MKLivestatusTableNotFoundError(f"Not Found ({code}): {error_info!r}")
-
-            if code == "413":
-                raise MKLivestatusPayloadTooLargeError(error_info)
-
-            if code == "502":
-                raise MKLivestatusBadGatewayError(error_info)
-
-            raise MKLivestatusQueryError(f"{code}: {error_info}")
+            self._raise_response_error(code, data)
 
         except (MKLivestatusSocketClosed, OSError) as e:
-            # In case of an IO error or the other side having
-            # closed the socket do a reconnect and try again
-            self.disconnect()
-
-            # In case of unix socket connections, do not start any reconnection attempts
-            # The other side (liveproxyd) might have had a good reason to disconnect
-            # Note: In most scenarios the liveproxyd still tries to send back a reasonable
-            # error response back to the client
-            if self.socket and self.socket.family == socket.AF_UNIX:
-                raise MKLivestatusSocketError("Unix socket was closed by peer")
-
-            now = time.time()
-            if not timeout_at or timeout_at > now:
-                if timeout_at is None:
-                    # Try until timeout reached in case there was a timeout configured.
-                    # Otherwise only retry once.
-                    timeout_at = now
-                    if self.timeout:
-                        timeout_at += self.timeout
-
-                time.sleep(0.1)
-                self.connect()
-                self.send_query(query)
-                # do not send query again -> danger of infinite loop
-                return self.receive_raw_response(query, suppress_exceptions, timeout_at)
-            raise MKLivestatusSocketError(str(e))
+            return self._receive_after_reconnect(query, suppress_exceptions, timeout_at, e)
 
         except suppress_exceptions:
             raise
@@ -849,6 +868,103 @@ class SingleSiteConnection(Helpers):
             # FIXME: ? self.disconnect()
             raise MKLivestatusSocketError("Unhandled exception: %s" % e)
 
+    def receive_response_chunks(
+        self,
+        query: str,
+        suppress_exceptions: tuple[type[Exception], ...],
+    ) -> Generator[bytes, None, None]:
+        """Like receive_raw_response, but yields the payload in chunks as it is read
+
+        The query is only sent again as long as nothing of the payload has been
+        yielded. The connection is closed in case the payload is not consumed
+        completely, the rest of it would otherwise be read as the next response."""
+        try:
+            code, length = self._receive_response_header()
+            if code != "200":
+                self._raise_response_error(code, self.receive_data(length, 30))
+
+        except (MKLivestatusSocketClosed, OSError) as e:
+            yield self._receive_after_reconnect(query, suppress_exceptions, None, e)
+            return
+
+        except suppress_exceptions:
+            raise
+
+        except Exception as e:
+            raise MKLivestatusSocketError("Unhandled exception: %s" % e)
+
+        complete = False
+        try:
+            yield from self.receive_data_chunks(length, 30)
+            complete = True
+        except (MKLivestatusSocketClosed, OSError) as e:
+            raise MKLivestatusSocketError(str(e))
+        finally:
+            if not complete:
+                self.disconnect()
+
+    def _receive_response_header(self) -> tuple[str, int]:
+        # Headers are always ASCII encoded
+        resp = self.receive_data(16)
+        code = resp[0:3].decode("ascii")
+        try:
+            length = int(resp[4:15].lstrip())
+        except Exception:
+            self.disconnect()
+            raise MKLivestatusSocketError(
+                f"Malformed response header {resp!r}. Livestatus TCP socket might be "
+                "unreachable or wrong encryption settings are used."
+            )
+        return code, length
+
+    @staticmethod
+    def _raise_response_error(code: str, data: bytes) -> NoReturn:
+        error_info = data.decode("utf-8")
+        if code == "404":
+            raise MKLivestatusTableNotFoundError(f"Not Found ({code}): {error_info!r}")
+
+        if code == "413":
+            raise MKLivestatusPayloadTooLargeError(error_info)
+
+        if code == "502":
+            raise MKLivestatusBadGatewayError(error_info)
+
+        raise MKLivestatusQueryError(f"{code}: {error_info}")
+
+    def _receive_after_reconnect(
+        self,
+        query: str,
+        suppress_exceptions: tuple[type[Exception], ...],
+        timeout_at: float | None,
+        error: Exception,
+    ) -> bytes:
+        # In case of an IO error or the other side having
+        # closed the socket do a reconnect and try again
+        self.disconnect()
+
+        # In case of unix socket connections, do not start any reconnection attempts
+        # The other side (liveproxyd) might have had a good reason to disconnect
+        # Note: In most scenarios the liveproxyd still tries to send back a reasonable
+        # error response back to the client
+        if self.socket and self.socket.family == socket.AF_UNIX:
+            raise MKLivestatusSocketError("Unix socket was closed by peer")
+
+        now = time.time()
+        if not timeout_at or timeout_at > now:
+            if timeout_at is None:
+                # Try until timeout reached in case there was a timeout configured.
+                # Otherwise only retry once.
+                timeout_at = now
+                if self.timeout:
+                    timeout_at += self.timeout
+
+            time.sleep(0.1)
+            self.connect()
+            self.send_query(query)
+            # do not send query again -> danger of infinite loop
+            return self.receive_raw_response(query, suppress_exceptions, timeout_at)
+        raise MKLivestatusSocketError(str(error))
+
     def parse_raw_response(self, raw_response: bytes, query: Query) -> LivestatusResponse:
         data = raw_response.decode("utf-8")
         try:
@@ -892,6 +1008,23 @@ class SingleSiteConnection(Helpers):
                 row.insert(0, b"")
         return response
 
+    @override
+    def iter_query(
+        self, query: QueryTypes, add_headers: str = ""
+    ) -> Generator[LivestatusRow, None, None]:
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+
+        if self.limit is not None:
+            normalized_query = Query(
+                "%sLimit: %d\n" % (normalized_query, self.limit),
+                normalized_query.suppress_exceptions,
+            )
+
+        for row in self.do_iter_query(normalized_query, add_headers):
+            if self.prepend_site:
+                row.insert(0, b"")
+            yield row
+
     def command(
         self,
         command: str,
@@ -1241,6 +1374,45 @@ class MultiSiteConnection(Helpers):
         self.connections = stillalive
         return result
 
+    @override
+    def iter_query(
+        self, query: QueryTypes, add_headers: str = ""
+    ) -> Generator[LivestatusRow, None, None]:
+        """Streams the responses of the sites one after another
+
+        In contrast to query_parallel, only one site is queried at a time. This keeps
+        the memory bounded, no matter how large the responses are. The Limit is
+        distributed among the sites like in query_non_parallel."""
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+
+        limit = self.limit
+        failed_sites = set()
+        try:
+            for connected_site in self.connections:
+                if self.only_sites is not None and connected_site.id not in self.only_sites:
+                    continue
+                limit_header = "" if limit is None else "Limit: %d\n" % limit
+                try:
+                    for row in connected_site.connection.iter_query(
+                        normalized_query, add_headers + limit_header
+                    ):
+                        if self.prepend_site:
+                            row.insert(0, connected_site.id)
+                        if limit is not None:
+                            limit -= 1  # Account for portion of limit used by this site
+                        yield row
+                except LivestatusTestingError:
+                    raise
+                except Exception as e:
+                    connected_site.connection.disconnect()
+                    failed_sites.add(connected_site.id)
+                    self.deadsites[connected_site.id] = {
+                        "exception": e,
+                        "site": connected_site.config,
+                    }
+        finally:
+            self.connections = [c for c in self.connections if c.id not in failed_sites]
+
     def query_parallel(self, query: Query, add_headers: str = "") -> LivestatusResponse:
         """New parallelized version of query()
 
@@ -1248,33 +1420,107 @@ class MultiSiteConnection(Helpers):
         Limit: is simply applied to all sites - resulting in possibly more results then Limit
         requests.
         """
-        stillalive = []
+        site_ids = [connected_site.id for connected_site in self.connections]
+        with tracer.start_as_current_span(
+            "query_parallel", attributes={"cmk.livestatus.query": str(query)}
+        ):
+            site_rows = dict(self.iter_query_parallel(query, add_headers))
+
+        return LivestatusResponse(
+            [row for site_id in site_ids for row in site_rows.get(site_id, [])]
+        )
+
+    def iter_query_parallel(
+        self, query: Query, add_headers: str = "", executor: Executor | None = None
+    ) -> Generator[tuple[SiteId, LivestatusResponse], None, None]:
+        """Query the sites in parallel and yield the rows of every site as soon as they arrive
+
+        The queries are sent to all sites first. Then the responses are received in the
+        order they arrive, so a slow site does not delay the others. Every response is
+        parsed right after receiving it, on the given executor if there is one. This way
+        the raw responses do not have to be kept until all sites have answered.
+
+        The Limit: is applied to all sites, like with query_parallel().
+        """
+        stillalive: ConnectedSites = []
         if self.only_sites is not None:
-            connect_to_sites = [c for c in self.connections if c[0] in self.only_sites]
+            connect_to_sites = [c for c in self.connections if c.id in self.only_sites]
             # Unused sites are assumed to be alive
-            stillalive.extend([c for c in self.connections if c[0] not in self.only_sites])
+            stillalive.extend([c for c in self.connections if c.id not in self.only_sites])
         else:
             connect_to_sites = self.connections
+        positions = {connected_site.id: nr for nr, connected_site in enumerate(connect_to_sites)}
+        responded: ConnectedSites = []
 
-        with tracer.start_as_current_span(
-            "query_parallel", attributes={"cmk.livestatus.query": str(query)}
-        ):
-            # First send all queries
-            retrieve_responses = self._send_queries(
-                query,
-                add_headers,
-                connect_to_sites,
-                limit_header="Limit: %d\n" % self.limit if self.limit is not None else "",
-            )
+        retrieve_responses = self._send_queries(
+            query,
+            add_headers,
+            connect_to_sites,
+            limit_header="Limit: %d\n" % self.limit if self.limit is not None else "",
+        )
 
-            # Then retrieve all raw responses. We will be as slow as the slowest of all connections.
-            site_responses = self._retrieve_responses(query, retrieve_responses, stillalive)
+        parsing: dict[Future[LivestatusResponse], ConnectedSite] = {}
+        selector = selectors.DefaultSelector()
+        try:
+            for str_query, request_span, connected_site in retrieve_responses:
+                assert connected_site.connection.socket is not None
+                selector.register(
+                    connected_site.connection.socket,
+                    selectors.EVENT_READ,
+                    (str_query, request_span, connected_site),
+                )
 
-            # Convert responses to python format
-            result = self._parse_responses(query, site_responses, stillalive)
+            while selector.get_map():
+                # Don't block while parsed responses may be waiting to be yielded
+                for key in _readable_keys(selector, 0.1 if parsing else None):
+                    selector.unregister(key.fileobj)
+                    str_query, request_span, connected_site = key.data
+                    raw_response = self._receive_site_response(
+                        query, str_query, request_span, connected_site, responded
+                    )
+                    if raw_response is None:
+                        continue
 
-        self.connections = stillalive
-        return LivestatusResponse(result)
+                    if executor is not None:
+                        future = executor.submit(
+                            connected_site.connection.parse_raw_response, raw_response, query
+                        )
+                        parsing[future] = connected_site
+                        continue
+
+                    rows = self._site_rows(
+                        query,
+                        connected_site,
+                        partial(connected_site.connection.parse_raw_response, raw_response, query),
+                        responded,
+                    )
+                    if rows is not None:
+                        yield connected_site.id, rows
+
+                for future in [future for future in parsing if future.done()]:
+                    connected_site = parsing.pop(future)
+                    if (
+                        rows := self._site_rows(query, connected_site, future.result, responded)
+                    ) is not None:
+                        yield connected_site.id, rows
+
+            for future in as_completed(list(parsing)):
+                connected_site = parsing.pop(future)
+                if (
+                    rows := self._site_rows(query, connected_site, future.result, responded)
+                ) is not None:
+                    yield connected_site.id, rows
+
+        finally:
+            # Stopped early: The unreceived responses are dropped along with the connection
+            for key in list(selector.get_map().values()):
+                key.data[2].connection.disconnect()
+                responded.append(key.data[2])
+            selector.close()
+            responded.extend(parsing.values())
+            self.connections = stillalive + sorted(
+                responded, key=lambda connected_site: positions[connected_site.id]
+            )
 
     def _send_queries(
         self, query: Query, add_headers: str, connect_to_sites: ConnectedSites, limit_header: str
@@ -1304,64 +1550,30 @@ class MultiSiteConnection(Helpers):
                     }
         return retrieve_responses
 
-    def _retrieve_responses(
+    def _receive_site_response(
         self,
         query: Query,
-        retrieve_responses: list[tuple[str, trace.Span, ConnectedSite]],
+        str_query: str,
+        request_span: trace.Span,
+        connected_site: ConnectedSite,
         stillalive: ConnectedSites,
-    ) -> list[tuple[ConnectedSite, bytes]]:
-        site_responses: list[tuple[ConnectedSite, bytes]] = []
-        for str_query, request_span, connected_site in retrieve_responses:
-            with tracer.start_as_current_span(
-                f"receive_from_site[{connected_site.id}]",
-                kind=trace.SpanKind.CONSUMER,
-                links=[trace.Link(request_span.get_span_context())],
-                attributes={
-                    "cmk.livestatus.query": str_query,
-                    "cmk.livestatus.target_site_id": str(connected_site.id),
-                },
-            ):
-                try:
-                    site_responses.append(
-                        (
-                            connected_site,
-                            connected_site.connection.receive_raw_response(
-                                str_query, query.suppress_exceptions
-                            ),
-                        )
-                    )
-                except query.suppress_exceptions:
-                    # Mostly handles exception types MKLivestatusTableNotFoundError
-                    stillalive.append(connected_site)
-                    continue
-                except LivestatusTestingError:
-                    raise
-                except Exception as e:
-                    connected_site.connection.disconnect()
-                    self.deadsites[connected_site.id] = {
-                        "exception": e,
-                        "site": connected_site.config,
-                    }
-        return site_responses
-
-    def _parse_responses(
-        self,
-        query: Query,
-        site_responses: list[tuple[ConnectedSite, bytes]],
-        stillalive: ConnectedSites,
-    ) -> list[LivestatusRow]:
-        result: list[LivestatusRow] = []
-        for connected_site, raw_response in site_responses:
+    ) -> bytes | None:
+        with tracer.start_as_current_span(
+            f"receive_from_site[{connected_site.id}]",
+            kind=trace.SpanKind.CONSUMER,
+            links=[trace.Link(request_span.get_span_context())],
+            attributes={
+                "cmk.livestatus.query": str_query,
+                "cmk.livestatus.target_site_id": str(connected_site.id),
+            },
+        ):
             try:
-                rows = connected_site.connection.parse_raw_response(raw_response, query)
-                stillalive.append(connected_site)
-                if self.prepend_site:
-                    for row in rows:
-                        row.insert(0, connected_site.id)
-                result.extend(rows)
+                return connected_site.connection.receive_raw_response(
+                    str_query, query.suppress_exceptions
+                )
             except query.suppress_exceptions:
+                # Mostly handles exception types MKLivestatusTableNotFoundError
                 stillalive.append(connected_site)
-                continue
             except LivestatusTestingError:
                 raise
             except Exception as e:
@@ -1370,7 +1582,33 @@ class MultiSiteConnection(Helpers):
                     "exception": e,
                     "site": connected_site.config,
                 }
-        return result
+        return None
+
+    def _site_rows(
+        self,
+        query: Query,
+        connected_site: ConnectedSite,
+        parse: Callable[[], LivestatusResponse],
+        stillalive: ConnectedSites,
+    ) -> LivestatusResponse | None:
+        try:
+            rows = parse()
+            stillalive.append(connected_site)
+            if self.prepend_site:
+                for row in rows:
+                    row.insert(0, connected_site.id)
+            return rows
+        except query.suppress_exceptions:
+            stillalive.append(connected_site)
+        except LivestatusTestingError:
+            raise
+        except Exception as e:
+            connected_site.connection.disconnect()
+            self.deadsites[connected_site.id] = {
+                "exception": e,
+                "site": connected_site.config,
+            }
+        return None
 
     def command(self, command: str, sitename: SiteId | None = SiteId("local")) -> None:
         if sitename in self.deadsites:
@@ -1399,6 +1637,85 @@ class MultiSiteConnection(Helpers):
         raise KeyError("Connection does not exist")
 
 
+def iter_response_rows(chunks: Iterable[bytes], json_format: bool) -> Iterator[LivestatusRow]:
+    """Parses the rows of a JSON or Python formatted response while it is being received
+
+    Livestatus writes one row per line: "[" row (",\n" row)* "]\n". Each line is
+    parsed on its own, rows spanning several lines are collected until they can be
+    parsed. Responses not following this layout are parsed as a whole at the end.
+    """
+    parse_row = json.loads if json_format else ast.literal_eval
+    lines = _iter_lines(chunks)
+
+    first_line = next((line for line in lines if line.strip()), "").lstrip()
+    if not first_line.startswith("["):
+        raise MKLivestatusQueryError("Malformed raw response output")
+
+    pending = ""
+    complete = False
+    # Skip the opening bracket of the list of rows
+    for line in _chain_line(first_line[1:], lines):
+        text = f"{pending}\n{line}" if pending else line
+        if not (stripped := text.strip()):
+            continue
+        if complete:
+            raise MKLivestatusQueryError("Malformed raw response output")
+        if stripped == "]":
+            complete = True
+            continue
+
+        row = None
+        if stripped.endswith(","):
+            row = _parse_row(parse_row, stripped[:-1])
+        elif stripped.endswith("]"):
+            # The last row, followed by the closing bracket of the list of rows
+            row = _parse_row(parse_row, stripped[:-1])
+            complete = row is not None
+
+        if row is None:
+            pending = text
+            continue
+        pending = ""
+        yield row
+
+    if pending:
+        # Not one row per line, e.g. when talking to other Livestatus implementations
+        rows = _parse_row(parse_row, f"[{pending}")
+        if rows is None:
+            raise MKLivestatusQueryError("Malformed raw response output")
+        yield from rows
+    elif not complete:
+        raise MKLivestatusQueryError("Malformed raw response output")
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    incomplete_line: list[str] = []
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        incomplete_line.append(text)
+        if "\n" not in text:
+            continue
+        *lines, last_line = "".join(incomplete_line).split("\n")
+        yield from lines
+        incomplete_line = [last_line]
+    incomplete_line.append(decoder.decode(b"", final=True))
+    yield "".join(incomplete_line)
+
+
+def _chain_line(line: str, lines: Iterator[str]) -> Iterator[str]:
+    yield line
+    yield from lines
+
+
+def _parse_row(parse_row: Callable[[str], Any], text: str) -> LivestatusRow | None:
+    try:
+        row = parse_row(text)
+    except (ValueError, SyntaxError):
+        return None
+    return LivestatusRow(row) if isinstance(row, list) else None
+
+
 @contextlib.contextmanager
 def _livestatus_output_format_switcher(
     query: Query, connection: MultiSiteConnection | SingleSiteConnection
@@ -1509,6 +1826,19 @@ def is_socket_readable(sock: socket.socket, select_timeout: float = 1.0) -> bool
     return sock in fd_sets[0]
 
 
+def _readable_keys(
+    selector: selectors.BaseSelector, timeout: float | None
+) -> list[selectors.SelectorKey]:
+    # SSL sockets may have data pending which select does not know about, see is_socket_readable()
+    if pending := [
+        key
+        for key in selector.get_map().values()
+        if isinstance(key.fileobj, ssl.SSLSocket) and key.fileobj.pending()
+    ]:
+        return pending
+    return [key for key, _events in selector.select(timeout)]
+
+
 @dataclass(frozen=True)
 class RRDResponse:
     window: range
@@ -1595,3 +1925,39 @@ def get_rrd_data(  # pylint: disable=too-many-positional-arguments
         if (step := int(raw_step)) == 0
         else RRDResponse(range(int(raw_start), int(raw_end), step), values)
     )
+
+
+def get_rrd_data_batch(  # pylint: disable=too-many-positional-arguments
+    connection: SingleSiteConnection,
+    host_name: str,
+    service_description: str,
+    rpns: Sequence[str],
+    fromtime: int,
+    untiltime: int,
+    max_entries: int = 400,
+) -> dict[str, RRDResponse]:
+    """Fetch RRD historic metrics data of several metrics of a service with one query
+
+    Same as get_rrd_data, but returns the responses by RPN. Metrics without data are
+    left out."""
+    if not rpns:
+        return {}
+
+    step = 1
+    point_range = ":".join(lqencode(str(x)) for x in (fromtime, untiltime, step, max_entries))
+    columns = [f"rrddata:m{nr}:{rpn}:{point_range}" for nr, rpn in enumerate(rpns, 1)]
+
+    lql = livestatus_lql([host_name], columns, service_description) + "OutputFormat: python\n"
+
+    try:
+        response = connection.query_row(lql)
+    except MKLivestatusNotFoundError:
+        return {}
+
+    return {
+        rpn: RRDResponse(range(int(raw_start), int(raw_end), step), values)
+        for rpn, column_response in zip(rpns, response)
+        if column_response
+        for raw_start, raw_end, raw_step, *values in [column_response]
+        if (step := int(raw_step)) != 0
+    }
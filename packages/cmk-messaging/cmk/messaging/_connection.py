@@ -4,6 +4,7 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 """Wrapper for pika connection classes"""
 
+import logging
 import socket
 import ssl
 from collections.abc import Callable, Mapping, Sequence
@@ -17,11 +18,13 @@ import pika.adapters.blocking_connection
 import pika.channel
 import pika.spec
 from pika.exceptions import AMQPConnectionError, StreamLostError
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 from ._config import get_local_port, make_connection_params
 from ._constants import APP_PREFIX, INTERSITE_EXCHANGE, LOCAL_EXCHANGE
 
+_logger = logging.getLogger(__name__)
+
 
 @dataclass(frozen=True)
 class AppName:
@@ -236,11 +239,15 @@ class Channel(Generic[_ModelT]):
         callback: Callable[[Self, DeliveryTag, _ModelT], object],
         *,
         auto_ack: bool = False,
+        drop_invalid: bool = False,
     ) -> NoReturn:
         """Block forever and call the callback for every message received.
 
         This is a combination of pika's `basic_consume` and `start_consuming` methods.
         Currently there's no need to expose these methods separately.
+
+        With `drop_invalid`, messages not matching the model are acknowledged and
+        dropped instead of raising, otherwise they would be delivered again and again.
         """
 
         def _on_message(
@@ -249,11 +256,21 @@ class Channel(Generic[_ModelT]):
             _properties: pika.spec.BasicProperties,
             body: bytes,
         ) -> None:
-            callback(
-                self,
-                DeliveryTag(method.delivery_tag),
-                self._model.model_validate_json(body.decode("utf-8")),
-            )
+            if not drop_invalid:
+                callback(
+                    self,
+                    DeliveryTag(method.delivery_tag),
+                    self._model.model_validate_json(body.decode("utf-8")),
+                )
+                return
+            try:
+                message = self._model.model_validate_json(body)
+            except ValidationError as exc:
+                _logger.warning("Dropping invalid message from queue %s: %s", queue.value, exc)
+                if not auto_ack:
+                    self.acknowledge(DeliveryTag(method.delivery_tag))
+                return
+            callback(self, DeliveryTag(method.delivery_tag), message)
 
         self._pchannel.basic_consume(
             queue=self._make_queue_name(queue),
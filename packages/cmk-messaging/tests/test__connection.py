@@ -12,7 +12,7 @@ import pika.adapters.blocking_connection
 import pika.channel
 import pika.spec
 import pytest
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 from cmk.messaging import AppName, BindingKey, Channel, DeliveryTag, QueueName, RoutingKey
 
@@ -61,6 +61,7 @@ class ChannelTester:
         self.declared_queues: list[Queue] = []
         self.bound_queues: list[Binding] = []
         self.published_messages: list[Published] = []
+        self.acknowledged: list[int] = []
         self.consumer: (
             Callable[
                 [pika.channel.Channel, pika.spec.Basic.Deliver, pika.BasicProperties, bytes], object
@@ -119,7 +120,7 @@ class ChannelTester:
         raise AssertionError("No more messages to consume")
 
     def basic_ack(self, delivery_tag: int, multiple: bool) -> None:
-        pass
+        self.acknowledged.append(delivery_tag)
 
 
 def _make_test_channel() -> tuple[Channel[Message], ChannelTester]:
@@ -223,3 +224,31 @@ class TestChannel:
 
         with pytest.raises(_ConsumedSuccesfully):
             channel.consume(QueueName("ignored-by-this-test"), _on_message)
+
+    @staticmethod
+    def test_consume_raises_on_invalid_message() -> None:
+        channel, test_channel = _make_test_channel()
+        test_channel.basic_publish("cmk.intersite", "my-site.my-app.key", b'{"txt":1}', None)
+
+        def _on_message(*args: object, **kw: Mapping[str, object]) -> None:
+            raise _ConsumedSuccesfully()
+
+        with pytest.raises(ValidationError):
+            channel.consume(QueueName("ignored-by-this-test"), _on_message)
+        assert not test_channel.acknowledged
+
+    @staticmethod
+    def test_consume_drops_invalid_message() -> None:
+        channel, test_channel = _make_test_channel()
+        test_channel.basic_publish("cmk.intersite", "my-site.my-app.key", b'{"txt":1}', None)
+        channel.publish_for_site("other_site", Message(text="valid"), routing=RoutingKey("key"))
+
+        def _on_message(
+            _channel: Channel[Message], _delivery_tag: DeliveryTag, received: Message
+        ) -> None:
+            assert received == Message(text="valid")
+            raise _ConsumedSuccesfully()
+
+        with pytest.raises(_ConsumedSuccesfully):
+            channel.consume(QueueName("ignored-by-this-test"), _on_message, drop_invalid=True)
+        assert test_channel.acknowledged == [42]
@@ -24,6 +24,9 @@ from cmk.fetchers.snmp_backend import (  # pylint: disable=cmk-module-layer-viol
     ClassicSNMPBackend,
     StoredWalkSNMPBackend,
 )
+from cmk.fetchers.snmp_backend.pysnmp_backend import (  # pylint: disable=cmk-module-layer-violation
+    PySNMPBackend,
+)
 
 if edition(cmk.utils.paths.omd_root) is not Edition.CRE:
     from cmk.fetchers.cee.snmp_backend.inline import (  # type: ignore[import,unused-ignore] # pylint: disable=import-error,no-name-in-module,cmk-module-layer-violation
@@ -56,6 +59,8 @@ match backend_type:
         backend = partial(
             StoredWalkSNMPBackend, path=Path(cmk.utils.paths.snmpwalks_dir) / config.hostname
         )
+    case SNMPBackendEnum.PYSNMP:
+        backend = PySNMPBackend
     case _:
         raise ValueError(backend_type)
 
@@ -68,7 +73,7 @@ print(
                 backend=backend(config, logger),
                 log=logger.debug,
             ),
-            snmp_cache.single_oid_cache(),
+            dict(snmp_cache.single_oid_cache()),
         )
     )
 )
@@ -28,6 +28,9 @@ from cmk.fetchers.snmp_backend import (  # pylint: disable=cmk-module-layer-viol
     ClassicSNMPBackend,
     StoredWalkSNMPBackend,
 )
+from cmk.fetchers.snmp_backend.pysnmp_backend import (  # pylint: disable=cmk-module-layer-violation
+    PySNMPBackend,
+)
 
 if edition(cmk.utils.paths.omd_root) is not Edition.CRE:
     from cmk.fetchers.cee.snmp_backend.inline import (  # type: ignore[import,unused-ignore] # pylint: disable=import-error,no-name-in-module,cmk-module-layer-violation
@@ -54,6 +57,8 @@ match backend_type:
         backend = partial(
             StoredWalkSNMPBackend, path=Path(cmk.utils.paths.snmpwalks_dir) / config.hostname
         )
+    case SNMPBackendEnum.PYSNMP:
+        backend = PySNMPBackend
     case _:
         raise ValueError(backend_type)
 
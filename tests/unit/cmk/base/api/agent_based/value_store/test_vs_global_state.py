@@ -18,13 +18,11 @@ from cmk.agent_based.v1.value_store import get_value_store, set_value_store_mana
 
 def test_load_host_value_store_loads_file(monkeypatch: MonkeyPatch) -> None:
     service_id = ServiceID(CheckPluginName("test_service"), None)
-    raw_content = (
-        '[[["test_load_host_value_store_loads_file", "test_service", null, "loaded_file"], "True"]]'
-    )
+    raw_content = b'[[["test_load_host_value_store_loads_file", "test_service", null, "loaded_file"], "True"]]'
 
     monkeypatch.setattr(
         store,
-        "load_text_from_file",
+        "load_bytes_from_file",
         lambda *_a, **_kw: raw_content,
     )
 
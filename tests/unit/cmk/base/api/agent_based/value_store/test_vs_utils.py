@@ -3,6 +3,9 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import datetime
+import logging
+import time
 from ast import literal_eval
 from pathlib import Path
 from unittest.mock import Mock
@@ -16,8 +19,11 @@ from cmk.utils.hostaddress import HostName
 from cmk.checkengine.checking import CheckPluginName, ServiceID
 
 from cmk.base.api.agent_based.value_store._utils import (
+    _deserialize,
     _DiskSyncedMapping,
     _DynamicDiskSyncedMapping,
+    _ServiceChanges,
+    _ServiceValues,
     _StaticDiskSyncedMapping,
     _ValueStore,
     ValueStoreManager,
@@ -25,6 +31,8 @@ from cmk.base.api.agent_based.value_store._utils import (
 
 _TEST_KEY = ("check", "item", "user-key")
 
+logger = logging.getLogger(__name__)
+
 
 class Test_DynamicDiskSyncedMapping:
     @staticmethod
@@ -87,14 +95,14 @@ class Test_StaticDiskSyncedMapping:
 
         mocker.patch.object(
             store,
-            "load_text_from_file",
-            side_effect=lambda *a, **kw: stored_item_states,
+            "load_bytes_from_file",
+            side_effect=lambda *a, **kw: stored_item_states.encode(),
         )
 
     def _mock_store(self, mocker):
         mocker.patch.object(
             store,
-            "save_text_to_file",
+            "save_bytes_to_file",
             autospec=True,
         )
 
@@ -105,8 +113,8 @@ class Test_StaticDiskSyncedMapping:
         return _StaticDiskSyncedMapping(
             path=tmp_path / "test-host",
             log_debug=lambda msg: None,
-            serializer=repr,
-            deserializer=literal_eval,
+            serializer=lambda data: repr(data).encode(),
+            deserializer=lambda raw: literal_eval(raw.decode()),
         )
 
     def test_mapping_features(self, mocker: Mock, tmp_path: Path) -> None:
@@ -140,8 +148,8 @@ class Test_StaticDiskSyncedMapping:
             ("check1", None, "stored-user-key-1"): 23,
             ("check3", "el Barto", "Ay caramba"): "ASDF",
         }
-        written = store.save_text_to_file.call_args.args[1]  # type: ignore[attr-defined]
-        assert written == repr(expected_values)
+        written = store.save_bytes_to_file.call_args.args[1]  # type: ignore[attr-defined]
+        assert written == repr(expected_values).encode()
         assert list(sdsm.items()) == list(expected_values.items())
 
 
@@ -219,8 +227,8 @@ class Test_ValueStore:
         host_name = HostName("moritz")
         return _ValueStore(
             data={
-                (host_name, "check1", "item", "key1"): "42",
-                (host_name, "check2", "item", "key2"): "23",
+                (host_name, "check1", "item"): {"key1": "42"},
+                (host_name, "check2", "item"): '["moritz", "check2", "item"]\t{"key2": 23}',
             },
             service_id=(CheckPluginName("check1"), "item"),
             host_name=host_name,
@@ -236,9 +244,66 @@ class Test_ValueStore:
         with pytest.raises(TypeError):
             s_store[2] = "key must be string!"  # type: ignore[index]
 
+    def test_values_are_loaded_lazily(self) -> None:
+        s_store = _ValueStore(
+            data={
+                ("moritz", "check1", "item"): "never loaded",
+                ("moritz", "check2", "item"): '["moritz", "check2", "item"]\t{"key2": 23}',
+            },
+            service_id=(CheckPluginName("check2"), "item"),
+            host_name=HostName("moritz"),
+        )
+        assert s_store["key2"] == 23
+
+    def test_values_are_marked_as_changed(self) -> None:
+        raw = '["moritz", "check1", "item"]\t{"key1": 42, "key4": 0}'
+        data: dict[tuple[str, str, str | None], _ServiceValues] = {
+            ("moritz", "check1", "item"): raw,
+        }
+        s_store = _ValueStore(
+            data=data, service_id=(CheckPluginName("check1"), "item"), host_name=HostName("moritz")
+        )
+        assert s_store["key1"] == 42
+        assert data.get(("moritz", "check1", "item")) is raw
+
+        del s_store["key1"]
+        s_store["key2"] = (1, 2.0)
+        s_store["key3"] = HostName("heute")
+
+        assert data[("moritz", "check1", "item")] == _ServiceChanges(
+            {"key2": {"t": [1, 2.0]}, "key3": "heute", "key4": 0},
+            loaded_from=raw,
+            updated={"key2", "key3"},
+            removed={"key1"},
+        )
+        assert s_store["key2"] == (1, 2.0)
+        assert s_store["key3"] == "heute"
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            None,
+            True,
+            23,
+            4.2,
+            "heute",
+            (1, 2.0),
+            [(1, 2), [3]],
+            {"a": (1,), "b": {"c": None}},
+            {1: "a", (2, 3): frozenset({4})},
+            {b"bytes"},
+        ],
+    )
+    def test_values_keep_their_types(self, value: object) -> None:
+        s_store = self._get_store()
+        s_store["key"] = value
+        loaded = s_store["key"]
+        assert loaded == value
+        assert repr(loaded) == repr(value)
+
     def test_serialization_happens_in_plugin_scope(self) -> None:
         s_store = self._get_store()
-        s_store["key"] = float("inf")  # gets serialized here
+        s_store["key"] = datetime.date(2024, 1, 1)  # gets serialized here
         with pytest.raises(ValueError):
             _ = s_store["key"]  # deserialization failes here, not upon loading the store.
 
@@ -264,3 +329,94 @@ class TestValueStoreManager:
             assert vsm.active_service_interface["key"] == "outer"
 
         assert vsm.active_service_interface is None
+
+    @staticmethod
+    def test_save_and_load(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(ValueStoreManager, "STORAGE_PATH", tmp_path)
+        services = [ServiceID(CheckPluginName("plugin"), f"item{n}") for n in range(3)]
+
+        vsm = ValueStoreManager(HostName("test-host"))
+        for n, service in enumerate(services):
+            with vsm.namespace(service):
+                assert vsm.active_service_interface is not None
+                vsm.active_service_interface["counter"] = (n, float(n))
+        vsm.save()
+
+        stored_before = _deserialize((tmp_path / "test-host").read_bytes())
+
+        vsm = ValueStoreManager(HostName("test-host"))
+        with vsm.namespace(services[1]):
+            assert vsm.active_service_interface is not None
+            assert dict(vsm.active_service_interface) == {"counter": (1, 1.0)}
+            vsm.active_service_interface["counter"] = (23, 42.0)
+        vsm.save()
+
+        stored_after = _deserialize((tmp_path / "test-host").read_bytes())
+        assert (
+            stored_after[("test-host", "plugin", "item0")]
+            == (stored_before[("test-host", "plugin", "item0")])
+        )
+        vsm = ValueStoreManager(HostName("test-host"))
+        for service, expected in zip(services, [(0, 0.0), (23, 42.0), (2, 2.0)]):
+            with vsm.namespace(service):
+                assert vsm.active_service_interface is not None
+                assert vsm.active_service_interface["counter"] == expected
+
+    @staticmethod
+    def test_concurrent_changes_are_merged_per_key(
+        tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(ValueStoreManager, "STORAGE_PATH", tmp_path)
+        service = ServiceID(CheckPluginName("plugin"), "item")
+
+        vsm = ValueStoreManager(HostName("test-host"))
+        with vsm.namespace(service):
+            assert vsm.active_service_interface is not None
+            vsm.active_service_interface.update({"a": 1, "b": 2, "c": 3})
+        vsm.save()
+
+        vsm_1 = ValueStoreManager(HostName("test-host"))
+        vsm_2 = ValueStoreManager(HostName("test-host"))
+        with vsm_1.namespace(service):
+            assert vsm_1.active_service_interface is not None
+            vsm_1.active_service_interface["a"] = 10
+        with vsm_2.namespace(service):
+            assert vsm_2.active_service_interface is not None
+            vsm_2.active_service_interface["b"] = 20
+            del vsm_2.active_service_interface["c"]
+        vsm_1.save()
+        vsm_2.save()
+
+        vsm = ValueStoreManager(HostName("test-host"))
+        with vsm.namespace(service):
+            assert vsm.active_service_interface is not None
+            assert dict(vsm.active_service_interface) == {"a": 10, "b": 20}
+
+    @staticmethod
+    @pytest.mark.slow
+    def test_benchmark_many_services(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(ValueStoreManager, "STORAGE_PATH", tmp_path)
+        services = [ServiceID(CheckPluginName("if64"), f"{n}") for n in range(4000)]
+
+        durations = []
+        for _cycle in range(3):
+            start = time.perf_counter()
+            vsm = ValueStoreManager(HostName("switch"))
+            for service in services:
+                with vsm.namespace(service):
+                    assert vsm.active_service_interface is not None
+                    value_store = vsm.active_service_interface
+                    for counter in ("in_octets", "out_octets", "in_errors", "out_errors"):
+                        rate = value_store.get(counter, (0.0, 0))[1]
+                        value_store[counter] = (time.time(), rate + 1)
+            vsm.save()
+            durations.append(time.perf_counter() - start)
+
+        logger.info(
+            "Check cycles of 4000 services with 4 counters each: %s",
+            ", ".join(f"{d:.3f}s" for d in durations),
+        )
+        vsm = ValueStoreManager(HostName("switch"))
+        with vsm.namespace(services[-1]):
+            assert vsm.active_service_interface is not None
+            assert vsm.active_service_interface["in_octets"][1] == 3
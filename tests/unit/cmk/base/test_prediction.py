@@ -7,15 +7,27 @@
 
 import datetime
 import math
+import os
 import time
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Iterator, Sequence
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
 import pytest
 import time_machine
 
-from cmk.utils.prediction import _grouping, _prediction, DataStat, PredictionStore
+from livestatus import RRDResponse
+
+from cmk.utils.prediction import (
+    _grouping,
+    _prediction,
+    DataStat,
+    make_updated_predictions,
+    PredictionCache,
+    PredictionStore,
+)
+
+from cmk.agent_based.prediction_backend import PredictionInfo, PredictionParameters
 
 Timestamp = int
 
@@ -235,3 +247,113 @@ class TestPredictionStore:
         assert stillok_hour.exists()
         assert not too_old_minute.exists()
         assert stillok_minute.exists()
+
+
+class TestPredictionCache:
+    now = 1543402800
+
+    @pytest.fixture(autouse=True)
+    def _clear_loaded(self) -> Iterator[None]:
+        PredictionCache._loaded.clear()
+        yield
+        PredictionCache._loaded.clear()
+
+    def _write_info(
+        self, store: PredictionStore, levels: tuple[float, float], age_ns: int = 10**9
+    ) -> PredictionInfo:
+        meta = PredictionInfo(
+            valid_interval=(self.now - 3600, self.now + 3600),
+            metric="load15",
+            direction="upper",
+            params=PredictionParameters(period="hour", horizon=2, levels=("stdev", levels)),
+        )
+        info_file = store.path / store.relative_data_file(meta).with_suffix(".info")
+        info_file.parent.mkdir(parents=True, exist_ok=True)
+        info_file.write_text(meta.model_dump_json())
+        os.utime(info_file, ns=(time.time_ns(), time.time_ns() - age_ns))
+        return meta
+
+    @staticmethod
+    def _update(store: PredictionStore, fetched: list[int]) -> None:
+        def get_recorded_data(rpns: Sequence[str], start: int, end: int) -> dict[str, RRDResponse]:
+            fetched.append(start)
+            return {rpn: RRDResponse(range(start, end, 3600), [1.0] * 24) for rpn in rpns}
+
+        make_updated_predictions(store, get_recorded_data, TestPredictionCache.now)
+
+    def test_valid_prediction_is_not_recomputed(self, tmp_path: Path) -> None:
+        self._write_info(PredictionStore(tmp_path / "service"), (2, 4))
+        fetched: list[int] = []
+
+        self._update(PredictionStore(tmp_path / "service"), fetched)
+        assert len(fetched) == 2
+
+        self._update(PredictionStore(tmp_path / "service"), fetched)
+        assert len(fetched) == 2
+
+    def test_cached_prediction_needs_no_data_file(self, tmp_path: Path) -> None:
+        store = PredictionStore(tmp_path / "service", PredictionCache(tmp_path))
+        meta = self._write_info(store, (2, 4))
+        fetched: list[int] = []
+
+        self._update(store, fetched)
+        PredictionCache(tmp_path).write()
+        assert (tmp_path / PredictionCache.FILE_NAME).exists()
+        store._data_file(meta).unlink()
+        PredictionCache._loaded.clear()
+
+        self._update(PredictionStore(tmp_path / "service", PredictionCache(tmp_path)), fetched)
+        assert len(fetched) == 2
+
+    def test_changed_info_file_invalidates_cache(self, tmp_path: Path) -> None:
+        store = PredictionStore(tmp_path / "service", PredictionCache(tmp_path))
+        self._write_info(store, (2, 4))
+        fetched: list[int] = []
+        self._update(store, fetched)
+
+        store = PredictionStore(tmp_path / "service", PredictionCache(tmp_path))
+        self._write_info(store, (3, 5), age_ns=-(10**9))
+        self._update(store, fetched)
+
+        assert len(fetched) == 4
+        assert [
+            meta.params.levels for meta, _prediction in store.iter_all_valid_predictions(self.now)
+        ] == [("stdev", (3.0, 5.0))]
+
+    def test_cache_drops_expired_predictions(self, tmp_path: Path) -> None:
+        store = PredictionStore(tmp_path / "service", PredictionCache(tmp_path))
+        self._write_info(store, (2, 4))
+        self._update(store, [])
+
+        PredictionCache(tmp_path).update({}, self.now + 3600)
+        PredictionCache(tmp_path).write()
+        PredictionCache._loaded.clear()
+
+        assert not PredictionCache(tmp_path).load()
+
+    def test_updates_are_written_per_host(self, tmp_path: Path) -> None:
+        for service in ("service1", "service2"):
+            store = PredictionStore(tmp_path / "host" / service, PredictionCache(tmp_path / "host"))
+            self._write_info(store, (2, 4))
+            self._update(store, [])
+        assert not (tmp_path / "host" / PredictionCache.FILE_NAME).exists()
+
+        # Checking the next host
+        PredictionCache(tmp_path / "other").load()
+
+        PredictionCache._loaded.clear()
+        assert sorted(PredictionCache(tmp_path / "host").load()) == [
+            "service1/load15/hour-1543399200-upper.info",
+            "service2/load15/hour-1543399200-upper.info",
+        ]
+
+    def test_least_recently_used_hosts_are_dropped(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(PredictionCache, "MAX_LOADED_HOSTS", 2)
+        for host in ("host1", "host2", "host1", "host3"):
+            PredictionCache(tmp_path / host).load()
+
+        assert list(PredictionCache._loaded) == [
+            tmp_path / host / PredictionCache.FILE_NAME for host in ("host1", "host3")
+        ]
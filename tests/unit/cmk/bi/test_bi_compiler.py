@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import copy
+import logging
+import multiprocessing
+import time
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from livestatus import SiteId
+
+from cmk.utils.hostaddress import HostName
+from cmk.utils.tags import TagGroupID, TagID
+
+import cmk.bi.compiler
+from cmk.bi.compiler import BICompilationReport, BICompiler
+from cmk.bi.data_fetcher import BIStructureFetcher, SiteProgramStart
+from cmk.bi.lib import BIHostData
+from cmk.bi.sample_configs import bi_sample_config
+
+from .bi_test_data import sample_config
+from .conftest import DUMMY_SITES_CALLBACK, MockBIAggregationPack
+
+logger = logging.getLogger(__name__)
+
+
+def _sample_config(num_aggregations: int) -> dict[str, Any]:
+    config: dict[str, Any] = copy.deepcopy(bi_sample_config)
+    pack = config["packs"][0]
+    sample_aggregation = pack["aggregations"][0]
+    sample_aggregation["computation_options"]["disabled"] = False
+    pack["aggregations"] = []
+    for n in range(num_aggregations):
+        aggregation = copy.deepcopy(sample_aggregation)
+        aggregation["id"] = f"aggregation_{n}"
+        pack["aggregations"].append(aggregation)
+    return config
+
+
+def _host_regex_config(patterns: Sequence[str]) -> dict[str, Any]:
+    config = _sample_config(len(patterns))
+    for aggregation, pattern in zip(config["packs"][0]["aggregations"], patterns):
+        aggregation["node"]["search"]["conditions"]["host_choice"] = {
+            "type": "host_name_regex",
+            "pattern": pattern,
+        }
+    return config
+
+
+def _hosts(num_hosts: int) -> dict[str, BIHostData]:
+    structure_fetcher = BIStructureFetcher(DUMMY_SITES_CALLBACK)
+    structure_fetcher.add_site_data(SiteId("heute"), sample_config.bi_structure_states)
+    heute = structure_fetcher.hosts["heute"]
+    return {
+        f"host{n}": heute._replace(
+            name=HostName(f"host{n}"), tags={(TagGroupID("tcp"), TagID("tcp"))}
+        )
+        for n in range(num_hosts)
+    }
+
+
+def _compiler(
+    num_aggregations: int,
+    num_hosts: int,
+    compilation_processes: int,
+    min_aggregations_per_process: int = 1,
+) -> BICompiler:
+    hosts = _hosts(num_hosts)
+    compiler = BICompiler(
+        "bi.mk", DUMMY_SITES_CALLBACK, compilation_processes, min_aggregations_per_process
+    )
+    compiler._bi_packs = MockBIAggregationPack(_sample_config(num_aggregations))
+    compiler.bi_searcher.set_hosts(hosts)
+    return compiler
+
+
+def _compile(compiler: BICompiler) -> dict[str, Any]:
+    return {
+        aggr_id: (compiled_aggregation.serialize(), search_dependencies)
+        for aggr_id, (compiled_aggregation, search_dependencies) in compiler.compile_aggregations(
+            compiler._bi_packs.get_all_aggregations()
+        ).items()
+    }
+
+
+def test_parallel_compilation() -> None:
+    sequential = _compile(_compiler(4, 3, 1))
+    parallel = _compile(_compiler(4, 3, 2))
+
+    assert list(parallel) == [f"aggregation_{n}" for n in range(4)]
+    assert parallel == sequential
+    compiled_aggregation, search_dependencies = parallel["aggregation_0"]
+    assert len(compiled_aggregation["branches"]) == 3
+    assert search_dependencies.hosts == {"host0", "host1", "host2"}
+
+
+def test_sequential_compilation_below_threshold(monkeypatch: pytest.MonkeyPatch) -> None:
+    def no_fork(method: str) -> None:
+        raise AssertionError("No processes must be forked")
+
+    monkeypatch.setattr(multiprocessing, "get_context", no_fork)
+    # Two processes would get less than the minimum of three aggregations each
+    assert list(_compile(_compiler(5, 3, 2, 3))) == [f"aggregation_{n}" for n in range(5)]
+
+
+@pytest.mark.slow
+def test_benchmark_parallel_compilation() -> None:
+    durations = {}
+    for compilation_processes in (1, 4):
+        compiler = _compiler(16, 200, compilation_processes)
+        start = time.perf_counter()
+        compiler.compile_aggregations(compiler._bi_packs.get_all_aggregations())
+        durations[compilation_processes] = time.perf_counter() - start
+
+    logger.info(
+        "Compilation of 16 aggregations of 200 hosts: %s",
+        ", ".join(f"{d:.3f}s with {p} processes" for p, d in durations.items()),
+    )
+
+
+_CompileIncrementally = Callable[[dict[str, Any], dict[str, BIHostData], int], BICompilationReport]
+
+
+@pytest.fixture(name="compile_incrementally")
+def _compile_incrementally(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> _CompileIncrementally:
+    monkeypatch.setattr(cmk.bi.compiler, "path_compiled_aggregations", tmp_path / "compiled")
+    monkeypatch.setattr(cmk.bi.compiler, "frozen_aggregations_dir", tmp_path / "frozen")
+    (tmp_path / "compiled").mkdir()
+
+    def compile_incrementally(
+        config: dict[str, Any], hosts: dict[str, BIHostData], program_start: int
+    ) -> BICompilationReport:
+        compiler = BICompiler("bi.mk", DUMMY_SITES_CALLBACK)
+        compiler._bi_packs = MockBIAggregationPack(config)
+        compiler._path_compilation_lock = tmp_path / "compilation.LOCK"
+        compiler._path_compilation_timestamp = tmp_path / "last_compilation"
+        compiler._path_compilation_dependencies = tmp_path / "compilation_dependencies"
+
+        site_program_starts = {(SiteId("heute"), program_start)}
+        monkeypatch.setattr(
+            compiler,
+            "compute_current_configstatus",
+            lambda: {
+                "configfile_timestamp": 0.0,
+                "online_sites": site_program_starts,
+                "known_sites": site_program_starts,
+            },
+        )
+        monkeypatch.setattr(compiler, "_compilation_required", lambda configstatus: True)
+        monkeypatch.setattr(compiler, "_generate_part_of_aggregation_lookup", lambda aggrs: None)
+        monkeypatch.setattr(
+            compiler._bi_structure_fetcher, "cleanup_orphaned_files", lambda known_sites: None
+        )
+
+        def prepare_for_compilation(online_sites: set[SiteProgramStart]) -> None:
+            compiler._bi_structure_fetcher.hosts.update(hosts)
+            compiler.bi_searcher.set_hosts(compiler._bi_structure_fetcher.hosts)
+
+        monkeypatch.setattr(compiler, "prepare_for_compilation", prepare_for_compilation)
+
+        compiler.load_compiled_aggregations()
+        assert compiler.compilation_report is not None
+        assert sorted(compiler.compiled_aggregations) == sorted(
+            aggregation["id"] for aggregation in config["packs"][0]["aggregations"]
+        )
+        return compiler.compilation_report
+
+    return compile_incrementally
+
+
+_INITIAL_CONFIG = _host_regex_config(["host0$", "host[1-9]$"])
+
+
+def _initial_compilation(
+    compile_incrementally: _CompileIncrementally,
+) -> dict[str, BIHostData]:
+    hosts = _hosts(3)
+    report = compile_incrementally(_INITIAL_CONFIG, hosts, 1)
+    assert report.compiled == ["aggregation_0", "aggregation_1"]
+    assert not report.reused
+    return hosts
+
+
+def test_incremental_compilation_nothing_changed(
+    compile_incrementally: _CompileIncrementally,
+) -> None:
+    hosts = _initial_compilation(compile_incrementally)
+
+    # A restart of the site without changes of the hosts
+    report = compile_incrementally(_INITIAL_CONFIG, hosts, 2)
+    assert not report.compiled
+    assert report.reused == ["aggregation_0", "aggregation_1"]
+    assert report.changed_hosts == 0
+
+
+def test_incremental_compilation_changed_config(
+    compile_incrementally: _CompileIncrementally,
+) -> None:
+    hosts = _initial_compilation(compile_incrementally)
+
+    config = copy.deepcopy(_INITIAL_CONFIG)
+    config["packs"][0]["aggregations"][1]["comment"] = "changed"
+    report = compile_incrementally(config, hosts, 1)
+    assert report.compiled == ["aggregation_1"]
+    assert report.reused == ["aggregation_0"]
+
+
+def test_incremental_compilation_changed_host(
+    compile_incrementally: _CompileIncrementally,
+) -> None:
+    hosts = _initial_compilation(compile_incrementally)
+
+    hosts["host2"] = hosts["host2"]._replace(alias="changed")
+    report = compile_incrementally(_INITIAL_CONFIG, hosts, 2)
+    assert report.compiled == ["aggregation_1"]
+    assert report.reused == ["aggregation_0"]
+    assert report.changed_hosts == 1
+
+
+def test_incremental_compilation_new_matching_host(
+    compile_incrementally: _CompileIncrementally,
+) -> None:
+    hosts = _initial_compilation(compile_incrementally)
+
+    hosts["host5"] = hosts["host2"]._replace(name=HostName("host5"))
+    report = compile_incrementally(_INITIAL_CONFIG, hosts, 2)
+    assert report.compiled == ["aggregation_1"]
+    assert report.reused == ["aggregation_0"]
+    assert report.changed_hosts == 1
@@ -189,3 +189,39 @@ def test_service_search(
     search = BIServiceSearch(schema_config)
     results = search.execute({}, bi_searcher_with_sample_config)
     assert len(results) == expected_matches
+
+
+def test_record_search_dependencies(bi_searcher_with_sample_config: BISearcher) -> None:
+    schema_config = BIServiceSearch.schema()().dump(
+        {
+            "conditions": {
+                "service_regex": "Interface",
+                "host_choice": {"type": "host_name_regex", "pattern": "heute_cl.*"},
+            }
+        }
+    )
+    search = BIServiceSearch(schema_config)
+    with bi_searcher_with_sample_config.record_dependencies() as dependencies:
+        assert len(search.execute({}, bi_searcher_with_sample_config)) == 4
+
+    assert dependencies.hosts == {"heute_clone"}
+    assert [kind for kind, _argument in dependencies.searches.values()] == ["services"]
+
+    # Nothing is recorded outside of the context
+    search.execute({}, bi_searcher_with_sample_config)
+    assert len(dependencies.searches) == 1
+
+    heute = bi_searcher_with_sample_config.hosts["heute"]
+    changed_hosts_searcher = BISearcher()
+
+    # A changed host not found by the search
+    changed_hosts_searcher.set_hosts({"heute": heute})
+    assert not dependencies.affected_by({"heute"}, changed_hosts_searcher)
+
+    # A changed host found by the search
+    assert dependencies.affected_by({"heute_clone"}, BISearcher())
+
+    # A new host found by the search
+    new_host = heute._replace(name="heute_clone2")
+    changed_hosts_searcher.set_hosts({"heute_clone2": new_host})
+    assert dependencies.affected_by({"heute_clone2"}, changed_hosts_searcher)
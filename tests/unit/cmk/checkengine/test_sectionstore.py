@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import pickle
+from collections.abc import Sequence
+from pathlib import Path
+
+import pytest
+
+from cmk.ccc import store
+
+from cmk.utils.sectionname import SectionName
+
+from cmk.checkengine.parser import SectionStore
+
+Content = Sequence[Sequence[str]]
+
+
+@pytest.fixture(name="section_store")
+def _section_store(tmp_path: Path) -> SectionStore[Content]:
+    return SectionStore[Content](tmp_path / "store", logger=logging.getLogger("test"))
+
+
+def _update(
+    section_store: SectionStore[Content],
+    sections: dict[SectionName, Content],
+    *,
+    now: int = 1000,
+    keep_outdated: bool = True,
+) -> dict[SectionName, Content]:
+    return dict(
+        section_store.update(
+            sections,
+            {},
+            lookup_persist=lambda section_name: (now, now + 60),
+            section_outdated=lambda valid_until, now: valid_until < now,
+            now=now,
+            keep_outdated=keep_outdated,
+        )
+    )
+
+
+def test_store_and_load(section_store: SectionStore[Content]) -> None:
+    sections = {
+        SectionName("one"): (1000, 1060, [["1"]]),
+        SectionName("two"): (1000, 1120, [["2", "2"]]),
+    }
+    section_store.store(dict(sections))
+
+    assert section_store.load() == sections
+
+
+def test_load_missing(section_store: SectionStore[Content]) -> None:
+    assert not section_store.load()
+
+
+def test_load_unpickles_only_accessed_sections(
+    section_store: SectionStore[Content], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    section_store.store(
+        {SectionName(f"section_{nr}"): (1000, 1060, [[str(nr)]]) for nr in range(10)}
+    )
+    unpickled = []
+    loads = pickle.loads
+
+    def counting_loads(data: bytes) -> object:
+        unpickled.append(data)
+        return loads(data)
+
+    monkeypatch.setattr(pickle, "loads", counting_loads)
+
+    persisted_sections = section_store.load()
+
+    assert len(persisted_sections) == 10
+    assert persisted_sections[SectionName("section_3")] == (1000, 1060, [["3"]])
+    assert len(unpickled) == 1
+
+
+def test_update_appends_changed_sections(section_store: SectionStore[Content]) -> None:
+    _update(section_store, {SectionName("one"): [["1"]], SectionName("two"): [["2"]]})
+    raw = section_store.path.read_bytes()
+
+    _update(section_store, {SectionName("two"): [["new"]]}, now=1010)
+
+    assert section_store.path.read_bytes().startswith(raw)
+    assert section_store.load() == {
+        SectionName("one"): (1000, 1060, [["1"]]),
+        SectionName("two"): (1010, 1070, [["new"]]),
+    }
+
+
+def test_update_removes_outdated_sections(section_store: SectionStore[Content]) -> None:
+    _update(section_store, {SectionName("old"): [["old"]]})
+
+    assert _update(
+        section_store, {SectionName("new"): [["new"]]}, now=1100, keep_outdated=False
+    ) == {
+        SectionName("new"): [["new"]],
+    }
+    assert section_store.load() == {SectionName("new"): (1100, 1160, [["new"]])}
+
+
+def test_superseded_records_are_compacted(section_store: SectionStore[Content]) -> None:
+    content = [["x" * 100]]
+    for now in range(1000, 1100):
+        _update(section_store, {SectionName("section"): content}, now=now)
+
+    assert section_store.path.stat().st_size < 8192
+    assert section_store.load() == {SectionName("section"): (1099, 1159, content)}
+
+
+def test_incomplete_record_is_ignored(section_store: SectionStore[Content]) -> None:
+    _update(section_store, {SectionName("one"): [["1"]]})
+    with section_store.path.open("ab") as file:
+        file.write(b"\x03\x00\x00")
+
+    assert section_store.load() == {SectionName("one"): (1000, 1060, [["1"]])}
+
+    _update(section_store, {SectionName("two"): [["2"]]})
+
+    assert section_store.load() == {
+        SectionName("one"): (1000, 1060, [["1"]]),
+        SectionName("two"): (1000, 1060, [["2"]]),
+    }
+
+
+def test_load_pickled_sections(section_store: SectionStore[Content]) -> None:
+    store.save_object_to_pickle_file(section_store.path, {"one": (1000, 1060, [["1"]])})
+
+    assert section_store.load() == {SectionName("one"): (1000, 1060, [["1"]])}
+
+    _update(section_store, {SectionName("two"): [["2"]]})
+
+    assert section_store.load() == {
+        SectionName("one"): (1000, 1060, [["1"]]),
+        SectionName("two"): (1000, 1060, [["2"]]),
+    }
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from typing import NoReturn
+
+import pytest
+
+from tests.unit.cmk.ec.helpers import new_event
+
+from cmk.utils.hostaddress import HostName
+
+import cmk.ec.export as ec
+from cmk.ec.config import Count, MatchGroups, ServiceLevel
+from cmk.ec.event_store import EventStore
+from cmk.ec.main import EventServer, EventStatus
+
+RULE = ec.Rule(
+    actions=[],
+    actions_in_downtime=True,
+    autodelete=False,
+    cancel_action_phases="always",
+    cancel_actions=[],
+    comment="",
+    description="",
+    disabled=False,
+    docu_url="",
+    id="counting",
+    invert_matching=False,
+    sl=ServiceLevel(precedence="message", value=0),
+    state=2,
+)
+
+COUNT = Count(
+    count=1000000,
+    period=3600,
+    algorithm="interval",
+    count_duration=None,
+    count_ack=False,
+    separate_host=True,
+    separate_application=False,
+    separate_match_groups=False,
+)
+
+
+def _event(rule_id: str, host: str, event_id: int | None = None) -> ec.Event:
+    event = new_event(
+        ec.Event(
+            rule_id=rule_id,
+            host=HostName(host),
+            core_host=HostName(host),
+            host_in_downtime=False,
+        )
+    )
+    if event_id is not None:
+        event["id"] = event_id
+    return event
+
+
+def test_event_store_lookups() -> None:
+    events = [
+        _event("a", "h1", 1),
+        _event("b", "h1", 2),
+        _event("a", "h2", 3),
+        _event("a", "h1", 4),
+    ]
+    store = EventStore(events)
+
+    assert len(store) == 4
+    assert list(store) == events
+    assert store.get(3) is events[2]
+    assert store.get(5) is None
+    assert store.oldest() is events[0]
+    assert store.by_rule("a") == [events[0], events[2], events[3]]
+    assert store.by_host("h1") == [events[0], events[1], events[3]]
+    assert store.by_breed("a", "h1") == [events[0], events[3]]
+    assert store.oldest_of_rule("b") is events[1]
+    assert store.oldest_of_host("h2") is events[2]
+
+    store.remove(events[0])
+    assert events[0] not in store
+    assert store.oldest() is events[1]
+    assert store.by_breed("a", "h1") == [events[3]]
+    with pytest.raises(KeyError):
+        store.remove(events[0])
+
+
+def test_event_store_reindex_keeps_age_order() -> None:
+    events = [_event("a", "h1", 1), _event("a", "h2", 2), _event("a", "h2", 3)]
+    store = EventStore(events)
+
+    events[0]["host"] = HostName("h2")
+    store.reindex(events[0])
+
+    assert store.by_host("h1") == []
+    assert store.by_host("h2") == events
+    assert store.oldest_of_host("h2") is events[0]
+    assert store.by_breed("a", "h2") == events
+
+
+def test_count_event_with_changed_host_is_reindexed(
+    event_status: EventStatus, event_server: EventServer
+) -> None:
+    count = Count(**{**COUNT, "separate_host": False})
+    event_status.count_event(event_server, _event("counting", "h1"), count)
+    event_status.count_event(event_server, _event("counting", "h2"), count)
+
+    (event,) = event_status.events()
+    assert event["count"] == 2
+    assert event["host"] == "h2"
+    assert event_status.num_existing_events_by_host == {
+        ("h1", HostName("h1")): 0,
+        ("h2", HostName("h2")): 1,
+    }
+
+    event_status.delete_events_of_host("h2", "")
+    assert not event_status.events()
+    assert event_status.num_existing_events_by_host[("h2", HostName("h2"))] == 0
+
+
+def test_delete_events_by_id(event_status: EventStatus) -> None:
+    for num in range(3):
+        event_status.new_event(_event("rule", f"host-{num}"))
+
+    event_status.delete_events_by_id([1, 3, 4711], "me")
+
+    assert [event["id"] for event in event_status.events()] == [2]
+
+
+def test_event_processing_does_not_scan_open_events(
+    event_status: EventStatus, event_server: EventServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Counting and cancelling only look at events of the same rule and host"""
+    for num in range(10):
+        event_status.count_event(event_server, _event("counting", f"host-{num}"), COUNT)
+    for num in range(1000):
+        event_status.new_event(_event(f"other-rule-{num % 100}", f"other-host-{num}"))
+
+    def no_scan(self: EventStore) -> NoReturn:
+        raise AssertionError("All open events are looked at")
+
+    looked_at = []
+
+    def by_breed(self: EventStore, rule_id: str, host: str) -> list[ec.Event]:
+        looked_at.extend(events := original_by_breed(self, rule_id, host))
+        return events
+
+    original_by_breed = EventStore.by_breed
+    monkeypatch.setattr(EventStore, "__iter__", no_scan)
+    monkeypatch.setattr(EventStore, "to_list", no_scan)
+    monkeypatch.setattr(EventStore, "by_breed", by_breed)
+
+    event_status.count_event(event_server, _event("counting", "host-3"), COUNT)
+    event_status.cancel_events(
+        event_server,
+        [],
+        _event("counting", "unrelated-host"),
+        MatchGroups(match_groups_message_ok=()),
+        RULE,
+    )
+
+    assert [(e["rule_id"], e["host"], e["count"]) for e in looked_at] == [("counting", "host-3", 2)]
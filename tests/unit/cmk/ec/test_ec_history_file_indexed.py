@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""EC History file backend with sidecar indexes"""
+
+import logging
+from collections.abc import Sequence
+from typing import Any
+
+import pytest
+
+from cmk.utils.hostaddress import HostName
+
+import cmk.ec.export as ec
+import cmk.ec.history_file_indexed
+from cmk.ec.config import Config
+from cmk.ec.history import History
+from cmk.ec.history_file import convert_history_line, FileHistory, INDEX_SUFFIX
+from cmk.ec.history_file_indexed import IndexedFileHistory
+from cmk.ec.main import create_history, StatusTableEvents, StatusTableHistory
+from cmk.ec.query import Columns, QueryGET
+
+
+@pytest.fixture(name="history_indexed")
+def fixture_history_indexed(
+    settings: ec.Settings, config: Config, monkeypatch: pytest.MonkeyPatch
+) -> IndexedFileHistory:
+    # Small blocks, so that the tests need only a few lines for several blocks
+    monkeypatch.setattr(cmk.ec.history_file_indexed, "BLOCK_SIZE", 10)
+    history = create_history(
+        settings,
+        config | {"archive_mode": "file_indexed"},
+        logging.getLogger("cmk.mkeventd"),
+        StatusTableEvents.columns,
+        StatusTableHistory.columns,
+    )
+    assert isinstance(history, IndexedFileHistory)
+    return history
+
+
+def _add_events(history: FileHistory, num: int, offset: int = 0) -> None:
+    for nr in range(offset, offset + num):
+        history.add(
+            ec.Event(
+                id=nr,
+                host=HostName(f"host{nr % 7}"),
+                core_host=HostName(f"host{nr % 7}"),
+                rule_id=f"rule{nr % 3}",
+                phase="open" if nr % 5 else "closed",
+                text=f"Event {nr}",
+            ),
+            "NEW" if nr % 2 else "DELETE",
+        )
+
+
+def _query(history: History, *headers: str) -> list[Sequence[object]]:
+    logger = logging.getLogger("cmk.mkeventd")
+    table = StatusTableHistory(logger, history)
+    query = QueryGET(lambda name: table, ["GET history", *headers], logger)
+    return list(table.query(query))[1:]
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        (),
+        ("Filter: event_host = host3",),
+        ("Filter: event_host =~ HOST3", "Filter: event_phase = closed"),
+        ("Filter: event_host in host1 HOST2",),
+        ("Filter: event_id = 42",),
+        ("Filter: event_id > 40", "Filter: event_id <= 45"),
+        ("Filter: event_rule_id ~ rule[12]", "Filter: history_what = NEW"),
+        ("Filter: event_host = unknown",),
+        ("Filter: event_text ~~ EVENT 1", "Limit: 5"),
+        ("Filter: history_time > 0", "Limit: 15"),
+        ("Filter: history_time < 0",),
+    ],
+)
+def test_same_result_as_file_history(
+    history: FileHistory, history_indexed: IndexedFileHistory, headers: tuple[str, ...]
+) -> None:
+    _add_events(history, 95)
+
+    result = _query(history_indexed, *headers)
+
+    assert result == _query(history, *headers)
+
+
+def test_index_is_updated_incrementally(
+    settings: ec.Settings, history_indexed: IndexedFileHistory
+) -> None:
+    _add_events(history_indexed, 25)
+    assert len(_query(history_indexed)) == 25
+    (logfile,) = settings.paths.history_dir.value.glob("*.log")
+    assert logfile.with_suffix(INDEX_SUFFIX).exists()
+
+    _add_events(history_indexed, 10, offset=25)
+
+    rows = _query(history_indexed, "Columns: history_line event_id", "Filter: event_id >= 20")
+    assert rows == [[line, line - 1] for line in range(35, 20, -1)]
+
+
+def test_index_is_rebuilt_for_changed_logfile(
+    settings: ec.Settings, config: Config, history_indexed: IndexedFileHistory
+) -> None:
+    _add_events(history_indexed, 25)
+    _query(history_indexed)
+    history_indexed.close()
+
+    (logfile,) = settings.paths.history_dir.value.glob("*.log")
+    logfile.write_bytes(b"".join(logfile.read_bytes().splitlines(keepends=True)[:3]))
+    # A new instance has to rely on the index file only
+    new_history = create_history(
+        settings,
+        config | {"archive_mode": "file_indexed"},
+        logging.getLogger("cmk.mkeventd"),
+        StatusTableEvents.columns,
+        StatusTableHistory.columns,
+    )
+
+    assert [row[0] for row in _query(new_history, "Columns: event_id")] == [2, 1, 0]
+
+
+def test_limit_stops_parsing_early(
+    history_indexed: IndexedFileHistory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _add_events(history_indexed, 95)
+    parsed_lines: list[object] = []
+
+    def counting_convert_history_line(columns: Columns, values: list[Any]) -> None:
+        parsed_lines.append(values[0])
+        convert_history_line(columns, values)
+
+    monkeypatch.setattr(
+        cmk.ec.history_file_indexed, "convert_history_line", counting_convert_history_line
+    )
+
+    assert len(_query(history_indexed, "Limit: 3")) == 3
+    assert len(parsed_lines) == 3
+
+    parsed_lines.clear()
+    assert len(_query(history_indexed, "Filter: event_id = 12")) == 1
+    # Only the block with the event has been read
+    assert len(parsed_lines) == 10
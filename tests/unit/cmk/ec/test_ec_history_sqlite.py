@@ -6,15 +6,19 @@
 
 import logging
 import sqlite3
+import time
 from collections.abc import Iterator
+from pathlib import Path
 
 import pytest
 
 from cmk.utils.hostaddress import HostName
 
 import cmk.ec.export as ec
-from cmk.ec.history_sqlite import filters_to_sqlite_query, SQLiteHistory
-from cmk.ec.main import StatusTableHistory
+from cmk.ec.config import Config
+from cmk.ec.history_sqlite import filters_to_sqlite_query, SQLiteHistory, SQLiteSettings
+from cmk.ec.main import StatusTableEvents, StatusTableHistory
+from cmk.ec.perfcounters import Perfcounters
 from cmk.ec.query import QueryFilter, QueryGET, StatusTable
 
 
@@ -208,6 +212,7 @@ def test_housekeeping(history_sqlite: SQLiteHistory) -> None:
     event2 = ec.Event(host=HostName("ABC2"), text="Event2 text", core_host=HostName("ABC"))
     history_sqlite.add(event=event1, what="NEW")
     history_sqlite.add(event=event2, what="NEW")
+    history_sqlite.write_pending()
 
     with history_sqlite.conn as connection:
         cur = connection.cursor()
@@ -218,3 +223,190 @@ def test_housekeeping(history_sqlite: SQLiteHistory) -> None:
         history_sqlite.housekeeping()
         cur.execute("SELECT count(*) FROM history;")
         assert cur.fetchone()["count(*)"] == 1
+
+
+def _history_sqlite(
+    settings: ec.Settings,
+    config: Config,
+    perfcounters: Perfcounters,
+    database: Path | None = None,
+    *,
+    batch_size: int = 1000,
+    flush_interval: int = 1,
+) -> SQLiteHistory:
+    return SQLiteHistory(
+        SQLiteSettings.from_settings(settings, database=database or ":memory:"),
+        config
+        | {
+            "archive_mode": "sqlite",
+            "sqlite_batch_size": batch_size,
+            "sqlite_flush_interval": flush_interval,
+        },
+        logging.getLogger("cmk.mkeventd"),
+        StatusTableEvents.columns,
+        StatusTableHistory.columns,
+        perfcounters,
+    )
+
+
+def _num_rows(history: SQLiteHistory) -> int:
+    return int(history.conn.execute("SELECT count(*) FROM history;").fetchone()[0])
+
+
+def _counters(perfcounters: Perfcounters) -> dict[str, float]:
+    return {
+        name: value
+        for (name, _default), value in zip(perfcounters.status_columns(), perfcounters.get_status())
+    }
+
+
+def _get_all(history: SQLiteHistory) -> list[sqlite3.Row]:
+    logger = logging.getLogger("cmk.mkeventd")
+    query = QueryGET(
+        lambda name: StatusTableHistory(logger, history),
+        ["GET history", "Columns: history_what event_host"],
+        logger,
+    )
+    return list(history.get(query))  # type: ignore[arg-type]
+
+
+def test_add_is_written_in_batches(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters
+) -> None:
+    history = _history_sqlite(settings, config, perfcounters, batch_size=3, flush_interval=3600)
+
+    for num in range(2):
+        history.add(ec.Event(host=HostName(f"host{num}"), text="text"), "NEW")
+    assert _num_rows(history) == 0
+
+    history.add(ec.Event(host=HostName("host2"), text="text"), "NEW")
+    assert _num_rows(history) == 3
+    assert _counters(perfcounters)["status_history_writes"] == 3
+    assert _counters(perfcounters)["status_history_stalls"] == 1
+
+
+def test_add_is_written_after_flush_interval(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters
+) -> None:
+    history = _history_sqlite(settings, config, perfcounters, flush_interval=0)
+
+    history.add(ec.Event(host=HostName("host"), text="text"), "NEW")
+
+    assert _num_rows(history) == 1
+    assert _counters(perfcounters)["status_history_stalls"] == 0
+
+
+def test_add_is_written_without_further_entries(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters
+) -> None:
+    history = _history_sqlite(settings, config, perfcounters, flush_interval=1)
+
+    history.add(ec.Event(host=HostName("host"), text="text"), "NEW")
+    assert _num_rows(history) == 0
+
+    deadline = time.time() + 10
+    while _num_rows(history) == 0 and time.time() < deadline:
+        time.sleep(0.1)
+    assert _num_rows(history) == 1
+    history.close()
+
+
+def test_get_includes_pending_entries(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters
+) -> None:
+    history = _history_sqlite(settings, config, perfcounters, flush_interval=3600)
+    event = ec.Event(host=HostName("host"), text="text", contact_groups=["group"])
+
+    history.add(event, "NEW")
+    # The buffered entry must not change with the event
+    event["host"] = HostName("other")
+    event["contact_groups"].append("other")  # type: ignore[union-attr]
+
+    (row,) = _get_all(history)
+    assert row["host"] == "host"
+    assert row["contact_groups"] == ["group"]
+
+
+def test_flush_discards_pending_entries(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters
+) -> None:
+    history = _history_sqlite(settings, config, perfcounters, flush_interval=3600)
+    history.add(ec.Event(host=HostName("host1"), text="text"), "NEW")
+    history.write_pending()
+    history.add(ec.Event(host=HostName("host2"), text="text"), "NEW")
+
+    history.flush()
+
+    assert not _get_all(history)
+
+
+def test_close_writes_pending_entries(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters, tmp_path: Path
+) -> None:
+    database = tmp_path / "history.sqlite"
+    history = _history_sqlite(settings, config, perfcounters, database, flush_interval=3600)
+    history.add(ec.Event(host=HostName("host"), text="text"), "NEW")
+
+    history.close()
+
+    history = _history_sqlite(settings, config, perfcounters, database)
+    assert _num_rows(history) == 1
+    history.close()
+
+
+def test_failed_writes_are_retried_with_delay(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters
+) -> None:
+    history = _history_sqlite(settings, config, perfcounters, flush_interval=0)
+    history.conn.execute("ALTER TABLE history RENAME TO history_gone;")
+    write_pending = history.write_pending
+    attempts = []
+
+    def _counting_write_pending() -> None:
+        attempts.append(time.monotonic())
+        write_pending()
+
+    history.write_pending = _counting_write_pending  # type: ignore[method-assign]
+
+    history.add(ec.Event(host=HostName("host"), text="text"), "NEW")
+    time.sleep(0.5)
+
+    # The add itself and the first attempt of the timer, then it waits
+    assert len(attempts) <= 2
+    history.close()
+
+
+def test_failed_writes_are_bounded(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters
+) -> None:
+    history = _history_sqlite(settings, config, perfcounters, batch_size=2, flush_interval=3600)
+    history.conn.execute("ALTER TABLE history RENAME TO history_gone;")
+
+    for num in range(25):
+        history.add(ec.Event(host=HostName(f"host{num}"), text="text"), "NEW")
+
+    counters = _counters(perfcounters)
+    assert counters["status_history_writes"] == 0
+    assert counters["status_history_drops"] == 5
+
+    # Once the database can be written again, the remaining entries are kept
+    history.conn.execute("ALTER TABLE history_gone RENAME TO history;")
+    assert [row["host"] for row in _get_all(history)] == [f"host{num}" for num in range(5, 25)]
+
+
+def test_add_performance(
+    settings: ec.Settings, config: Config, perfcounters: Perfcounters, tmp_path: Path
+) -> None:
+    """A syslog burst must not be slowed down by a commit per history entry"""
+    history = _history_sqlite(settings, config, perfcounters, tmp_path / "history.sqlite")
+    events = [ec.Event(host=HostName(f"host{num}"), text=f"text {num}") for num in range(10000)]
+
+    before = time.time()
+    for event in events:
+        history.add(event, "NEW")
+    history.write_pending()
+    duration = time.time() - before
+
+    assert _num_rows(history) == 10000
+    assert duration < 1.0
+    history.close()
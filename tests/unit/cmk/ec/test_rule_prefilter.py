@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import itertools
+import re
+
+import pytest
+
+from livestatus import SiteId
+
+from cmk.utils.hostaddress import HostName
+
+import cmk.ec.export as ec
+import cmk.ec.rule_prefilter
+from cmk.ec.rule_prefilter import AhoCorasick, regex_condition, RulePrefilter
+
+
+def test_aho_corasick_finds_overlapping_words() -> None:
+    assert AhoCorasick(["he", "she", "his", "hers"]).find_all("ushers") == {"he", "she", "hers"}
+    assert AhoCorasick(["abc", "bcd", "c"]).find_all("xabcdx") == {"abc", "bcd", "c"}
+    assert not AhoCorasick(["abc"]).find_all("ab bc")
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (r"^web\d+", {("prefix", "web")}),
+        (r"\AWeb", {("prefix", "web")}),
+        (r"(?m)^abc", {("substring", "abc")}),
+        (r"Disk (\w+) FAILED", {("substring", " failed")}),
+        (r"x?yz", {("substring", "yz")}),
+        (r"abc(?!xyz)", {("substring", "abc")}),
+        (r"^db|^web", {("prefix", "db"), ("prefix", "web")}),
+        (r"(error|warning)", {("substring", "error"), ("substring", "warning")}),
+        (r"a|.*", None),
+        (r"(?:foo)+", None),
+        (r"[abc]\d", None),
+        (r"Kühlung", {("substring", "hlung")}),
+    ],
+)
+def test_regex_condition(pattern: str, expected: set[tuple[str, str]] | None) -> None:
+    condition = regex_condition(re.compile(pattern, re.IGNORECASE))
+    assert (
+        None if condition is None else {(literal.kind, literal.value) for literal in condition}
+    ) == expected
+
+
+def test_regex_condition_without_regex_parser(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(cmk.ec.rule_prefilter, "sre_parser", None)
+    assert regex_condition(re.compile("^web")) is None
+    # Only the plain string patterns are used
+    assert [rule["id"] for rule in RulePrefilter(RULES, None).candidates(EVENTS[0])] == [
+        "regex-host",
+        "cancel-application",
+        "cancelling",
+        "anything",
+        "inverted",
+        "case-insensitive",
+    ]
+
+
+def _rule(rule_id: str, **conditions: object) -> ec.Rule:
+    rule = ec.Rule(id=rule_id, pack="pack", state=0)
+    rule.update(conditions)  # type: ignore[typeddict-item]
+    ec.compile_rule(rule)
+    return rule
+
+
+RULES = [
+    _rule("exact-host", match_host="Web01", match="down"),
+    _rule("regex-host", match_host="^db[0-9]+$", match="(error|warning)"),
+    _rule("application", match_application="sshd", match="Failed password"),
+    _rule("cancel-application", match_application="^kernel", cancel_application="watchdog"),
+    _rule("cancelling", match="link (down|flapping)", match_ok="link up"),
+    _rule("anything"),
+    _rule("inverted", match="heartbeat", invert_matching=True),
+    _rule("umlaut", match="Kühlung ausgefallen"),
+    _rule("case-insensitive", match="Kel+vin"),
+]
+
+EVENTS = [
+    ec.Event(
+        host=HostName(host),
+        ipaddress="127.0.0.1",
+        application=application,
+        text=text,
+        facility=1,
+        priority=3,
+    )
+    for host, application, text in itertools.product(
+        ["web01", "WEB01", "db17", "db", "other"],
+        ["sshd", "kernel", "watchdog", "", "Kernel-watchdog"],
+        [
+            "",
+            "Interface down",
+            "disk ERROR on /dev/sda",
+            "Failed password for root",
+            "link flapping",
+            "LINK UP again",
+            "heartbeat",
+            "KÜHLUNG AUSGEFALLEN",
+            "\u212aelvin",  # KELVIN SIGN, matches "k" case insensitively
+        ],
+    )
+]
+
+
+@pytest.mark.parametrize("event", EVENTS)
+def test_prefilter_keeps_all_matching_rules(event: ec.Event) -> None:
+    matcher = ec.RuleMatcher(None, SiteId("test_site"), lambda time_period_name: True)
+    matching = [
+        rule["id"]
+        for rule in RULES
+        if isinstance(matcher.event_rule_matches(rule, event), ec.MatchSuccess)
+    ]
+
+    candidates = [rule["id"] for rule in RulePrefilter(RULES, None).candidates(event)]
+
+    assert [rule_id for rule_id in candidates if rule_id in matching] == matching
+
+
+def test_prefilter_skips_rules() -> None:
+    prefilter = RulePrefilter(RULES, None)
+    event = ec.Event(
+        host=HostName("web01"), application="sshd", text="Interface down", facility=1, priority=3
+    )
+
+    assert [rule["id"] for rule in prefilter.candidates(event)] == [
+        "exact-host",
+        "anything",
+        "inverted",
+    ]
+    assert prefilter.stats.events == 1
+    assert prefilter.stats.rules_before == len(RULES)
+    assert prefilter.stats.rules_after == 3
+
+
+def test_prefilter_respects_rule_hash() -> None:
+    prefilter = RulePrefilter(RULES, {1: {3: [RULES[0], RULES[5]]}})
+    event = ec.Event(
+        host=HostName("web01"), application="", text="Interface down", facility=1, priority=3
+    )
+
+    assert [rule["id"] for rule in prefilter.candidates(event)] == ["exact-host", "anything"]
+    assert not prefilter.candidates(event | {"priority": 2})
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+
+import asyncio
+import bisect
+import dataclasses
+import logging
+import re
+import threading
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+import pytest
+from pysnmp.carrier.asyncio.dgram import udp  # type: ignore[import-untyped]
+from pysnmp.entity import config, engine  # type: ignore[import-untyped]
+from pysnmp.entity.rfc3413 import cmdrsp, context  # type: ignore[import-untyped]
+from pysnmp.proto import rfc1902, rfc1905  # type: ignore[import-untyped]
+from pysnmp.smi import instrum  # type: ignore[import-untyped]
+
+from cmk.ccc.exceptions import MKGeneralException, MKSNMPError
+
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from cmk.snmplib import SNMPBackendEnum, SNMPHostConfig, SNMPVersion
+
+from cmk.fetchers.snmp import make_backend
+from cmk.fetchers.snmp_backend import pysnmp_backend, StoredWalkSNMPBackend
+from cmk.fetchers.snmp_backend._utils import strip_snmp_value
+from cmk.fetchers.snmp_backend.pysnmp_backend import PySNMPBackend
+
+WALK = """\
+.1.3.6.1.2.1.1.1.0 "Linux zeus 4.8.6.5-smp #2 SMP Sun Nov 13 14:58:11 CDT 2016 i686"
+.1.3.6.1.2.1.1.2.0 .1.3.6.1.4.1.8072.3.2.10
+.1.3.6.1.2.1.1.3.0 546876
+.1.3.6.1.2.1.1.4.0 "root@localhost"
+.1.3.6.1.2.1.1.5.0 "zeus"
+.1.3.6.1.2.1.2.1.0 2
+.1.3.6.1.2.1.2.2.1.1.1 1
+.1.3.6.1.2.1.2.2.1.1.2 2
+.1.3.6.1.2.1.2.2.1.2.1 "lo"
+.1.3.6.1.2.1.2.2.1.2.2 "eth0"
+.1.3.6.1.2.1.2.2.1.6.1 ""
+.1.3.6.1.2.1.2.2.1.6.2 "00 0C 29 A1 B2 C3 "
+.1.3.6.1.2.1.2.2.1.10.1 1234567
+.1.3.6.1.2.1.2.2.1.10.2 4294967295
+.1.3.6.1.2.1.2.2.1.14.1 -3
+.1.3.6.1.2.1.4.20.1.1.10.0.0.1 10.0.0.1
+.1.3.6.1.2.1.4.20.1.1.127.0.0.1 127.0.0.1
+.1.3.6.1.4.1.2021.10.1.2.1 "Load-1"
+.1.3.6.1.4.1.2021.10.1.3.1 "0.08"
+"""
+
+WALKED_OIDS = [
+    ".1.3.6.1.2.1.1",
+    ".1.3.6.1.2.1.2.2.1.2",
+    ".1.3.6.1.2.1.2.2.1.6",
+    ".1.3.6.1.2.1.2.2.1.10",
+    ".1.3.6.1.2.1.2.2.1.14",
+    ".1.3.6.1.2.1.4.20.1.1",
+    ".1.3.6.1.2.1.1.5.0",
+    ".1.3.6.1.2.1.2.2.1.99",
+    ".1.3.6.1.4.1.2021",
+    ".1.3.6.1.4.1.9999",
+    ".1.3.6.1",
+]
+
+SINGLE_OIDS = [
+    ".1.3.6.1.2.1.1.1.0",
+    ".1.3.6.1.2.1.1.2.0",
+    ".1.3.6.1.2.1.2.2.1.6.2",
+    ".1.3.6.1.2.1.2.2.1.6.1",
+    ".1.3.6.1.2.1.1.9.0",
+    ".1.3.6.1.2.1.1.*",
+    ".1.3.6.1.2.1.2.2.1.10.*",
+    ".1.3.6.1.4.1.9999.*",
+]
+
+
+def _typed_value(raw: str) -> object:
+    """Guess the SNMP type of a value in a stored walk"""
+    if raw.startswith('"'):
+        return rfc1902.OctetString(strip_snmp_value(raw))
+    if re.fullmatch(r"(\.\d+)+", raw):
+        return rfc1902.ObjectIdentifier(raw[1:])
+    if re.fullmatch(r"-?\d+", raw):
+        return rfc1902.Counter32(raw) if int(raw) >= 2**31 else rfc1902.Integer32(raw)
+    if re.fullmatch(r"\d+\.\d+\.\d+\.\d+", raw):
+        return rfc1902.IpAddress(raw)
+    return rfc1902.OctetString(raw.encode())
+
+
+class _StoredWalkInstrumentation(instrum.AbstractMibInstrumController):  # type: ignore[misc]
+    """Serves the OIDs of a stored walk"""
+
+    def __init__(self, walk: str) -> None:
+        self._values: dict[tuple[int, ...], object] = {}
+        for line in walk.splitlines():
+            oid, raw = line.split(" ", 1)
+            self._values[tuple(int(part) for part in oid.strip(".").split("."))] = _typed_value(raw)
+        self._oids = sorted(self._values)
+
+    def readVars(
+        self, varBinds: Sequence[tuple[Any, Any]], acInfo: object = (None, None)
+    ) -> list[tuple[Any, Any]]:
+        return [
+            (name, self._values.get(tuple(name), rfc1905.noSuchInstance)) for name, _ in varBinds
+        ]
+
+    def readNextVars(
+        self, varBinds: Sequence[tuple[Any, Any]], acInfo: object = (None, None)
+    ) -> list[tuple[Any, Any]]:
+        var_binds = []
+        for name, _value in varBinds:
+            position = bisect.bisect_right(self._oids, tuple(name))
+            if position == len(self._oids):
+                var_binds.append((name, rfc1905.endOfMibView))
+            else:
+                oid = self._oids[position]
+                var_binds.append((rfc1902.ObjectName(oid), self._values[oid]))
+        return var_binds
+
+
+def _serve(walk: str, started: threading.Event, ports: list[int]) -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    async def setup() -> None:
+        snmp_engine = engine.SnmpEngine()
+        transport = udp.UdpTransport().openServerMode(("127.0.0.1", 0))
+        config.addTransport(snmp_engine, udp.domainName, transport)
+        config.addV1System(snmp_engine, "area", "public")
+        config.addV3User(
+            snmp_engine,
+            "authPrivUser",
+            config.usmHMACSHAAuthProtocol,
+            "A_long_authKey",
+            config.usmAesCfb128Protocol,
+            "A_long_privKey",
+        )
+        for security_model, security_name, security_level in [
+            (1, "area", "noAuthNoPriv"),
+            (2, "area", "noAuthNoPriv"),
+            (3, "authPrivUser", "authPriv"),
+        ]:
+            config.addVacmUser(snmp_engine, security_model, security_name, security_level, (1,))
+        snmp_context = context.SnmpContext(snmp_engine)
+        snmp_context.unregisterContextName(b"")
+        snmp_context.registerContextName(b"", _StoredWalkInstrumentation(walk))
+        cmdrsp.GetCommandResponder(snmp_engine, snmp_context)
+        cmdrsp.NextCommandResponder(snmp_engine, snmp_context)
+        cmdrsp.BulkCommandResponder(snmp_engine, snmp_context)
+        _udp_transport, _protocol = await transport._lport
+        ports.append(_udp_transport.get_extra_info("sockname")[1])
+        started.set()
+
+    loop.run_until_complete(setup())
+    loop.run_forever()
+
+
+@pytest.fixture(name="simulator_port", scope="module")
+def fixture_simulator_port() -> Iterator[int]:
+    """A local SNMP agent serving the stored walk"""
+    started = threading.Event()
+    ports: list[int] = []
+    threading.Thread(target=_serve, args=(WALK, started, ports), daemon=True).start()
+    assert started.wait(10)
+    yield ports[0]
+
+
+@pytest.fixture(name="stored_walk")
+def fixture_stored_walk(tmp_path: Path) -> StoredWalkSNMPBackend:
+    (tmp_path / "zeus").write_text(WALK)
+    return StoredWalkSNMPBackend(_config(port=161), logging.getLogger("test"), tmp_path / "zeus")
+
+
+def _config(port: int, **kwargs: Any) -> SNMPHostConfig:
+    return dataclasses.replace(
+        SNMPHostConfig(
+            is_ipv6_primary=False,
+            hostname=HostName("zeus"),
+            ipaddress=HostAddress("127.0.0.1"),
+            credentials="public",
+            port=port,
+            bulkwalk_enabled=True,
+            snmp_version=SNMPVersion.V2C,
+            bulk_walk_size_of=3,
+            timing={"timeout": 1, "retries": 1},
+            oid_range_limits={},
+            snmpv3_contexts=[],
+            character_encoding=None,
+            snmp_backend=SNMPBackendEnum.PYSNMP,
+        ),
+        **kwargs,
+    )
+
+
+CONFIGS: Mapping[str, Mapping[str, Any]] = {
+    "v1": {"snmp_version": SNMPVersion.V1},
+    "v2c-getnext": {"bulkwalk_enabled": False},
+    "v2c-bulk": {},
+    "v2c-bulk-large": {"bulk_walk_size_of": 100},
+    "v3": {
+        "snmp_version": SNMPVersion.V3,
+        "credentials": (
+            "authPriv",
+            "sha",
+            "authPrivUser",
+            "A_long_authKey",
+            "AES",
+            "A_long_privKey",
+        ),
+    },
+}
+
+
+@pytest.mark.parametrize("config_name", CONFIGS)
+def test_same_walks_as_stored_walk(
+    simulator_port: int, stored_walk: StoredWalkSNMPBackend, config_name: str
+) -> None:
+    backend = PySNMPBackend(
+        _config(simulator_port, **CONFIGS[config_name]), logging.getLogger("test")
+    )
+
+    for oid in WALKED_OIDS:
+        assert backend.walk(oid, context="") == stored_walk.walk(oid, context=""), oid
+
+
+@pytest.mark.parametrize("config_name", CONFIGS)
+def test_same_values_as_stored_walk(
+    simulator_port: int, stored_walk: StoredWalkSNMPBackend, config_name: str
+) -> None:
+    backend = PySNMPBackend(
+        _config(simulator_port, **CONFIGS[config_name]), logging.getLogger("test")
+    )
+
+    for oid in SINGLE_OIDS:
+        assert backend.get(oid, context="") == stored_walk.get(oid, context=""), oid
+
+
+def test_walk_many(simulator_port: int, stored_walk: StoredWalkSNMPBackend) -> None:
+    backend = PySNMPBackend(
+        _config(simulator_port, timing={"max_concurrent_requests": 3}), logging.getLogger("test")
+    )
+
+    assert backend.max_concurrent_requests == 3
+    assert backend.walk_many(WALKED_OIDS, context="") == [
+        stored_walk.walk(oid, context="") for oid in WALKED_OIDS
+    ]
+
+
+def test_new_event_loop(simulator_port: int, stored_walk: StoredWalkSNMPBackend) -> None:
+    backend = PySNMPBackend(_config(simulator_port), logging.getLogger("test"))
+    assert backend.walk_many(WALKED_OIDS[:2], context="")
+
+    assert pysnmp_backend._loop is not None
+    pysnmp_backend._loop.close()
+
+    assert backend.walk_many(WALKED_OIDS[:2], context="") == [
+        stored_walk.walk(oid, context="") for oid in WALKED_OIDS[:2]
+    ]
+
+
+def test_unreachable_host() -> None:
+    backend = PySNMPBackend(
+        _config(1, timing={"timeout": 0.1, "retries": 0}), logging.getLogger("test")
+    )
+
+    assert backend.get(".1.3.6.1.2.1.1.1.0", context="") is None
+    with pytest.raises(MKSNMPError):
+        backend.walk(".1.3.6.1.2.1.1", context="")
+
+
+def test_wrong_community(simulator_port: int) -> None:
+    backend = PySNMPBackend(
+        _config(simulator_port, credentials="wrong", timing={"timeout": 0.1, "retries": 0}),
+        logging.getLogger("test"),
+    )
+
+    assert backend.get(".1.3.6.1.2.1.1.1.0", context="") is None
+
+
+@pytest.mark.parametrize(
+    "credentials",
+    [
+        ("authPriv", "md4", "user", "authkey", "AES", "privkey"),
+        ("authPriv", "sha", "user", "authkey", "3DES", "privkey"),
+        ("authPriv", "sha", "user"),
+    ],
+)
+def test_invalid_credentials(credentials: tuple[str, ...]) -> None:
+    backend = PySNMPBackend(
+        _config(161, snmp_version=SNMPVersion.V3, credentials=credentials),
+        logging.getLogger("test"),
+    )
+
+    with pytest.raises(MKGeneralException):
+        backend._auth_data()
+
+
+def test_make_backend() -> None:
+    assert isinstance(
+        make_backend(_config(161), logging.getLogger("test"), stored_walk_path=Path("/")),
+        PySNMPBackend,
+    )
@@ -6,13 +6,35 @@
 # pylint: disable=protected-access
 
 import logging
+import os
 from pathlib import Path
 
 import pytest
 
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from cmk.snmplib import SNMPBackendEnum, SNMPHostConfig, SNMPVersion
+
 import cmk.fetchers.snmp_backend._utils as utils
+import cmk.fetchers.snmp_backend.stored_walk
 from cmk.fetchers.snmp_backend import StoredWalkSNMPBackend
 
+SNMP_CONFIG = SNMPHostConfig(
+    is_ipv6_primary=False,
+    hostname=HostName("bob"),
+    ipaddress=HostAddress("1.2.3.4"),
+    credentials="public",
+    port=42,
+    bulkwalk_enabled=True,
+    snmp_version=SNMPVersion.V2C,
+    bulk_walk_size_of=0,
+    timing={},
+    oid_range_limits={},
+    snmpv3_contexts=[],
+    character_encoding=None,
+    snmp_backend=SNMPBackendEnum.STORED_WALK,
+)
+
 
 @pytest.mark.parametrize(
     "value,expected",
@@ -29,21 +51,6 @@ def test_strip_snmp_value(value: str, expected: bytes) -> None:
 
 @pytest.mark.usefixtures("create_files")
 class TestStoredWalkSNMPBackend:
-    @pytest.mark.parametrize(
-        "a, b, result",
-        [
-            ("1.2.3", "1.2.3", 0),
-            ("1.2.3", ".1.2.3", 0),
-            (".1.2.3", "1.2.3", 0),
-            (".1.2.3", ".1.2.3", 0),
-            ("1.2.3", "1.2.3.4", 0),
-            ("1.2.3.4", "1.2.3", 1),
-            ("1.2.3", "4.5.6", -1),
-        ],
-    )
-    def test_compare_oids(self, a: str, b: str, result: int) -> None:
-        assert StoredWalkSNMPBackend._compare_oids(a, b) == result
-
     def test_read_walk_data(self, tmpdir: Path) -> None:
         assert StoredWalkSNMPBackend.read_walk_from_path(
             tmpdir / "walkdata" / "1.txt", logging.getLogger("test")
@@ -58,6 +65,88 @@ class TestStoredWalkSNMPBackend:
             ".1.2.5 test\n",
         ]
 
+    def test_walk(self, tmp_path: Path) -> None:
+        path = tmp_path / "walk"
+        path.write_text('.1.2.3 foo\n.1.2.10.1 "a"\n.1.2.10.2 b\n.1.2.100 c\n.1.2.9.1 d\n.1.3 e\n')
+        backend = StoredWalkSNMPBackend(SNMP_CONFIG, logging.getLogger("test"), path)
+
+        assert backend.walk(".1.2.10", context="") == [(".1.2.10.1", b"a"), (".1.2.10.2", b"b")]
+        assert backend.walk("1.2.9", context="") == [(".1.2.9.1", b"d")]
+        assert backend.walk(".1.2.3", context="") == [(".1.2.3", b"foo")]
+        assert backend.walk(".1.2.*", context="") == [(".1.2.3", b"foo")]
+        assert [oid for oid, _value in backend.walk(".1.2", context="")] == [
+            ".1.2.3",
+            ".1.2.9.1",
+            ".1.2.10.1",
+            ".1.2.10.2",
+            ".1.2.100",
+        ]
+        assert not backend.walk(".1.2.4", context="")
+        assert not backend.walk(".1.4", context="")
+
+    def test_get(self, tmp_path: Path) -> None:
+        path = tmp_path / "walk"
+        path.write_text(".1.2.3 foo\n.1.2.3.1 bar\n.1.2.4 baz\n")
+        backend = StoredWalkSNMPBackend(SNMP_CONFIG, logging.getLogger("test"), path)
+
+        assert backend.get(".1.2.4", context="") == b"baz"
+        assert backend.get(".1.2.3.1", context="") == b"bar"
+        assert backend.get(".1.2.*", context="") == b"foo"
+        # Only OIDs below the prefix, not the prefix itself
+        assert backend.get(".1.2.3.*", context="") == b"bar"
+        assert backend.walk(".1.2.3.*", context="") == [(".1.2.3.1", b"bar")]
+        assert backend.get(".1.2.4.*", context="") is None
+        # Not an exact match, there are OIDs below it
+        assert backend.get(".1.2.3", context="") is None
+        assert backend.get(".1.2.5", context="") is None
+        assert backend.get(".1.2.5.*", context="") is None
+
+    def test_walk_file_is_parsed_once(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        path = tmp_path / "walk"
+        path.write_text(".1.2.3 foo\n.1.2.4 bar\n")
+        backend = StoredWalkSNMPBackend(SNMP_CONFIG, logging.getLogger("test"), path)
+        read_paths = []
+        read_walk_from_path = StoredWalkSNMPBackend.read_walk_from_path
+
+        def counting_read_walk_from_path(path: Path, logger: logging.Logger) -> list[str]:
+            read_paths.append(path)
+            return list(read_walk_from_path(path, logger))
+
+        monkeypatch.setattr(
+            StoredWalkSNMPBackend, "read_walk_from_path", staticmethod(counting_read_walk_from_path)
+        )
+
+        for _ in range(3):
+            assert backend.get(".1.2.3", context="") == b"foo"
+            assert backend.walk(".1.2", context="") == [(".1.2.3", b"foo"), (".1.2.4", b"bar")]
+        assert read_paths == [path]
+
+        # Another backend for the same file uses the cached walk
+        other_backend = StoredWalkSNMPBackend(SNMP_CONFIG, logging.getLogger("test"), path)
+        assert other_backend.get(".1.2.4", context="") == b"bar"
+        assert read_paths == [path]
+
+        path.write_text(".1.2.3 changed\n")
+        os.utime(path, ns=(0, 0))
+        assert backend.get(".1.2.3", context="") == b"changed"
+        assert backend.get(".1.2.4", context="") is None
+        assert read_paths == [path, path]
+
+    def test_walk_cache_is_bounded(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(cmk.fetchers.snmp_backend.stored_walk, "_WALK_CACHE_SIZE", 2)
+        for nr in range(5):
+            path = tmp_path / f"walk{nr}"
+            path.write_text(f".1.2.3 {nr}\n")
+            backend = StoredWalkSNMPBackend(SNMP_CONFIG, logging.getLogger("test"), path)
+            assert backend.get(".1.2.3", context="") == str(nr).encode()
+
+        assert list(cmk.fetchers.snmp_backend.stored_walk._WALK_CACHE) == [
+            tmp_path / "walk3",
+            tmp_path / "walk4",
+        ]
+
 
 @pytest.fixture
 def create_files(tmpdir):
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+import time_machine
+
+from cmk.ccc import store
+
+from cmk.utils.hostaddress import HostAddress, HostName
+
+import cmk.fetchers._snmpcache as snmp_cache
+
+OID_SYS_DESCR = ".1.3.6.1.2.1.1.1.0"
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    snmp_cache._clear_other_hosts_oid_cache(None)
+    yield
+    snmp_cache._clear_other_hosts_oid_cache(None)
+
+
+def _initialize(host_name: str, tmp_path: Path, **kwargs: object) -> snmp_cache.SingleOIDCache:
+    snmp_cache.initialize_single_oid_cache(
+        HostName(host_name),
+        HostAddress("127.0.0.1"),
+        cache_dir=tmp_path,
+        **kwargs,  # type: ignore[arg-type]
+    )
+    return snmp_cache.single_oid_cache()
+
+
+def test_missing_oid_raises_key_error(tmp_path: Path) -> None:
+    cache = _initialize("host", tmp_path)
+
+    with pytest.raises(KeyError):
+        _ = cache[OID_SYS_DESCR]
+
+    cache[OID_SYS_DESCR] = None
+    assert cache[OID_SYS_DESCR] is None
+    assert cache.stats == snmp_cache.SingleOIDCacheStats(hits=1, misses=1)
+
+
+def test_failures_are_forgotten_with_the_next_scan(tmp_path: Path) -> None:
+    _initialize("host", tmp_path)[OID_SYS_DESCR] = None
+
+    cache = _initialize("host", tmp_path)
+
+    assert OID_SYS_DESCR not in cache
+    with pytest.raises(KeyError):
+        _ = cache[OID_SYS_DESCR]
+
+
+def test_caches_of_several_hosts_are_kept(tmp_path: Path) -> None:
+    _initialize("host1", tmp_path)[OID_SYS_DESCR] = "one"
+    _initialize("host2", tmp_path)[OID_SYS_DESCR] = "two"
+
+    assert _initialize("host1", tmp_path)[OID_SYS_DESCR] == "one"
+    assert _initialize("host2", tmp_path)[OID_SYS_DESCR] == "two"
+
+
+def test_cleanup_and_refresh_drop_the_cache(tmp_path: Path) -> None:
+    _initialize("host", tmp_path)[OID_SYS_DESCR] = "descr"
+    snmp_cache.cleanup_host_caches()
+    assert OID_SYS_DESCR not in _initialize("host", tmp_path)
+
+    _initialize("host", tmp_path)[OID_SYS_DESCR] = "descr"
+    assert OID_SYS_DESCR not in _initialize("host", tmp_path, refresh=True)
+
+
+def test_least_recently_used_hosts_are_evicted(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(snmp_cache, "MAX_CACHED_HOSTS", 2)
+    _initialize("host1", tmp_path)[OID_SYS_DESCR] = "one"
+    _initialize("host2", tmp_path)[OID_SYS_DESCR] = "two"
+    _initialize("host1", tmp_path)
+    _initialize("host3", tmp_path)[OID_SYS_DESCR] = "three"
+
+    assert OID_SYS_DESCR in _initialize("host1", tmp_path)
+    assert OID_SYS_DESCR not in _initialize("host2", tmp_path)
+
+
+def test_values_expire(tmp_path: Path) -> None:
+    with time_machine.travel(1000, tick=False) as traveller:
+        cache = _initialize("host", tmp_path, ttl=60)
+        cache[OID_SYS_DESCR] = "descr"
+        traveller.shift(59)
+        assert cache[OID_SYS_DESCR] == "descr"
+        traveller.shift(1)
+        with pytest.raises(KeyError):
+            _ = cache[OID_SYS_DESCR]
+
+    assert cache.stats == snmp_cache.SingleOIDCacheStats(hits=1, misses=1, expired=1)
+
+
+def test_write_and_load(tmp_path: Path) -> None:
+    cache = _initialize("host", tmp_path)
+    cache[OID_SYS_DESCR] = "descr"
+    cache[".1.3.6.1.2.1.1.2.0"] = None
+    snmp_cache.write_single_oid_cache(
+        HostName("host"), HostAddress("127.0.0.1"), cache_dir=tmp_path
+    )
+    snmp_cache._clear_other_hosts_oid_cache(None)
+
+    loaded = _initialize("host", tmp_path, from_disk=True)
+
+    assert dict(loaded) == {OID_SYS_DESCR: "descr"}
+
+
+def test_load_ignores_expired_and_old_format(tmp_path: Path) -> None:
+    with time_machine.travel(1000, tick=False) as traveller:
+        cache = _initialize("host", tmp_path, ttl=60)
+        cache[OID_SYS_DESCR] = "descr"
+        snmp_cache.write_single_oid_cache(
+            HostName("host"), HostAddress("127.0.0.1"), cache_dir=tmp_path
+        )
+        snmp_cache._clear_other_hosts_oid_cache(None)
+        traveller.shift(60)
+        assert not _initialize("host", tmp_path, from_disk=True)
+
+    store.save_object_to_file(tmp_path / "other.127.0.0.1", {OID_SYS_DESCR: "descr"})
+    assert not _initialize("other", tmp_path, from_disk=True)
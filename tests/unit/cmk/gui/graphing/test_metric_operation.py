@@ -9,7 +9,12 @@ import pytest
 
 from cmk.ccc.exceptions import MKGeneralException
 
-from cmk.gui.graphing._metric_operation import _time_series_math, Operators
+from cmk.gui.graphing._metric_operation import (
+    _time_series_math,
+    op_func_wrapper,
+    Operators,
+    time_series_operators,
+)
 from cmk.gui.time_series import TimeSeries
 
 
@@ -28,3 +33,20 @@ def test__time_series_math_exc_symbol(args: tuple[Literal["%"], list[TimeSeries]
 def test__time_series_math_stable_singles(operator: Operators) -> None:
     test_ts = TimeSeries([0, 180, 60, 6, 5, 10, None, -2, -3.14])
     assert _time_series_math(operator, [test_ts]) == test_ts
+
+
+@pytest.mark.parametrize("operator", ["+", "*", "-", "/", "MAX", "MIN", "AVERAGE", "MERGE"])
+def test__time_series_math_equals_point_wise(operator: Operators) -> None:
+    operands = [
+        TimeSeries([1, None, 0, None, 2.5, -4, 7], (0, 70, 10)),
+        TimeSeries([3, 5, 0, None, None, 2, 0, 9], (0, 80, 10)),
+    ]
+    _op_title, op_func = time_series_operators()[operator]
+    assert _time_series_math(operator, operands) == TimeSeries(
+        [op_func_wrapper(op_func, list(tsp)) for tsp in zip(*operands)], (0, 70, 10)
+    )
+
+
+@pytest.mark.parametrize("operator", ["-", "/"])
+def test__time_series_math_arity(operator: Operators) -> None:
+    assert _time_series_math(operator, [TimeSeries([1, 2], (0, 20, 10))]) is None
@@ -109,6 +109,7 @@ def test_default_config_from_plugins() -> None:
         "log_level",
         "log_rulehits",
         "rule_optimizer",
+        "rule_prefilter",
         "session_mgmt",
         "mkeventd_service_levels",
         "wato_host_tags",
@@ -140,6 +141,7 @@ def test_default_config_from_plugins() -> None:
         "bi_packs",
         "default_bi_layout",
         "bi_layouts",
+        "bi_parallel_compilation",
         "bi_compile_log",
         "bi_precompile_on_demand",
         "bi_use_legacy_compilation",
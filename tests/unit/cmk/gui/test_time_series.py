@@ -4,9 +4,18 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 
+import math
+
+import numpy as np
 import pytest
 
-from cmk.gui.time_series import rrd_timestamps, TimeSeries, TimeSeriesValues, TimeWindow
+from cmk.gui.time_series import (
+    aggregation_functions,
+    rrd_timestamps,
+    TimeSeries,
+    TimeSeriesValues,
+    TimeWindow,
+)
 
 
 @pytest.mark.parametrize(
@@ -79,6 +88,27 @@ def test_time_series_downsampling(
     assert ts.downsample(twindow, cf) == downsampled
 
 
+@pytest.mark.parametrize(
+    "series, aggr, result",
+    [
+        ([], "max", None),
+        ([None, None], "average", None),
+        ([1, None, 3], None, 3),
+        ([1, None, 3], "MIN", 1),
+        ([1, None, 4], "average", 2.5),
+    ],
+)
+def test_aggregation_functions(
+    series: TimeSeriesValues, aggr: str | None, result: float | None
+) -> None:
+    assert aggregation_functions(series, aggr) == result
+
+
+def test_aggregation_functions_invalid() -> None:
+    with pytest.raises(ValueError):
+        aggregation_functions([1], "sum")
+
+
 class TestTimeseries:
     def test_conversion(self) -> None:
         assert TimeSeries(
@@ -93,6 +123,25 @@ class TestTimeseries:
     def test_conversion_noop_default(self) -> None:
         assert TimeSeries([1, 2, 3, 4, None, 5]).values == [4, None, 5]
 
+    def test_values_view(self) -> None:
+        ts = TimeSeries([1.5, None, 3], time_window=(0, 30, 10))
+        assert math.isnan(ts.array[1])
+        assert ts.values == [1.5, None, 3]
+        assert list(ts) == [1.5, None, 3]
+        assert ts[1] is None
+        assert ts[-1] == 3
+
+    def test_values_are_built_once(self) -> None:
+        ts = TimeSeries([1, 2], time_window=(0, 20, 10))
+        assert ts.values is ts.values
+        ts.array = np.array([3.0, math.nan])
+        assert ts.values == [3.0, None]
+
+    def test_values_setter(self) -> None:
+        ts = TimeSeries([1, 2], time_window=(0, 20, 10))
+        ts.values = [None, 4]
+        assert ts == TimeSeries.from_array(np.array([math.nan, 4.0]), (0, 20, 10))
+
     def test_count(self) -> None:
         assert (
             TimeSeries(
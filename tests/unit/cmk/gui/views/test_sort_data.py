@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+
+import logging
+import random
+import time
+
+import pytest
+
+from cmk.gui.type_defs import Row, Rows
+from cmk.gui.views.page_show_view import _sort_data
+from cmk.gui.views.sorter import Sorter, sorter_registry, SorterEntry
+from cmk.gui.views.sorter.sorters import SorterSvcPerfVal01, SorterSvcstate
+
+logger = logging.getLogger(__name__)
+
+
+def _service_row(rnd: random.Random, nr: int) -> Row:
+    return {
+        "site": rnd.choice(["heute", "remote"]),
+        "host_name": f"host{rnd.randrange(100)}",
+        "service_description": rnd.choice(
+            ["Check_MK", "CPU load", "cpu load", f"Interface {nr % 50}", "Memory", "Uptime"]
+        ),
+        "service_state": rnd.randrange(4),
+        "service_has_been_checked": rnd.choice([0, 1, 1, 1]),
+        "service_perf_data": rnd.choice(["", f"load1={rnd.random() * 10:.2f};5;10", "x=abc"]),
+        "JOIN": (
+            {}
+            if nr % 3 == 0
+            else {"CPU load": {"service_state": rnd.randrange(4), "service_has_been_checked": 1}}
+        ),
+    }
+
+
+def _service_rows(count: int) -> Rows:
+    rnd = random.Random(42)
+    return [_service_row(rnd, nr) for nr in range(count)]
+
+
+def _without_key(sorter: Sorter) -> Sorter:
+    return Sorter(
+        ident=sorter.ident,
+        title=sorter.title,
+        columns=sorter.columns,
+        sort_function=sorter.cmp,
+    )
+
+
+def _sorters(with_key: bool) -> list[SorterEntry]:
+    svcdescr = sorter_registry["svcdescr"]
+    sorters = [
+        SorterEntry(SorterSvcstate, negate=True, join_key=None, parameters=None),
+        SorterEntry(svcdescr, negate=False, join_key=None, parameters=None),
+        SorterEntry(SorterSvcPerfVal01, negate=True, join_key=None, parameters=None),
+        SorterEntry(SorterSvcstate, negate=False, join_key="CPU load", parameters=None),
+    ]
+    if with_key:
+        return sorters
+    return [entry._replace(sorter=_without_key(entry.sorter)) for entry in sorters]
+
+
+@pytest.mark.usefixtures("request_context")
+def test_key_sort_equals_cmp_sort() -> None:
+    assert all(entry.sorter.key is not None for entry in _sorters(with_key=True))
+
+    by_key = _service_rows(2000)
+    _sort_data(by_key, _sorters(with_key=True))
+    by_cmp = _service_rows(2000)
+    _sort_data(by_cmp, _sorters(with_key=False))
+
+    assert by_key == by_cmp
+
+
+@pytest.mark.usefixtures("request_context")
+def test_sort_mixed_key_and_cmp_sorters() -> None:
+    sorters = _sorters(with_key=True)
+    sorters[1] = sorters[1]._replace(sorter=_without_key(sorters[1].sorter))
+
+    mixed = _service_rows(2000)
+    _sort_data(mixed, sorters)
+    by_cmp = _service_rows(2000)
+    _sort_data(by_cmp, _sorters(with_key=False))
+
+    assert mixed == by_cmp
+
+
+@pytest.mark.usefixtures("request_context")
+def test_sort_keeps_order_of_equal_rows() -> None:
+    rows: Rows = [{"service_description": "Uptime", "nr": nr} for nr in range(10)]
+
+    _sort_data(
+        rows,
+        [SorterEntry(sorter_registry["svcdescr"], negate=True, join_key=None, parameters=None)],
+    )
+
+    assert [row["nr"] for row in rows] == list(range(10))
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures("request_context")
+def test_benchmark_sort_data() -> None:
+    durations = {}
+    for with_key in (False, True):
+        rows = _service_rows(20000)
+        sorters = _sorters(with_key)
+        start = time.perf_counter()
+        _sort_data(rows, sorters)
+        durations[with_key] = time.perf_counter() - start
+
+    logger.info(
+        "Sorting 20000 rows: %.3fs with cmp, %.3fs with key", durations[False], durations[True]
+    )
+    assert durations[True] < durations[False]
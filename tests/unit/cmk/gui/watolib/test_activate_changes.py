@@ -35,6 +35,7 @@ from cmk.gui.http import Request
 from cmk.gui.watolib import activate_changes
 from cmk.gui.watolib.activate_changes import (
     ActivationCleanupBackgroundJob,
+    ConfigSyncFileHashCache,
     ConfigSyncFileInfo,
     default_rabbitmq_definitions,
 )
@@ -311,6 +312,7 @@ def test_automation_get_config_sync_state(request_context: None) -> None:
             ),
         },
         0,
+        ["gzip"],
     )
 
 
@@ -393,6 +395,72 @@ def test_get_config_sync_file_infos() -> None:
     }
 
 
+def test_get_config_sync_file_infos_with_hash_cache(tmp_path: Path) -> None:
+    base_dir = cmk.utils.paths.omd_root / "replication"
+    _create_get_config_sync_file_infos_test_config(base_dir)
+    for file_path in base_dir.rglob("*"):
+        if file_path.is_file() and not file_path.is_symlink():
+            os.utime(file_path, (1700000000, 1700000000))
+
+    replication_paths = [
+        ReplicationPath("dir", "d4-multiple-files", "etc/d4", []),
+        ReplicationPath("file", "f2", "bla/blub/f2", []),
+    ]
+    cache_path = tmp_path / "hashes"
+
+    hash_cache = ConfigSyncFileHashCache.load(cache_path)
+    sync_infos = activate_changes._get_config_sync_file_infos(
+        replication_paths, base_dir, hash_cache=hash_cache
+    )
+    hash_cache.save(cache_path)
+    assert (hash_cache.hits, hash_cache.misses) == (0, 5)
+    assert sync_infos == activate_changes._get_config_sync_file_infos(replication_paths, base_dir)
+
+    hash_cache = ConfigSyncFileHashCache.load(cache_path)
+    assert (
+        activate_changes._get_config_sync_file_infos(
+            replication_paths, base_dir, hash_cache=hash_cache
+        )
+        == sync_infos
+    )
+    assert (hash_cache.hits, hash_cache.misses) == (5, 0)
+
+
+def test_config_sync_file_hash_cache_detects_changes(tmp_path: Path) -> None:
+    file_path = tmp_path / "file"
+    file_path.write_bytes(b"abc")
+    os.utime(file_path, (1700000000, 1700000000))
+    cache_path = tmp_path / "hashes"
+
+    hash_cache = ConfigSyncFileHashCache.load(cache_path)
+    hash_cache.file_hash(str(file_path), os.stat(file_path))
+    hash_cache.save(cache_path)
+
+    # Same size and mtime, only the ctime tells the file has been changed
+    file_path.write_bytes(b"xyz")
+    os.utime(file_path, (1700000000, 1700000000))
+
+    hash_cache = ConfigSyncFileHashCache.load(cache_path)
+    assert hash_cache.file_hash(
+        str(file_path), os.stat(file_path)
+    ) == activate_changes._create_config_sync_file_hash(str(file_path))
+    assert (hash_cache.hits, hash_cache.misses) == (0, 1)
+
+
+def test_config_sync_file_hash_cache_skips_recently_modified_files(tmp_path: Path) -> None:
+    file_path = tmp_path / "file"
+    file_path.write_bytes(b"abc")
+    cache_path = tmp_path / "hashes"
+
+    hash_cache = ConfigSyncFileHashCache.load(cache_path)
+    hash_cache.file_hash(str(file_path), os.stat(file_path))
+    hash_cache.save(cache_path)
+
+    hash_cache = ConfigSyncFileHashCache.load(cache_path)
+    hash_cache.file_hash(str(file_path), os.stat(file_path))
+    assert (hash_cache.hits, hash_cache.misses) == (0, 1)
+
+
 def _create_get_config_sync_file_infos_test_config(base_dir: Path) -> None:
     base_dir.joinpath("etc/d1").mkdir(parents=True, exist_ok=True)
 
@@ -609,6 +677,51 @@ def test_get_sync_archive(tmp_path: Path) -> None:
         )
 
 
+def test_sync_archives_are_shared(tmp_path: Path) -> None:
+    to_sync = ["etc/abc", "ding"]
+    site_dirs = [tmp_path / "site1", tmp_path / "site2", tmp_path / "site3"]
+    for site_dir, content in zip(site_dirs, ["dong", "dong", "dung"]):
+        site_dir.joinpath("etc").mkdir(parents=True)
+        site_dir.joinpath("etc/abc").write_text("gä")
+        site_dir.joinpath("ding").write_text(content)
+
+    sync_archives = activate_changes.SyncArchives()
+    archives = [
+        sync_archives.get(
+            to_sync,
+            site_dir,
+            activate_changes._get_config_sync_file_infos(
+                [ReplicationPath("dir", "all", "", [])], site_dir
+            ),
+            compress=False,
+        )
+        for site_dir in site_dirs
+    ]
+
+    assert archives[0] is archives[1]
+    assert archives[0] != archives[2]
+    assert (sync_archives.built, sync_archives.reused) == (2, 1)
+    with tarfile.TarFile(mode="r", fileobj=io.BytesIO(archives[2])) as f:
+        member = f.extractfile("ding")
+        assert member is not None
+        assert member.read() == b"dung"
+
+
+def test_unpack_compressed_sync_archive(tmp_path: Path) -> None:
+    _get_test_sync_archive(tmp_path / "central")
+    sync_archive = activate_changes.SyncArchives().get(
+        ["etc/abc", "ding"], tmp_path / "central", {}, compress=True
+    )
+    assert sync_archive.startswith(b"\x1f\x8b")
+
+    remote_path = tmp_path / "remote"
+    remote_path.mkdir()
+    activate_changes._unpack_sync_archive(sync_archive, remote_path)
+
+    assert remote_path.joinpath("etc/abc").read_text() == "gä"
+    assert remote_path.joinpath("ding").read_text() == "dong"
+
+
 def _get_test_sync_archive(tmp_path: Path) -> bytes:
     tmp_path.joinpath("etc").mkdir(parents=True, exist_ok=True)
     with tmp_path.joinpath("etc/abc").open("w", encoding="utf-8") as f:
@@ -10,7 +10,7 @@ from cmk.utils.hostaddress import HostAddress
 
 from cmk.gui.watolib.piggyback_hub import compute_new_config
 
-from cmk.piggyback_hub.config import PiggybackHubConfig
+from cmk.piggyback_hub.config import Compression, PiggybackHubConfig
 
 
 def test_update_sites_with_hub_config() -> None:
@@ -30,3 +30,21 @@ def test_update_sites_with_hub_config() -> None:
         SiteId("site1"): PiggybackHubConfig(targets={HostAddress("host3"): SiteId("site3")}),
         SiteId("site3"): PiggybackHubConfig(targets={HostAddress("host1"): SiteId("site1")}),
     }
+
+
+def test_batches_are_sent_to_the_sites_receiving_them() -> None:
+    global_settings = {"piggyback_hub_enabled": True, "piggyback_hub_batches": "zlib"}
+    configured_sites = {
+        SiteId("site1"): SiteConfiguration(globals={"piggyback_hub_batches": None}),
+        SiteId("site2"): SiteConfiguration(globals={}),
+        SiteId("site3"): SiteConfiguration(globals={"piggyback_hub_batches": "none"}),
+    }
+
+    assert {
+        site_id: config.batch_sites
+        for site_id, config in compute_new_config(global_settings, configured_sites, {}).items()
+    } == {
+        SiteId("site1"): {SiteId("site2"): Compression.ZLIB, SiteId("site3"): Compression.NONE},
+        SiteId("site2"): {SiteId("site3"): Compression.NONE},
+        SiteId("site3"): {SiteId("site2"): Compression.ZLIB},
+    }
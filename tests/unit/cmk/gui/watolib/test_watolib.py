@@ -91,6 +91,7 @@ def test_registered_configvars() -> None:
         "apache_process_tuning",
         "archive_orphans",
         "auth_by_http_header",
+        "bi_parallel_compilation",
         "builtin_icon_visibility",
         "bulk_discovery_default_settings",
         "check_mk_perfdata_with_times",
@@ -118,6 +119,8 @@ def test_registered_configvars() -> None:
         "housekeeping_interval",
         "sqlite_housekeeping_interval",
         "sqlite_freelist_size",
+        "sqlite_flush_interval",
+        "sqlite_batch_size",
         "user_security_notification_duration",
         "http_proxies",
         "inventory_check_autotrigger",
@@ -146,6 +149,7 @@ def test_registered_configvars() -> None:
         "page_heading",
         "pagetitle_date_format",
         "password_policy",
+        "piggyback_hub_batches",
         "piggyback_hub_enabled",
         "piggyback_max_cachefile_age",
         "profile",
@@ -159,6 +163,7 @@ def test_registered_configvars() -> None:
         "retention_interval",
         "rrdcached_tuning",
         "rule_optimizer",
+        "rule_prefilter",
         "ruleset_matching_stats",
         "selection_livetime",
         "service_view_grouping",
@@ -5,13 +5,21 @@
 
 # pylint: disable=protected-access
 
+import os
 import pprint
+import shutil
+from pathlib import Path
+from typing import NoReturn
+
+import pytest
 
 import cmk.utils.log
 import cmk.utils.paths
 from cmk.utils.hostaddress import HostAddress
 
 from cmk import piggyback
+from cmk.piggyback._paths import index_dir as piggyback_index_dir
+from cmk.piggyback._paths import payload_dir as piggyback_payload_dir
 
 _TEST_HOST_NAME = HostAddress("test-host")
 
@@ -199,6 +207,105 @@ def test_get_source_and_piggyback_hosts() -> None:
     }
 
 
+def test_get_messages_for_hosts() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"),
+        {HostAddress("test-host"): _PAYLOAD, HostAddress("test-host2"): (b"other",)},
+        _REF_TIME,
+        cmk.utils.paths.omd_root,
+    )
+
+    messages = piggyback.get_messages_for_hosts(
+        [HostAddress("test-host"), HostAddress("test-host2"), HostAddress("no-host")],
+        cmk.utils.paths.omd_root,
+    )
+
+    assert [m.raw_data for m in messages[HostAddress("test-host")]] == [b"pay\nload\n"]
+    assert [m.raw_data for m in messages[HostAddress("test-host2")]] == [b"other\n"]
+    assert not messages[HostAddress("no-host")]
+
+
+def test_get_piggyback_meta_data() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME, cmk.utils.paths.omd_root
+    )
+
+    assert piggyback.get_piggyback_meta_data(_TEST_HOST_NAME, cmk.utils.paths.omd_root) == [
+        piggyback.PiggybackMetaData(
+            source=HostAddress("source1"),
+            piggybacked=_TEST_HOST_NAME,
+            last_update=int(_REF_TIME),
+            last_contact=int(_REF_TIME),
+        )
+    ]
+
+
+def test_index_is_rebuilt_from_files() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME, cmk.utils.paths.omd_root
+    )
+    # Files put in place without this package knowing
+    shutil.rmtree(piggyback_index_dir(cmk.utils.paths.omd_root))
+    (piggyback_payload_dir(cmk.utils.paths.omd_root) / "test-host" / "source2").write_bytes(b"x\n")
+
+    assert sorted(
+        m.meta.source for m in piggyback.get_messages_for(_TEST_HOST_NAME, cmk.utils.paths.omd_root)
+    ) == [HostAddress("source1"), HostAddress("source2")]
+
+
+def test_remove_source_status_file_updates_index() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME, cmk.utils.paths.omd_root
+    )
+    piggyback.remove_source_status_file(HostAddress("source1"), cmk.utils.paths.omd_root)
+
+    (meta,) = piggyback.get_piggyback_meta_data(_TEST_HOST_NAME, cmk.utils.paths.omd_root)
+    assert meta.last_contact is None
+
+
+def test_cleanup_piggyback_files() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"),
+        {HostAddress("test-host"): _PAYLOAD},
+        _REF_TIME - 100,
+        cmk.utils.paths.omd_root,
+        _REF_TIME,
+    )
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source2"),
+        {HostAddress("test-host2"): _PAYLOAD},
+        _REF_TIME,
+        cmk.utils.paths.omd_root,
+    )
+
+    piggyback.cleanup_piggyback_files(_REF_TIME - 10, cmk.utils.paths.omd_root)
+
+    assert not (piggyback_payload_dir(cmk.utils.paths.omd_root) / "test-host").exists()
+    assert piggyback.get_piggybacked_host_with_sources(cmk.utils.paths.omd_root) == {
+        HostAddress("test-host2"): [
+            piggyback.PiggybackMetaData(
+                source=HostAddress("source2"),
+                piggybacked=HostAddress("test-host2"),
+                last_update=int(_REF_TIME),
+                last_contact=int(_REF_TIME),
+            ),
+        ],
+    }
+
+
+def test_move_for_host_rename_invalidates_index() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME, cmk.utils.paths.omd_root
+    )
+    assert piggyback.get_piggyback_meta_data(_TEST_HOST_NAME, cmk.utils.paths.omd_root)
+
+    piggyback.move_for_host_rename(cmk.utils.paths.omd_root, "test-host", "new-host")
+
+    assert not piggyback.get_piggyback_meta_data(_TEST_HOST_NAME, cmk.utils.paths.omd_root)
+    (meta,) = piggyback.get_piggyback_meta_data(HostAddress("new-host"), cmk.utils.paths.omd_root)
+    assert meta.source == HostAddress("source1")
+
+
 class TestPiggybackMetaData:
     def test_serialization_roundtrip(self) -> None:
         pmd = piggyback.PiggybackMetaData(
@@ -217,3 +324,30 @@ class TestPiggybackMetaData:
             last_contact=None,
         )
         assert piggyback.PiggybackMetaData.deserialize(pmd.serialize()) == pmd
+
+
+def test_index_is_only_read_when_changed(monkeypatch: pytest.MonkeyPatch) -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME, cmk.utils.paths.omd_root
+    )
+    # Build the index and pretend its last change happened long ago
+    assert piggyback.get_piggyback_meta_data(_TEST_HOST_NAME, cmk.utils.paths.omd_root)
+    os.utime(piggyback_index_dir(cmk.utils.paths.omd_root), (_REF_TIME, _REF_TIME))
+    assert piggyback.get_piggyback_meta_data(_TEST_HOST_NAME, cmk.utils.paths.omd_root)
+
+    with monkeypatch.context() as m:
+        m.setattr(os, "listdir", _fail)
+        m.setattr(Path, "open", _fail)
+        assert piggyback.get_piggyback_meta_data(_TEST_HOST_NAME, cmk.utils.paths.omd_root)
+
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source2"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME, cmk.utils.paths.omd_root
+    )
+    assert sorted(
+        m.source
+        for m in piggyback.get_piggyback_meta_data(_TEST_HOST_NAME, cmk.utils.paths.omd_root)
+    ) == [HostAddress("source1"), HostAddress("source2")]
+
+
+def _fail(*args: object, **kwargs: object) -> NoReturn:
+    raise AssertionError("The index must not be read")
@@ -12,6 +12,7 @@ from cmk.utils.hostaddress import HostName
 
 from cmk.messaging import DeliveryTag
 from cmk.piggyback_hub.config import (
+    Compression,
     load_config,
     PiggybackHubConfig,
     save_config_on_message,
@@ -21,7 +22,9 @@ from cmk.piggyback_hub.paths import create_paths
 
 def test_save_config_on_message(tmp_path: Path) -> None:
     test_logger = logging.getLogger("test")
-    input_payload = PiggybackHubConfig(targets={HostName("test_host"): "test_site"})
+    input_payload = PiggybackHubConfig(
+        targets={HostName("test_host"): "test_site"}, batch_sites={"test_site": Compression.ZLIB}
+    )
     on_message = save_config_on_message(test_logger, tmp_path, (reload_config := make_event()))
 
     assert not reload_config.is_set()
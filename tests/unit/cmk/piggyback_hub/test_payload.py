@@ -4,8 +4,12 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import logging
+from multiprocessing import Event as make_event
+from pathlib import Path
 from unittest.mock import Mock
 
+import pytest
+
 import cmk.utils.paths
 from cmk.utils.hostaddress import HostName
 
@@ -15,7 +19,27 @@ from cmk.piggyback import (
     PiggybackMessage,
     PiggybackMetaData,
 )
-from cmk.piggyback_hub.payload import PiggybackPayload, save_payload_on_message
+from cmk.piggyback_hub.config import Compression, PiggybackHubConfig
+from cmk.piggyback_hub.payload import (
+    make_batches,
+    PiggybackPayload,
+    PiggybackPayloadBatch,
+    PiggybackPayloadMessage,
+    save_payload_on_message,
+    SendingPayloadProcess,
+    store_payloads,
+    TransferStatistics,
+)
+
+
+def _payload(target: str, last_update: int, sections: bytes) -> PiggybackPayload:
+    return PiggybackPayload(
+        source_host="source",
+        target_host=target,
+        last_update=last_update,
+        last_contact=1640000000,
+        sections=sections,
+    )
 
 
 def test__on_message() -> None:
@@ -29,7 +53,13 @@ def test__on_message() -> None:
     )
     on_message = save_payload_on_message(test_logger, cmk.utils.paths.omd_root)
 
-    on_message(Mock(), DeliveryTag(0), input_payload)
+    on_message(
+        Mock(),
+        DeliveryTag(0),
+        PiggybackPayloadMessage(
+            PiggybackPayloadBatch.from_payloads([input_payload], Compression.ZLIB)
+        ),
+    )
 
     expected_payload = [
         PiggybackMessage(
@@ -44,3 +74,128 @@ def test__on_message() -> None:
     ]
     actual_payload = get_messages_for(HostName("target"), cmk.utils.paths.omd_root)
     assert actual_payload == expected_payload
+
+
+@pytest.mark.parametrize("compression", list(Compression))
+def test_payload_batch_serialization_roundtrip(compression: Compression) -> None:
+    payloads = [_payload("target1", 1640000020, b"a\nb"), _payload("target2", 1640000020, b"")]
+    batch = PiggybackPayloadBatch.from_payloads(payloads, compression)
+
+    assert PiggybackPayloadBatch.model_validate_json(batch.model_dump_json()).payloads() == payloads
+
+
+def test_payload_batch_compression() -> None:
+    payloads = [_payload(f"target{n}", 1640000020, b"<<<section>>>\n" * 100) for n in range(10)]
+
+    assert len(
+        PiggybackPayloadBatch.from_payloads(payloads, Compression.ZLIB).model_dump_json()
+    ) < len(PiggybackPayloadBatch.from_payloads(payloads, Compression.NONE).model_dump_json())
+
+
+def test_uncompressed_payload_batch_is_not_encoded() -> None:
+    payloads = [_payload("target1", 1640000020, b"<<<section>>>\n" * 100)]
+
+    assert (
+        len(PiggybackPayloadBatch.from_payloads(payloads, Compression.NONE).model_dump_json())
+        < len(payloads[0].model_dump_json()) + 100
+    )
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        PiggybackPayloadBatch.from_payloads(
+            [_payload("target", 1640000020, b"a")], Compression.ZLIB
+        ),
+        _payload("target", 1640000020, b"a"),
+    ],
+)
+def test_payload_message_accepts_batches_and_single_payloads(
+    payload: PiggybackPayloadBatch | PiggybackPayload,
+) -> None:
+    assert PiggybackPayloadMessage.model_validate_json(payload.model_dump_json()).payloads() == [
+        _payload("target", 1640000020, b"a")
+    ]
+
+
+def test__on_message_drops_invalid_batch() -> None:
+    channel = Mock()
+    on_message = save_payload_on_message(logging.getLogger("test"), cmk.utils.paths.omd_root)
+
+    on_message(
+        channel,
+        DeliveryTag(23),
+        PiggybackPayloadMessage(PiggybackPayloadBatch(compression=Compression.ZLIB, data="eA==")),
+    )
+
+    channel.acknowledge.assert_called_once_with(DeliveryTag(23))
+
+
+def test_make_batches() -> None:
+    payloads = [
+        _payload("target1", 1640000020, b"x" * 6),
+        _payload("target2", 1640000020, b"x" * 4),
+        _payload("target3", 1640000020, b"x" * 12),
+        _payload("target4", 1640000020, b"x" * 1),
+    ]
+
+    assert [[p.target_host for p in batch] for batch in make_batches(payloads, 10)] == [
+        ["target1", "target2"],
+        ["target3"],
+        ["target4"],
+    ]
+
+
+def test_store_payloads_keeps_latest() -> None:
+    store_payloads(
+        [
+            _payload("target1", 1640000030, b"new"),
+            _payload("target1", 1640000020, b"old"),
+            _payload("target2", 1640000020, b"other"),
+        ],
+        cmk.utils.paths.omd_root,
+    )
+
+    (message,) = get_messages_for(HostName("target1"), cmk.utils.paths.omd_root)
+    assert message.raw_data == b"new\n"
+    assert message.meta.last_update == 1640000030
+    (message,) = get_messages_for(HostName("target2"), cmk.utils.paths.omd_root)
+    assert message.raw_data == b"other\n"
+
+
+def test_payloads_are_only_batched_for_batch_sites(tmp_path: Path) -> None:
+    test_logger = logging.getLogger("test")
+    messages = [
+        PiggybackMessage(
+            meta=PiggybackMetaData(
+                source=HostName("source"),
+                piggybacked=HostName(target),
+                last_update=1640000020,
+                last_contact=1640000000,
+            ),
+            raw_data=b"data",
+        )
+        for target in ("old1", "old2", "new1", "new2")
+    ]
+    config = PiggybackHubConfig(
+        targets={
+            HostName("old1"): "old_site",
+            HostName("old2"): "old_site",
+            HostName("new1"): "new_site",
+            HostName("new2"): "new_site",
+        },
+        batch_sites={"new_site": Compression.NONE},
+    )
+    channel = Mock()
+
+    SendingPayloadProcess(test_logger, tmp_path, make_event(), str)._handle_messages(
+        channel, config, messages, TransferStatistics(test_logger, "Sent", 60.0)
+    )
+
+    published = [(c.args[0], c.args[1].root) for c in channel.publish_for_site.call_args_list]
+    assert [(site, type(message)) for site, message in published] == [
+        ("old_site", PiggybackPayload),
+        ("old_site", PiggybackPayload),
+        ("new_site", PiggybackPayloadBatch),
+    ]
+    assert [p.target_host for p in published[2][1].payloads()] == ["new1", "new2"]
@@ -113,6 +113,46 @@ def test_get_snmp_table(
     assert get_all_snmp_tables(snmp_info) == expected_values
 
 
+def test_get_snmp_table_walks_all_columns_at_once() -> None:
+    walked: list[Sequence[str]] = []
+
+    class Backend(SNMPTestBackend):
+        def walk_many(self, /, oids, *, context, **kw):
+            walked.append(oids)
+            return super().walk_many(oids, context=context, **kw)
+
+    base = ".1.3.6.1.4.1.13595.2.2.3.1"
+    get_table = partial(
+        get_snmp_table,
+        section_name=SectionName("unit_test"),
+        walk_cache={},
+        backend=Backend(SNMPConfig, logger),
+        log=logger.debug,
+    )
+
+    table = get_table(
+        tree=BackendSNMPTree(
+            base=base,
+            oids=[
+                BackendOIDSpec(SpecialColumn.END, "string", False),
+                BackendOIDSpec("16", "string", False),
+                BackendOIDSpec("17", "string", False),
+            ],
+        )
+    )
+    assert table == [[str(r), "C0FEFE", "C0FEFE"] for r in (1, 2, 3)]
+    assert walked == [[f"{base}.16", f"{base}.17"]]
+
+    # Columns in the walk cache are not walked again
+    get_table(
+        tree=BackendSNMPTree(
+            base=base,
+            oids=[BackendOIDSpec("17", "string", False), BackendOIDSpec("18", "string", False)],
+        )
+    )
+    assert walked[1:] == [[f"{base}.18"]]
+
+
 @pytest.mark.parametrize(
     "encoding, columns, expected",
     [
@@ -24,6 +24,16 @@ def test_new_files_are_ignored(tmp_path: Path) -> None:
     assert new_file.read_text() == content
 
 
+def test_files_per_service_are_ignored(tmp_path: Path) -> None:
+    content = b'value store 2\n["heute","plugin","item"]\t{"user-key":"42"}\n'
+
+    (new_file := tmp_path / "heute").write_bytes(content)
+
+    ConvertCounters.convert_counter_files(tmp_path)
+
+    assert new_file.read_bytes() == content
+
+
 def test_old_files_are_converted(tmp_path: Path) -> None:
     host = HostAddress("heute")
     service = ServiceID(CheckPluginName("plugin"), "item")
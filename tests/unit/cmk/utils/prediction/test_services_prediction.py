@@ -6,6 +6,7 @@
 # pylint: disable=protected-access
 
 import json
+from collections.abc import Sequence
 
 import pytest
 
@@ -15,6 +16,8 @@ from livestatus import RRDResponse
 
 from cmk.utils.prediction import _prediction
 
+from cmk.agent_based.prediction_backend import PredictionInfo, PredictionParameters
+
 
 def _load_fake_rrd_response(start: int, end: int) -> RRDResponse:
     raw = json.loads(
@@ -210,3 +213,59 @@ def test_calculate_data_for_prediction(
     assert len(expected_reference.points) == len(data_for_pred.points)
     for cal, ref in zip(data_for_pred.points, expected_reference.points):
         assert cal == pytest.approx(ref, rel=1e-12, abs=1e-12)
+
+
+def _fake_recorded_data(rpn: str, start: int, end: int) -> RRDResponse | None:
+    if rpn.startswith("unknown"):
+        return None
+    step = 600 if (start // 86400) % 2 else 300
+    return RRDResponse(
+        window=range(start, end, step),
+        values=[
+            None if t % 7 == 0 else float((t // step) % 13 + len(rpn))
+            for t in range(start, end, step)
+        ],
+    )
+
+
+def _prediction_info(metric: str, period: str) -> PredictionInfo:
+    return PredictionInfo(
+        valid_interval=(1543402800, 1543489200),
+        metric=metric,
+        direction="upper",
+        params=PredictionParameters(period=period, horizon=14, levels=("stdev", (2, 4))),
+    )
+
+
+def test_compute_predictions_fetches_shared_time_slices_once() -> None:
+    infos = [
+        _prediction_info("load15", "wday"),
+        _prediction_info("load5", "wday"),
+        _prediction_info("load15", "hour"),
+        _prediction_info("unknown", "wday"),
+    ]
+    fetched: list[tuple[Sequence[str], int, int]] = []
+
+    def get_recorded_data(rpns: Sequence[str], start: int, end: int) -> dict[str, RRDResponse]:
+        fetched.append((rpns, start, end))
+        return {
+            rpn: response
+            for rpn in rpns
+            if (response := _fake_recorded_data(rpn, start, end)) is not None
+        }
+
+    predictions = _prediction.compute_predictions(infos, get_recorded_data)
+
+    assert predictions == [_prediction.compute_prediction(i, _fake_recorded_data) for i in infos]
+    assert predictions[0] is not None
+    assert predictions[-1] is None
+    # two weekly slices for the "wday" metrics, 14 daily slices for "hour"
+    assert [len(rpns) for rpns, _start, _end in fetched] == [3] * 2 + [1] * 14
+
+
+def test_forward_fill_resample() -> None:
+    values = _prediction._to_array([0, 10, None, 30])
+    resampled = _prediction._forward_fill_resample(range(0, 40, 10), values, range(5, 45, 5))
+    assert resampled.tolist() == pytest.approx(
+        [0, 10, 10, float("nan"), float("nan"), 30, 30, 30], nan_ok=True
+    )
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+import pytest
+
+from cmk.utils.hostaddress import HostName
+from cmk.utils.labels import BuiltinHostLabelsStore
+from cmk.utils.rulesets.match_index import HostMatchIndex, hosts_fingerprint
+from cmk.utils.rulesets.ruleset_matcher import (
+    LabelManager,
+    RulesetMatcher,
+    RulesetOptimizer,
+    RuleSpec,
+)
+from cmk.utils.tags import TagGroupID, TagID
+
+HOSTS = [HostName(f"host{nr}") for nr in range(20)]
+
+HOST_TAGS: Mapping[HostName, Mapping[TagGroupID, TagID]] = {
+    host_name: {
+        TagGroupID("criticality"): TagID("prod" if nr % 3 else "test"),
+        TagGroupID("networking"): TagID("lan" if nr % 2 else "wan"),
+    }
+    for nr, host_name in enumerate(HOSTS)
+}
+
+HOST_PATHS = {host_name: f"/folder{nr % 4}/hosts.mk" for nr, host_name in enumerate(HOSTS)}
+
+RULESET: Sequence[RuleSpec[str]] = [
+    {
+        "id": "tags",
+        "value": "prod_lan",
+        "condition": {
+            "host_tags": {
+                TagGroupID("criticality"): TagID("prod"),
+                TagGroupID("networking"): TagID("lan"),
+            },
+        },
+    },
+    {
+        "id": "or",
+        "value": "not_test",
+        "condition": {"host_tags": {TagGroupID("criticality"): {"$nor": [TagID("test")]}}},
+    },
+    {"id": "folder", "value": "folder1", "condition": {"host_folder": "/folder1/"}},
+    {
+        "id": "regex",
+        "value": "regex",
+        "condition": {"host_name": [{"$regex": "host1"}, HostName("host3")]},
+    },
+    {"id": "all", "value": "all", "condition": {}},
+]
+
+
+def _matcher(
+    match_index_path: Path | None,
+    host_tags: Mapping[HostName, Mapping[TagGroupID, TagID]] = HOST_TAGS,
+) -> RulesetMatcher:
+    return RulesetMatcher(
+        host_tags=dict(host_tags),
+        host_paths=HOST_PATHS,
+        label_manager=LabelManager(
+            explicit_host_labels={},
+            host_label_rules=(),
+            service_label_rules=(),
+            discovered_labels_of_service=lambda *args, **kw: {},
+        ),
+        all_configured_hosts=frozenset(HOSTS),
+        clusters_of={},
+        nodes_of={},
+        builtin_host_labels_store=BuiltinHostLabelsStore(),
+        match_index_path=match_index_path,
+    )
+
+
+def _host_values(matcher: RulesetMatcher) -> Mapping[HostName, Sequence[str]]:
+    return {host_name: matcher.get_host_values(host_name, RULESET) for host_name in HOSTS}
+
+
+def test_bitset_roundtrip() -> None:
+    index = HostMatchIndex(HOSTS, "fingerprint")
+    hosts = {HOSTS[0], HOSTS[7], HOSTS[19]}
+
+    bitset = index.bitset(hosts)
+
+    # Sorted: host0, host1, host10, ..., host19, host2, ..., host9
+    assert bitset == 1 << 0 | 1 << 11 | 1 << 17
+    assert index.hosts_of(bitset) == hosts
+    assert not index.hosts_of(index.bitset([]))
+
+
+def test_deserialize_checks_fingerprint() -> None:
+    index = HostMatchIndex(HOSTS, "fingerprint")
+    index.add("key", HOSTS[:3])
+    raw = index.serialize()
+
+    assert HostMatchIndex.deserialize(raw, HOSTS, "fingerprint").get("key") == index.get("key")
+    assert HostMatchIndex.deserialize(raw, HOSTS, "other").get("key") is None
+    assert HostMatchIndex.deserialize(b"garbage", HOSTS, "fingerprint").get("key") is None
+
+
+def test_fingerprint_depends_on_host_config() -> None:
+    tags = {hn: set(tags.items()) for hn, tags in HOST_TAGS.items()}
+    fingerprint = hosts_fingerprint(HOST_PATHS, tags)
+
+    assert hosts_fingerprint(dict(HOST_PATHS), dict(tags)) == fingerprint
+    assert hosts_fingerprint({**HOST_PATHS, HOSTS[0]: "/other/hosts.mk"}, tags) != fingerprint
+    assert hosts_fingerprint(HOST_PATHS, {**tags, HOSTS[0]: set()}) != fingerprint
+
+
+def test_same_values_with_index(tmp_path: Path) -> None:
+    expected = _host_values(_matcher(None))
+
+    matcher = _matcher(tmp_path / "index")
+    assert _host_values(matcher) == expected
+    matcher.persist_match_index()
+
+    assert _host_values(_matcher(tmp_path / "index")) == expected
+
+
+def test_index_skips_matching(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    matcher = _matcher(tmp_path / "index")
+    expected = _host_values(matcher)
+    matcher.persist_match_index()
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("not indexed")
+
+    monkeypatch.setattr(RulesetOptimizer, "_compute_all_matching_hosts", fail)
+
+    assert _host_values(_matcher(tmp_path / "index")) == expected
+
+
+def test_index_is_dropped_for_changed_tags(tmp_path: Path) -> None:
+    matcher = _matcher(tmp_path / "index")
+    _host_values(matcher)
+    matcher.persist_match_index()
+
+    changed_tags = {
+        **HOST_TAGS,
+        HOSTS[0]: {
+            TagGroupID("criticality"): TagID("prod"),
+            TagGroupID("networking"): TagID("lan"),
+        },
+    }
+
+    assert _host_values(_matcher(tmp_path / "index", changed_tags)) == _host_values(
+        _matcher(None, changed_tags)
+    )
+
+
+def test_index_with_processed_hosts(tmp_path: Path) -> None:
+    matcher = _matcher(tmp_path / "index")
+    _host_values(matcher)
+    matcher.persist_match_index()
+
+    processed = set(HOSTS[:5])
+    matcher = _matcher(tmp_path / "index")
+    matcher.ruleset_optimizer.set_all_processed_hosts(processed)
+    unindexed_matcher = _matcher(None)
+    unindexed_matcher.ruleset_optimizer.set_all_processed_hosts(processed)
+
+    assert _host_values(matcher) == _host_values(unindexed_matcher)
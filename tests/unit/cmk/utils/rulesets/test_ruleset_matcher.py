@@ -5,6 +5,7 @@
 
 # pylint: disable=protected-access
 
+import re
 from collections.abc import Mapping, Sequence
 from typing import Any
 
@@ -16,6 +17,7 @@ from tests.testlib.base import Scenario
 from cmk.utils.hostaddress import HostName
 from cmk.utils.labels import BuiltinHostLabelsStore
 from cmk.utils.rulesets.ruleset_matcher import (
+    _prefilter_service_descriptions,
     LabelManager,
     matches_tag_condition,
     RuleConditionsSpec,
@@ -878,3 +880,132 @@ def test_matches_tag_condition(
         )
         is expected_result
     )
+
+
+BATCH_SERVICES: Mapping[ServiceName, Mapping[str, str]] = {
+    ServiceName(f"Interface {nr}"): {"speed": "fast" if nr % 2 else "slow"} for nr in range(12)
+} | {
+    ServiceName("CPU load"): {"os": "linux"},
+    ServiceName("Memory"): {},
+}
+
+batch_ruleset: Sequence[RuleSpec[str]] = [
+    {
+        "id": "regex",
+        "value": "interface",
+        "condition": {"service_description": [{"$regex": "Interface 1"}]},
+    },
+    {
+        "id": "negated",
+        "value": "no_interface",
+        "condition": {"service_description": {"$nor": [{"$regex": "Interface"}]}},
+    },
+    {
+        "id": "label",
+        "value": "fast",
+        "condition": {"service_label_groups": [("and", [("and", "speed:fast")])]},
+    },
+    {
+        "id": "regex_and_label",
+        "value": "fast_interface_1",
+        "condition": {
+            "service_description": [{"$regex": "Interface 1"}],
+            "service_label_groups": [("and", [("not", "speed:slow")])],
+        },
+    },
+    {
+        "id": "other_host",
+        "value": "other_host",
+        "condition": {"host_name": [HostName("other")]},
+    },
+    {
+        "id": "disabled",
+        "value": "disabled",
+        "condition": {},
+        "options": {"disabled": True},
+    },
+    {"id": "all", "value": "all", "condition": {}},
+]
+
+
+def _batch_matcher() -> RulesetMatcher:
+    return RulesetMatcher(
+        host_tags={HostName("host"): {}, HostName("other"): {}},
+        host_paths={HostName("host"): "/hosts.mk", HostName("other"): "/hosts.mk"},
+        label_manager=LabelManager(
+            explicit_host_labels={},
+            host_label_rules=(),
+            service_label_rules=(),
+            discovered_labels_of_service=lambda host_name, description: BATCH_SERVICES.get(
+                description, {}
+            ),
+        ),
+        all_configured_hosts=frozenset({HostName("host"), HostName("other")}),
+        clusters_of={},
+        nodes_of={},
+        builtin_host_labels_store=BuiltinHostLabelsStore(),
+    )
+
+
+def test_get_service_ruleset_values_of_host() -> None:
+    expected = {
+        description: _batch_matcher().service_extra_conf(
+            HostName("host"), description, batch_ruleset
+        )
+        for description in BATCH_SERVICES
+    }
+
+    values = _batch_matcher().get_service_ruleset_values_of_host(
+        HostName("host"), BATCH_SERVICES, batch_ruleset
+    )
+
+    assert values == expected
+    assert values[ServiceName("Interface 11")] == [
+        "interface",
+        "fast",
+        "fast_interface_1",
+        "all",
+    ]
+    assert values[ServiceName("Memory")] == ["no_interface", "all"]
+
+
+@pytest.mark.parametrize(
+    "patterns, expected",
+    [
+        pytest.param(["(?:CPU)", "(?:Interface 1)"], {"CPU load", "Interface 1"}, id="combined"),
+        pytest.param(["(?i)(?:cpu)", "(?:Memory)"], {"CPU load", "Memory"}, id="modifier"),
+        pytest.param(["(?:CPU)"], {"CPU load", "Interface 1", "Memory"}, id="single"),
+        pytest.param(
+            ["(C)PU\\1", "(?:Memory)"], {"CPU load", "Interface 1", "Memory"}, id="groups"
+        ),
+    ],
+)
+def test_prefilter_service_descriptions(patterns: Sequence[str], expected: set[str]) -> None:
+    assert _prefilter_service_descriptions(
+        [re.compile(p) for p in patterns],
+        frozenset({ServiceName("CPU load"), ServiceName("Interface 1"), ServiceName("Memory")}),
+    ) == frozenset(expected)
+
+
+def test_prepared_service_rulesets() -> None:
+    matcher = _batch_matcher()
+    matcher.prepare_service_rulesets(HostName("host"), BATCH_SERVICES, [batch_ruleset])
+
+    assert matcher._prepared_values(HostName("host"), ServiceName("Memory"), batch_ruleset)
+    assert matcher.service_extra_conf(HostName("host"), ServiceName("Memory"), batch_ruleset) == [
+        "no_interface",
+        "all",
+    ]
+    # Not prepared: Evaluated for the single service
+    assert matcher.service_extra_conf(HostName("host"), ServiceName("Uptime"), batch_ruleset) == [
+        "no_interface",
+        "all",
+    ]
+    assert matcher.service_extra_conf(HostName("other"), ServiceName("Memory"), batch_ruleset) == [
+        "no_interface",
+        "other_host",
+        "all",
+    ]
+
+    matcher.clear_caches()
+    assert not matcher._prepared_values(HostName("host"), ServiceName("Memory"), batch_ruleset)
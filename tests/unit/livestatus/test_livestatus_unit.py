@@ -8,10 +8,14 @@
 # pylint: disable=redefined-outer-name
 
 import errno
+import json
 import socket
 import ssl
-from collections.abc import Sequence
-from contextlib import closing
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, suppress
 from pathlib import Path
 
 import pytest
@@ -341,3 +345,188 @@ def test_livestatus_lql(
     result: str,
 ) -> None:
     assert livestatus.livestatus_lql(*args) == result
+
+
+def _serve_one_query(sock_path: Path, response: bytes, delay: float) -> threading.Thread:
+    server = socket.socket(socket.AF_UNIX)
+    server.bind(str(sock_path))
+    server.listen(1)
+
+    def _serve() -> None:
+        with closing(server), closing(server.accept()[0]) as connection:
+            request = b""
+            while not request.endswith(b"\n\n"):
+                request += connection.recv(4096)
+            time.sleep(delay)
+            with suppress(BrokenPipeError):  # The client may have stopped waiting
+                connection.sendall(b"200 %11d\n" % len(response) + response)
+
+    thread = threading.Thread(target=_serve, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def slow_and_fast_site(tmp_path: Path) -> Iterator[livestatus.MultiSiteConnection]:
+    threads = [
+        _serve_one_query(tmp_path / "slow", b"[['slow_host']]", 0.3),
+        _serve_one_query(tmp_path / "fast", b"[['fast_host']]", 0.0),
+    ]
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                livestatus.SiteId("slow"): {"socket": f"unix:{tmp_path / 'slow'}"},
+                livestatus.SiteId("fast"): {"socket": f"unix:{tmp_path / 'fast'}"},
+            }
+        )
+    )
+    yield live
+    live.disconnect()
+    for thread in threads:
+        thread.join(timeout=5)
+
+
+def test_iter_query_parallel_yields_sites_as_they_respond(
+    slow_and_fast_site: livestatus.MultiSiteConnection,
+) -> None:
+    assert list(slow_and_fast_site.iter_query_parallel(livestatus.Query("GET hosts"))) == [
+        ("fast", [["fast_host"]]),
+        ("slow", [["slow_host"]]),
+    ]
+    assert slow_and_fast_site.alive_sites() == ["slow", "fast"]
+
+
+def test_iter_query_parallel_parses_on_executor(
+    slow_and_fast_site: livestatus.MultiSiteConnection,
+) -> None:
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert dict(
+            slow_and_fast_site.iter_query_parallel(livestatus.Query("GET hosts"), executor=executor)
+        ) == {"fast": [["fast_host"]], "slow": [["slow_host"]]}
+    assert slow_and_fast_site.alive_sites() == ["slow", "fast"]
+
+
+def test_query_parallel_keeps_site_order(
+    slow_and_fast_site: livestatus.MultiSiteConnection,
+) -> None:
+    slow_and_fast_site.set_prepend_site(True)
+    assert slow_and_fast_site.query("GET hosts") == [
+        ["slow", "slow_host"],
+        ["fast", "fast_host"],
+    ]
+
+
+def test_iter_query_parallel_stopped_early(
+    slow_and_fast_site: livestatus.MultiSiteConnection,
+) -> None:
+    rows = slow_and_fast_site.iter_query_parallel(livestatus.Query("GET hosts"))
+    assert next(rows) == ("fast", [["fast_host"]])
+    rows.close()
+
+    assert slow_and_fast_site.alive_sites() == ["slow", "fast"]
+    assert slow_and_fast_site.get_connection(livestatus.SiteId("slow")).socket is None
+
+
+ROWS = [
+    ["host,1", 'with "quotes", [brackets]\\ and ],\nnewlines', 1],
+    ["höst 2 ✓", "", [["nested", 2.5], {"key": None}]],
+    [],
+]
+
+
+def _chunked(raw: bytes, size: int) -> Iterator[bytes]:
+    return (raw[i : i + size] for i in range(0, len(raw), size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+@pytest.mark.parametrize(
+    "raw, json_format",
+    [
+        pytest.param(
+            ("[" + ",\n".join(json.dumps(row) for row in ROWS) + "]\n").encode("utf-8"),
+            True,
+            id="json",
+        ),
+        pytest.param(
+            ("[" + ",\n".join(repr(row) for row in ROWS) + "]\n").encode("utf-8"),
+            False,
+            id="python",
+        ),
+        pytest.param(json.dumps(ROWS).encode("utf-8"), True, id="json one line"),
+        pytest.param(repr(ROWS).encode("utf-8"), False, id="python one line"),
+        pytest.param(
+            ("[\n" + ",\n".join(json.dumps(row, indent=1) for row in ROWS) + "\n]\n").encode(),
+            True,
+            id="json rows spanning lines",
+        ),
+    ],
+)
+def test_iter_response_rows(raw: bytes, json_format: bool, chunk_size: int) -> None:
+    assert list(livestatus.iter_response_rows(_chunked(raw, chunk_size), json_format)) == ROWS
+
+
+@pytest.mark.parametrize("raw", [b"[]\n", b"[\n]\n", b" []"])
+def test_iter_response_rows_empty(raw: bytes) -> None:
+    assert not list(livestatus.iter_response_rows([raw], True))
+
+
+@pytest.mark.parametrize("raw", [b"", b"{}", b"[[1],\n[2", b"[[1]]\n[2]"])
+def test_iter_response_rows_malformed(raw: bytes) -> None:
+    with pytest.raises(livestatus.MKLivestatusQueryError):
+        list(livestatus.iter_response_rows(_chunked(raw, 2), True))
+
+
+@pytest.fixture
+def streaming_site(tmp_path: Path) -> Iterator[tuple[livestatus.SingleSiteConnection, Path]]:
+    connection = livestatus.SingleSiteConnection(f"unix:{tmp_path / 'site'}")
+    yield connection, tmp_path / "site"
+    connection.disconnect()
+
+
+def test_single_site_iter_query(
+    streaming_site: tuple[livestatus.SingleSiteConnection, Path],
+) -> None:
+    connection, path = streaming_site
+    rows = [[f"host{nr}", nr] for nr in range(1000)]
+    raw = ("[" + ",\n".join(repr(row) for row in rows) + "]\n").encode()
+    thread = _serve_one_query(path, raw, 0.0)
+
+    assert list(connection.iter_query("GET hosts\nColumns: name state\n")) == rows
+    thread.join(timeout=5)
+
+
+def test_single_site_iter_query_table_assoc(
+    streaming_site: tuple[livestatus.SingleSiteConnection, Path],
+) -> None:
+    connection, path = streaming_site
+    thread = _serve_one_query(path, b"[['name', 'state'],\n['host1', 0],\n['host2', 1]]\n", 0.0)
+
+    assert list(connection.iter_query_table_assoc("GET hosts\nColumns: name state\n")) == [
+        {"name": "host1", "state": 0},
+        {"name": "host2", "state": 1},
+    ]
+    thread.join(timeout=5)
+
+
+def test_single_site_iter_query_stopped_early_disconnects(
+    streaming_site: tuple[livestatus.SingleSiteConnection, Path],
+) -> None:
+    connection, path = streaming_site
+    rows = [[f"host{nr}"] for nr in range(10000)]
+    thread = _serve_one_query(path, ("[" + ",\n".join(map(repr, rows)) + "]\n").encode(), 0.0)
+
+    with closing(connection.iter_query("GET hosts\nColumns: name\n")) as response:
+        assert next(response) == rows[0]
+    thread.join(timeout=5)
+
+    # The rest of the response must not be taken for the response of the next query
+    assert connection.socket is None
+
+
+def test_multi_site_iter_query(slow_and_fast_site: livestatus.MultiSiteConnection) -> None:
+    slow_and_fast_site.set_prepend_site(True)
+
+    assert list(slow_and_fast_site.iter_query("GET hosts\nColumns: name\n")) == [
+        ["slow", "slow_host"],
+        ["fast", "fast_host"],
+    ]